@@ -0,0 +1,47 @@
+from functools import lru_cache
+from app.config import settings
+from app.almacenamiento.documentos import MotorDocumentos
+from app.almacenamiento.memoria import MotorMemoria
+from app.almacenamiento.sqlite import MotorSQLite
+
+
+# Motores locales de documentos (ver app.almacenamiento.documentos).
+#
+# settings.ALMACENAMIENTO elige dónde guarda sus datos el servicio:
+# "firestore" (por defecto), "memoria" o "sqlite" (archivo SQLITE_PATH).
+# Los motores locales no usan red ni credenciales, para pruebas de carga
+# y entornos de staging aislados.
+
+MOTORES = ("memoria", "sqlite")
+
+# Índices de SQLite para las consultas de CuentasRepository sobre
+# colecciones de primer nivel: (colección, campos), igualdades primero.
+# Las subcolecciones de una cuenta (resúmenes) ya quedan acotadas por la
+# clave primaria, y el listado de cuentas ordena por ID.
+INDICES_SQLITE = (
+    ("cuentas", ("cliente_id",)),
+    ("cuentas", ("numero_cuenta",)),
+    ("movimientos", ("cuenta_id", "fecha")),
+    ("movimientos", ("cuenta_id", "tipo", "fecha")),
+    ("holds", ("cuenta_id", "estado")),
+    ("holds", ("estado", "expira_en")),
+    ("outbox", ("created_at",)),
+)
+
+
+def crear_motor(nombre: str, sqlite_path: str = "cuentas.db") -> MotorDocumentos:
+    """Crea el motor local `nombre`"""
+    if nombre == "memoria":
+        return MotorMemoria()
+    if nombre == "sqlite":
+        return MotorSQLite(sqlite_path, indices=INDICES_SQLITE)
+    raise ValueError(f"Motor de almacenamiento desconocido: {nombre}")
+
+
+@lru_cache(maxsize=None)
+def get_motor_local() -> MotorDocumentos:
+    """Motor local configurado en settings (uno por proceso)"""
+    return crear_motor(settings.ALMACENAMIENTO, settings.SQLITE_PATH)
+
+
+__all__ = ["INDICES_SQLITE", "MOTORES", "MotorDocumentos", "MotorMemoria", "MotorSQLite", "crear_motor", "get_motor_local"]
@@ -0,0 +1,451 @@
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore_v1.transforms import DELETE_FIELD, SERVER_TIMESTAMP, Increment
+import functools
+import operator
+import threading
+import uuid
+
+
+# Subconjunto del cliente de Firestore sobre un motor local.
+#
+# Los repositorios hablan con Firestore a través de unas pocas piezas del
+# cliente: referencias a colecciones y documentos, consultas con where /
+# order_by / limit / start_after, get_all, lotes de escritura y
+# transacciones, y las transformaciones Increment / DELETE_FIELD /
+# SERVER_TIMESTAMP. Este módulo implementa esas piezas con la misma
+# interfaz sobre un `MotorDocumentos`, así `CuentasRepository` corre sin
+# cambios contra los motores locales (memoria y SQLite) y la lógica de
+# shards, límites, resúmenes, outbox y holds sigue siendo una sola.
+#
+# Las transacciones son pesimistas: el motor da acceso exclusivo de
+# escritura mientras corre la función transaccional y aplica sus
+# escrituras al final, todas o ninguna. Igual que en Firestore, las
+# lecturas de la transacción no ven sus propias escrituras.
+
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+# Campo especial de las consultas: el ID del documento
+CAMPO_ID = "__name__"
+
+_OPERADORES: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda valor, opciones: valor in opciones,
+    "not-in": lambda valor, opciones: valor not in opciones,
+    "array-contains": lambda valor, buscado: isinstance(valor, list) and buscado in valor,
+    "array-contains-any": lambda valor, opciones: isinstance(valor, list) and any(o in valor for o in opciones),
+}
+
+_FALTA = object()
+
+
+def _copiar(valor: Any) -> Any:
+    """Copia mapas y listas anidados; el resto de los valores es inmutable"""
+    if isinstance(valor, dict):
+        return {campo: _copiar(v) for campo, v in valor.items()}
+    if isinstance(valor, list):
+        return [_copiar(v) for v in valor]
+    return valor
+
+
+def _es_numero(valor: Any) -> bool:
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool)
+
+
+def _combinar(base: dict, datos: dict, merge: bool, rutas: bool = False) -> dict:
+    """
+    Documento resultante de escribir `datos` sobre `base` (sin modificarlo)
+
+    Con merge los mapas anidados se combinan campo por campo; sin merge
+    reemplazan al guardado. Con rutas, las claves "a.b" se interpretan
+    como campos anidados (semántica de update).
+    """
+    resultado = dict(base)
+    for campo, valor in datos.items():
+        if rutas and "." in campo:
+            cabeza, resto = campo.split(".", 1)
+            previo = resultado.get(cabeza)
+            resultado[cabeza] = _combinar(previo if isinstance(previo, dict) else {}, {resto: valor}, merge, rutas)
+        elif valor is DELETE_FIELD:
+            resultado.pop(campo, None)
+        elif valor is SERVER_TIMESTAMP:
+            resultado[campo] = datetime.now()
+        elif isinstance(valor, Increment):
+            previo = resultado.get(campo)
+            resultado[campo] = previo + valor.value if _es_numero(previo) else valor.value
+        elif isinstance(valor, dict):
+            previo = resultado.get(campo) if merge else None
+            resultado[campo] = _combinar(previo if isinstance(previo, dict) else {}, valor, merge)
+        else:
+            resultado[campo] = _copiar(valor)
+    return resultado
+
+
+def dividir_ruta(ruta: str) -> Tuple[str, str]:
+    """Ruta de un documento -> (ruta de su colección, ID)"""
+    coleccion, _, doc_id = ruta.rpartition("/")
+    return coleccion, doc_id
+
+
+class Escritura:
+    """Una escritura pendiente de un lote o una transacción"""
+    __slots__ = ("operacion", "ruta", "datos", "merge")
+
+    def __init__(self, operacion: str, ruta: str, datos: Optional[dict] = None, merge: bool = False):
+        self.operacion = operacion
+        self.ruta = ruta
+        self.datos = datos
+        self.merge = merge
+
+    def aplicar(self, actual: Optional[dict]) -> Optional[dict]:
+        """Documento resultante (None si queda borrado)"""
+        if self.operacion == "delete":
+            return None
+        if self.operacion == "create":
+            if actual is not None:
+                raise AlreadyExists(f"El documento ya existe: {self.ruta}")
+            return _combinar({}, self.datos, merge=False)
+        if self.operacion == "update":
+            if actual is None:
+                raise NotFound(f"No existe el documento: {self.ruta}")
+            return _combinar(actual, self.datos, merge=False, rutas=True)
+        return _combinar((actual or {}) if self.merge else {}, self.datos, self.merge)
+
+
+class DocumentSnapshot:
+    """Lectura de un documento (exista o no)"""
+    __slots__ = ("reference", "_datos")
+
+    def __init__(self, reference: "DocumentReference", datos: Optional[dict]):
+        self.reference = reference
+        self._datos = datos
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._datos is not None
+
+    def to_dict(self) -> Optional[dict]:
+        return _copiar(self._datos) if self._datos is not None else None
+
+    def get(self, campo: str) -> Any:
+        valor = self._datos
+        for parte in campo.split("."):
+            if not isinstance(valor, dict) or parte not in valor:
+                raise KeyError(campo)
+            valor = valor[parte]
+        return _copiar(valor)
+
+
+class DocumentReference:
+    __slots__ = ("_motor", "path", "id")
+
+    def __init__(self, motor: "MotorDocumentos", path: str):
+        self._motor = motor
+        self.path = path
+        self.id = path.rpartition("/")[2]
+
+    @property
+    def parent(self) -> "CollectionReference":
+        return CollectionReference(self._motor, self.path.rpartition("/")[0])
+
+    def collection(self, nombre: str) -> "CollectionReference":
+        return CollectionReference(self._motor, f"{self.path}/{nombre}")
+
+    def get(self, transaction=None) -> DocumentSnapshot:
+        return DocumentSnapshot(self, self._motor._leer([self.path]).get(self.path))
+
+    def set(self, datos: dict, merge: bool = False) -> None:
+        self._motor._escribir([Escritura("set", self.path, datos, merge)])
+
+    def update(self, datos: dict) -> None:
+        self._motor._escribir([Escritura("update", self.path, datos)])
+
+    def create(self, datos: dict) -> None:
+        self._motor._escribir([Escritura("create", self.path, datos)])
+
+    def delete(self) -> None:
+        self._motor._escribir([Escritura("delete", self.path)])
+
+
+def _clave_campo(campo: str, doc_id: str, datos: dict) -> Any:
+    if campo == CAMPO_ID:
+        return doc_id
+    valor = datos
+    for parte in campo.split("."):
+        if not isinstance(valor, dict) or parte not in valor:
+            return _FALTA
+        valor = valor[parte]
+    return valor
+
+
+class Query:
+    """Consulta sobre una colección (inmutable: cada método retorna una nueva)"""
+
+    def __init__(
+        self,
+        motor: "MotorDocumentos",
+        coleccion: str,
+        filtros: Tuple[Tuple[str, str, Any], ...] = (),
+        orden: Tuple[Tuple[str, str], ...] = (),
+        limite: Optional[int] = None,
+        cursor: Optional[dict] = None
+    ):
+        self._motor = motor
+        self._coleccion = coleccion
+        self._filtros = filtros
+        self._orden = orden
+        self._limite = limite
+        self._cursor = cursor
+
+    def _con(self, **cambios) -> "Query":
+        valores = {
+            "filtros": self._filtros, "orden": self._orden,
+            "limite": self._limite, "cursor": self._cursor
+        }
+        valores.update(cambios)
+        return Query(self._motor, self._coleccion, **valores)
+
+    def where(self, campo: str, op: str, valor: Any) -> "Query":
+        if op not in _OPERADORES:
+            raise ValueError(f"Operador no soportado: {op}")
+        return self._con(filtros=self._filtros + ((campo, op, valor),))
+
+    def order_by(self, campo: str, direction: str = ASCENDING) -> "Query":
+        return self._con(orden=self._orden + ((campo, direction),))
+
+    def limit(self, cantidad: int) -> "Query":
+        return self._con(limite=cantidad)
+
+    def start_after(self, valores) -> "Query":
+        if isinstance(valores, DocumentSnapshot):
+            valores = dict(valores._datos or {}, **{CAMPO_ID: valores.id})
+        return self._con(cursor=dict(valores))
+
+    def get(self, transaction=None) -> List[DocumentSnapshot]:
+        return list(self.stream(transaction=transaction))
+
+    def _orden_completo(self) -> List[Tuple[str, str]]:
+        """Como en Firestore, siempre se desempata por ID en la dirección del último orden"""
+        orden = list(self._orden)
+        if not any(campo == CAMPO_ID for campo, _ in orden):
+            orden.append((CAMPO_ID, orden[-1][1] if orden else ASCENDING))
+        return orden
+
+    def stream(self, transaction=None) -> Iterator[DocumentSnapshot]:
+        orden = self._orden_completo()
+        filas = self._motor._listar(self._coleccion, self._filtros, orden, self._limite, self._cursor)
+
+        seleccion = []
+        for doc_id, datos in filas:
+            claves = [_clave_campo(campo, doc_id, datos) for campo, _ in orden]
+            # Los documentos sin un campo filtrado u ordenado no entran en la consulta
+            if _FALTA in claves or not self._cumple(doc_id, datos):
+                continue
+            if self._cursor is not None and not self._despues_del_cursor(claves, orden):
+                continue
+            seleccion.append((claves, doc_id, datos))
+
+        # Orden estable por cada campo, del último al primero (null antes que cualquier valor)
+        for posicion in range(len(orden) - 1, -1, -1):
+            seleccion.sort(
+                key=lambda fila: (0, 0) if fila[0][posicion] is None else (1, fila[0][posicion]),
+                reverse=orden[posicion][1] == DESCENDING
+            )
+
+        if self._limite is not None:
+            seleccion = seleccion[:self._limite]
+        self._motor._contar(consultas=1, documentos_leidos=len(seleccion))
+
+        for _, doc_id, datos in seleccion:
+            yield DocumentSnapshot(DocumentReference(self._motor, f"{self._coleccion}/{doc_id}"), datos)
+
+    def _cumple(self, doc_id: str, datos: dict) -> bool:
+        for campo, op, esperado in self._filtros:
+            valor = _clave_campo(campo, doc_id, datos)
+            if valor is _FALTA:
+                return False
+            try:
+                if not _OPERADORES[op](valor, esperado):
+                    return False
+            except TypeError:
+                # Tipos que no se comparan (p. ej. texto contra número): no coincide
+                return False
+        return True
+
+    def _despues_del_cursor(self, claves: list, orden: List[Tuple[str, str]]) -> bool:
+        for clave, (campo, direccion) in zip(claves, orden):
+            cursor = self._cursor.get(campo, _FALTA)
+            if cursor is _FALTA or clave == cursor:
+                continue
+            return clave > cursor if direccion == ASCENDING else clave < cursor
+        return False
+
+
+class CollectionReference(Query):
+    def __init__(self, motor: "MotorDocumentos", path: str):
+        super().__init__(motor, path)
+        self.path = path
+        self.id = path.rpartition("/")[2]
+
+    @property
+    def parent(self) -> Optional[DocumentReference]:
+        padre = self.path.rpartition("/")[0]
+        return DocumentReference(self._motor, padre) if padre else None
+
+    def document(self, doc_id: Optional[str] = None) -> DocumentReference:
+        return DocumentReference(self._motor, f"{self.path}/{doc_id or uuid.uuid4().hex[:20]}")
+
+
+class WriteBatch:
+    """Escrituras que se aplican juntas al hacer commit"""
+
+    def __init__(self, motor: "MotorDocumentos"):
+        self._motor = motor
+        self._escrituras: List[Escritura] = []
+
+    def set(self, referencia: DocumentReference, datos: dict, merge: bool = False) -> None:
+        self._escrituras.append(Escritura("set", referencia.path, datos, merge))
+
+    def update(self, referencia: DocumentReference, datos: dict) -> None:
+        self._escrituras.append(Escritura("update", referencia.path, datos))
+
+    def create(self, referencia: DocumentReference, datos: dict) -> None:
+        self._escrituras.append(Escritura("create", referencia.path, datos))
+
+    def delete(self, referencia: DocumentReference) -> None:
+        self._escrituras.append(Escritura("delete", referencia.path))
+
+    def commit(self) -> None:
+        escrituras, self._escrituras = self._escrituras, []
+        if escrituras:
+            self._motor._escribir(escrituras)
+
+
+class Transaction(WriteBatch):
+    """Transacción: las escrituras se aplican al terminar la función transaccional"""
+
+    def __init__(self, motor: "MotorDocumentos", **opciones):
+        super().__init__(motor)
+        self.opciones = opciones
+
+
+class MotorDocumentos:
+    """
+    Base de los motores locales de documentos.
+
+    Expone la interfaz del cliente de Firestore que usan los repositorios
+    (collection, get_all, batch, transaction) más `transactional`, que
+    reemplaza a `firestore.transactional`. Cada motor implementa solo el
+    acceso a los documentos: `_exclusivo`, `_leer_varios`, `_listar` y
+    `_guardar`.
+
+    `llamadas()` cuenta las operaciones como las cobraría Firestore: cada
+    get / get_all es una lectura, cada consulta una consulta, cada lote o
+    transacción confirmada un commit, más los documentos leídos y escritos.
+    """
+
+    def __init__(self):
+        self._llamadas: Counter = Counter()
+        self._lock_llamadas = threading.Lock()
+
+    def llamadas(self) -> Dict[str, int]:
+        """Operaciones hechas desde que se creó el motor"""
+        with self._lock_llamadas:
+            return dict(self._llamadas)
+
+    def _contar(self, **cantidades: int) -> None:
+        with self._lock_llamadas:
+            self._llamadas.update(cantidades)
+
+    def collection(self, nombre: str) -> CollectionReference:
+        return CollectionReference(self, nombre)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def transaction(self, **opciones) -> Transaction:
+        return Transaction(self, **opciones)
+
+    def get_all(self, referencias: Iterable[DocumentReference], transaction=None) -> Iterator[DocumentSnapshot]:
+        referencias = list(referencias)
+        datos = self._leer([referencia.path for referencia in referencias])
+        for referencia in referencias:
+            yield DocumentSnapshot(referencia, datos.get(referencia.path))
+
+    def transactional(self, funcion: Callable) -> Callable:
+        """Decorador equivalente a `firestore.transactional` para este motor"""
+        @functools.wraps(funcion)
+        def _ejecutar(transaction: Transaction, *args, **kwargs):
+            self._contar(transacciones=1)
+            with self._exclusivo():
+                resultado = funcion(transaction, *args, **kwargs)
+                transaction.commit()
+            return resultado
+
+        return _ejecutar
+
+    def close(self) -> None:
+        """Libera los recursos del motor"""
+
+    def _leer(self, rutas: List[str]) -> Dict[str, dict]:
+        self._contar(lecturas=1, documentos_leidos=len(rutas))
+        return self._leer_varios(rutas)
+
+    def _escribir(self, escrituras: List[Escritura]) -> None:
+        """Aplica escrituras de forma atómica: si una falla no se aplica ninguna"""
+        self._contar(commits=1, documentos_escritos=len(escrituras))
+        with self._exclusivo():
+            documentos = self._leer_varios(list(dict.fromkeys(e.ruta for e in escrituras)))
+            cambios: Dict[str, Optional[dict]] = {}
+            for escritura in escrituras:
+                actual = cambios[escritura.ruta] if escritura.ruta in cambios else documentos.get(escritura.ruta)
+                cambios[escritura.ruta] = escritura.aplicar(actual)
+            self._guardar(cambios)
+
+    # A implementar por cada motor
+
+    @contextmanager
+    def _exclusivo(self) -> Iterator[None]:
+        """Acceso exclusivo de escritura (reentrante en el mismo hilo)"""
+        raise NotImplementedError
+        yield
+
+    def _leer_varios(self, rutas: List[str]) -> Dict[str, dict]:
+        """Datos de los documentos existentes entre `rutas`, por ruta"""
+        raise NotImplementedError
+
+    def _listar(
+        self,
+        coleccion: str,
+        filtros: Tuple[Tuple[str, str, Any], ...],
+        orden: List[Tuple[str, str]],
+        limite: Optional[int],
+        cursor: Optional[dict]
+    ) -> Iterable[Tuple[str, dict]]:
+        """
+        (id, datos) de los documentos de una colección candidatos a la consulta
+
+        Recibe la consulta entera (filtros, orden con el desempate por ID,
+        límite y cursor): el motor puede usarla para descartar documentos
+        antes, y ordenar y cortar en `limite` solo si resolvió todo lo
+        demás igual que la consulta. La consulta vuelve a filtrar, ordenar
+        y cortar lo que recibe.
+        """
+        raise NotImplementedError
+
+    def _guardar(self, cambios: Dict[str, Optional[dict]]) -> None:
+        """Guarda documentos ya resueltos (None = borrar); se llama dentro de `_exclusivo`"""
+        raise NotImplementedError
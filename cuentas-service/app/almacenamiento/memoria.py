@@ -0,0 +1,69 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.almacenamiento.documentos import MotorDocumentos, dividir_ruta
+import threading
+
+
+class MotorMemoria(MotorDocumentos):
+    """
+    Motor de documentos en memoria del proceso.
+
+    Los documentos viven en un dict por colección y se pierden al terminar
+    el proceso; sirve para pruebas de carga y entornos sin red. Un único
+    RLock serializa las escrituras y las transacciones. Los documentos
+    guardados nunca se modifican en el lugar (cada escritura guarda uno
+    nuevo), así una lectura sin lock ve siempre una versión completa.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._colecciones: Dict[str, Dict[str, dict]] = {}
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def _exclusivo(self) -> Iterator[None]:
+        with self._lock:
+            yield
+
+    def _leer_varios(self, rutas: List[str]) -> Dict[str, dict]:
+        encontrados = {}
+        for ruta in rutas:
+            coleccion, doc_id = dividir_ruta(ruta)
+            datos = self._colecciones.get(coleccion, {}).get(doc_id)
+            if datos is not None:
+                encontrados[ruta] = datos
+        return encontrados
+
+    def _listar(
+        self,
+        coleccion: str,
+        filtros: Tuple[Tuple[str, str, Any], ...],
+        orden: List[Tuple[str, str]],
+        limite: Optional[int],
+        cursor: Optional[dict]
+    ) -> Iterable[Tuple[str, dict]]:
+        documentos = self._colecciones.get(coleccion)
+        if not documentos:
+            return []
+
+        # list() copia los items sin soltar el GIL: no choca con una escritura concurrente
+        filas = list(documentos.items())
+        # Solo descarta por los filtros ==; el orden y el límite quedan para la consulta
+        simples = [
+            (campo, valor) for campo, op, valor in filtros
+            if op == "==" and "." not in campo and campo != "__name__"
+        ]
+        if not simples:
+            return filas
+        return [
+            (doc_id, datos) for doc_id, datos in filas
+            if all(datos.get(campo) == valor for campo, valor in simples)
+        ]
+
+    def _guardar(self, cambios: Dict[str, Optional[dict]]) -> None:
+        for ruta, datos in cambios.items():
+            coleccion, doc_id = dividir_ruta(ruta)
+            if datos is None:
+                self._colecciones.get(coleccion, {}).pop(doc_id, None)
+            else:
+                self._colecciones.setdefault(coleccion, {})[doc_id] = datos
@@ -0,0 +1,360 @@
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from app.almacenamiento.documentos import ASCENDING, CAMPO_ID, MotorDocumentos, dividir_ruta
+import json
+import re
+import sqlite3
+import threading
+
+
+# Máximo de parámetros por sentencia (SQLITE_MAX_VARIABLE_NUMBER de versiones viejas)
+_MAX_PARAMETROS = 900
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS documentos (
+    coleccion TEXT NOT NULL,
+    id TEXT NOT NULL,
+    datos TEXT NOT NULL,
+    PRIMARY KEY (coleccion, id)
+) WITHOUT ROWID
+"""
+
+# Formato de los datos (PRAGMA user_version). 1: fechas con microsegundos y,
+# si tienen zona, en UTC; así su texto ISO ordena igual que las fechas
+_VERSION = 1
+
+# Comparaciones que se traducen a SQL
+_OPERADORES_SQL = {"==": "=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+
+
+def _codificar(valor: Any) -> Any:
+    """Tipos que JSON no tiene: las fechas se guardan como {"$fecha": ISO}"""
+    if isinstance(valor, datetime):
+        if valor.tzinfo is not None:
+            valor = valor.astimezone(timezone.utc)
+        return {"$fecha": valor.isoformat(timespec="microseconds")}
+    if isinstance(valor, date):
+        return {"$fecha": datetime(valor.year, valor.month, valor.day).isoformat(timespec="microseconds")}
+    if hasattr(valor, "value"):
+        return valor.value
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def _decodificar(objeto: dict) -> Any:
+    if len(objeto) == 1 and "$fecha" in objeto:
+        return datetime.fromisoformat(objeto["$fecha"])
+    return objeto
+
+
+def _a_json(datos: dict) -> str:
+    return json.dumps(datos, default=_codificar, separators=(",", ":"), ensure_ascii=False)
+
+
+def _de_json(texto: str) -> dict:
+    return json.loads(texto, object_hook=_decodificar)
+
+
+def _ruta_json(campo: str) -> Optional[str]:
+    """Ruta JSON de un campo ("a.b" -> $."a"."b"), None si no se puede escribir como literal"""
+    if not campo or '"' in campo or "'" in campo:
+        return None
+    return "$." + ".".join(f'"{parte}"' for parte in campo.split("."))
+
+
+def _expresion(campo: str) -> Optional[str]:
+    """
+    Valor SQL de un campo: el ID, o el valor JSON con las fechas como su
+    texto ISO. Los índices usan la misma expresión, literal, para que
+    SQLite los elija.
+    """
+    if campo == CAMPO_ID:
+        return "id"
+    ruta = _ruta_json(campo)
+    if ruta is None:
+        return None
+    return f"COALESCE(json_extract(datos, '{ruta}.\"$fecha\"'), json_extract(datos, '{ruta}'))"
+
+
+def _comparable(campo: str, valor: Any) -> Optional[Tuple[str, Any]]:
+    """
+    (condición de tipo, parámetro) para comparar `campo` con `valor` en SQL
+    como lo hace Python: los documentos con un valor de otro tipo no
+    cumplen el filtro. None si el valor no se traduce.
+    """
+    if campo == CAMPO_ID:
+        return ("1", valor) if isinstance(valor, str) else None
+    ruta = _ruta_json(campo)
+    if ruta is None:
+        return None
+    if isinstance(valor, datetime):
+        # Fechas con y sin zona no se comparan entre sí: sus textos tienen distinto largo
+        texto = _codificar(valor)["$fecha"]
+        return f"json_type(datos, '{ruta}.\"$fecha\"') = 'text' AND length({_expresion(campo)}) = {len(texto)}", texto
+    if isinstance(valor, str):
+        return f"json_type(datos, '{ruta}') = 'text'", valor
+    if isinstance(valor, (bool, int, float)):
+        return f"json_type(datos, '{ruta}') IN ('integer', 'real', 'true', 'false')", valor
+    return None
+
+
+def _consulta_sql(
+    filtros: Sequence[Tuple[str, str, Any]],
+    orden: Sequence[Tuple[str, str]],
+    limite: Optional[int],
+    cursor: Optional[dict]
+) -> Tuple[List[str], List[Any], str]:
+    """
+    Traduce una consulta a (condiciones, parámetros, ORDER BY ... LIMIT).
+
+    Cada condición descarta exactamente los documentos que descartaría la
+    consulta en Python. El orden, el cursor y el límite se traducen solo
+    si se tradujo todo: si no, quedan para la consulta y el final es "".
+    """
+    condiciones: List[str] = []
+    parametros: List[Any] = []
+    completa = True
+
+    for campo, op, valor in filtros:
+        if op == "==" and valor is None and _ruta_json(campo):
+            condiciones.append(f"json_type(datos, '{_ruta_json(campo)}') = 'null'")
+            continue
+        comparable = _comparable(campo, valor) if op in _OPERADORES_SQL else None
+        if comparable is None:
+            completa = False
+            continue
+        tipo, parametro = comparable
+        condiciones.append(f"{tipo} AND {_expresion(campo)} {_OPERADORES_SQL[op]} ?")
+        parametros.append(parametro)
+
+    if not completa or limite is None:
+        return condiciones, parametros, ""
+
+    claves = []
+    for campo, direccion in orden:
+        expresion = _expresion(campo)
+        if expresion is None:
+            return condiciones, parametros, ""
+        claves.append((campo, expresion, direccion))
+
+    condiciones_orden: List[str] = []
+    parametros_orden: List[Any] = []
+    for campo, expresion, _ in claves:
+        # Los documentos sin un campo ordenado no entran en la consulta
+        if campo != CAMPO_ID:
+            condiciones_orden.append(f"json_type(datos, '{_ruta_json(campo)}') IS NOT NULL")
+
+    if cursor is not None:
+        # Después del cursor: iguales en los campos anteriores y posterior en uno
+        en_cursor = []
+        for campo, expresion, direccion in claves:
+            if campo not in cursor:
+                continue
+            comparable = _comparable(campo, cursor[campo])
+            if comparable is None:
+                return condiciones, parametros, ""
+            en_cursor.append((expresion, ">" if direccion == ASCENDING else "<", comparable[1]))
+        if en_cursor:
+            expresion, mayor, valor = en_cursor[0]
+            # Cota del primer campo, para que el índice empiece en el cursor
+            condiciones_orden.append(f"{expresion} {mayor}= ?")
+            parametros_orden.append(valor)
+            alternativas = []
+            for posicion, (expresion, mayor, valor) in enumerate(en_cursor):
+                partes = [f"{anterior} = ?" for anterior, _, _ in en_cursor[:posicion]] + [f"{expresion} {mayor} ?"]
+                parametros_orden.extend([anterior for _, _, anterior in en_cursor[:posicion]] + [valor])
+                alternativas.append("(" + " AND ".join(partes) + ")")
+            condiciones_orden.append("(" + " OR ".join(alternativas) + ")")
+
+    orden_sql = ", ".join(f"{expresion} {'ASC' if direccion == ASCENDING else 'DESC'}" for _, expresion, direccion in claves)
+    return condiciones + condiciones_orden, parametros + parametros_orden, f" ORDER BY {orden_sql} LIMIT {int(limite)}"
+
+
+class MotorSQLite(MotorDocumentos):
+    """
+    Motor de documentos sobre un archivo SQLite en modo WAL.
+
+    Cada documento es una fila (colección, id, JSON). Cada hilo usa su
+    propia conexión: con WAL las lecturas no esperan a las escrituras, y
+    las escrituras y transacciones se serializan con BEGIN IMMEDIATE (las
+    demás esperan hasta `timeout` segundos). Una transacción lee con la
+    misma conexión que tiene el lock, así sus lecturas son consistentes
+    con lo que escribe al final.
+
+    Las consultas se resuelven en SQL: los filtros de comparación sobre
+    texto, números y fechas con json_extract, y el orden, el cursor y el
+    límite cuando todos los filtros se tradujeron (si no, el orden y el
+    límite se aplican en Python sobre lo filtrado). `indices` son
+    índices de expresión parciales por colección de primer nivel:
+    (colección, campos) con las igualdades primero y el campo ordenado
+    o por rango al final, como los índices compuestos de Firestore.
+    """
+
+    def __init__(
+        self,
+        ruta: str,
+        timeout: float = 30.0,
+        synchronous: str = "NORMAL",
+        indices: Iterable[Tuple[str, Sequence[str]]] = ()
+    ):
+        if ruta == ":memory:" or not ruta:
+            # Cada conexión a :memory: es una base distinta: para eso está MotorMemoria
+            raise ValueError("MotorSQLite necesita la ruta de un archivo")
+
+        super().__init__()
+        self.ruta = ruta
+        self.timeout = timeout
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self._conexiones: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.indices = [(coleccion, tuple(campos)) for coleccion, campos in indices]
+        # Colecciones con índices: van literales en la consulta para que SQLite use los parciales
+        self._indexadas = {coleccion for coleccion, _ in self.indices}
+
+        conexion = self._conexion()
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute(_ESQUEMA)
+        self._migrar(conexion)
+        for coleccion, campos in self.indices:
+            conexion.execute(self._sql_indice(coleccion, campos))
+        # Estadísticas para el planificador (ANALYZE de lo que haga falta): sin ellas
+        # una página ordenada por id puede recorrer la clave primaria en vez del índice
+        conexion.execute("PRAGMA optimize")
+
+    def _migrar(self, conexion: sqlite3.Connection) -> None:
+        """Vuelve a codificar los documentos de un archivo con un formato anterior"""
+        version = conexion.execute("PRAGMA user_version").fetchone()[0]
+        if version >= _VERSION:
+            return
+        with self._exclusivo():
+            filas = conexion.execute("SELECT coleccion, id, datos FROM documentos").fetchall()
+            conexion.executemany(
+                "UPDATE documentos SET datos = ? WHERE coleccion = ? AND id = ?",
+                [(_a_json(_de_json(datos)), coleccion, doc_id) for coleccion, doc_id, datos in filas]
+            )
+            conexion.execute(f"PRAGMA user_version = {_VERSION}")
+
+    @staticmethod
+    def _sql_indice(coleccion: str, campos: Sequence[str]) -> str:
+        expresiones = [_expresion(campo) for campo in campos]
+        if not re.fullmatch(r"\w+", coleccion) or None in expresiones or CAMPO_ID in campos:
+            raise ValueError(f"Índice no soportado: {coleccion} {tuple(campos)}")
+        nombre = "ix_" + "_".join(re.sub(r"\W", "_", parte) for parte in (coleccion, *campos))
+        return (
+            # La colección va primera aunque el índice sea parcial: sin estadísticas SQLite
+            # prefiere la clave primaria a un índice que solo acota por rango
+            f'CREATE INDEX IF NOT EXISTS "{nombre}" ON documentos (coleccion, {", ".join(expresiones)}, id) '
+            f"WHERE coleccion = '{coleccion}'"
+        )
+
+    def _conexion(self) -> sqlite3.Connection:
+        """Conexión del hilo actual (se crea la primera vez)"""
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            # isolation_level=None: sin transacciones implícitas, se manejan con BEGIN/COMMIT
+            conexion = sqlite3.connect(
+                self.ruta, timeout=self.timeout, isolation_level=None, check_same_thread=False
+            )
+            conexion.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.conexion = conexion
+            self._local.profundidad = 0
+            with self._lock:
+                self._conexiones.append(conexion)
+        return conexion
+
+    def close(self) -> None:
+        with self._lock:
+            conexiones, self._conexiones = self._conexiones, []
+        for indice, conexion in enumerate(conexiones):
+            if indice == 0:
+                conexion.execute("PRAGMA optimize")
+            conexion.close()
+        self._local = threading.local()
+
+    @contextmanager
+    def _exclusivo(self) -> Iterator[None]:
+        conexion = self._conexion()
+        externa = self._local.profundidad == 0
+        if externa:
+            conexion.execute("BEGIN IMMEDIATE")
+        self._local.profundidad += 1
+        try:
+            yield
+            if externa:
+                conexion.execute("COMMIT")
+        except BaseException:
+            # SQLite ya deshace la transacción ante algunos errores
+            if externa and conexion.in_transaction:
+                conexion.execute("ROLLBACK")
+            raise
+        finally:
+            self._local.profundidad -= 1
+
+    def _leer_varios(self, rutas: List[str]) -> Dict[str, dict]:
+        por_coleccion: Dict[str, List[str]] = {}
+        for ruta in rutas:
+            coleccion, doc_id = dividir_ruta(ruta)
+            por_coleccion.setdefault(coleccion, []).append(doc_id)
+
+        conexion = self._conexion()
+        encontrados = {}
+        for coleccion, ids in por_coleccion.items():
+            for inicio in range(0, len(ids), _MAX_PARAMETROS):
+                parte = ids[inicio:inicio + _MAX_PARAMETROS]
+                filas = conexion.execute(
+                    f"SELECT id, datos FROM documentos WHERE coleccion = ? AND id IN ({','.join('?' * len(parte))})",
+                    [coleccion, *parte]
+                )
+                for doc_id, datos in filas:
+                    encontrados[f"{coleccion}/{doc_id}"] = _de_json(datos)
+        return encontrados
+
+    def _listar(
+        self,
+        coleccion: str,
+        filtros: Tuple[Tuple[str, str, Any], ...],
+        orden: List[Tuple[str, str]],
+        limite: Optional[int],
+        cursor: Optional[dict]
+    ) -> Iterable[Tuple[str, dict]]:
+        sql, parametros = self._sql_listar(coleccion, filtros, orden, limite, cursor)
+        return [(doc_id, _de_json(datos)) for doc_id, datos in self._conexion().execute(sql, parametros)]
+
+    def _sql_listar(
+        self,
+        coleccion: str,
+        filtros: Tuple[Tuple[str, str, Any], ...],
+        orden: List[Tuple[str, str]],
+        limite: Optional[int],
+        cursor: Optional[dict]
+    ) -> Tuple[str, List[Any]]:
+        """SELECT de `_listar` y sus parámetros"""
+        condiciones, parametros, final = _consulta_sql(filtros, orden, limite, cursor)
+        if coleccion in self._indexadas:
+            # Nombre validado al crear el índice
+            condiciones.insert(0, f"coleccion = '{coleccion}'")
+        else:
+            condiciones.insert(0, "coleccion = ?")
+            parametros.insert(0, coleccion)
+        return f"SELECT id, datos FROM documentos WHERE {' AND '.join(condiciones)}{final}", parametros
+
+    def _guardar(self, cambios: Dict[str, Optional[dict]]) -> None:
+        conexion = self._conexion()
+        borrar = []
+        guardar = []
+        for ruta, datos in cambios.items():
+            coleccion, doc_id = dividir_ruta(ruta)
+            if datos is None:
+                borrar.append((coleccion, doc_id))
+            else:
+                guardar.append((coleccion, doc_id, _a_json(datos)))
+
+        if borrar:
+            conexion.executemany("DELETE FROM documentos WHERE coleccion = ? AND id = ?", borrar)
+        if guardar:
+            conexion.executemany(
+                "INSERT INTO documentos (coleccion, id, datos) VALUES (?, ?, ?) "
+                "ON CONFLICT (coleccion, id) DO UPDATE SET datos = excluded.datos",
+                guardar
+            )
@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from typing import Dict, Optional
+from app.config import settings
+from app.models import Cuenta
+import threading
+import time
+
+
+class CuentasCache:
+    """
+    Caché en proceso (TTL + LRU) de cuentas ya decodificadas.
+
+    Se indexa por ID de cuenta y mantiene un índice secundario por número
+    de cuenta. Es compartida por todas las peticiones del proceso, por eso
+    usa un lock: el repositorio síncrono corre en el threadpool.
+
+    Las cuentas guardadas no deben modificarse desde afuera; para cambiar
+    una entrada se usa `actualizar` o `invalidar`.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entradas: "OrderedDict[str, tuple]" = OrderedDict()
+        self._por_numero: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def habilitada(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, cuenta_id: str) -> Optional[Cuenta]:
+        """Retorna la cuenta cacheada o None si no está o expiró"""
+        if not self.habilitada:
+            return None
+
+        with self._lock:
+            entrada = self._entradas.get(cuenta_id)
+            if entrada is None:
+                self.misses += 1
+                return None
+
+            cuenta, expira = entrada
+            if expira < time.monotonic():
+                self._quitar(cuenta_id)
+                self.misses += 1
+                return None
+
+            self._entradas.move_to_end(cuenta_id)
+            self.hits += 1
+            return cuenta
+
+    def get_by_numero(self, numero_cuenta: str) -> Optional[Cuenta]:
+        """Retorna la cuenta cacheada a partir de su número de cuenta"""
+        with self._lock:
+            cuenta_id = self._por_numero.get(numero_cuenta)
+
+        if cuenta_id is None:
+            if self.habilitada:
+                with self._lock:
+                    self.misses += 1
+            return None
+
+        return self.get(cuenta_id)
+
+    def put(self, cuenta: Cuenta) -> None:
+        """Guarda (o reemplaza) una cuenta en la caché"""
+        if not self.habilitada or not cuenta.id:
+            return
+
+        with self._lock:
+            if cuenta.id in self._entradas:
+                self._quitar(cuenta.id)
+
+            self._entradas[cuenta.id] = (cuenta, time.monotonic() + self.ttl)
+            if cuenta.numero_cuenta:
+                self._por_numero[cuenta.numero_cuenta] = cuenta.id
+
+            while len(self._entradas) > self.max_size:
+                cuenta_id, _ = next(iter(self._entradas.items()))
+                self._quitar(cuenta_id)
+                self.evictions += 1
+
+    def actualizar(self, cuenta_id: str, cambios: dict) -> None:
+        """Aplica cambios a la entrada cacheada, si existe, sin renovar su TTL"""
+        with self._lock:
+            entrada = self._entradas.get(cuenta_id)
+            if entrada is None:
+                return
+
+            cuenta, expira = entrada
+            self._entradas[cuenta_id] = (cuenta.model_copy(update=cambios), expira)
+
+    def invalidar(self, cuenta_id: str) -> None:
+        """Elimina una cuenta de la caché"""
+        with self._lock:
+            self._quitar(cuenta_id)
+
+    def limpiar(self) -> None:
+        """Vacía la caché y reinicia las estadísticas"""
+        with self._lock:
+            self._entradas.clear()
+            self._por_numero.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """Estadísticas de uso de la caché"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entradas),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0
+            }
+
+    def _quitar(self, cuenta_id: str) -> None:
+        """Elimina una entrada; se llama con el lock tomado"""
+        entrada = self._entradas.pop(cuenta_id, None)
+        if entrada is not None:
+            numero = entrada[0].numero_cuenta
+            if self._por_numero.get(numero) == cuenta_id:
+                del self._por_numero[numero]
+
+
+# Instancia global de la caché
+cuentas_cache = CuentasCache(
+    max_size=settings.CUENTAS_CACHE_SIZE,
+    ttl=settings.CUENTAS_CACHE_TTL
+)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -16,6 +16,47 @@ class Settings(BaseSettings):
     # Firebase
     FIREBASE_CREDENTIALS_PATH: str = "secrets/cuentas-service-credentials.json"
     FIREBASE_PROJECT_ID: Optional[str] = None
+    # Usa el AsyncClient de Firestore; en False usa el cliente síncrono en el threadpool
+    FIRESTORE_ASYNC: bool = True
+    
+    # Almacenamiento: "firestore", o un motor local sin red ("memoria" o "sqlite")
+    ALMACENAMIENTO: Literal["firestore", "memoria", "sqlite"] = "firestore"
+    # Archivo de la base del motor sqlite (modo WAL)
+    SQLITE_PATH: str = "cuentas.db"
+    
+    # Caché de cuentas (TTL en segundos; tamaño 0 la deshabilita)
+    CUENTAS_CACHE_SIZE: int = 10000
+    CUENTAS_CACHE_TTL: float = 30.0
+    
+    # Idempotency-Key en endpoints de escritura (TTL en segundos; tamaño 0 lo deshabilita)
+    IDEMPOTENCIA_MAX_SIZE: int = 10000
+    IDEMPOTENCIA_TTL: float = 86400.0
+    
+    # Holds (reservas de fondos). Duraciones e intervalo en segundos
+    HOLD_DURACION_DEFECTO: int = 900
+    HOLD_DURACION_MAXIMA: int = 604800
+    HOLDS_BARRIDO_INTERVALO: float = 30.0
+    HOLDS_BARRIDO_LOTE: int = 100
+    
+    # Eventos de cambio (outbox + feed en proceso). Ventana e intervalos en segundos
+    EVENTOS_BUFFER_SIZE: int = 10000
+    EVENTOS_LOTE_MAX: int = 500
+    EVENTOS_VENTANA: float = 0.05
+    EVENTOS_BARRIDO_INTERVALO: float = 60.0
+    EVENTOS_BARRIDO_GRACIA: float = 30.0
+    # Log local de eventos (JSON por línea); deshabilitado salvo que se
+    # indique una ruta (p. ej. EVENTOS_LOG_PATH=eventos.jsonl)
+    EVENTOS_LOG_PATH: str = ""
+    
+    # Exportación de movimientos (documentos leídos por página)
+    EXPORT_PAGE_SIZE: int = 500
+    
+    # Numeración de cuentas (bloques reservados por proceso)
+    NUMERO_CUENTA_INICIAL: int = 1000000000
+    NUMERO_CUENTA_BLOQUE: int = 100
+    # Sin la migración scripts/indexar_numeros_cuenta.py no se crean cuentas;
+    # en False se crean verificando cada número contra las cuentas sin índice
+    NUMERO_CUENTA_EXIGIR_INDICE: bool = True
     
     # CORS
     CORS_ORIGINS: list = [
@@ -28,6 +69,7 @@ class Settings(BaseSettings):
     LIMITE_DEPOSITO_DIARIO: float = 50000.0
     LIMITE_RETIRO_DIARIO: float = 20000.0
     SALDO_MINIMO_CUENTA: float = 0.0
+    LOTE_MAX_OPERACIONES: int = 5000
     
     # Otros servicios (para integraciones futuras)
     CLIENTES_SERVICE_URL: Optional[str] = "http://localhost:8001"
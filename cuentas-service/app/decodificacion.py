@@ -0,0 +1,154 @@
+from typing import Any, Dict, Type, TypeVar
+from datetime import datetime
+from pydantic import BaseModel
+from app.models import Cuenta, Movimiento
+from app.schemas import CuentaResponse, MovimientoResponse
+
+
+# Decodificación sin validación de documentos de Firestore.
+#
+# Los documentos de `cuentas` y `movimientos` solo los escribe este
+# servicio, a partir de modelos ya validados, así que al leerlos no hace
+# falta volver a pasar por la validación de pydantic: se arman sin validar
+# y solo se normalizan los tipos que Firestore puede devolver distinto
+# (enteros en campos float, fechas guardadas como texto por versiones
+# anteriores). Lo mismo vale para las respuestas, que se arman desde
+# modelos ya decodificados; los listados directamente serializan las filas
+# (`*_a_fila`) con app.responses. scripts/bench_decodificacion.py mide el
+# costo por fila de esta ruta contra la validación completa.
+
+M = TypeVar("M", bound=BaseModel)
+
+_nuevo = object.__new__
+_asignar = object.__setattr__
+
+
+def _valor(enum_o_str: Any) -> Any:
+    return enum_o_str.value if hasattr(enum_o_str, 'value') else enum_o_str
+
+
+class _Constructor:
+    """
+    Arma instancias de un modelo pydantic sin validar.
+    
+    Hace lo mismo que `model_construct` (asigna __dict__ y los atributos
+    internos de pydantic), pero con los valores por defecto precalculados
+    una vez por modelo en lugar de recorrer todos los campos en cada fila.
+    """
+
+    def __init__(self, modelo: Type[M]):
+        self.modelo = modelo
+        self.campos = frozenset(modelo.model_fields)
+        self.defaults = {}
+        self.fabricas = {}
+        for nombre, campo in modelo.model_fields.items():
+            if campo.default_factory is not None:
+                self.fabricas[nombre] = campo.default_factory
+            elif not campo.is_required():
+                # Igual que use_enum_values: los Enum se guardan como su valor
+                self.defaults[nombre] = _valor(campo.default)
+
+    def __call__(self, valores: Dict[str, Any]) -> M:
+        # Los campos faltantes van al final: el JSON sale en el orden de `valores`
+        datos = dict(valores)
+        for nombre, valor in self.defaults.items():
+            if nombre not in datos:
+                datos[nombre] = valor
+        for nombre, fabrica in self.fabricas.items():
+            if nombre not in datos:
+                datos[nombre] = fabrica()
+
+        instancia = _nuevo(self.modelo)
+        _asignar(instancia, "__dict__", datos)
+        _asignar(instancia, "__pydantic_fields_set__", set(valores))
+        _asignar(instancia, "__pydantic_extra__", None)
+        _asignar(instancia, "__pydantic_private__", None)
+        return instancia
+
+
+_construir_cuenta = _Constructor(Cuenta)
+_construir_movimiento = _Constructor(Movimiento)
+_construir_cuenta_respuesta = _Constructor(CuentaResponse)
+_construir_movimiento_respuesta = _Constructor(MovimientoResponse)
+
+
+def _fecha(valor: Any) -> Any:
+    """Convierte fechas guardadas como texto ISO; deja igual los datetime"""
+    if isinstance(valor, str):
+        return datetime.fromisoformat(valor.replace('Z', '+00:00'))
+    return valor
+
+
+def decodificar_cuenta(doc_id: str, data: Dict[str, Any]) -> Cuenta:
+    """Arma una Cuenta a partir de los datos de un documento, sin validar"""
+    campos = {campo: valor for campo, valor in data.items() if campo in _construir_cuenta.campos}
+    campos["id"] = doc_id
+    campos["saldo"] = float(campos.get("saldo", 0.0))
+    if "saldo_retenido" in campos:
+        campos["saldo_retenido"] = float(campos["saldo_retenido"])
+
+    for campo in ("fecha_apertura", "created_at", "updated_at"):
+        if campo in campos:
+            campos[campo] = _fecha(campos[campo])
+
+    return _construir_cuenta(campos)
+
+
+def decodificar_movimiento(doc_id: str, data: Dict[str, Any]) -> Movimiento:
+    """Arma un Movimiento a partir de los datos de un documento, sin validar"""
+    campos = {campo: valor for campo, valor in data.items() if campo in _construir_movimiento.campos}
+    campos["id"] = doc_id
+
+    campos["monto"] = float(campos.get("monto", 0.0))
+    for campo in ("saldo_anterior", "saldo_nuevo"):
+        # Los créditos a cuentas fraccionadas no guardan saldos
+        if campos.get(campo) is not None:
+            campos[campo] = float(campos[campo])
+    for campo in ("fecha", "created_at"):
+        if campo in campos:
+            campos[campo] = _fecha(campos[campo])
+
+    return _construir_movimiento(campos)
+
+
+def cuenta_a_fila(cuenta: Cuenta) -> Dict[str, Any]:
+    """Campos de CuentaResponse de una cuenta, como dict listo para serializar"""
+    return {
+        "id": cuenta.id,
+        "cliente_id": cuenta.cliente_id,
+        "numero_cuenta": cuenta.numero_cuenta,
+        "tipo": _valor(cuenta.tipo),
+        "moneda": _valor(cuenta.moneda),
+        "saldo": cuenta.saldo,
+        "saldo_retenido": cuenta.saldo_retenido,
+        "saldo_disponible": cuenta.saldo_disponible,
+        "estado": _valor(cuenta.estado),
+        "fecha_apertura": cuenta.fecha_apertura,
+        "created_at": cuenta.created_at,
+        "updated_at": cuenta.updated_at
+    }
+
+
+def movimiento_a_fila(mov: Movimiento) -> Dict[str, Any]:
+    """Campos de MovimientoResponse de un movimiento, como dict listo para serializar"""
+    return {
+        "id": mov.id,
+        "cuenta_id": mov.cuenta_id,
+        "tipo": _valor(mov.tipo),
+        "monto": mov.monto,
+        "saldo_anterior": mov.saldo_anterior,
+        "saldo_nuevo": mov.saldo_nuevo,
+        "descripcion": mov.descripcion,
+        "referencia": mov.referencia,
+        "fecha": mov.fecha
+    }
+
+
+def cuenta_a_respuesta(cuenta: Cuenta) -> CuentaResponse:
+    """Arma la CuentaResponse de una cuenta ya decodificada, sin validar"""
+    return _construir_cuenta_respuesta(cuenta_a_fila(cuenta))
+
+
+def movimiento_a_respuesta(mov: Movimiento) -> MovimientoResponse:
+    """Arma la MovimientoResponse de un movimiento ya decodificado, sin validar"""
+    return _construir_movimiento_respuesta(movimiento_a_fila(mov))
@@ -1,16 +1,27 @@
-from app.firebase import get_firebase_db
-from app.repos.cuentas_repo import CuentasRepository
+from app.config import settings
+from app.repos.interfaz import RepositorioCuentas
 from app.services.cuentas_service import CuentasService
 from fastapi import Depends
 
 
-def get_cuentas_repository(db=Depends(get_firebase_db)) -> CuentasRepository:
+def get_cuentas_repository() -> RepositorioCuentas:
     """Dependency para obtener el repositorio de cuentas"""
-    return CuentasRepository(db)
+    # Los repositorios traen firebase_admin y google-cloud-firestore: se importan
+    # en el primer uso (el lifespan), no al importar la app
+    from app.repos.cuentas_repo import CuentasRepository
+    from app.repos.cuentas_repo_async import AsyncCuentasRepository, ThreadpoolCuentasRepository
+    if settings.ALMACENAMIENTO != "firestore":
+        from app.almacenamiento import get_motor_local
+        return ThreadpoolCuentasRepository(CuentasRepository(get_motor_local()))
+
+    from app.firebase import get_firebase_db, get_firebase_async_db
+    if settings.FIRESTORE_ASYNC:
+        return AsyncCuentasRepository(get_firebase_async_db())
+    return ThreadpoolCuentasRepository(CuentasRepository(get_firebase_db()))
 
 
 def get_cuentas_service(
-    repo: CuentasRepository = Depends(get_cuentas_repository)
+    repo: RepositorioCuentas = Depends(get_cuentas_repository)
 ) -> CuentasService:
     """Dependency para obtener el servicio de cuentas"""
-    return CuentasService(repo)
\ No newline at end of file
+    return CuentasService(repo)
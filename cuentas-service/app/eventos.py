@@ -0,0 +1,285 @@
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.responses import dumps
+import asyncio
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class DespachadorEventos:
+    """
+    Despacha en proceso los eventos de cambio de las cuentas.
+
+    Cada movimiento se escribe junto con su registro en la colección
+    `outbox` en el mismo commit de Firestore (ver el repositorio). Después
+    del commit el repositorio publica los eventos acá; una tarea del event
+    loop los junta en lotes, les asigna un número de secuencia, los agrega
+    al log local (JSON por línea, solo se agrega) y al buffer que lee
+    `/api/cuentas/eventos`, y recién entonces borra sus registros del
+    outbox. Los registros que quedan (el proceso cayó antes de
+    despacharlos) se recuperan con un barrido periódico, así que la entrega
+    es al menos una vez: los consumidores deduplican por `id`.
+
+    La secuencia y el buffer son del proceso: se reinician con él y cada
+    réplica tiene su propio feed. `publicar` puede llamarse desde el
+    threadpool (repositorio síncrono), por eso los pendientes usan un lock.
+    """
+
+    def __init__(
+        self,
+        capacidad: int = 10000,
+        lote_max: int = 500,
+        ventana: float = 0.05,
+        log_path: Optional[str] = None,
+        barrido_intervalo: float = 60.0,
+        barrido_gracia: float = 30.0
+    ):
+        self.capacidad = capacidad
+        self.lote_max = lote_max
+        self.ventana = ventana
+        self.log_path = log_path
+        self.barrido_intervalo = barrido_intervalo
+        self.barrido_gracia = barrido_gracia
+
+        self._pendientes: deque = deque()
+        self._lock = threading.Lock()
+        self._buffer: deque = deque(maxlen=capacidad)
+        # IDs ya despachados, para no repetir eventos recuperados por el barrido
+        self._despachados: "OrderedDict[str, None]" = OrderedDict()
+        self._secuencia = 0
+
+        self._repo = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self._hay_pendientes: Optional[asyncio.Event] = None
+        self._nuevos: Optional[asyncio.Event] = None
+
+        self.publicados = 0
+        self.despachados = 0
+        self.recuperados = 0
+        self.lotes = 0
+
+    @property
+    def activo(self) -> bool:
+        return self._tarea is not None and not self._tarea.done()
+
+    @property
+    def ultima_secuencia(self) -> int:
+        return self._secuencia
+
+    def publicar(self, eventos: List[Dict[str, Any]]) -> None:
+        """
+        Encola eventos ya confirmados en Firestore (desde cualquier hilo)
+
+        Si el despachador no está corriendo (p. ej. en un script) no hace
+        nada: los registros siguen en el outbox hasta el próximo barrido.
+        """
+        if not eventos or self._loop is None:
+            return
+
+        with self._lock:
+            self._pendientes.extend(eventos)
+            self.publicados += len(eventos)
+        self._loop.call_soon_threadsafe(self._hay_pendientes.set)
+
+    async def iniciar(self, repo) -> None:
+        """Arranca la tarea de despacho; `repo` se usa para leer y borrar el outbox"""
+        if self.activo:
+            return
+
+        self._repo = repo
+        self._loop = asyncio.get_running_loop()
+        self._hay_pendientes = asyncio.Event()
+        self._nuevos = asyncio.Event()
+        self._tarea = asyncio.create_task(self._ejecutar())
+
+    async def detener(self) -> None:
+        """Despacha lo pendiente y detiene la tarea"""
+        if self._tarea is None:
+            return
+
+        self._tarea.cancel()
+        try:
+            await self._tarea
+        except asyncio.CancelledError:
+            pass
+        self._tarea = None
+
+        while True:
+            lote = self._tomar()
+            if not lote:
+                break
+            try:
+                await self._despachar(lote)
+            except Exception:
+                logger.exception("No se pudo despachar un lote de %d eventos", len(lote))
+        self._loop = None
+
+    async def esperar(
+        self,
+        desde: int,
+        timeout: float,
+        cuenta_id: Optional[str] = None,
+        limite: int = 500
+    ) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """
+        Eventos con secuencia mayor a `desde`, esperando hasta `timeout` segundos
+
+        Retorna (eventos, siguiente, incompleto): `siguiente` es el `desde`
+        de la próxima consulta e incompleto indica que algunos eventos
+        posteriores a `desde` ya salieron del buffer, así que el consumidor
+        debe releer el estado en lugar de seguir el feed.
+        """
+        fin = time.monotonic() + timeout
+        while True:
+            eventos, siguiente, incompleto = self.leer(desde, cuenta_id, limite)
+            restante = fin - time.monotonic()
+            if eventos or incompleto or restante <= 0 or self._nuevos is None:
+                return eventos, siguiente, incompleto
+
+            nuevos = self._nuevos
+            try:
+                await asyncio.wait_for(nuevos.wait(), timeout=restante)
+            except asyncio.TimeoutError:
+                pass
+
+    def leer(
+        self,
+        desde: int,
+        cuenta_id: Optional[str] = None,
+        limite: int = 500
+    ) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """Eventos del buffer con secuencia mayor a `desde`, sin esperar (ver `esperar`)"""
+        if desde > self._secuencia:
+            # El proceso se reinició: el cursor del consumidor es de un feed anterior
+            return [], self._secuencia, True
+
+        incompleto = bool(self._buffer) and desde < self._buffer[0]["secuencia"] - 1
+
+        # El buffer está ordenado por secuencia: se salta directo a `desde`
+        inicio = max(desde - self._buffer[0]["secuencia"] + 1, 0) if self._buffer else 0
+        eventos = []
+        for evento in islice(self._buffer, inicio, None):
+            if cuenta_id is None or evento["cuenta_id"] == cuenta_id:
+                eventos.append(evento)
+                if len(eventos) >= limite:
+                    return eventos, evento["secuencia"], incompleto
+        # Se recorrió todo el buffer: la próxima consulta sigue desde el último evento
+        return eventos, self._secuencia, incompleto
+
+    def stats(self) -> dict:
+        """Estadísticas del despachador"""
+        return {
+            "activo": self.activo,
+            "ultima_secuencia": self._secuencia,
+            "buffer": len(self._buffer),
+            "capacidad": self.capacidad,
+            "pendientes": len(self._pendientes),
+            "publicados": self.publicados,
+            "despachados": self.despachados,
+            "recuperados": self.recuperados,
+            "lotes": self.lotes
+        }
+
+    def _tomar(self) -> List[Dict[str, Any]]:
+        """Saca de los pendientes hasta `lote_max` eventos"""
+        with self._lock:
+            cantidad = min(len(self._pendientes), self.lote_max)
+            return [self._pendientes.popleft() for _ in range(cantidad)]
+
+    async def _ejecutar(self) -> None:
+        proximo_barrido = time.monotonic()
+        while True:
+            if time.monotonic() >= proximo_barrido:
+                await self._barrer()
+                proximo_barrido = time.monotonic() + self.barrido_intervalo
+
+            try:
+                await asyncio.wait_for(
+                    self._hay_pendientes.wait(),
+                    timeout=max(proximo_barrido - time.monotonic(), 0)
+                )
+            except asyncio.TimeoutError:
+                continue
+
+            self._hay_pendientes.clear()
+            # Ventana para juntar en un lote los eventos que llegan seguidos
+            await asyncio.sleep(self.ventana)
+
+            while True:
+                lote = self._tomar()
+                if not lote:
+                    break
+                try:
+                    await self._despachar(lote)
+                except Exception:
+                    # Quedan en el outbox: los recupera el próximo barrido
+                    logger.exception("No se pudo despachar un lote de %d eventos", len(lote))
+
+    async def _barrer(self) -> None:
+        """Recupera registros del outbox que nadie despachó"""
+        antes = datetime.now() - timedelta(seconds=self.barrido_gracia)
+        try:
+            while True:
+                eventos = await self._repo.get_outbox(antes, self.lote_max)
+                nuevos = [e for e in eventos if e["id"] not in self._despachados]
+                self.recuperados += len(nuevos)
+                await self._despachar(eventos)
+                if len(eventos) < self.lote_max:
+                    break
+        except Exception:
+            logger.exception("No se pudo barrer el outbox de eventos")
+
+    async def _despachar(self, lote: List[Dict[str, Any]]) -> None:
+        """Numera un lote, lo agrega al log y al buffer, y borra sus registros del outbox"""
+        nuevos = []
+        vistos = set()
+        for evento in lote:
+            if evento["id"] in self._despachados or evento["id"] in vistos:
+                continue
+            vistos.add(evento["id"])
+            nuevos.append(dict(evento, secuencia=self._secuencia + len(nuevos) + 1))
+
+        if nuevos:
+            if self.log_path:
+                await run_in_threadpool(self._escribir_log, nuevos)
+
+            self._secuencia += len(nuevos)
+            for evento in nuevos:
+                self._despachados[evento["id"]] = None
+            while len(self._despachados) > self.capacidad:
+                self._despachados.popitem(last=False)
+
+            self._buffer.extend(nuevos)
+            self.despachados += len(nuevos)
+            self.lotes += 1
+
+            # Despierta a los que esperan y prepara el evento para la próxima tanda
+            nuevos_evento, self._nuevos = self._nuevos, asyncio.Event()
+            nuevos_evento.set()
+
+        if self._repo is not None:
+            await self._repo.borrar_outbox([evento["id"] for evento in lote])
+
+    def _escribir_log(self, eventos: List[Dict[str, Any]]) -> None:
+        with open(self.log_path, "ab") as log:
+            log.write(b"".join(dumps(evento) + b"\n" for evento in eventos))
+
+
+# Instancia global del despachador
+despachador_eventos = DespachadorEventos(
+    capacidad=settings.EVENTOS_BUFFER_SIZE,
+    lote_max=settings.EVENTOS_LOTE_MAX,
+    ventana=settings.EVENTOS_VENTANA,
+    log_path=settings.EVENTOS_LOG_PATH or None,
+    barrido_intervalo=settings.EVENTOS_BARRIDO_INTERVALO,
+    barrido_gracia=settings.EVENTOS_BARRIDO_GRACIA
+)
@@ -1,49 +1,29 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
 from typing import Optional
+from app.arranque import ArranqueFirestore
 import os
 
 
+# Bootstrap perezoso (ver app.arranque): importar este módulo no inicializa
+# Firebase. El lifespan crea el cliente y calienta el canal al arrancar.
+arranque_firestore = ArranqueFirestore(
+    os.getenv("FIREBASE_CREDENTIALS_PATH", "secrets/cuentas/firebase-credentials.json"),
+    # Sin archivo de credenciales: inicialización sin credenciales para desarrollo local
+    credenciales_obligatorias=False
+)
+
+
 class FirebaseService:
-    _instance = None
-    _db = None
-
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(FirebaseService, cls).__new__(cls)
-        return cls._instance
-
-    def __init__(self):
-        if self._db is None:
-            self._initialize_firebase()
-
-    def _initialize_firebase(self):
-        """Inicializa la conexión con Firebase"""
-        try:
-            # Verificar si ya existe una app inicializada
-            firebase_admin.get_app()
-        except ValueError:
-            # Si no existe, inicializar
-            cred_path = os.getenv(
-                "FIREBASE_CREDENTIALS_PATH",
-                "secrets/cuentas/firebase-credentials.json"
-            )
-            
-            if os.path.exists(cred_path):
-                cred = credentials.Certificate(cred_path)
-                firebase_admin.initialize_app(cred)
-            else:
-                # Inicialización sin credenciales para desarrollo local
-                firebase_admin.initialize_app()
-
-        self._db = firestore.client()
+    """Acceso a Firestore sobre el cliente único del proceso"""
 
     @property
     def db(self):
         """Retorna la instancia de Firestore"""
-        if self._db is None:
-            self._initialize_firebase()
-        return self._db
+        return arranque_firestore.db
+
+    @property
+    def async_db(self):
+        """Retorna la instancia asíncrona de Firestore (AsyncClient)"""
+        return arranque_firestore.async_db
 
     def get_collection(self, collection_name: str):
         """Obtiene una referencia a una colección"""
@@ -96,4 +76,9 @@ firebase_service = FirebaseService()
 
 def get_firebase_db():
     """Dependency para FastAPI"""
-    return firebase_service.db
\ No newline at end of file
+    return firebase_service.db
+
+
+def get_firebase_async_db():
+    """Dependency para FastAPI (cliente asíncrono)"""
+    return firebase_service.async_db
\ No newline at end of file
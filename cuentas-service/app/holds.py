@@ -0,0 +1,123 @@
+from typing import Optional
+from app.config import settings
+from app.models import EstadoHold
+import asyncio
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class BarredorHolds:
+    """
+    Expira los holds vencidos.
+
+    Cada `intervalo` segundos busca holds activos con `expira_en` cumplido
+    (de a `lote` por consulta) y los libera con estado EXPIRADO, cada uno
+    en su propia transacción. Un hold vencido que se intenta capturar antes
+    del barrido también se expira en ese momento (ver el repositorio), así
+    que el barrido solo decide cuándo vuelve el monto al saldo disponible.
+
+    Con varias réplicas cada una corre su barrido: liberar un hold que ya
+    no está activo no hace nada, así que no hay doble liberación.
+
+    Un hold cuya cuenta ya no existe (huérfano) no se puede liberar: se
+    marca EXPIRADO sin tocar saldos y se registra en el log, así sale de
+    la consulta. Cada lote sigue con el siguiente solo si expiró algún
+    hold, para no repetir indefinidamente los que no avanzan.
+    """
+
+    def __init__(self, intervalo: float = 30.0, lote: int = 100):
+        self.intervalo = intervalo
+        self.lote = lote
+
+        self._servicio = None
+        self._tarea: Optional[asyncio.Task] = None
+
+        self.barridos = 0
+        self.expirados = 0
+        self.huerfanos = 0
+        self.errores = 0
+
+    @property
+    def activo(self) -> bool:
+        return self._tarea is not None and not self._tarea.done()
+
+    async def iniciar(self, servicio) -> None:
+        """Arranca el barrido periódico con `servicio` (un CuentasService)"""
+        if self.activo:
+            return
+
+        self._servicio = servicio
+        self._tarea = asyncio.create_task(self._ejecutar())
+
+    async def detener(self) -> None:
+        """Detiene el barrido"""
+        if self._tarea is None:
+            return
+
+        self._tarea.cancel()
+        try:
+            await self._tarea
+        except asyncio.CancelledError:
+            pass
+        self._tarea = None
+
+    def stats(self) -> dict:
+        """Estadísticas del barrido"""
+        return {
+            "activo": self.activo,
+            "intervalo": self.intervalo,
+            "barridos": self.barridos,
+            "expirados": self.expirados,
+            "huerfanos": self.huerfanos,
+            "errores": self.errores
+        }
+
+    async def _ejecutar(self) -> None:
+        while True:
+            await self.barrer()
+            await asyncio.sleep(self.intervalo)
+
+    async def barrer(self) -> int:
+        """Expira los holds vencidos; retorna cuántos se expiraron"""
+        expirados = 0
+        try:
+            while True:
+                holds = await self._servicio.holds_vencidos(self.lote)
+                avance = 0
+                for hold in holds:
+                    try:
+                        if await self._expirar(hold):
+                            avance += 1
+                    except Exception:
+                        self.errores += 1
+                        logger.exception("No se pudo expirar el hold %s", hold.id)
+                expirados += avance
+                if len(holds) < self.lote or avance == 0:
+                    break
+        except Exception:
+            self.errores += 1
+            logger.exception("No se pudo barrer los holds vencidos")
+
+        self.barridos += 1
+        self.expirados += expirados
+        return expirados
+
+    async def _expirar(self, hold) -> bool:
+        """Expira un hold; retorna si quedó EXPIRADO"""
+        resultado = await self._servicio.expirar_hold(hold)
+        if resultado is None:
+            # La cuenta ya no existe: se cierra el hold para que salga de la consulta
+            resultado = await self._servicio.cerrar_hold_huerfano(hold)
+            if resultado is not None and resultado.estado == EstadoHold.EXPIRADO.value:
+                self.huerfanos += 1
+                logger.warning("Hold %s de la cuenta inexistente %s marcado EXPIRADO", hold.id, hold.cuenta_id)
+        return resultado is not None and resultado.estado == EstadoHold.EXPIRADO.value
+
+
+# Instancia global del barrido
+barredor_holds = BarredorHolds(
+    intervalo=settings.HOLDS_BARRIDO_INTERVALO,
+    lote=settings.HOLDS_BARRIDO_LOTE
+)
@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from app.config import settings
+import asyncio
+import hashlib
+import time
+
+
+class IdempotenciaConflicto(Exception):
+    """La misma Idempotency-Key se usó con otra petición"""
+
+
+class IdempotenciaStore:
+    """
+    Registro en proceso (TTL + LRU) de operaciones por Idempotency-Key.
+
+    La primera petición con una clave ejecuta la operación y guarda su
+    respuesta; las repeticiones reciben esa respuesta sin tocar Firestore.
+    Mientras la primera está en curso, los duplicados esperan su resultado
+    en lugar de ejecutarse en paralelo. Si la operación falla no se guarda
+    nada: los duplicados que esperaban reciben el mismo error y un
+    reintento posterior vuelve a ejecutarla.
+
+    Cada entrada guarda una huella de la petición (ruta y cuerpo) para
+    rechazar una clave reutilizada con otros datos. Todo corre en el event
+    loop, por eso no usa locks.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 86400.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entradas: "OrderedDict[str, tuple]" = OrderedDict()
+        self.replays = 0
+        self.esperas = 0
+        self.evictions = 0
+
+    @property
+    def habilitado(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    @staticmethod
+    def huella(*partes: str) -> str:
+        """Resume los datos de la petición para comparar repeticiones"""
+        return hashlib.sha256("\n".join(partes).encode()).hexdigest()
+
+    async def ejecutar(
+        self,
+        clave: Optional[str],
+        huella: str,
+        operacion: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Ejecuta `operacion` una sola vez por clave
+
+        Retorna (resultado, repetido). Sin clave (o con el registro
+        deshabilitado) ejecuta la operación directamente. Lanza
+        IdempotenciaConflicto si la clave ya se usó con otra huella.
+        """
+        if not clave or not self.habilitado:
+            return await operacion(), False
+
+        entrada = self._vigente(clave)
+        if entrada is not None:
+            huella_guardada, futuro = entrada
+            if huella_guardada != huella:
+                raise IdempotenciaConflicto(clave)
+
+            if futuro.done():
+                self.replays += 1
+            else:
+                self.esperas += 1
+            return await asyncio.shield(futuro), True
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._guardar(clave, huella, futuro)
+
+        try:
+            resultado = await operacion()
+        except asyncio.CancelledError:
+            self._entradas.pop(clave, None)
+            futuro.cancel()
+            raise
+        except Exception as e:
+            self._entradas.pop(clave, None)
+            futuro.set_exception(e)
+            # Marca la excepción como leída aunque no haya duplicados esperando
+            futuro.exception()
+            raise
+
+        futuro.set_result(resultado)
+        return resultado, False
+
+    def limpiar(self) -> None:
+        """Vacía el registro y reinicia las estadísticas"""
+        self._entradas.clear()
+        self.replays = self.esperas = self.evictions = 0
+
+    def stats(self) -> dict:
+        """Estadísticas de uso del registro"""
+        return {
+            "size": len(self._entradas),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "replays": self.replays,
+            "esperas": self.esperas,
+            "evictions": self.evictions
+        }
+
+    def _vigente(self, clave: str) -> Optional[tuple]:
+        """Retorna (huella, futuro) si la clave existe y no expiró"""
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+
+        huella, futuro, expira = entrada
+        if expira < time.monotonic():
+            del self._entradas[clave]
+            return None
+
+        self._entradas.move_to_end(clave)
+        return huella, futuro
+
+    def _guardar(self, clave: str, huella: str, futuro: asyncio.Future) -> None:
+        """Agrega una entrada y descarta las menos usadas si se pasa del tamaño"""
+        self._entradas[clave] = (huella, futuro, time.monotonic() + self.ttl)
+
+        while len(self._entradas) > self.max_size:
+            # No se descartan operaciones en curso: sus duplicados deben esperarlas
+            antigua = next(
+                (k for k, (_, f, _) in self._entradas.items() if f.done()),
+                None
+            )
+            if antigua is None:
+                break
+            del self._entradas[antigua]
+            self.evictions += 1
+
+
+# Instancia global del registro
+idempotencia_store = IdempotenciaStore(
+    max_size=settings.IDEMPOTENCIA_MAX_SIZE,
+    ttl=settings.IDEMPOTENCIA_TTL
+)
@@ -1,11 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.config import settings
+from app.cache import cuentas_cache
+from app.idempotencia import idempotencia_store
+from app.eventos import despachador_eventos
+from app.holds import barredor_holds
+from app.metricas import MetricasMiddleware, metricas_response
+from app.deps import get_cuentas_repository
+from app.firebase import arranque_firestore
+from app.services.cuentas_service import CuentasService
+from app.responses import FastJSONResponse
 from app.routers import cuentas
 import uvicorn
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cliente de Firestore único del proceso, con el canal gRPC ya caliente
+    if settings.ALMACENAMIENTO == "firestore":
+        await arranque_firestore.iniciar(asincrono=settings.FIRESTORE_ASYNC)
+    # Despachador del outbox de eventos: uno por proceso
+    await despachador_eventos.iniciar(get_cuentas_repository())
+    # Barrido de holds vencidos
+    await barredor_holds.iniciar(CuentasService(get_cuentas_repository()))
+    yield
+    await barredor_holds.detener()
+    await despachador_eventos.detener()
+
+
 # Crear aplicación FastAPI
 app = FastAPI(
     title=settings.APP_NAME,
@@ -13,7 +37,9 @@ app = FastAPI(
     description="Microservicio de gestión de cuentas bancarias",
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -23,8 +49,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cursor de los listados paginados (ver app.routers.cuentas)
+    expose_headers=["X-Next-Page-Token", "Link"],
 )
 
+# Latencia por ruta y llamadas a Firestore; en DEBUG, cabecera con el presupuesto por petición
+app.add_middleware(MetricasMiddleware, cabecera=settings.DEBUG)
+
 
 # Health check endpoint
 @app.get("/health", tags=["Health"])
@@ -37,6 +68,42 @@ async def health_check():
     }
 
 
+@app.get("/health/cache", tags=["Health"])
+async def cache_stats():
+    """Estadísticas de la caché de cuentas (hits, misses, tamaño)"""
+    return cuentas_cache.stats()
+
+
+@app.get("/health/idempotencia", tags=["Health"])
+async def idempotencia_stats():
+    """Estadísticas del registro de Idempotency-Key (repeticiones, esperas, tamaño)"""
+    return idempotencia_store.stats()
+
+
+@app.get("/health/eventos", tags=["Health"])
+async def eventos_stats():
+    """Estadísticas del despachador de eventos (secuencia, buffer, lotes)"""
+    return despachador_eventos.stats()
+
+
+@app.get("/health/holds", tags=["Health"])
+async def holds_stats():
+    """Estadísticas del barrido de holds vencidos (barridos, expirados, errores)"""
+    return barredor_holds.stats()
+
+
+@app.get("/health/firestore", tags=["Health"])
+async def firestore_stats():
+    """Tiempos de arranque de Firestore (imports, inicialización, calentamiento del canal)"""
+    return arranque_firestore.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato de Prometheus"""
+    return metricas_response()
+
+
 @app.get("/", tags=["Root"])
 async def root():
     """Endpoint raíz con información del servicio"""
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, Literal, Union
+from typing import Dict, Optional, Literal, Union
 from datetime import datetime
 from enum import Enum
 
@@ -28,6 +28,13 @@ class TipoMovimiento(str, Enum):
     PAGO_SERVICIO = "PAGO_SERVICIO"
 
 
+class EstadoHold(str, Enum):
+    ACTIVO = "ACTIVO"
+    CAPTURADO = "CAPTURADO"
+    LIBERADO = "LIBERADO"
+    EXPIRADO = "EXPIRADO"
+
+
 class Cuenta(BaseModel):
     id: Optional[str] = None
     cliente_id: str
@@ -35,6 +42,10 @@ class Cuenta(BaseModel):
     tipo: Union[TipoCuenta, str] = TipoCuenta.AHORRO
     moneda: Union[Moneda, str] = Moneda.BOB
     saldo: float = 0.0
+    # Cantidad de shards del saldo (0 = saldo en el documento de la cuenta)
+    saldo_shards: int = 0
+    # Suma de los holds activos: no se puede retirar ni volver a retener
+    saldo_retenido: float = 0.0
     estado: Union[EstadoCuenta, str] = EstadoCuenta.ACTIVA
     fecha_apertura: datetime = Field(default_factory=datetime.now)
     created_at: datetime = Field(default_factory=datetime.now)
@@ -61,6 +72,11 @@ class Cuenta(BaseModel):
             return v
         return v.value if hasattr(v, 'value') else v
 
+    @property
+    def saldo_disponible(self) -> float:
+        """Saldo menos lo retenido por holds activos"""
+        return round(self.saldo - self.saldo_retenido, 2)
+
     class Config:
         use_enum_values = True
 
@@ -70,8 +86,9 @@ class Movimiento(BaseModel):
     cuenta_id: str
     tipo: Union[TipoMovimiento, str]
     monto: float
-    saldo_anterior: float
-    saldo_nuevo: float
+    # None en los créditos a cuentas fraccionadas: no leen el saldo agregado
+    saldo_anterior: Optional[float] = None
+    saldo_nuevo: Optional[float] = None
     descripcion: str
     referencia: Optional[str] = None
     fecha: datetime = Field(default_factory=datetime.now)
@@ -85,4 +102,46 @@ class Movimiento(BaseModel):
         return v.value if hasattr(v, 'value') else v
 
     class Config:
-        use_enum_values = True
\ No newline at end of file
+        use_enum_values = True
+
+
+class Hold(BaseModel):
+    """Reserva de fondos de una cuenta hasta que se captura, se libera o expira"""
+    id: Optional[str] = None
+    cuenta_id: str
+    monto: float
+    descripcion: str
+    referencia: Optional[str] = None
+    estado: Union[EstadoHold, str] = EstadoHold.ACTIVO
+    expira_en: datetime
+    # Al capturar: monto debitado (puede ser menor al retenido) y su movimiento
+    monto_capturado: Optional[float] = None
+    movimiento_id: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    @field_validator('estado', mode='before')
+    @classmethod
+    def validate_estado(cls, v):
+        if isinstance(v, str):
+            return v
+        return v.value if hasattr(v, 'value') else v
+
+    class Config:
+        use_enum_values = True
+
+
+class ResumenPeriodo(BaseModel):
+    """Resumen de los movimientos de una cuenta en un día o un mes"""
+    cuenta_id: str
+    granularidad: Literal["dia", "mes"]
+    periodo: str
+    # None si el periodo tiene movimientos de una cuenta fraccionada
+    saldo_apertura: Optional[float] = None
+    saldo_cierre: Optional[float] = None
+    creditos: Dict[str, float] = Field(default_factory=dict)
+    debitos: Dict[str, float] = Field(default_factory=dict)
+    total_creditos: float = 0.0
+    total_debitos: float = 0.0
+    cantidad_movimientos: int = 0
+    updated_at: Optional[datetime] = None
@@ -0,0 +1,30 @@
+from typing import Optional
+import base64
+import json
+
+
+def encode_page_token(cursor: dict) -> str:
+    """Codifica un cursor de paginación como token opaco (base64 url-safe)"""
+    raw = json.dumps(cursor, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_page_token(token: Optional[str]) -> Optional[dict]:
+    """
+    Decodifica un token generado por encode_page_token
+
+    Lanza ValueError si el token no es válido.
+    """
+    if not token:
+        return None
+
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cursor = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Token de página inválido") from e
+
+    if not isinstance(cursor, dict):
+        raise ValueError("Token de página inválido")
+
+    return cursor
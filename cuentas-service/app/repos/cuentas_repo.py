@@ -1,42 +1,100 @@
-from typing import List, Optional
+from typing import Any, Callable, Dict, Generator, List, NamedTuple, Optional, Tuple
 from datetime import datetime
 from firebase_admin import firestore
-from app.models import Cuenta, Movimiento, EstadoCuenta
-from app.schemas import CuentaFilter, MovimientoFilter
+from google.api_core.exceptions import AlreadyExists
+from app.config import settings
+from app.models import Cuenta, Movimiento, EstadoCuenta, TipoMovimiento, ResumenPeriodo, Hold, EstadoHold
+from app.schemas import CuentaFilter, MovimientoFilter, OperacionLoteItem
+from app.cache import CuentasCache, cuentas_cache
+from app.decodificacion import decodificar_cuenta, decodificar_movimiento
+from app.eventos import DespachadorEventos, despachador_eventos
+from app.repos.numeros_cuenta import IndiceNumerosPendiente, NumeroCuentaAllocator, numeros_cuenta_allocator
+from app.repos.interfaz import RESUMENES, TransferenciaAnulada
+from app.repos.limites_diarios import (
+    AcumuladosDiarios, LimiteDiarioExcedido, acumulados_diarios, limite_diario
+)
 import random
-import string
 
 
-class CuentasRepository:
-    def __init__(self, db):
+# Límite de escrituras por transacción de Firestore
+LOTE_MAX_ESCRITURAS = 500
+
+# Escrituras fijas por cuenta en un lote: saldo, acumulado diario y resúmenes (día y mes)
+LOTE_ESCRITURAS_POR_CUENTA = 4
+
+# Escrituras por movimiento en un lote: el movimiento y su registro en el outbox
+LOTE_ESCRITURAS_POR_MOVIMIENTO = 2
+
+# Tipo de evento de los registros del outbox
+EVENTO_MOVIMIENTO = "MOVIMIENTO_REGISTRADO"
+
+
+class Lectura(NamedTuple):
+    """Pedido de un plan: leer `refs` con get_all (dentro de `transaction` si viene)"""
+    refs: list
+    transaction: Any = None
+
+
+class Consulta(NamedTuple):
+    """Pedido de un plan: correr `query` y recibir sus snapshots"""
+    query: Any
+
+
+class Transaccion(NamedTuple):
+    """Pedido de un plan: correr el plan `cuerpo(transaction)` en una transacción con reintentos"""
+    cuerpo: Callable[[Any], Generator]
+
+
+class BaseCuentasRepository:
+    """
+    Lógica común a los repositorios de cuentas (síncrono y asíncrono).
+
+    Contiene las conversiones, la construcción de consultas y las
+    operaciones transaccionales como planes sin E/S (ver `_plan_*`); cada
+    repositorio solo ejecuta las lecturas y los commits contra Firestore.
+    Las lecturas por ID o número de cuenta pasan por la caché de cuentas
+    del proceso.
+    """
+
+    def __init__(
+        self,
+        db,
+        cache: Optional[CuentasCache] = None,
+        allocator: Optional[NumeroCuentaAllocator] = None,
+        acumulados: Optional[AcumuladosDiarios] = None,
+        eventos: Optional[DespachadorEventos] = None
+    ):
         self.db = db
+        self.cache = cache if cache is not None else cuentas_cache
+        self.allocator = allocator if allocator is not None else numeros_cuenta_allocator
+        self.acumulados = acumulados if acumulados is not None else acumulados_diarios
+        self.eventos = eventos if eventos is not None else despachador_eventos
         self.collection = "cuentas"
         self.movimientos_collection = "movimientos"
+        # Índice numero_cuenta -> cuenta_id (un documento por número)
+        self.numeros_collection = "numeros_cuenta"
+        self.contadores_collection = "contadores"
+        # Subcolección de cuentas/{id} con los shards del saldo fraccionado
+        self.shards_collection = "saldo_shards"
+        # Acumulados de depósitos y retiros por cuenta y día ({cuenta_id}_{dia})
+        self.limites_collection = "limites_diarios"
+        # Eventos de cambio escritos en el mismo commit que sus movimientos
+        self.outbox_collection = "outbox"
+        # Reservas de fondos (holds) de todas las cuentas
+        self.holds_collection = "holds"
+        # Transferencias ya aplicadas, por referencia (reintentos idempotentes)
+        self.transferencias_collection = "transferencias_aplicadas"
 
-    def _generar_numero_cuenta(self) -> str:
-        """Genera un número de cuenta único de 10 dígitos"""
-        return ''.join(random.choices(string.digits, k=10))
-
-    def _cuenta_existe(self, numero_cuenta: str) -> bool:
-        """Verifica si un número de cuenta ya existe"""
-        docs = self.db.collection(self.collection).where(
-            "numero_cuenta", "==", numero_cuenta
-        ).limit(1).stream()
-        return len(list(docs)) > 0
+    def _doc_to_cuenta(self, doc) -> Cuenta:
+        """Convierte un documento de Firestore en un modelo Cuenta (sin revalidar)"""
+        return decodificar_cuenta(doc.id, doc.to_dict())
 
-    def _generar_numero_cuenta_unico(self) -> str:
-        """Genera un número de cuenta único"""
-        while True:
-            numero = self._generar_numero_cuenta()
-            if not self._cuenta_existe(numero):
-                return numero
+    def _doc_to_movimiento(self, doc) -> Movimiento:
+        """Convierte un documento de Firestore en un modelo Movimiento (sin revalidar)"""
+        return decodificar_movimiento(doc.id, doc.to_dict())
 
-    def create(self, cuenta: Cuenta) -> str:
-        """Crea una nueva cuenta"""
-        cuenta.numero_cuenta = self._generar_numero_cuenta_unico()
-        cuenta.created_at = datetime.now()
-        cuenta.updated_at = datetime.now()
-        
+    def _cuenta_to_dict(self, cuenta: Cuenta) -> dict:
+        """Convierte una Cuenta al formato que se guarda en Firestore"""
         cuenta_dict = cuenta.model_dump(exclude={"id"})
         
         # Convertir datetime a formato compatible con Firestore
@@ -52,53 +110,873 @@ class CuentasRepository:
         if hasattr(cuenta_dict.get("estado"), 'value'):
             cuenta_dict["estado"] = cuenta_dict["estado"].value
         
-        doc_ref = self.db.collection(self.collection).add(cuenta_dict)
-        return doc_ref[1].id
+        return cuenta_dict
 
-    def get_by_id(self, cuenta_id: str) -> Optional[Cuenta]:
-        """Obtiene una cuenta por ID"""
-        doc = self.db.collection(self.collection).document(cuenta_id).get()
+    def _movimiento_to_dict(self, movimiento: Movimiento) -> dict:
+        """Convierte un Movimiento al formato que se guarda en Firestore"""
+        movimiento_dict = movimiento.model_dump(exclude={"id"})
+        movimiento_dict["fecha"] = movimiento.fecha
+        movimiento_dict["created_at"] = movimiento.created_at
         
-        if not doc.exists:
-            return None
+        # Asegurar que el Enum se guarde como string
+        if hasattr(movimiento_dict.get("tipo"), 'value'):
+            movimiento_dict["tipo"] = movimiento_dict["tipo"].value
         
-        data = doc.to_dict()
-        data["id"] = doc.id
+        return movimiento_dict
+
+    def _preparar_update(self, update_data: dict) -> dict:
+        """Agrega la marca de tiempo y convierte Enums antes de actualizar"""
+        update_data["updated_at"] = datetime.now()
         
-        # Asegurar que los campos datetime sean datetime objects
-        if isinstance(data.get("fecha_apertura"), str):
-            data["fecha_apertura"] = datetime.fromisoformat(data["fecha_apertura"].replace('Z', '+00:00'))
-        if isinstance(data.get("created_at"), str):
-            data["created_at"] = datetime.fromisoformat(data["created_at"].replace('Z', '+00:00'))
-        if isinstance(data.get("updated_at"), str):
-            data["updated_at"] = datetime.fromisoformat(data["updated_at"].replace('Z', '+00:00'))
+        # Convertir Enums a strings si es necesario
+        if "estado" in update_data and hasattr(update_data["estado"], 'value'):
+            update_data["estado"] = update_data["estado"].value
+        if "tipo" in update_data and hasattr(update_data["tipo"], 'value'):
+            update_data["tipo"] = update_data["tipo"].value
         
-        return Cuenta(**data)
+        return update_data
 
-    def get_by_numero_cuenta(self, numero_cuenta: str) -> Optional[Cuenta]:
-        """Obtiene una cuenta por número de cuenta"""
-        docs = self.db.collection(self.collection).where(
-            "numero_cuenta", "==", numero_cuenta
-        ).limit(1).stream()
+    def _nuevo_movimiento(
+        self,
+        cuenta: Cuenta,
+        tipo: TipoMovimiento,
+        monto: float,
+        descripcion: str,
+        debito: bool,
+        referencia: Optional[str] = None,
+        con_saldo: bool = True
+    ) -> Movimiento:
+        """
+        Calcula el nuevo saldo y arma el Movimiento correspondiente
         
-        for doc in docs:
-            data = doc.to_dict()
-            data["id"] = doc.id
+        Con con_saldo=False (créditos a cuentas fraccionadas, que no leen
+        todos los shards) el movimiento no lleva saldo anterior ni nuevo.
+        """
+        saldo_anterior = saldo_nuevo = None
+        if con_saldo:
+            saldo_anterior = cuenta.saldo
+            saldo_nuevo = saldo_anterior - monto if debito else saldo_anterior + monto
+        ahora = datetime.now()
+        
+        return Movimiento(
+            cuenta_id=cuenta.id,
+            tipo=tipo,
+            monto=monto,
+            saldo_anterior=saldo_anterior,
+            saldo_nuevo=saldo_nuevo,
+            descripcion=descripcion,
+            referencia=referencia,
+            fecha=ahora,
+            created_at=ahora
+        )
+
+    def _armar_lotes(self, operaciones: List[OperacionLoteItem]) -> List[Dict[str, list]]:
+        """
+        Agrupa las operaciones por cuenta y las reparte en lotes de escritura
+        
+        Cada lote es un dict cuenta_id -> [(indice, operacion), ...] que cabe
+        en una transacción: LOTE_ESCRITURAS_POR_CUENTA por cuenta (saldo
+        final, acumulado diario y resúmenes) más LOTE_ESCRITURAS_POR_MOVIMIENTO
+        por movimiento (movimiento y outbox), hasta LOTE_MAX_ESCRITURAS. Una cuenta con más
+        operaciones de las que caben se continúa en el lote siguiente,
+        respetando el orden original.
+        """
+        grupos: Dict[str, list] = {}
+        for indice, operacion in enumerate(operaciones):
+            grupos.setdefault(operacion.cuenta_id, []).append((indice, operacion))
+        
+        lotes = []
+        lote: Dict[str, list] = {}
+        escrituras = 0
+        
+        for cuenta_id, pendientes in grupos.items():
+            while pendientes:
+                disponibles = (
+                    LOTE_MAX_ESCRITURAS - escrituras - LOTE_ESCRITURAS_POR_CUENTA
+                ) // LOTE_ESCRITURAS_POR_MOVIMIENTO
+                if disponibles <= 0:
+                    lotes.append(lote)
+                    lote, escrituras = {}, 0
+                    continue
+                
+                lote[cuenta_id] = pendientes[:disponibles]
+                escrituras += len(lote[cuenta_id]) * LOTE_ESCRITURAS_POR_MOVIMIENTO + LOTE_ESCRITURAS_POR_CUENTA
+                pendientes = pendientes[disponibles:]
+        
+        if lote:
+            lotes.append(lote)
+        
+        return lotes
+
+    def _procesar_grupo(
+        self,
+        cuenta: Optional[Cuenta],
+        operaciones: list,
+        validar: Callable[[Cuenta, OperacionLoteItem], None],
+        acumulados: Optional[Dict[str, float]] = None
+    ) -> Tuple[list, List[Movimiento], Optional[Cuenta]]:
+        """
+        Aplica en memoria las operaciones de una cuenta dentro de un lote
+        
+        `validar` lanza ValueError para rechazar una operación; el rechazo
+        solo afecta a esa operación. `acumulados` (campo -> monto del día)
+        se usa para los límites diarios y se actualiza en el lugar. Retorna
+        los resultados (indice, movimiento o None, error o None), los
+        movimientos a escribir y la cuenta con el saldo final.
+        """
+        resultados = []
+        movimientos = []
+        
+        for indice, operacion in operaciones:
+            if cuenta is None:
+                resultados.append((indice, None, "Cuenta no encontrada"))
+                continue
             
-            # Asegurar que los campos datetime sean datetime objects
-            if isinstance(data.get("fecha_apertura"), str):
-                data["fecha_apertura"] = datetime.fromisoformat(data["fecha_apertura"].replace('Z', '+00:00'))
-            if isinstance(data.get("created_at"), str):
-                data["created_at"] = datetime.fromisoformat(data["created_at"].replace('Z', '+00:00'))
-            if isinstance(data.get("updated_at"), str):
-                data["updated_at"] = datetime.fromisoformat(data["updated_at"].replace('Z', '+00:00'))
+            try:
+                validar(cuenta, operacion)
+                if acumulados is not None:
+                    self._sumar_acumulado(acumulados, operacion.tipo, operacion.monto)
+            except ValueError as e:
+                resultados.append((indice, None, str(e)))
+                continue
             
-            return Cuenta(**data)
+            movimiento = self._nuevo_movimiento(
+                cuenta,
+                operacion.tipo,
+                operacion.monto,
+                operacion.descripcion,
+                debito=operacion.tipo == TipoMovimiento.RETIRO.value,
+                referencia=operacion.referencia
+            )
+            cuenta = cuenta.model_copy(update={
+                "saldo": movimiento.saldo_nuevo,
+                "updated_at": movimiento.fecha
+            })
+            movimientos.append(movimiento)
+            resultados.append((indice, movimiento, None))
+        
+        return resultados, movimientos, cuenta
+
+    def _escribir_grupo(
+        self,
+        transaction,
+        cuenta: Cuenta,
+        movimientos: List[Movimiento],
+        saldos_shards: Optional[Dict[str, float]] = None,
+        acumulados: Optional[Dict[str, float]] = None,
+        dia: Optional[str] = None,
+        acumulados_shards: Optional[Dict[str, Dict[str, float]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Agrega al lote/transacción el saldo final, el acumulado diario, los
+        resúmenes y los movimientos de una cuenta, con sus registros en el
+        outbox. En una cuenta fraccionada el acumulado va en el shard
+        escrito (ver `_escribir_shards`). Retorna los eventos a publicar
+        después del commit.
+        """
+        shard = None
+        if saldos_shards is not None:
+            delta = cuenta.saldo - sum(saldos_shards.values())
+            shard = self._escribir_shards(
+                transaction, cuenta, saldos_shards, delta, dia, acumulados_shards, self._sumas_limite(movimientos)
+            )
+        else:
+            transaction.update(self.db.collection(self.collection).document(cuenta.id), {
+                "saldo": cuenta.saldo,
+                "updated_at": cuenta.updated_at
+            })
+            if acumulados:
+                self._escribir_acumulado(transaction, cuenta.id, dia, acumulados)
+        
+        self._escribir_resumenes(transaction, cuenta.id, movimientos, shard)
+        
+        for movimiento in movimientos:
+            movimiento_ref = self.db.collection(self.movimientos_collection).document()
+            transaction.set(movimiento_ref, self._movimiento_to_dict(movimiento))
+            movimiento.id = movimiento_ref.id
+        
+        return self._escribir_outbox(transaction, movimientos)
+
+    def _escribir_transferencia(
+        self,
+        transaction,
+        origen: Cuenta,
+        destino: Cuenta,
+        monto: float,
+        descripciones: Tuple[str, str],
+        referencia: Optional[str] = None,
+        saldos_origen: Optional[Dict[str, float]] = None,
+        saldos_destino: Optional[Dict[str, float]] = None
+    ) -> Tuple[Movimiento, Movimiento, List[Dict[str, Any]]]:
+        """
+        Agrega a la transacción el débito de `origen`, el crédito de
+        `destino` y sus movimientos TRANSFERENCIA_SALIDA y
+        TRANSFERENCIA_ENTRADA, con resúmenes y registros en el outbox.
+        `saldos_origen` son todos los shards de un origen fraccionado y
+        `saldos_destino` el único shard leído de un destino fraccionado.
+        Retorna los dos movimientos y los eventos a publicar después del commit.
+        """
+        descripcion_salida, descripcion_entrada = descripciones
+        salida = self._nuevo_movimiento(
+            origen, TipoMovimiento.TRANSFERENCIA_SALIDA, monto, descripcion_salida,
+            debito=True, referencia=referencia
+        )
+        entrada = self._nuevo_movimiento(
+            destino, TipoMovimiento.TRANSFERENCIA_ENTRADA, monto, descripcion_entrada,
+            debito=False, referencia=referencia, con_saldo=not destino.saldo_shards
+        )
+        
+        cuentas = self.db.collection(self.collection)
+        shards = (
+            self._escribir_movimiento(transaction, cuentas.document(origen.id), origen, salida, saldos_origen),
+            self._escribir_movimiento(transaction, cuentas.document(destino.id), destino, entrada, saldos_destino)
+        )
         
+        for movimiento, shard in zip((salida, entrada), shards):
+            movimiento_ref = self.db.collection(self.movimientos_collection).document()
+            transaction.set(movimiento_ref, self._movimiento_to_dict(movimiento))
+            self._escribir_resumenes(transaction, movimiento.cuenta_id, [movimiento], shard)
+            movimiento.id = movimiento_ref.id
+        
+        if referencia:
+            transaction.set(self._transferencia_ref(referencia), {
+                "salida": dict(self._movimiento_to_dict(salida), id=salida.id),
+                "entrada": dict(self._movimiento_to_dict(entrada), id=entrada.id),
+                "created_at": datetime.now()
+            })
+        
+        return salida, entrada, self._escribir_outbox(transaction, [salida, entrada])
+
+    def _transferencia_ref(self, referencia: str):
+        return self.db.collection(self.transferencias_collection).document(referencia)
+
+    def _transferencia_aplicada(self, snapshot) -> Tuple[Movimiento, Movimiento]:
+        """Movimientos (salida, entrada) guardados de una transferencia ya aplicada"""
+        data = snapshot.to_dict()
+        return tuple(
+            decodificar_movimiento(data[lado]["id"], {k: v for k, v in data[lado].items() if k != "id"})
+            for lado in ("salida", "entrada")
+        )
+
+    # Saldo fraccionado (shards)
+    #
+    # Una cuenta con saldo_shards = N guarda su saldo repartido en N
+    # documentos cuentas/{id}/saldo_shards/{0..N-1}; el campo saldo de la
+    # cuenta queda como el último valor consolidado. Un crédito lee y
+    # escribe solo un shard al azar: si la cuenta está en caché, la
+    # transacción no lee el documento de la cuenta, así los créditos
+    # concurrentes solo compiten cuando caen en el mismo shard. Como no
+    # conocen el saldo agregado, sus movimientos no llevan saldo anterior
+    # ni nuevo. Los débitos leen todos los shards dentro de la transacción
+    # y validan contra el total exacto.
+
+    def _shard_refs(self, cuenta: Cuenta) -> list:
+        """Referencias a los shards del saldo de una cuenta"""
+        shards = self.db.collection(self.collection).document(cuenta.id).collection(self.shards_collection)
+        return [shards.document(str(i)) for i in range(cuenta.saldo_shards)]
+
+    def _agrupar_shards(self, cuentas: List[Cuenta], snapshots) -> Dict[str, Dict[str, float]]:
+        """Arma cuenta_id -> {shard_id: saldo}; los shards inexistentes valen 0"""
+        saldos = {
+            cuenta.id: {str(i): 0.0 for i in range(cuenta.saldo_shards)}
+            for cuenta in cuentas
+        }
+        
+        for snapshot in snapshots:
+            if snapshot.exists:
+                cuenta_id = snapshot.reference.parent.parent.id
+                saldos[cuenta_id][snapshot.id] = snapshot.get("saldo") or 0.0
+        
+        return saldos
+
+    def _repartir_delta(self, saldos: Dict[str, float], delta: float) -> Tuple[str, float]:
+        """
+        Elige el shard que recibe `delta`; retorna (shard_id, nuevo saldo)
+        
+        `saldos` son los shards leídos: todos, o solo el elegido para un
+        crédito. Un crédito va a un shard al azar y un débito al shard con
+        más saldo. Siempre se escribe un solo shard (así una cuenta ocupa
+        una escritura en los lotes); un shard puede quedar negativo, lo que
+        cuenta es la suma.
+        """
+        if delta >= 0:
+            shard_id = random.choice(list(saldos))
+        else:
+            shard_id = max(saldos, key=saldos.get)
+        return shard_id, saldos[shard_id] + delta
+
+    def _escribir_shards(
+        self,
+        transaction,
+        cuenta: Cuenta,
+        saldos: Dict[str, float],
+        delta: float,
+        dia: Optional[str] = None,
+        acumulados: Optional[Dict[str, Dict[str, float]]] = None,
+        sumas: Optional[Dict[str, float]] = None
+    ) -> str:
+        """
+        Agrega a la transacción el nuevo saldo del shard que recibe `delta`
+        
+        Si hay `sumas` (campo de límite -> monto), también escribe en ese
+        shard su acumulado del día: el leído en `acumulados` más `sumas`.
+        Retorna el ID del shard escrito.
+        """
+        shard_id, saldo = self._repartir_delta(saldos, delta)
+        datos = {"saldo": saldo}
+        if sumas:
+            previos = acumulados[shard_id]
+            datos.update({campo: previos[campo] + sumas.get(campo, 0.0) for campo in previos}, dia=dia)
+        transaction.set(self._shard_refs(cuenta)[int(shard_id)], datos, merge=True)
+        return shard_id
+
+    def _fraccionada_cacheada(self, cuenta_id: str) -> Optional[Cuenta]:
+        """La cuenta cacheada si está fraccionada (sus créditos no leen la cuenta)"""
+        cacheada = self.cache.get(cuenta_id)
+        if cacheada is not None and cacheada.saldo_shards:
+            return cacheada
         return None
 
-    def list(self, filters: Optional[CuentaFilter] = None) -> List[Cuenta]:
-        """Lista cuentas con filtros opcionales"""
+    def _es_debito(self, movimiento: Movimiento) -> bool:
+        # Los movimientos sin saldo son siempre créditos a cuentas fraccionadas
+        return movimiento.saldo_anterior is not None and movimiento.saldo_nuevo < movimiento.saldo_anterior
+
+    def _escribir_movimiento(
+        self,
+        transaction,
+        cuenta_ref,
+        cuenta: Cuenta,
+        movimiento: Movimiento,
+        saldos_shards: Optional[Dict[str, float]] = None,
+        cambios: Optional[Dict[str, Any]] = None,
+        acumulados_shards: Optional[Dict[str, Dict[str, float]]] = None,
+        dia: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Agrega a la transacción el nuevo saldo de la cuenta
+        
+        En una cuenta fraccionada solo se escribe un shard de `saldos_shards`
+        (los leídos en la transacción): el documento de la cuenta no se
+        toca. Con `acumulados_shards` (los acumulados del día de esos
+        shards) el shard escrito suma también el movimiento a su contador
+        de límite diario. `cambios` son otros campos de la cuenta a escribir
+        en la misma actualización (p. ej. saldo_retenido al capturar un hold).
+        Retorna el ID del shard escrito (None si la cuenta no está fraccionada).
+        """
+        if cuenta.saldo_shards:
+            delta = -movimiento.monto if self._es_debito(movimiento) else movimiento.monto
+            sumas = self._sumas_limite([movimiento]) if acumulados_shards is not None else None
+            shard = self._escribir_shards(transaction, cuenta, saldos_shards, delta, dia, acumulados_shards, sumas)
+            if cambios:
+                transaction.update(cuenta_ref, cambios)
+            return shard
+        
+        transaction.update(cuenta_ref, {
+            "saldo": movimiento.saldo_nuevo,
+            "updated_at": movimiento.fecha,
+            **(cambios or {})
+        })
+        return None
+
+    # Límites diarios
+    #
+    # Cada cuenta tiene un documento por día en `limites_diarios` con los
+    # campos depositos y retiros, que se actualiza en la misma transacción
+    # que el saldo. Así el límite se valida leyendo un documento por ID,
+    # sin consultar los movimientos del día.
+    #
+    # Las cuentas fraccionadas no usan ese documento, que volvería a juntar
+    # en uno solo las escrituras que reparten los shards: cada shard guarda
+    # en sus campos dia, depositos y retiros lo acumulado hoy por los
+    # movimientos que lo escribieron, y el acumulado de la cuenta es la
+    # suma. Los débitos, los lotes y las capturas leen todos los shards y
+    # validan el límite exacto. Un crédito lee solo su shard y valida
+    # contra el mayor entre ese shard y la cota en memoria
+    # (AcumuladosDiarios), que se refresca cada vez que el proceso lee
+    # todos los shards: el límite de depósitos de una cuenta fraccionada es
+    # aproximado y puede superarse si varios procesos acreditan a la vez.
+
+    def _dia_actual(self) -> str:
+        return datetime.now().strftime("%Y-%m-%d")
+
+    def _limite_ref(self, cuenta_id: str, dia: str):
+        return self.db.collection(self.limites_collection).document(f"{cuenta_id}_{dia}")
+
+    def _leer_acumulados(self, snapshot, dia: Optional[str] = None) -> Dict[str, float]:
+        """
+        Acumulados del día (campo -> monto) de un documento de límites
+        
+        Con `dia` el documento es un shard: sus acumulados de otro día valen 0.
+        """
+        data = snapshot.to_dict() if snapshot is not None and snapshot.exists else {}
+        if dia is not None and data.get("dia") != dia:
+            data = {}
+        return {
+            "depositos": data.get("depositos", 0.0),
+            "retiros": data.get("retiros", 0.0)
+        }
+
+    def _sumar_acumulado(self, acumulados: Dict[str, float], tipo, monto: float) -> None:
+        """Suma `monto` al acumulado del tipo o lanza LimiteDiarioExcedido"""
+        limite = limite_diario(tipo)
+        if limite is None:
+            return
+        
+        campo, maximo = limite
+        if acumulados[campo] + monto > maximo:
+            raise LimiteDiarioExcedido(campo, maximo, acumulados[campo])
+        acumulados[campo] += monto
+
+    def _escribir_acumulado(self, transaction, cuenta_id: str, dia: str, acumulados: Dict[str, float]) -> None:
+        """Agrega a la transacción los acumulados del día"""
+        transaction.set(self._limite_ref(cuenta_id, dia), {
+            **acumulados,
+            "cuenta_id": cuenta_id,
+            "dia": dia,
+            "updated_at": datetime.now()
+        }, merge=True)
+
+    def _leer_contador(self, cuenta_id: str, tipo, debito: bool) -> bool:
+        """
+        Indica si la transacción debe leer el documento de límites
+        
+        Los créditos a cuentas fraccionadas (según la caché) no lo leen:
+        su acumulado está en los shards.
+        """
+        if limite_diario(tipo) is None:
+            return False
+        cacheada = self.cache.get(cuenta_id)
+        return debito or cacheada is None or not cacheada.saldo_shards
+
+    def _aplicar_limite(
+        self,
+        transaction,
+        cuenta: Cuenta,
+        tipo,
+        monto: float,
+        dia: str,
+        snapshot_limite,
+        acumulados_shards: Optional[Dict[str, Dict[str, float]]] = None
+    ) -> Optional[Dict[str, float]]:
+        """
+        Valida el límite diario y agrega a la transacción el nuevo acumulado
+        
+        En una cuenta fraccionada valida contra `acumulados_shards` (los
+        shards leídos) y no escribe nada: el acumulado lo escribe
+        `_escribir_movimiento` en el shard que recibe el movimiento.
+        Retorna los acumulados resultantes (None si el tipo no tiene límite).
+        """
+        limite = limite_diario(tipo)
+        if limite is None:
+            return None
+        
+        if cuenta.saldo_shards:
+            acumulados = self._total_acumulados(acumulados_shards)
+            if len(acumulados_shards) < cuenta.saldo_shards:
+                # Crédito: se leyó un solo shard, el resto del día se estima con la cota en memoria
+                acumulados = {
+                    campo: max(acumulado, self.acumulados.get(cuenta.id, dia, campo))
+                    for campo, acumulado in acumulados.items()
+                }
+            self._sumar_acumulado(acumulados, tipo, monto)
+            return acumulados
+        
+        acumulados = self._leer_acumulados(snapshot_limite)
+        self._sumar_acumulado(acumulados, tipo, monto)
+        self._escribir_acumulado(transaction, cuenta.id, dia, acumulados)
+        return acumulados
+
+    def _total_acumulados(self, acumulados_shards: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+        """Acumulados del día de una cuenta fraccionada: la suma de los shards leídos"""
+        total = {"depositos": 0.0, "retiros": 0.0}
+        for acumulados in acumulados_shards.values():
+            for campo, monto in acumulados.items():
+                total[campo] += monto
+        return total
+
+    def _sumas_limite(self, movimientos: List[Movimiento]) -> Dict[str, float]:
+        """Monto de `movimientos` por contador de límite diario"""
+        sumas: Dict[str, float] = {}
+        for movimiento in movimientos:
+            limite = limite_diario(movimiento.tipo)
+            if limite is not None:
+                sumas[limite[0]] = sumas.get(limite[0], 0.0) + movimiento.monto
+        return sumas
+
+    def _separar_lote(
+        self,
+        lote: Dict[str, list],
+        snapshots: Dict[str, Any],
+        dia: str
+    ) -> Tuple[Dict[str, Cuenta], Dict[str, Dict[str, float]]]:
+        """Separa los snapshots de un lote en cuentas existentes y acumulados del día"""
+        cuentas = {}
+        limites = {}
+        
+        for cuenta_id in lote:
+            snapshot = snapshots.get(self.db.collection(self.collection).document(cuenta_id).path)
+            if snapshot is not None and snapshot.exists:
+                cuentas[cuenta_id] = self._doc_to_cuenta(snapshot)
+            limites[cuenta_id] = self._leer_acumulados(snapshots.get(self._limite_ref(cuenta_id, dia).path))
+        
+        return cuentas, limites
+
+    def _registrar_acumulados(self, cuenta_id: str, dia: str, acumulados: Dict[str, float]) -> None:
+        """Guarda en memoria los acumulados confirmados por Firestore"""
+        for campo, acumulado in acumulados.items():
+            self.acumulados.registrar(cuenta_id, dia, campo, acumulado)
+
+    # Resúmenes por día y por mes
+    #
+    # Cada movimiento suma, en el mismo commit, a los documentos
+    # cuentas/{id}/resumenes_diarios/{AAAA-MM-DD} y resumenes_mensuales/{AAAA-MM}.
+    # Los totales se escriben con Increment y el saldo de cierre con el
+    # saldo_nuevo del último movimiento, así que no hace falta leerlos. El
+    # saldo de apertura se deriva al leer: cierre - créditos + débitos.
+    #
+    # En una cuenta fraccionada esos documentos volverían a recibir todas
+    # las escrituras que reparten los shards: cada movimiento suma en cambio
+    # a {periodo}_{shard}, del mismo shard que escribe el saldo, y al leer
+    # se juntan los documentos de cada periodo. Esos documentos no llevan
+    # saldo de cierre (los créditos no conocen el saldo agregado), así que
+    # un periodo con movimientos fraccionados no tiene saldo de apertura ni
+    # de cierre.
+
+    def _resumen_ref(self, cuenta_id: str, granularidad: str, periodo: str, shard: Optional[str] = None):
+        subcoleccion, _ = RESUMENES[granularidad]
+        doc_id = periodo if shard is None else f"{periodo}_{shard}"
+        return self.db.collection(self.collection).document(cuenta_id).collection(subcoleccion).document(doc_id)
+
+    def _escribir_resumenes(
+        self,
+        transaction,
+        cuenta_id: str,
+        movimientos: List[Movimiento],
+        shard: Optional[str] = None
+    ) -> None:
+        """
+        Agrega al lote/transacción los incrementos de los resúmenes de una cuenta
+        
+        `shard` es el shard escrito en una cuenta fraccionada: los
+        incrementos van a los documentos de ese shard, sin saldo de cierre.
+        """
+        resumenes: Dict[Tuple[str, str], dict] = {}
+        
+        for movimiento in movimientos:
+            tipo = movimiento.tipo.value if hasattr(movimiento.tipo, 'value') else movimiento.tipo
+            lado = "debitos" if self._es_debito(movimiento) else "creditos"
+            
+            for granularidad, (_, formato) in RESUMENES.items():
+                periodo = movimiento.fecha.strftime(formato)
+                resumen = resumenes.setdefault((granularidad, periodo), {
+                    "creditos": {}, "debitos": {}, "cantidad": 0
+                })
+                resumen[lado][tipo] = resumen[lado].get(tipo, 0.0) + movimiento.monto
+                resumen["cantidad"] += 1
+                resumen["saldo_cierre"] = movimiento.saldo_nuevo
+        
+        for (granularidad, periodo), resumen in resumenes.items():
+            data = {
+                "cuenta_id": cuenta_id,
+                "periodo": periodo,
+                "total_creditos": firestore.Increment(sum(resumen["creditos"].values())),
+                "total_debitos": firestore.Increment(sum(resumen["debitos"].values())),
+                "cantidad_movimientos": firestore.Increment(resumen["cantidad"]),
+                "updated_at": datetime.now()
+            }
+            if shard is None:
+                data["saldo_cierre"] = resumen["saldo_cierre"]
+            else:
+                data["shard"] = int(shard)
+            # Un mapa vacío con merge reemplazaría el guardado: solo se envían los lados con montos
+            for lado in ("creditos", "debitos"):
+                if resumen[lado]:
+                    data[lado] = {t: firestore.Increment(m) for t, m in resumen[lado].items()}
+            
+            transaction.set(self._resumen_ref(cuenta_id, granularidad, periodo, shard), data, merge=True)
+
+    def _doc_to_resumen(self, doc, granularidad: str) -> ResumenPeriodo:
+        """Convierte un documento de resumen en ResumenPeriodo"""
+        data = doc.to_dict()
+        total_creditos = data.get("total_creditos", 0.0)
+        total_debitos = data.get("total_debitos", 0.0)
+        # Los documentos de un shard no tienen saldo de cierre
+        saldo_cierre = data.get("saldo_cierre", 0.0) if "shard" not in data else None
+        
+        return ResumenPeriodo(
+            cuenta_id=data.get("cuenta_id", ""),
+            granularidad=granularidad,
+            periodo=data.get("periodo", doc.id),
+            saldo_apertura=round(saldo_cierre - total_creditos + total_debitos, 2) if saldo_cierre is not None else None,
+            saldo_cierre=saldo_cierre,
+            creditos=data.get("creditos", {}),
+            debitos=data.get("debitos", {}),
+            total_creditos=total_creditos,
+            total_debitos=total_debitos,
+            cantidad_movimientos=data.get("cantidad_movimientos", 0),
+            updated_at=data.get("updated_at")
+        )
+
+    def _juntar_resumenes(self, resumenes: List[ResumenPeriodo]) -> ResumenPeriodo:
+        """
+        Junta los documentos de un mismo periodo (el de la cuenta y los de
+        sus shards); si hay alguno de un shard, el periodo no tiene saldos
+        """
+        if len(resumenes) == 1:
+            return resumenes[0]
+        
+        juntado = resumenes[0].model_copy(update={"saldo_apertura": None, "saldo_cierre": None})
+        for lado in ("creditos", "debitos"):
+            montos: Dict[str, float] = {}
+            for resumen in resumenes:
+                for tipo, monto in getattr(resumen, lado).items():
+                    montos[tipo] = montos.get(tipo, 0.0) + monto
+            setattr(juntado, lado, montos)
+        
+        juntado.total_creditos = sum(resumen.total_creditos for resumen in resumenes)
+        juntado.total_debitos = sum(resumen.total_debitos for resumen in resumenes)
+        juntado.cantidad_movimientos = sum(resumen.cantidad_movimientos for resumen in resumenes)
+        juntado.updated_at = max((r.updated_at for r in resumenes if r.updated_at), default=None)
+        return juntado
+
+    def _query_resumenes(
+        self,
+        cuenta_id: str,
+        granularidad: str,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        limit: int = 31
+    ):
+        """
+        Consulta los documentos de resumen de una cuenta, del periodo más
+        reciente al más antiguo (un periodo puede tener varios documentos)
+        """
+        subcoleccion, _ = RESUMENES[granularidad]
+        query = self.db.collection(self.collection).document(cuenta_id).collection(subcoleccion)
+        
+        if desde:
+            query = query.where("periodo", ">=", desde)
+        if hasta:
+            query = query.where("periodo", "<=", hasta)
+        
+        return query.order_by("periodo", direction=firestore.Query.DESCENDING).limit(limit)
+
+    # Holds
+    #
+    # Un hold reserva fondos de una cuenta: se guarda en `holds` y su monto
+    # se suma a saldo_retenido de la cuenta en la misma transacción, así el
+    # saldo disponible (saldo - saldo_retenido) se valida leyendo solo la
+    # cuenta. Capturarlo, liberarlo o expirarlo descuenta su monto completo
+    # de saldo_retenido en la transacción que cambia su estado.
+
+    def _hold_ref(self, hold_id: str):
+        return self.db.collection(self.holds_collection).document(hold_id)
+
+    def _doc_to_hold(self, doc) -> Hold:
+        return Hold(**dict(doc.to_dict(), id=doc.id))
+
+    def _hold_to_dict(self, hold: Hold) -> dict:
+        hold_dict = hold.model_dump(exclude={"id"})
+        if hasattr(hold_dict.get("estado"), 'value'):
+            hold_dict["estado"] = hold_dict["estado"].value
+        return hold_dict
+
+    def _leer_hold(self, snapshots: dict, cuenta_ref, hold_ref, cuenta_id: str) -> Tuple[Optional[Cuenta], Optional[Hold]]:
+        """Cuenta y hold leídos en un get_all; (None, None) si falta alguno o el hold es de otra cuenta"""
+        cuenta_snapshot = snapshots[cuenta_ref.path]
+        hold_snapshot = snapshots[hold_ref.path]
+        if not cuenta_snapshot.exists or not hold_snapshot.exists:
+            return None, None
+        
+        hold = self._doc_to_hold(hold_snapshot)
+        if hold.cuenta_id != cuenta_id:
+            return None, None
+        return self._doc_to_cuenta(cuenta_snapshot), hold
+
+    def _sin_hold(self, cuenta: Cuenta, hold: Hold) -> float:
+        """saldo_retenido de la cuenta sin el monto del hold"""
+        return max(round(cuenta.saldo_retenido - hold.monto, 2), 0.0)
+
+    def _hold_vencido(self, hold: Hold) -> bool:
+        """Si un hold activo ya pasó su vencimiento"""
+        # Firestore devuelve la fecha con zona UTC; se escribió como hora local sin zona
+        return hold.estado == EstadoHold.ACTIVO.value and hold.expira_en.replace(tzinfo=None) <= datetime.now()
+
+    def _cerrar_hold(self, transaction, cuenta_ref, cuenta: Cuenta, hold: Hold, estado: EstadoHold) -> None:
+        """Libera el monto de un hold activo y lo deja en `estado` (LIBERADO o EXPIRADO)"""
+        cuenta.saldo_retenido = self._sin_hold(cuenta, hold)
+        hold.estado = estado.value
+        hold.updated_at = datetime.now()
+        transaction.update(cuenta_ref, {"saldo_retenido": cuenta.saldo_retenido})
+        transaction.update(self._hold_ref(hold.id), {
+            "estado": hold.estado,
+            "updated_at": hold.updated_at
+        })
+
+    def _cerrar_huerfano(self, transaction, snapshots: dict, cuenta_ref, hold_ref, estado: EstadoHold) -> Optional[Hold]:
+        """Agrega a la transacción el cierre de un hold activo si su cuenta no existe"""
+        hold_snapshot = snapshots[hold_ref.path]
+        if not hold_snapshot.exists:
+            return None
+        
+        hold = self._doc_to_hold(hold_snapshot)
+        if hold.estado == EstadoHold.ACTIVO.value and not snapshots[cuenta_ref.path].exists:
+            hold.estado = estado.value
+            hold.updated_at = datetime.now()
+            transaction.update(hold_ref, {"estado": hold.estado, "updated_at": hold.updated_at})
+        return hold
+
+    def _query_holds_activos(self, cuenta_id: str):
+        return (
+            self.db.collection(self.holds_collection)
+            .where("cuenta_id", "==", cuenta_id)
+            .where("estado", "==", EstadoHold.ACTIVO.value)
+        )
+
+    def _query_holds_vencidos(self, ahora: datetime, limit: int):
+        """Holds activos cuyo vencimiento ya pasó (índice estado + expira_en)"""
+        return (
+            self.db.collection(self.holds_collection)
+            .where("estado", "==", EstadoHold.ACTIVO.value)
+            .where("expira_en", "<=", ahora)
+            .order_by("expira_en")
+            .limit(limit)
+        )
+
+    # Outbox de eventos
+    #
+    # Cada movimiento escribe en el mismo commit un documento
+    # outbox/{movimiento_id} con el evento de cambio. Después del commit el
+    # evento se publica en el despachador del proceso (app.eventos), que lo
+    # entrega a los suscriptores y borra el registro; los que quedan los
+    # recupera su barrido.
+
+    def _outbox_ref(self, movimiento_id: str):
+        return self.db.collection(self.outbox_collection).document(movimiento_id)
+
+    def _evento_movimiento(self, movimiento: Movimiento) -> Dict[str, Any]:
+        """Evento de cambio de un movimiento, tal como se guarda en el outbox"""
+        return {
+            "evento": EVENTO_MOVIMIENTO,
+            "cuenta_id": movimiento.cuenta_id,
+            "movimiento_id": movimiento.id,
+            "tipo": movimiento.tipo.value if hasattr(movimiento.tipo, 'value') else movimiento.tipo,
+            "monto": movimiento.monto,
+            "saldo_anterior": movimiento.saldo_anterior,
+            "saldo_nuevo": movimiento.saldo_nuevo,
+            "fecha": movimiento.fecha,
+            "created_at": datetime.now()
+        }
+
+    def _escribir_outbox(self, transaction, movimientos: List[Movimiento]) -> List[Dict[str, Any]]:
+        """Agrega al lote/transacción el registro de outbox de cada movimiento (ya con ID)"""
+        eventos = []
+        for movimiento in movimientos:
+            evento = self._evento_movimiento(movimiento)
+            transaction.set(self._outbox_ref(movimiento.id), evento)
+            eventos.append(dict(evento, id=movimiento.id))
+        return eventos
+
+    def _doc_to_evento(self, doc) -> Dict[str, Any]:
+        return dict(doc.to_dict(), id=doc.id)
+
+    def _query_outbox(self, antes: datetime, limit: int):
+        """Registros del outbox creados antes de `antes`, del más antiguo al más nuevo"""
+        return (
+            self.db.collection(self.outbox_collection)
+            .where("created_at", "<", antes)
+            .order_by("created_at")
+            .limit(limit)
+        )
+
+    def _lotes_outbox(self, ids: List[str]) -> List[List[str]]:
+        """Reparte los IDs a borrar en lotes de LOTE_MAX_ESCRITURAS"""
+        return [ids[i:i + LOTE_MAX_ESCRITURAS] for i in range(0, len(ids), LOTE_MAX_ESCRITURAS)]
+
+    def _preparar_fraccion(
+        self,
+        transaction,
+        cuenta_ref,
+        cuenta: Cuenta,
+        saldos: Dict[str, float],
+        shards: int,
+        acumulados: Dict[str, float],
+        dia: str
+    ) -> float:
+        """
+        Agrega a la transacción el cambio de una cuenta a `shards` shards
+        
+        Todo el saldo y los `acumulados` del día quedan en el shard 0 (o en
+        la cuenta y su documento de límites si shards es 0) y se borran los
+        shards que sobran. Retorna el saldo consolidado.
+        """
+        saldo = sum(saldos.values()) if cuenta.saldo_shards else cuenta.saldo
+        refs = self._shard_refs(cuenta.model_copy(update={"saldo_shards": max(shards, cuenta.saldo_shards)}))
+        
+        for i, ref in enumerate(refs):
+            if i >= shards:
+                transaction.delete(ref)
+            elif i == 0:
+                transaction.set(ref, {"saldo": saldo, "dia": dia, **acumulados})
+            else:
+                transaction.set(ref, {"saldo": 0.0})
+        
+        if shards == 0 and cuenta.saldo_shards:
+            self._escribir_acumulado(transaction, cuenta.id, dia, acumulados)
+        transaction.update(cuenta_ref, {
+            "saldo": saldo,
+            "saldo_shards": shards,
+            "updated_at": datetime.now()
+        })
+        return saldo
+
+    def _buscar_en_cache(self, cuenta_ids: List[str], use_cache: bool) -> Tuple[Dict[str, Cuenta], List[str]]:
+        """Separa las cuentas ya cacheadas de las que hay que leer (sin duplicados)"""
+        cuentas: Dict[str, Cuenta] = {}
+        faltantes = []
+        
+        for cuenta_id in dict.fromkeys(cuenta_ids):
+            cuenta = self.cache.get(cuenta_id) if use_cache else None
+            if cuenta is not None:
+                cuentas[cuenta_id] = cuenta
+            else:
+                faltantes.append(cuenta_id)
+        
+        return cuentas, faltantes
+
+    def _numero_ref(self, numero_cuenta: str):
+        """Documento del índice de números de cuenta"""
+        return self.db.collection(self.numeros_collection).document(numero_cuenta)
+
+    def _contador_numero_ref(self):
+        """Contador del que se reservan los bloques de números de cuenta"""
+        return self.db.collection(self.contadores_collection).document("numero_cuenta")
+
+    def _reservar_en_contador(self, transaction, snapshot, indice_completo: bool) -> range:
+        """
+        Reserva el siguiente bloque dentro de una transacción ya abierta
+        
+        El contador guarda también `indice_completo`, que marca
+        scripts/indexar_numeros_cuenta.py al terminar la migración.
+        """
+        inicio = snapshot.get("siguiente") if snapshot.exists else settings.NUMERO_CUENTA_INICIAL
+        fin = inicio + settings.NUMERO_CUENTA_BLOQUE
+        
+        transaction.set(self._contador_numero_ref(), {
+            "siguiente": fin,
+            "indice_completo": indice_completo,
+            "updated_at": datetime.now()
+        }, merge=True)
+        return range(inicio, fin)
+
+    def _query_numero_cuenta(self, numero_cuenta: str):
+        """Consulta por número de cuenta (cuentas creadas antes del índice)"""
+        return self.db.collection(self.collection).where(
+            "numero_cuenta", "==", numero_cuenta
+        ).limit(1)
+
+    def _query_cuentas(self, filters: Optional[CuentaFilter] = None):
+        """Construye la consulta de cuentas con filtros opcionales"""
         query = self.db.collection(self.collection)
         
         if filters:
@@ -115,37 +993,816 @@ class CuentasRepository:
                 moneda_value = filters.moneda.value if hasattr(filters.moneda, 'value') else filters.moneda
                 query = query.where("moneda", "==", moneda_value)
         
-        docs = query.stream()
-        cuentas = []
+        return query
+
+    def _query_cuentas_pagina(
+        self,
+        filters: Optional[CuentaFilter] = None,
+        page_size: int = 50,
+        start_after: Optional[str] = None
+    ):
+        """
+        Construye la consulta de una página de cuentas
         
-        for doc in docs:
-            data = doc.to_dict()
-            data["id"] = doc.id
+        Ordena por ID de documento ("__name__"), que es estable y no necesita
+        índices compuestos junto a los filtros de igualdad. Pide un elemento
+        extra para saber si existe una página siguiente.
+        """
+        query = self._query_cuentas(filters).order_by("__name__")
+        
+        if start_after:
+            query = query.start_after({"__name__": start_after})
+        
+        return query.limit(page_size + 1)
+
+    def _cortar_pagina(self, items: list, page_size: int) -> Tuple[list, Optional[Any]]:
+        """Recorta el elemento extra y retorna el último elemento si hay otra página"""
+        if len(items) > page_size:
+            items = items[:page_size]
+            return items, items[-1]
+        return items, None
+
+    def _query_movimientos(
+        self,
+        cuenta_id: str,
+        filters: Optional[MovimientoFilter] = None,
+        limit: int = 50,
+        start_after: Optional[Tuple[datetime, str]] = None
+    ):
+        """
+        Construye la consulta de movimientos de una cuenta
+        
+        Los filtros se agregan antes del orden, el cursor y el límite. El
+        orden es fecha descendente con el ID de documento como desempate,
+        así el cursor (fecha, id) es estable. Los índices compuestos que
+        necesita están en firestore.indexes.json.
+        """
+        query = self.db.collection(self.movimientos_collection).where(
+            "cuenta_id", "==", cuenta_id
+        )
+        
+        if filters:
+            if filters.tipo:
+                tipo_value = filters.tipo.value if hasattr(filters.tipo, 'value') else filters.tipo
+                query = query.where("tipo", "==", tipo_value)
+            if filters.fecha_desde:
+                query = query.where("fecha", ">=", filters.fecha_desde)
+            if filters.fecha_hasta:
+                query = query.where("fecha", "<=", filters.fecha_hasta)
+        
+        query = query.order_by(
+            "fecha", direction=firestore.Query.DESCENDING
+        ).order_by(
+            "__name__", direction=firestore.Query.DESCENDING
+        )
+        
+        if start_after:
+            fecha, movimiento_id = start_after
+            query = query.start_after({"fecha": fecha, "__name__": movimiento_id})
+        
+        return query.limit(limit)
+
+
+    # Operaciones transaccionales, sin E/S
+    #
+    # Cada operación es un generador (`_plan_*`) que pide sus lecturas con
+    # `yield Lectura(refs, transaction)` (o sus consultas con
+    # `yield Consulta(query)`) y recibe los snapshots, y corre su
+    # parte transaccional con `yield Transaccion(cuerpo)`, donde `cuerpo`
+    # recibe la transacción y es a su vez un plan. Las escrituras de una
+    # transacción o batch no son E/S (se envían en el commit), así que van
+    # directo en el plan. Cada repositorio solo ejecuta los pedidos con su
+    # cliente (ver `_ejecutar`): la lógica existe una sola vez.
+
+    def _leer(self, refs: list, transaction=None) -> Generator[Lectura, list, Dict[str, Any]]:
+        """Lee `refs` con un solo get_all; retorna path -> snapshot"""
+        snapshots = yield Lectura(refs, transaction)
+        return {snapshot.reference.path: snapshot for snapshot in snapshots}
+
+    def _plan_shards(self, cuentas: List[Cuenta], transaction=None) -> Generator:
+        """Lee con un solo get_all los shards de las cuentas fraccionadas"""
+        fraccionadas = [cuenta for cuenta in cuentas if cuenta.saldo_shards]
+        if not fraccionadas:
+            return {}
+        
+        refs = [ref for cuenta in fraccionadas for ref in self._shard_refs(cuenta)]
+        snapshots = yield Lectura(refs, transaction)
+        return self._agrupar_shards(fraccionadas, snapshots)
+
+    def _plan_shards_del_dia(self, cuentas: List[Cuenta], dia: str, transaction=None) -> Generator:
+        """
+        Como `_plan_shards`, pero retorna también los acumulados del día de
+        cada shard: (cuenta_id -> {shard_id: saldo}, cuenta_id -> {shard_id: acumulados})
+        """
+        fraccionadas = [cuenta for cuenta in cuentas if cuenta.saldo_shards]
+        if not fraccionadas:
+            return {}, {}
+        
+        refs = [ref for cuenta in fraccionadas for ref in self._shard_refs(cuenta)]
+        snapshots = yield Lectura(refs, transaction)
+        acumulados = {cuenta.id: {} for cuenta in fraccionadas}
+        for snapshot in snapshots:
+            acumulados[snapshot.reference.parent.parent.id][snapshot.id] = self._leer_acumulados(snapshot, dia)
+        return self._agrupar_shards(fraccionadas, snapshots), acumulados
+
+    def _plan_completar_saldos(self, cuentas: List[Cuenta]) -> Generator:
+        """
+        Reemplaza el saldo de las cuentas fraccionadas por la suma de sus shards
+        
+        De paso refresca la cota en memoria de sus acumulados del día, que
+        usan los créditos para validar el límite sin leer todos los shards.
+        """
+        dia = self._dia_actual()
+        saldos, acumulados = yield from self._plan_shards_del_dia(cuentas, dia)
+        for cuenta in cuentas:
+            if cuenta.id in saldos:
+                cuenta.saldo = sum(saldos[cuenta.id].values())
+                self._registrar_acumulados(cuenta.id, dia, self._total_acumulados(acumulados[cuenta.id]))
+
+    def _plan_shard_credito(self, cuenta: Cuenta, dia: str, transaction, cacheada: bool = False) -> Generator:
+        """
+        Lee en la transacción solo el shard al azar que recibe un crédito
+        
+        Retorna ({shard_id: saldo}, {shard_id: acumulados del día}).
+        `fraccionar_saldo` crea todos los shards y borra los que sobran: si
+        la cuenta viene de la caché y el shard no existe, la caché quedó
+        vieja (la cuenta se consolidó o pasó a menos shards) y se retorna None.
+        """
+        ref = random.choice(self._shard_refs(cuenta))
+        snapshot = (yield from self._leer([ref], transaction))[ref.path]
+        if not snapshot.exists and cacheada:
+            return None
+        saldo = (snapshot.get("saldo") or 0.0) if snapshot.exists else 0.0
+        return {ref.id: saldo}, {ref.id: self._leer_acumulados(snapshot, dia)}
+
+    def _plan_cachear_fraccionada(self, cuenta: Optional[Cuenta]) -> Generator:
+        """Cachea con la suma de sus shards una cuenta fraccionada leída sin caché"""
+        if cuenta is not None and cuenta.saldo_shards:
+            yield from self._plan_completar_saldos([cuenta])
+            self.cache.put(cuenta)
+
+    def _plan_siguiente_numero_cuenta(self) -> Generator:
+        """Toma un número del bloque local, reservando otro bloque si hace falta"""
+        numero = self.allocator.tomar()
+        while numero is None:
+            contador_ref = self._contador_numero_ref()
+            
+            def _reservar(transaction):
+                snapshot = (yield from self._leer([contador_ref], transaction))[contador_ref.path]
+                if snapshot.exists:
+                    indice_completo = bool((snapshot.to_dict() or {}).get("indice_completo"))
+                else:
+                    # Primer bloque: si todavía no hay cuentas, ninguna queda fuera del índice
+                    indice_completo = not (yield Consulta(self.db.collection(self.collection).limit(1)))
+                bloque = self._reservar_en_contador(transaction, snapshot, indice_completo)
+                return bloque, indice_completo
+            
+            self.allocator.agregar_bloque(*(yield Transaccion(_reservar)))
+            numero = self.allocator.tomar()
+        return numero
+
+    def _plan_numero_cuenta_nuevo(self) -> Generator:
+        """
+        Número para una cuenta nueva
+        
+        Mientras no termine la migración del índice (ver
+        scripts/indexar_numeros_cuenta.py) puede haber cuentas con números
+        que el índice no conoce: se rechaza la creación o, sin
+        NUMERO_CUENTA_EXIGIR_INDICE, se saltean los números ya usados.
+        """
+        while True:
+            numero = yield from self._plan_siguiente_numero_cuenta()
+            if self.allocator.indice_completo:
+                return numero
+            if settings.NUMERO_CUENTA_EXIGIR_INDICE:
+                raise IndiceNumerosPendiente()
+            if not (yield Consulta(self._query_numero_cuenta(numero))):
+                return numero
+
+    def _plan_aplicar_movimiento(
+        self,
+        cuenta_id: str,
+        tipo: TipoMovimiento,
+        monto: float,
+        descripcion: str,
+        debito: bool,
+        validar: Optional[Callable[[Cuenta], None]]
+    ) -> Generator:
+        """Plan de `aplicar_movimiento`"""
+        cuenta_ref = self.db.collection(self.collection).document(cuenta_id)
+        movimiento_ref = self.db.collection(self.movimientos_collection).document()
+        dia = self._dia_actual()
+        self.acumulados.verificar(cuenta_id, dia, tipo, monto)
+        
+        # Crédito a una cuenta fraccionada en caché: la transacción no lee la cuenta
+        fraccionada = None if debito else self._fraccionada_cacheada(cuenta_id)
+        
+        refs = [] if fraccionada else [cuenta_ref]
+        if self._leer_contador(cuenta_id, tipo, debito):
+            refs.append(self._limite_ref(cuenta_id, dia))
+        
+        def _aplicar(transaction):
+            snapshots = (yield from self._leer(refs, transaction)) if refs else {}
+            cuenta, shards = fraccionada, (None, None)
+            if cuenta is not None:
+                shards = yield from self._plan_shard_credito(cuenta, dia, transaction, cacheada=True)
+                if shards is None:
+                    # La caché quedó vieja: se lee la cuenta como en un crédito sin caché
+                    cuenta, shards = None, (None, None)
+                    limite_refs = [self._limite_ref(cuenta_id, dia)] if limite_diario(tipo) else []
+                    snapshots = yield from self._leer([cuenta_ref] + limite_refs, transaction)
+            
+            if cuenta is None:
+                snapshot = snapshots[cuenta_ref.path]
+                if not snapshot.exists:
+                    return None, None, None, []
+                cuenta = self._doc_to_cuenta(snapshot)
+                if cuenta.saldo_shards:
+                    if debito:
+                        saldos, acumulados_shards = yield from self._plan_shards_del_dia([cuenta], dia, transaction)
+                        shards = saldos[cuenta.id], acumulados_shards[cuenta.id]
+                        cuenta.saldo = sum(shards[0].values())
+                    else:
+                        shards = yield from self._plan_shard_credito(cuenta, dia, transaction)
+            saldos, acumulados_shards = shards
+            
+            if validar:
+                validar(cuenta)
+            
+            snapshot_limite = snapshots.get(self._limite_ref(cuenta_id, dia).path)
+            acumulados = self._aplicar_limite(
+                transaction, cuenta, tipo, monto, dia, snapshot_limite, acumulados_shards
+            )
+            
+            movimiento = self._nuevo_movimiento(
+                cuenta, tipo, monto, descripcion, debito, con_saldo=debito or not cuenta.saldo_shards
+            )
+            
+            shard = self._escribir_movimiento(
+                transaction, cuenta_ref, cuenta, movimiento, saldos,
+                acumulados_shards=acumulados_shards, dia=dia
+            )
+            transaction.set(movimiento_ref, self._movimiento_to_dict(movimiento))
+            self._escribir_resumenes(transaction, cuenta.id, [movimiento], shard)
+            
+            movimiento.id = movimiento_ref.id
+            eventos = self._escribir_outbox(transaction, [movimiento])
+            return movimiento, cuenta, acumulados, eventos
+        
+        movimiento, cuenta, acumulados, eventos = yield Transaccion(_aplicar)
+        
+        self.eventos.publicar(eventos)
+        if acumulados:
+            self._registrar_acumulados(cuenta_id, dia, acumulados)
+        leida = cuenta is not None and cuenta is not fraccionada
+        if fraccionada is not None and leida:
+            self.cache.invalidar(cuenta_id)
+        if movimiento and movimiento.saldo_nuevo is not None:
+            self.cache.actualizar(cuenta_id, {
+                "saldo": movimiento.saldo_nuevo,
+                "updated_at": movimiento.fecha
+            })
+        elif movimiento and leida:
+            # Primer crédito sin caché (o con la caché vieja): los siguientes ya no leen la cuenta
+            yield from self._plan_cachear_fraccionada(cuenta)
+        return movimiento
+
+    def _plan_aplicar_lote(
+        self,
+        operaciones: List[OperacionLoteItem],
+        validar: Callable[[Cuenta, OperacionLoteItem], None]
+    ) -> Generator:
+        """Plan de `aplicar_lote`"""
+        resultados = [None] * len(operaciones)
+        lotes = self._armar_lotes(operaciones)
+        dia = self._dia_actual()
+        
+        for lote in lotes:
+            refs = [self.db.collection(self.collection).document(cuenta_id) for cuenta_id in lote]
+            refs += [self._limite_ref(cuenta_id, dia) for cuenta_id in lote]
+            
+            def _aplicar(transaction, lote=lote, refs=refs):
+                snapshots = yield from self._leer(refs, transaction)
+                cuentas, limites = self._separar_lote(lote, snapshots, dia)
+                shards, acumulados_shards = yield from self._plan_shards_del_dia(
+                    list(cuentas.values()), dia, transaction
+                )
+                parciales = []
+                actualizadas = []
+                eventos = []
+                
+                for cuenta_id, grupo in lote.items():
+                    cuenta = cuentas.get(cuenta_id)
+                    if cuenta_id in shards:
+                        cuenta.saldo = sum(shards[cuenta_id].values())
+                        limites[cuenta_id] = self._total_acumulados(acumulados_shards[cuenta_id])
+                    
+                    acumulados = limites[cuenta_id]
+                    res, movimientos, cuenta = self._procesar_grupo(cuenta, grupo, validar, acumulados)
+                    if movimientos:
+                        eventos += self._escribir_grupo(
+                            transaction, cuenta, movimientos, shards.get(cuenta_id), acumulados, dia,
+                            acumulados_shards.get(cuenta_id)
+                        )
+                        actualizadas.append((cuenta, acumulados))
+                    parciales.extend(res)
+                
+                return parciales, actualizadas, eventos
+            
+            parciales, actualizadas, eventos = yield Transaccion(_aplicar)
+            
+            self.eventos.publicar(eventos)
+            
+            for indice, movimiento, error in parciales:
+                resultados[indice] = (movimiento, error)
+            for cuenta, acumulados in actualizadas:
+                self._registrar_acumulados(cuenta.id, dia, acumulados)
+                self.cache.actualizar(cuenta.id, {"saldo": cuenta.saldo, "updated_at": cuenta.updated_at})
+        
+        return resultados, len(lotes)
+
+    def _plan_transferir(
+        self,
+        origen_id: str,
+        destino_id: str,
+        monto: float,
+        descripciones: Tuple[str, str],
+        referencia: Optional[str],
+        validar: Optional[Callable[[Cuenta, Cuenta], None]]
+    ) -> Generator:
+        """Plan de `transferir`"""
+        cuentas = self.db.collection(self.collection)
+        # Un destino fraccionado en caché recibe el crédito sin que la transacción lea su cuenta
+        destino_fraccionado = self._fraccionada_cacheada(destino_id)
+        dia = self._dia_actual()
+        refs = [cuentas.document(origen_id)]
+        if destino_fraccionado is None:
+            refs.append(cuentas.document(destino_id))
+        registro_ref = self._transferencia_ref(referencia) if referencia else None
+        
+        def _transferir(transaction):
+            snapshots = yield from self._leer(refs + [registro_ref] if registro_ref else refs, transaction)
+            if registro_ref is not None and snapshots[registro_ref.path].exists:
+                if snapshots[registro_ref.path].to_dict().get("anulada"):
+                    raise TransferenciaAnulada(referencia)
+                # Reintento de una transferencia ya aplicada: no se escribe nada
+                return self._transferencia_aplicada(snapshots[registro_ref.path]), [], None
+            if not all(snapshots[ref.path].exists for ref in refs):
+                return None, [], None
+            
+            origen = self._doc_to_cuenta(snapshots[refs[0].path])
+            destino, saldos_destino = destino_fraccionado, None
+            if destino is not None:
+                shard = yield from self._plan_shard_credito(destino, dia, transaction, cacheada=True)
+                saldos_destino = shard[0] if shard else None
+                if saldos_destino is None:
+                    # La caché del destino quedó vieja: se lee su cuenta
+                    destino_ref = cuentas.document(destino_id)
+                    snapshot = (yield from self._leer([destino_ref], transaction))[destino_ref.path]
+                    if not snapshot.exists:
+                        return None, [], None
+                    destino = self._doc_to_cuenta(snapshot)
+            else:
+                destino = self._doc_to_cuenta(snapshots[refs[1].path])
+            if destino is not destino_fraccionado and destino.saldo_shards:
+                saldos_destino, _ = yield from self._plan_shard_credito(destino, dia, transaction)
+            
+            saldos_origen = None
+            if origen.saldo_shards:
+                saldos_origen = (yield from self._plan_shards([origen], transaction))[origen.id]
+                origen.saldo = sum(saldos_origen.values())
+            
+            if validar:
+                validar(origen, destino)
+            
+            salida, entrada, eventos = self._escribir_transferencia(
+                transaction, origen, destino, monto, descripciones, referencia, saldos_origen, saldos_destino
+            )
+            return (salida, entrada), eventos, destino
+        
+        movimientos, eventos, destino = yield Transaccion(_transferir)
+        
+        self.eventos.publicar(eventos)
+        leido = destino is not None and destino is not destino_fraccionado
+        if destino_fraccionado is not None and leido:
+            self.cache.invalidar(destino_id)
+        # Sin eventos no se escribió nada (cuenta inexistente o reintento)
+        for movimiento in movimientos if eventos else ():
+            if movimiento.saldo_nuevo is not None:
+                self.cache.actualizar(movimiento.cuenta_id, {
+                    "saldo": movimiento.saldo_nuevo,
+                    "updated_at": movimiento.fecha
+                })
+        if eventos and leido:
+            yield from self._plan_cachear_fraccionada(destino)
+        return movimientos
+
+    def _plan_resolver_transferencia(self, referencia: str) -> Generator:
+        """Plan de `resolver_transferencia`"""
+        registro_ref = self._transferencia_ref(referencia)
+        
+        def _resolver(transaction):
+            snapshot = (yield from self._leer([registro_ref], transaction))[registro_ref.path]
+            if not snapshot.exists:
+                # Nunca se aplicó: queda anulada en el mismo documento que escribiría transferir
+                transaction.set(registro_ref, {"anulada": True, "created_at": datetime.now()})
+                return None
+            if snapshot.to_dict().get("anulada"):
+                return None
+            return self._transferencia_aplicada(snapshot)
+        
+        return (yield Transaccion(_resolver))
+
+    def _plan_resumenes(
+        self,
+        cuenta_id: str,
+        granularidad: str,
+        desde: Optional[str],
+        hasta: Optional[str],
+        limit: int
+    ) -> Generator:
+        """
+        Plan de `get_resumenes`
+        
+        Los documentos de un periodo quedan juntos en la consulta: se piden
+        de a páginas hasta ver un periodo más que `limit` (así el último
+        devuelto está completo) o hasta agotar la consulta. Sin shards
+        alcanza con la primera página.
+        """
+        query = self._query_resumenes(cuenta_id, granularidad, desde, hasta, limit + 1)
+        por_periodo: Dict[str, List[ResumenPeriodo]] = {}
+        pagina = query
+        
+        while True:
+            docs = yield Consulta(pagina)
+            for doc in docs:
+                resumen = self._doc_to_resumen(doc, granularidad)
+                por_periodo.setdefault(resumen.periodo, []).append(resumen)
+            if len(docs) <= limit or len(por_periodo) > limit:
+                break
+            pagina = query.start_after(docs[-1])
+        
+        return [self._juntar_resumenes(resumenes) for resumenes in list(por_periodo.values())[:limit]]
+
+    def _plan_fraccionar_saldo(self, cuenta_id: str, shards: int) -> Generator:
+        """Plan de `fraccionar_saldo`"""
+        cuenta_ref = self.db.collection(self.collection).document(cuenta_id)
+        dia = self._dia_actual()
+        limite_ref = self._limite_ref(cuenta_id, dia)
+        
+        def _fraccionar(transaction):
+            snapshots = yield from self._leer([cuenta_ref, limite_ref], transaction)
+            if not snapshots[cuenta_ref.path].exists:
+                return None
             
-            # Asegurar que los campos datetime sean datetime objects
-            if isinstance(data.get("fecha_apertura"), str):
-                data["fecha_apertura"] = datetime.fromisoformat(data["fecha_apertura"].replace('Z', '+00:00'))
-            if isinstance(data.get("created_at"), str):
-                data["created_at"] = datetime.fromisoformat(data["created_at"].replace('Z', '+00:00'))
-            if isinstance(data.get("updated_at"), str):
-                data["updated_at"] = datetime.fromisoformat(data["updated_at"].replace('Z', '+00:00'))
+            cuenta = self._doc_to_cuenta(snapshots[cuenta_ref.path])
+            saldos, acumulados_shards = yield from self._plan_shards_del_dia([cuenta], dia, transaction)
+            if cuenta.saldo_shards:
+                acumulados = self._total_acumulados(acumulados_shards[cuenta.id])
+            else:
+                acumulados = self._leer_acumulados(snapshots[limite_ref.path])
+            saldo = self._preparar_fraccion(
+                transaction, cuenta_ref, cuenta, saldos.get(cuenta.id, {}), shards, acumulados, dia
+            )
+            return cuenta.model_copy(update={"saldo": saldo, "saldo_shards": shards})
+        
+        cuenta = yield Transaccion(_fraccionar)
+        self.cache.invalidar(cuenta_id)
+        return cuenta
+
+    def _plan_crear_hold(self, hold: Hold, validar: Callable[[Cuenta], None]) -> Generator:
+        """Plan de `crear_hold`"""
+        cuenta_ref = self.db.collection(self.collection).document(hold.cuenta_id)
+        hold_ref = self.db.collection(self.holds_collection).document()
+        
+        def _crear(transaction):
+            snapshot = (yield from self._leer([cuenta_ref], transaction))[cuenta_ref.path]
+            if not snapshot.exists:
+                return None
+            
+            cuenta = self._doc_to_cuenta(snapshot)
+            if cuenta.saldo_shards:
+                saldos = (yield from self._plan_shards([cuenta], transaction))[cuenta.id]
+                cuenta.saldo = sum(saldos.values())
+            
+            validar(cuenta)
+            
+            cuenta.saldo_retenido = round(cuenta.saldo_retenido + hold.monto, 2)
+            transaction.update(cuenta_ref, {"saldo_retenido": cuenta.saldo_retenido})
+            transaction.set(hold_ref, self._hold_to_dict(hold))
+            return cuenta
+        
+        cuenta = yield Transaccion(_crear)
+        if cuenta is None:
+            return None
+        
+        hold.id = hold_ref.id
+        self.cache.actualizar(cuenta.id, {"saldo_retenido": cuenta.saldo_retenido})
+        return hold
+
+    def _plan_capturar_hold(
+        self,
+        cuenta_id: str,
+        hold_id: str,
+        tipo: TipoMovimiento,
+        descripcion: Optional[str],
+        monto: Optional[float],
+        validar: Callable[[Cuenta, Hold, float], None]
+    ) -> Generator:
+        """Plan de `capturar_hold`"""
+        cuenta_ref = self.db.collection(self.collection).document(cuenta_id)
+        hold_ref = self._hold_ref(hold_id)
+        movimiento_ref = self.db.collection(self.movimientos_collection).document()
+        dia = self._dia_actual()
+        
+        refs = [cuenta_ref, hold_ref]
+        if self._leer_contador(cuenta_id, tipo, True):
+            refs.append(self._limite_ref(cuenta_id, dia))
+        
+        def _capturar(transaction):
+            snapshots = yield from self._leer(refs, transaction)
+            cuenta, hold = self._leer_hold(snapshots, cuenta_ref, hold_ref, cuenta_id)
+            if hold is None:
+                return None, None, None, None, []
             
-            cuentas.append(Cuenta(**data))
+            if self._hold_vencido(hold):
+                self._cerrar_hold(transaction, cuenta_ref, cuenta, hold, EstadoHold.EXPIRADO)
+                return hold, None, cuenta, None, []
+            
+            saldos = acumulados_shards = None
+            if cuenta.saldo_shards:
+                saldos, acumulados_shards = yield from self._plan_shards_del_dia([cuenta], dia, transaction)
+                saldos, acumulados_shards = saldos[cuenta.id], acumulados_shards[cuenta.id]
+                cuenta.saldo = sum(saldos.values())
+            
+            monto_captura = hold.monto if monto is None else monto
+            validar(cuenta, hold, monto_captura)
+            
+            snapshot_limite = snapshots.get(refs[-1].path) if len(refs) > 2 else None
+            acumulados = self._aplicar_limite(
+                transaction, cuenta, tipo, monto_captura, dia, snapshot_limite, acumulados_shards
+            )
+            
+            movimiento = self._nuevo_movimiento(
+                cuenta, tipo, monto_captura, descripcion or hold.descripcion, True, referencia=hold.id
+            )
+            cuenta.saldo_retenido = self._sin_hold(cuenta, hold)
+            shard = self._escribir_movimiento(
+                transaction, cuenta_ref, cuenta, movimiento, saldos,
+                cambios={"saldo_retenido": cuenta.saldo_retenido},
+                acumulados_shards=acumulados_shards, dia=dia
+            )
+            transaction.set(movimiento_ref, self._movimiento_to_dict(movimiento))
+            self._escribir_resumenes(transaction, cuenta.id, [movimiento], shard)
+            
+            movimiento.id = movimiento_ref.id
+            eventos = self._escribir_outbox(transaction, [movimiento])
+            
+            hold.estado = EstadoHold.CAPTURADO.value
+            hold.monto_capturado = monto_captura
+            hold.movimiento_id = movimiento.id
+            hold.updated_at = movimiento.fecha
+            transaction.update(hold_ref, {
+                "estado": hold.estado,
+                "monto_capturado": hold.monto_capturado,
+                "movimiento_id": hold.movimiento_id,
+                "updated_at": hold.updated_at
+            })
+            return hold, movimiento, cuenta, acumulados, eventos
+        
+        hold, movimiento, cuenta, acumulados, eventos = yield Transaccion(_capturar)
+        
+        self.eventos.publicar(eventos)
+        if acumulados:
+            self._registrar_acumulados(cuenta_id, dia, acumulados)
+        if cuenta:
+            cambios = {"saldo_retenido": cuenta.saldo_retenido}
+            if movimiento:
+                cambios.update(saldo=movimiento.saldo_nuevo, updated_at=movimiento.fecha)
+            self.cache.actualizar(cuenta_id, cambios)
+        return hold, movimiento
+
+    def _plan_liberar_hold(self, cuenta_id: str, hold_id: str, estado: EstadoHold) -> Generator:
+        """Plan de `liberar_hold`"""
+        cuenta_ref = self.db.collection(self.collection).document(cuenta_id)
+        hold_ref = self._hold_ref(hold_id)
+        
+        def _liberar(transaction):
+            snapshots = yield from self._leer([cuenta_ref, hold_ref], transaction)
+            cuenta, hold = self._leer_hold(snapshots, cuenta_ref, hold_ref, cuenta_id)
+            if hold is None or hold.estado != EstadoHold.ACTIVO.value:
+                return hold, None
+            
+            self._cerrar_hold(transaction, cuenta_ref, cuenta, hold, estado)
+            return hold, cuenta
+        
+        hold, cuenta = yield Transaccion(_liberar)
+        
+        if cuenta:
+            self.cache.actualizar(cuenta_id, {"saldo_retenido": cuenta.saldo_retenido})
+        return hold
+
+    def _plan_cerrar_hold_huerfano(self, cuenta_id: str, hold_id: str, estado: EstadoHold) -> Generator:
+        """Plan de `cerrar_hold_huerfano`"""
+        cuenta_ref = self.db.collection(self.collection).document(cuenta_id)
+        hold_ref = self._hold_ref(hold_id)
+        
+        def _cerrar(transaction):
+            snapshots = yield from self._leer([cuenta_ref, hold_ref], transaction)
+            return self._cerrar_huerfano(transaction, snapshots, cuenta_ref, hold_ref, estado)
+        
+        return (yield Transaccion(_cerrar))
+
+class CuentasRepository(BaseCuentasRepository):
+    @property
+    def _transaccional(self) -> Callable:
+        """Decorador de transacciones: el de Firestore o el del motor local (app.almacenamiento)"""
+        return getattr(self.db, "transactional", firestore.transactional)
+
+    def _ejecutar(self, plan: Generator) -> Any:
+        """Ejecuta un plan de BaseCuentasRepository con el cliente síncrono"""
+        respuesta = None
+        while True:
+            try:
+                pedido = plan.send(respuesta)
+            except StopIteration as fin:
+                return fin.value
+            
+            if isinstance(pedido, Transaccion):
+                respuesta = self._en_transaccion(pedido.cuerpo)
+            elif isinstance(pedido, Consulta):
+                respuesta = list(pedido.query.stream())
+            else:
+                respuesta = list(self.db.get_all(pedido.refs, transaction=pedido.transaction))
+
+    def _en_transaccion(self, cuerpo: Callable[[Any], Generator]) -> Any:
+        """Corre el plan `cuerpo` en una transacción (reintentada si hay conflicto)"""
+        @self._transaccional
+        def _correr(transaction):
+            return self._ejecutar(cuerpo(transaction))
+        
+        return _correr(self.db.transaction())
+
+    def _completar_saldos(self, cuentas: List[Cuenta]) -> None:
+        """Reemplaza el saldo de las cuentas fraccionadas por la suma de sus shards"""
+        self._ejecutar(self._plan_completar_saldos(cuentas))
+
+    def create(self, cuenta: Cuenta) -> str:
+        """
+        Crea una nueva cuenta
+        
+        La cuenta y su entrada en el índice `numeros_cuenta` se escriben en
+        el mismo batch; la entrada usa create, que falla si el número ya
+        está tomado, y en ese caso se reintenta con el siguiente número.
+        Lanza IndiceNumerosPendiente si falta la migración del índice (ver
+        `_plan_numero_cuenta_nuevo`).
+        """
+        cuenta.created_at = datetime.now()
+        cuenta.updated_at = datetime.now()
+        cuenta_ref = self.db.collection(self.collection).document()
+        
+        while True:
+            cuenta.numero_cuenta = self._ejecutar(self._plan_numero_cuenta_nuevo())
+            
+            batch = self.db.batch()
+            batch.create(self._numero_ref(cuenta.numero_cuenta), {
+                "cuenta_id": cuenta_ref.id,
+                "created_at": cuenta.created_at
+            })
+            batch.set(cuenta_ref, self._cuenta_to_dict(cuenta))
+            
+            try:
+                batch.commit()
+                break
+            except AlreadyExists:
+                continue
+        
+        cuenta_creada = cuenta.model_copy(update={"id": cuenta_ref.id})
+        self.cache.put(cuenta_creada)
+        return cuenta_creada.id
+
+    def get_by_id(self, cuenta_id: str, use_cache: bool = True) -> Optional[Cuenta]:
+        """
+        Obtiene una cuenta por ID
+        
+        Con use_cache=False se lee siempre de Firestore (y se refresca la caché).
+        """
+        if use_cache:
+            cuenta = self.cache.get(cuenta_id)
+            if cuenta is not None:
+                return cuenta
+        
+        doc = self.db.collection(self.collection).document(cuenta_id).get()
+        
+        if not doc.exists:
+            self.cache.invalidar(cuenta_id)
+            return None
+        
+        cuenta = self._doc_to_cuenta(doc)
+        self._completar_saldos([cuenta])
+        self.cache.put(cuenta)
+        return cuenta
+
+    def get_many(self, cuenta_ids: List[str], use_cache: bool = True) -> Dict[str, Cuenta]:
+        """
+        Obtiene varias cuentas por ID con un solo get_all
+        
+        Las que están en caché no se piden a Firestore. Retorna un dict
+        cuenta_id -> Cuenta solo con las cuentas encontradas.
+        """
+        cuentas, faltantes = self._buscar_en_cache(cuenta_ids, use_cache)
+        if not faltantes:
+            return cuentas
+        
+        refs = [self.db.collection(self.collection).document(cuenta_id) for cuenta_id in faltantes]
+        leidas = [self._doc_to_cuenta(snapshot) for snapshot in self.db.get_all(refs) if snapshot.exists]
+        self._completar_saldos(leidas)
+        
+        for cuenta in leidas:
+            self.cache.put(cuenta)
+            cuentas[cuenta.id] = cuenta
         
         return cuentas
 
+    def get_by_numero_cuenta(self, numero_cuenta: str, use_cache: bool = True) -> Optional[Cuenta]:
+        """Obtiene una cuenta por número de cuenta"""
+        if use_cache:
+            cuenta = self.cache.get_by_numero(numero_cuenta)
+            if cuenta is not None:
+                return cuenta
+        
+        indice = self._numero_ref(numero_cuenta).get()
+        if indice.exists:
+            return self.get_by_id(indice.get("cuenta_id"), use_cache=use_cache)
+        
+        # Cuentas creadas antes del índice: se buscan con la consulta y se indexan
+        docs = self._query_numero_cuenta(numero_cuenta).stream()
+        
+        for doc in docs:
+            cuenta = self._doc_to_cuenta(doc)
+            self.indexar_numero_cuenta(cuenta)
+            self._completar_saldos([cuenta])
+            self.cache.put(cuenta)
+            return cuenta
+        
+        return None
+
+    def marcar_indice_completo(self) -> None:
+        """Registra que todas las cuentas existentes tienen su entrada en `numeros_cuenta`"""
+        self._contador_numero_ref().set({
+            "indice_completo": True,
+            "updated_at": datetime.now()
+        }, merge=True)
+
+    def indexar_numero_cuenta(self, cuenta: Cuenta) -> bool:
+        """Crea la entrada del índice para una cuenta; False si ya existía"""
+        try:
+            self._numero_ref(cuenta.numero_cuenta).create({
+                "cuenta_id": cuenta.id,
+                "created_at": cuenta.created_at
+            })
+            return True
+        except AlreadyExists:
+            return False
+
+    def list(self, filters: Optional[CuentaFilter] = None) -> List[Cuenta]:
+        """Lista cuentas con filtros opcionales"""
+        docs = self._query_cuentas(filters).stream()
+        cuentas = []
+        
+        for doc in docs:
+            cuentas.append(self._doc_to_cuenta(doc))
+        
+        self._completar_saldos(cuentas)
+        return cuentas
+
+    def list_page(
+        self,
+        filters: Optional[CuentaFilter] = None,
+        page_size: int = 50,
+        start_after: Optional[str] = None
+    ) -> Tuple[List[Cuenta], Optional[str]]:
+        """
+        Lista una página de cuentas ordenadas por ID
+        
+        Retorna las cuentas y el ID de la última, que sirve como cursor de
+        la siguiente página (None si no hay más).
+        """
+        docs = self._query_cuentas_pagina(filters, page_size, start_after).stream()
+        cuentas = [self._doc_to_cuenta(doc) for doc in docs]
+        
+        cuentas, ultima = self._cortar_pagina(cuentas, page_size)
+        self._completar_saldos(cuentas)
+        return cuentas, ultima.id if ultima else None
+
     def update(self, cuenta_id: str, update_data: dict) -> bool:
         """Actualiza una cuenta"""
-        update_data["updated_at"] = datetime.now()
-        
-        # Convertir Enums a strings si es necesario
-        if "estado" in update_data and hasattr(update_data["estado"], 'value'):
-            update_data["estado"] = update_data["estado"].value
-        if "tipo" in update_data and hasattr(update_data["tipo"], 'value'):
-            update_data["tipo"] = update_data["tipo"].value
+        update_data = self._preparar_update(update_data)
         
         doc_ref = self.db.collection(self.collection).document(cuenta_id)
         doc_ref.update(update_data)
+        
+        self.cache.actualizar(cuenta_id, update_data)
         return True
 
     def update_saldo(self, cuenta_id: str, nuevo_saldo: float) -> bool:
@@ -166,50 +1823,270 @@ class CuentasRepository:
         """Crea un registro de movimiento"""
         movimiento.created_at = datetime.now()
         
-        movimiento_dict = movimiento.model_dump(exclude={"id"})
-        movimiento_dict["fecha"] = movimiento.fecha
-        movimiento_dict["created_at"] = movimiento.created_at
+        movimiento_dict = self._movimiento_to_dict(movimiento)
         
-        # Asegurar que el Enum se guarde como string
-        if hasattr(movimiento_dict.get("tipo"), 'value'):
-            movimiento_dict["tipo"] = movimiento_dict["tipo"].value
+        # El movimiento, sus resúmenes y su evento se escriben en el mismo batch
+        doc_ref = self.db.collection(self.movimientos_collection).document()
+        movimiento.id = doc_ref.id
+        batch = self.db.batch()
+        batch.set(doc_ref, movimiento_dict)
+        self._escribir_resumenes(batch, movimiento.cuenta_id, [movimiento])
+        eventos = self._escribir_outbox(batch, [movimiento])
+        batch.commit()
         
-        doc_ref = self.db.collection(self.movimientos_collection).add(movimiento_dict)
-        return doc_ref[1].id
+        self.eventos.publicar(eventos)
+        return doc_ref.id
+
+    def aplicar_movimiento(
+        self,
+        cuenta_id: str,
+        tipo: TipoMovimiento,
+        monto: float,
+        descripcion: str,
+        debito: bool = False,
+        validar: Optional[Callable[[Cuenta], None]] = None
+    ) -> Optional[Movimiento]:
+        """
+        Aplica un movimiento de saldo en una sola transacción de Firestore.
+        
+        Lee la cuenta, actualiza el saldo e inserta el documento en
+        `movimientos` en un único commit. Si otra operación modifica la
+        cuenta en paralelo, Firestore reintenta la transacción con el saldo
+        actualizado. `validar` recibe la cuenta leída dentro de la
+        transacción y puede lanzar una excepción para abortarla.
+        
+        En una cuenta fraccionada los débitos leen todos los shards dentro
+        de la transacción. Los créditos leen y escriben solo un shard al
+        azar y, si la cuenta está en caché, no leen su documento (`validar`
+        recibe la cuenta cacheada); su movimiento no lleva saldo anterior ni
+        nuevo y la caché conserva el último saldo agregado leído.
+        
+        Los depósitos y retiros validan el límite diario con el documento de
+        `limites_diarios` de la cuenta, leído junto con la cuenta en el
+        mismo get_all y actualizado en el mismo commit; antes de abrir la
+        transacción se descartan las operaciones que ya superan el
+        acumulado conocido en memoria. Lanza LimiteDiarioExcedido.
+        
+        El registro del movimiento en el outbox va en el mismo commit y el
+        evento se publica después de confirmarlo.
+        
+        Retorna None si la cuenta no existe.
+        """
+        return self._ejecutar(self._plan_aplicar_movimiento(cuenta_id, tipo, monto, descripcion, debito, validar))
+
+    def aplicar_lote(
+        self,
+        operaciones: List[OperacionLoteItem],
+        validar: Callable[[Cuenta, OperacionLoteItem], None]
+    ) -> Tuple[list, int]:
+        """
+        Aplica depósitos y retiros en lote, una transacción por lote
+        
+        Cada transacción lee todas sus cuentas y sus acumulados del día con
+        un solo get_all (y otro para los shards de las cuentas fraccionadas)
+        y escribe el saldo final y el acumulado de cada cuenta junto con sus
+        movimientos y sus registros en el outbox. Las operaciones que
+        superan el límite diario se rechazan individualmente; los eventos de
+        cada lote se publican después de su commit. Retorna los resultados en el orden de
+        `operaciones` y la cantidad de lotes.
+        """
+        return self._ejecutar(self._plan_aplicar_lote(operaciones, validar))
+
+    def transferir(
+        self,
+        origen_id: str,
+        destino_id: str,
+        monto: float,
+        descripciones: Tuple[str, str],
+        referencia: Optional[str] = None,
+        validar: Optional[Callable[[Cuenta, Cuenta], None]] = None
+    ) -> Optional[Tuple[Movimiento, Movimiento]]:
+        """
+        Transfiere `monto` de una cuenta a otra en una sola transacción.
+        
+        Lee las dos cuentas con un solo get_all, debita la cuenta origen,
+        acredita la destino y escribe los movimientos TRANSFERENCIA_SALIDA
+        y TRANSFERENCIA_ENTRADA (descripciones de salida y de entrada) en
+        el mismo commit, junto con sus resúmenes y registros en el outbox:
+        se aplican los dos o ninguno. `validar` recibe las dos cuentas
+        leídas dentro de la transacción y puede lanzar una excepción para
+        abortarla. Las cuentas fraccionadas se tratan como en
+        `aplicar_movimiento` (el débito lee todos los shards, el crédito
+        solo uno). Las transferencias no cuentan para los límites diarios.
+        
+        Con `referencia` la transferencia queda registrada en
+        `transferencias_aplicadas/{referencia}` en el mismo commit: un
+        reintento con la misma referencia (p. ej. tras un timeout, en otra
+        instancia) no vuelve a mover fondos y retorna los movimientos
+        originales. Lanza TransferenciaAnulada si la referencia se anuló
+        con `resolver_transferencia`.
+        
+        Retorna los movimientos (salida, entrada), o None sin escribir nada
+        si alguna de las cuentas no existe.
+        """
+        return self._ejecutar(self._plan_transferir(origen_id, destino_id, monto, descripciones, referencia, validar))
+
+    def resolver_transferencia(self, referencia: str) -> Optional[Tuple[Movimiento, Movimiento]]:
+        """
+        Da un resultado definitivo a la transferencia `referencia`.
+        
+        Para quien no supo si una transferencia se aplicó (timeouts en
+        transferencias-service). En una transacción lee el registro de
+        `transferencias_aplicadas/{referencia}`: si existe retorna los
+        movimientos (salida, entrada) de la transferencia aplicada; si no,
+        lo marca anulado y retorna None. Una vez anulada, `transferir` con
+        esa referencia lanza TransferenciaAnulada, así un pedido original
+        todavía en vuelo no la aplica después. Repetirlo da el mismo
+        resultado.
+        """
+        return self._ejecutar(self._plan_resolver_transferencia(referencia))
+
+    def fraccionar_saldo(self, cuenta_id: str, shards: int) -> Optional[Cuenta]:
+        """
+        Cambia la cantidad de shards del saldo de una cuenta en uso
+        
+        Consolida en una transacción el saldo actual (de la cuenta o de sus
+        shards) y lo deja en el shard 0; con shards=0 la cuenta vuelve a
+        guardar el saldo en su propio documento. Los movimientos que corran
+        en paralelo tocan los mismos documentos, así que Firestore los
+        serializa con esta transacción. Retorna None si la cuenta no existe.
+        """
+        return self._ejecutar(self._plan_fraccionar_saldo(cuenta_id, shards))
+
+    def crear_hold(
+        self,
+        hold: Hold,
+        validar: Callable[[Cuenta], None]
+    ) -> Optional[Hold]:
+        """
+        Reserva fondos en una sola transacción
+        
+        Lee la cuenta (y sus shards si está fraccionada), la pasa a
+        `validar` y suma el monto a saldo_retenido junto con la creación
+        del hold. Retorna None si la cuenta no existe.
+        """
+        return self._ejecutar(self._plan_crear_hold(hold, validar))
+
+    def capturar_hold(
+        self,
+        cuenta_id: str,
+        hold_id: str,
+        tipo: TipoMovimiento,
+        descripcion: Optional[str],
+        monto: Optional[float],
+        validar: Callable[[Cuenta, Hold, float], None]
+    ) -> Tuple[Optional[Hold], Optional[Movimiento]]:
+        """
+        Convierte un hold en un movimiento de débito en una sola transacción
+        
+        Debita `monto` (por defecto todo el hold) como en `aplicar_movimiento`
+        (límite diario, resúmenes y outbox incluidos), descuenta el monto
+        completo del hold de saldo_retenido y lo marca CAPTURADO. Un hold
+        vencido se marca EXPIRADO y se retorna sin movimiento. Retorna
+        (None, None) si la cuenta o el hold no existen.
+        """
+        return self._ejecutar(self._plan_capturar_hold(cuenta_id, hold_id, tipo, descripcion, monto, validar))
+
+    def liberar_hold(
+        self,
+        cuenta_id: str,
+        hold_id: str,
+        estado: EstadoHold = EstadoHold.LIBERADO
+    ) -> Optional[Hold]:
+        """
+        Libera un hold activo (LIBERADO, o EXPIRADO desde el barrido)
+        
+        Un hold que ya no está activo se retorna sin cambios. Retorna None
+        si la cuenta o el hold no existen.
+        """
+        return self._ejecutar(self._plan_liberar_hold(cuenta_id, hold_id, estado))
+
+    def cerrar_hold_huerfano(
+        self,
+        cuenta_id: str,
+        hold_id: str,
+        estado: EstadoHold = EstadoHold.EXPIRADO
+    ) -> Optional[Hold]:
+        """
+        Cierra un hold activo cuya cuenta ya no existe, sin tocar saldos,
+        para que deje de aparecer en la consulta de vencidos. Si la cuenta
+        existe el hold se retorna sin cambios (se libera con `liberar_hold`).
+        Retorna None si el hold no existe.
+        """
+        return self._ejecutar(self._plan_cerrar_hold_huerfano(cuenta_id, hold_id, estado))
+
+    def get_hold(self, hold_id: str) -> Optional[Hold]:
+        """Obtiene un hold por ID"""
+        doc = self._hold_ref(hold_id).get()
+        return self._doc_to_hold(doc) if doc.exists else None
+
+    def get_holds_activos(self, cuenta_id: str) -> List[Hold]:
+        """Holds activos de una cuenta"""
+        return [self._doc_to_hold(doc) for doc in self._query_holds_activos(cuenta_id).stream()]
+
+    def get_holds_vencidos(self, ahora: datetime, limit: int = 100) -> List[Hold]:
+        """Holds activos de todas las cuentas con el vencimiento cumplido"""
+        return [self._doc_to_hold(doc) for doc in self._query_holds_vencidos(ahora, limit).stream()]
+
+    def get_outbox(self, antes: datetime, limit: int = 500) -> List[Dict[str, Any]]:
+        """Eventos que siguen en el outbox y se crearon antes de `antes`"""
+        return [self._doc_to_evento(doc) for doc in self._query_outbox(antes, limit).stream()]
+
+    def borrar_outbox(self, ids: List[str]) -> None:
+        """Borra los registros ya despachados del outbox"""
+        for lote in self._lotes_outbox(ids):
+            batch = self.db.batch()
+            for evento_id in lote:
+                batch.delete(self._outbox_ref(evento_id))
+            batch.commit()
+
+    def get_resumenes(
+        self,
+        cuenta_id: str,
+        granularidad: str = "dia",
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        limit: int = 31
+    ) -> List[ResumenPeriodo]:
+        """
+        Obtiene los resúmenes diarios o mensuales de una cuenta
+        
+        `desde` y `hasta` son periodos en el formato de la granularidad
+        (AAAA-MM-DD o AAAA-MM). Se leen los documentos de resumen de cada
+        periodo (uno, o uno por shard en una cuenta fraccionada), sin
+        recorrer los movimientos.
+        """
+        return self._ejecutar(self._plan_resumenes(cuenta_id, granularidad, desde, hasta, limit))
 
     def get_movimientos(
-        self, 
-        cuenta_id: str, 
+        self,
+        cuenta_id: str,
         filters: Optional[MovimientoFilter] = None,
         limit: int = 50
     ) -> List[Movimiento]:
         """Obtiene los movimientos de una cuenta"""
-        query = self.db.collection(self.movimientos_collection).where(
-            "cuenta_id", "==", cuenta_id
-        ).order_by("fecha", direction=firestore.Query.DESCENDING).limit(limit)
-        
-        if filters:
-            if filters.tipo:
-                tipo_value = filters.tipo.value if hasattr(filters.tipo, 'value') else filters.tipo
-                query = query.where("tipo", "==", tipo_value)
-            if filters.fecha_desde:
-                query = query.where("fecha", ">=", filters.fecha_desde)
-            if filters.fecha_hasta:
-                query = query.where("fecha", "<=", filters.fecha_hasta)
-        
-        docs = query.stream()
+        docs = self._query_movimientos(cuenta_id, filters, limit).stream()
         movimientos = []
         
         for doc in docs:
-            data = doc.to_dict()
-            data["id"] = doc.id
-            
-            # Asegurar que los campos datetime sean datetime objects
-            if isinstance(data.get("fecha"), str):
-                data["fecha"] = datetime.fromisoformat(data["fecha"].replace('Z', '+00:00'))
-            if isinstance(data.get("created_at"), str):
-                data["created_at"] = datetime.fromisoformat(data["created_at"].replace('Z', '+00:00'))
-            
-            movimientos.append(Movimiento(**data))
+            movimientos.append(self._doc_to_movimiento(doc))
+        
+        return movimientos
+
+    def get_movimientos_page(
+        self,
+        cuenta_id: str,
+        filters: Optional[MovimientoFilter] = None,
+        page_size: int = 50,
+        start_after: Optional[Tuple[datetime, str]] = None
+    ) -> Tuple[List[Movimiento], Optional[Movimiento]]:
+        """
+        Obtiene una página de movimientos de una cuenta
+        
+        Retorna los movimientos y el último de ellos si existe una página
+        siguiente; su (fecha, id) es el cursor para pedirla.
+        """
+        docs = self._query_movimientos(cuenta_id, filters, page_size + 1, start_after).stream()
+        movimientos = [self._doc_to_movimiento(doc) for doc in docs]
         
-        return movimientos
\ No newline at end of file
+        return self._cortar_pagina(movimientos, page_size)
@@ -0,0 +1,380 @@
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
+from datetime import datetime
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists
+from starlette.concurrency import run_in_threadpool
+from app.models import Cuenta, Movimiento, EstadoCuenta, TipoMovimiento, ResumenPeriodo, Hold, EstadoHold
+from app.schemas import CuentaFilter, MovimientoFilter, OperacionLoteItem
+from app.repos.cuentas_repo import BaseCuentasRepository, Consulta, CuentasRepository, Transaccion
+
+
+class AsyncCuentasRepository(BaseCuentasRepository):
+    """
+    Repositorio de cuentas sobre el `AsyncClient` de Firestore.
+
+    Expone los mismos métodos que `CuentasRepository` pero como corrutinas,
+    de modo que las llamadas a Firestore no bloquean el event loop. Las
+    operaciones transaccionales son los mismos planes de
+    `BaseCuentasRepository`; aquí solo se ejecutan sus lecturas con await.
+    """
+
+    async def _ejecutar(self, plan: Generator) -> Any:
+        """Ejecuta un plan de BaseCuentasRepository con el AsyncClient"""
+        respuesta = None
+        while True:
+            try:
+                pedido = plan.send(respuesta)
+            except StopIteration as fin:
+                return fin.value
+            
+            if isinstance(pedido, Transaccion):
+                respuesta = await self._en_transaccion(pedido.cuerpo)
+            elif isinstance(pedido, Consulta):
+                respuesta = [snapshot async for snapshot in pedido.query.stream()]
+            else:
+                respuesta = [
+                    snapshot async for snapshot in self.db.get_all(pedido.refs, transaction=pedido.transaction)
+                ]
+
+    async def _en_transaccion(self, cuerpo: Callable[[Any], Generator]) -> Any:
+        """Corre el plan `cuerpo` en una transacción (reintentada si hay conflicto)"""
+        @firestore.async_transactional
+        async def _correr(transaction):
+            return await self._ejecutar(cuerpo(transaction))
+        
+        return await _correr(self.db.transaction())
+
+    async def _completar_saldos(self, cuentas: List[Cuenta]) -> None:
+        """Reemplaza el saldo de las cuentas fraccionadas por la suma de sus shards"""
+        await self._ejecutar(self._plan_completar_saldos(cuentas))
+
+    async def create(self, cuenta: Cuenta) -> str:
+        """Crea una nueva cuenta (ver `CuentasRepository.create`)"""
+        cuenta.created_at = datetime.now()
+        cuenta.updated_at = datetime.now()
+        cuenta_ref = self.db.collection(self.collection).document()
+        
+        while True:
+            cuenta.numero_cuenta = await self._ejecutar(self._plan_numero_cuenta_nuevo())
+            
+            batch = self.db.batch()
+            batch.create(self._numero_ref(cuenta.numero_cuenta), {
+                "cuenta_id": cuenta_ref.id,
+                "created_at": cuenta.created_at
+            })
+            batch.set(cuenta_ref, self._cuenta_to_dict(cuenta))
+            
+            try:
+                await batch.commit()
+                break
+            except AlreadyExists:
+                continue
+        
+        cuenta_creada = cuenta.model_copy(update={"id": cuenta_ref.id})
+        self.cache.put(cuenta_creada)
+        return cuenta_creada.id
+
+    async def get_by_id(self, cuenta_id: str, use_cache: bool = True) -> Optional[Cuenta]:
+        """
+        Obtiene una cuenta por ID
+        
+        Con use_cache=False se lee siempre de Firestore (y se refresca la caché).
+        """
+        if use_cache:
+            cuenta = self.cache.get(cuenta_id)
+            if cuenta is not None:
+                return cuenta
+        
+        doc = await self.db.collection(self.collection).document(cuenta_id).get()
+        
+        if not doc.exists:
+            self.cache.invalidar(cuenta_id)
+            return None
+        
+        cuenta = self._doc_to_cuenta(doc)
+        await self._completar_saldos([cuenta])
+        self.cache.put(cuenta)
+        return cuenta
+
+    async def get_many(self, cuenta_ids: List[str], use_cache: bool = True) -> Dict[str, Cuenta]:
+        """Obtiene varias cuentas por ID con un solo get_all (ver `CuentasRepository.get_many`)"""
+        cuentas, faltantes = self._buscar_en_cache(cuenta_ids, use_cache)
+        if not faltantes:
+            return cuentas
+        
+        refs = [self.db.collection(self.collection).document(cuenta_id) for cuenta_id in faltantes]
+        leidas = [self._doc_to_cuenta(snapshot) async for snapshot in self.db.get_all(refs) if snapshot.exists]
+        await self._completar_saldos(leidas)
+        
+        for cuenta in leidas:
+            self.cache.put(cuenta)
+            cuentas[cuenta.id] = cuenta
+        
+        return cuentas
+
+    async def get_by_numero_cuenta(self, numero_cuenta: str, use_cache: bool = True) -> Optional[Cuenta]:
+        """Obtiene una cuenta por número de cuenta"""
+        if use_cache:
+            cuenta = self.cache.get_by_numero(numero_cuenta)
+            if cuenta is not None:
+                return cuenta
+        
+        indice = await self._numero_ref(numero_cuenta).get()
+        if indice.exists:
+            return await self.get_by_id(indice.get("cuenta_id"), use_cache=use_cache)
+        
+        # Cuentas creadas antes del índice: se buscan con la consulta y se indexan
+        async for doc in self._query_numero_cuenta(numero_cuenta).stream():
+            cuenta = self._doc_to_cuenta(doc)
+            await self.indexar_numero_cuenta(cuenta)
+            await self._completar_saldos([cuenta])
+            self.cache.put(cuenta)
+            return cuenta
+        
+        return None
+
+    async def indexar_numero_cuenta(self, cuenta: Cuenta) -> bool:
+        """Crea la entrada del índice para una cuenta; False si ya existía"""
+        try:
+            await self._numero_ref(cuenta.numero_cuenta).create({
+                "cuenta_id": cuenta.id,
+                "created_at": cuenta.created_at
+            })
+            return True
+        except AlreadyExists:
+            return False
+
+    async def list(self, filters: Optional[CuentaFilter] = None) -> List[Cuenta]:
+        """Lista cuentas con filtros opcionales"""
+        cuentas = []
+        
+        async for doc in self._query_cuentas(filters).stream():
+            cuentas.append(self._doc_to_cuenta(doc))
+        
+        await self._completar_saldos(cuentas)
+        return cuentas
+
+    async def list_page(
+        self,
+        filters: Optional[CuentaFilter] = None,
+        page_size: int = 50,
+        start_after: Optional[str] = None
+    ) -> Tuple[List[Cuenta], Optional[str]]:
+        """Lista una página de cuentas ordenadas por ID (ver `CuentasRepository.list_page`)"""
+        cuentas = []
+        
+        async for doc in self._query_cuentas_pagina(filters, page_size, start_after).stream():
+            cuentas.append(self._doc_to_cuenta(doc))
+        
+        cuentas, ultima = self._cortar_pagina(cuentas, page_size)
+        await self._completar_saldos(cuentas)
+        return cuentas, ultima.id if ultima else None
+
+    async def update(self, cuenta_id: str, update_data: dict) -> bool:
+        """Actualiza una cuenta"""
+        update_data = self._preparar_update(update_data)
+        
+        doc_ref = self.db.collection(self.collection).document(cuenta_id)
+        await doc_ref.update(update_data)
+        
+        self.cache.actualizar(cuenta_id, update_data)
+        return True
+
+    async def update_saldo(self, cuenta_id: str, nuevo_saldo: float) -> bool:
+        """Actualiza el saldo de una cuenta"""
+        return await self.update(cuenta_id, {"saldo": nuevo_saldo})
+
+    async def cambiar_estado(self, cuenta_id: str, nuevo_estado: EstadoCuenta) -> bool:
+        """Cambia el estado de una cuenta"""
+        estado_value = nuevo_estado.value if hasattr(nuevo_estado, 'value') else nuevo_estado
+        return await self.update(cuenta_id, {"estado": estado_value})
+
+    async def delete(self, cuenta_id: str) -> bool:
+        """Elimina una cuenta (soft delete)"""
+        return await self.cambiar_estado(cuenta_id, EstadoCuenta.CERRADA)
+
+    # Métodos para movimientos
+    async def crear_movimiento(self, movimiento: Movimiento) -> str:
+        """Crea un registro de movimiento"""
+        movimiento.created_at = datetime.now()
+        
+        movimiento_dict = self._movimiento_to_dict(movimiento)
+        
+        # El movimiento, sus resúmenes y su evento se escriben en el mismo batch
+        doc_ref = self.db.collection(self.movimientos_collection).document()
+        movimiento.id = doc_ref.id
+        batch = self.db.batch()
+        batch.set(doc_ref, movimiento_dict)
+        self._escribir_resumenes(batch, movimiento.cuenta_id, [movimiento])
+        eventos = self._escribir_outbox(batch, [movimiento])
+        await batch.commit()
+        
+        self.eventos.publicar(eventos)
+        return doc_ref.id
+
+    async def aplicar_movimiento(
+        self,
+        cuenta_id: str,
+        tipo: TipoMovimiento,
+        monto: float,
+        descripcion: str,
+        debito: bool = False,
+        validar: Optional[Callable[[Cuenta], None]] = None
+    ) -> Optional[Movimiento]:
+        """Aplica un movimiento de saldo en una sola transacción (ver `CuentasRepository.aplicar_movimiento`)"""
+        return await self._ejecutar(self._plan_aplicar_movimiento(cuenta_id, tipo, monto, descripcion, debito, validar))
+
+    async def aplicar_lote(
+        self,
+        operaciones: List[OperacionLoteItem],
+        validar: Callable[[Cuenta, OperacionLoteItem], None]
+    ) -> Tuple[list, int]:
+        """Aplica depósitos y retiros en lote (ver `CuentasRepository.aplicar_lote`)"""
+        return await self._ejecutar(self._plan_aplicar_lote(operaciones, validar))
+
+    async def transferir(
+        self,
+        origen_id: str,
+        destino_id: str,
+        monto: float,
+        descripciones: Tuple[str, str],
+        referencia: Optional[str] = None,
+        validar: Optional[Callable[[Cuenta, Cuenta], None]] = None
+    ) -> Optional[Tuple[Movimiento, Movimiento]]:
+        """Transfiere entre dos cuentas en una sola transacción (ver `CuentasRepository.transferir`)"""
+        return await self._ejecutar(self._plan_transferir(origen_id, destino_id, monto, descripciones, referencia, validar))
+
+    async def resolver_transferencia(self, referencia: str) -> Optional[Tuple[Movimiento, Movimiento]]:
+        """Aplicada o anulada, en una transacción (ver `CuentasRepository.resolver_transferencia`)"""
+        return await self._ejecutar(self._plan_resolver_transferencia(referencia))
+
+    async def fraccionar_saldo(self, cuenta_id: str, shards: int) -> Optional[Cuenta]:
+        """Cambia la cantidad de shards del saldo (ver `CuentasRepository.fraccionar_saldo`)"""
+        return await self._ejecutar(self._plan_fraccionar_saldo(cuenta_id, shards))
+
+    async def crear_hold(
+        self,
+        hold: Hold,
+        validar: Callable[[Cuenta], None]
+    ) -> Optional[Hold]:
+        """Reserva fondos en una sola transacción (ver `CuentasRepository.crear_hold`)"""
+        return await self._ejecutar(self._plan_crear_hold(hold, validar))
+
+    async def capturar_hold(
+        self,
+        cuenta_id: str,
+        hold_id: str,
+        tipo: TipoMovimiento,
+        descripcion: Optional[str],
+        monto: Optional[float],
+        validar: Callable[[Cuenta, Hold, float], None]
+    ) -> Tuple[Optional[Hold], Optional[Movimiento]]:
+        """Convierte un hold en un movimiento de débito (ver `CuentasRepository.capturar_hold`)"""
+        return await self._ejecutar(self._plan_capturar_hold(cuenta_id, hold_id, tipo, descripcion, monto, validar))
+
+    async def liberar_hold(
+        self,
+        cuenta_id: str,
+        hold_id: str,
+        estado: EstadoHold = EstadoHold.LIBERADO
+    ) -> Optional[Hold]:
+        """Libera un hold activo (ver `CuentasRepository.liberar_hold`)"""
+        return await self._ejecutar(self._plan_liberar_hold(cuenta_id, hold_id, estado))
+
+    async def cerrar_hold_huerfano(
+        self,
+        cuenta_id: str,
+        hold_id: str,
+        estado: EstadoHold = EstadoHold.EXPIRADO
+    ) -> Optional[Hold]:
+        """Cierra un hold cuya cuenta ya no existe (ver `CuentasRepository.cerrar_hold_huerfano`)"""
+        return await self._ejecutar(self._plan_cerrar_hold_huerfano(cuenta_id, hold_id, estado))
+
+    async def get_hold(self, hold_id: str) -> Optional[Hold]:
+        """Obtiene un hold por ID"""
+        doc = await self._hold_ref(hold_id).get()
+        return self._doc_to_hold(doc) if doc.exists else None
+
+    async def get_holds_activos(self, cuenta_id: str) -> List[Hold]:
+        """Holds activos de una cuenta"""
+        return [self._doc_to_hold(doc) async for doc in self._query_holds_activos(cuenta_id).stream()]
+
+    async def get_holds_vencidos(self, ahora: datetime, limit: int = 100) -> List[Hold]:
+        """Holds activos de todas las cuentas con el vencimiento cumplido"""
+        return [self._doc_to_hold(doc) async for doc in self._query_holds_vencidos(ahora, limit).stream()]
+
+    async def get_outbox(self, antes: datetime, limit: int = 500) -> List[Dict[str, Any]]:
+        """Eventos que siguen en el outbox y se crearon antes de `antes`"""
+        return [self._doc_to_evento(doc) async for doc in self._query_outbox(antes, limit).stream()]
+
+    async def borrar_outbox(self, ids: List[str]) -> None:
+        """Borra los registros ya despachados del outbox"""
+        for lote in self._lotes_outbox(ids):
+            batch = self.db.batch()
+            for evento_id in lote:
+                batch.delete(self._outbox_ref(evento_id))
+            await batch.commit()
+
+    async def get_resumenes(
+        self,
+        cuenta_id: str,
+        granularidad: str = "dia",
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        limit: int = 31
+    ) -> List[ResumenPeriodo]:
+        """Obtiene los resúmenes de una cuenta (ver `CuentasRepository.get_resumenes`)"""
+        return await self._ejecutar(self._plan_resumenes(cuenta_id, granularidad, desde, hasta, limit))
+
+    async def get_movimientos(
+        self,
+        cuenta_id: str,
+        filters: Optional[MovimientoFilter] = None,
+        limit: int = 50
+    ) -> List[Movimiento]:
+        """Obtiene los movimientos de una cuenta"""
+        movimientos = []
+        
+        async for doc in self._query_movimientos(cuenta_id, filters, limit).stream():
+            movimientos.append(self._doc_to_movimiento(doc))
+        
+        return movimientos
+
+    async def get_movimientos_page(
+        self,
+        cuenta_id: str,
+        filters: Optional[MovimientoFilter] = None,
+        page_size: int = 50,
+        start_after: Optional[Tuple[datetime, str]] = None
+    ) -> Tuple[List[Movimiento], Optional[Movimiento]]:
+        """Obtiene una página de movimientos (ver `CuentasRepository.get_movimientos_page`)"""
+        movimientos = []
+        query = self._query_movimientos(cuenta_id, filters, page_size + 1, start_after)
+        
+        async for doc in query.stream():
+            movimientos.append(self._doc_to_movimiento(doc))
+        
+        return self._cortar_pagina(movimientos, page_size)
+
+
+class ThreadpoolCuentasRepository:
+    """
+    Adapta un repositorio síncrono a la interfaz asíncrona del servicio.
+
+    Cada método del repositorio envuelto se ejecuta en el threadpool de
+    Starlette, así el cliente síncrono de Firestore sigue siendo
+    seleccionable sin bloquear el event loop.
+    """
+
+    def __init__(self, repo: CuentasRepository):
+        self.repo = repo
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.repo, name)
+        if not callable(attr):
+            return attr
+        
+        async def _llamar(*args, **kwargs):
+            return await run_in_threadpool(attr, *args, **kwargs)
+        
+        return _llamar
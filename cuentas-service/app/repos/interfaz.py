@@ -0,0 +1,131 @@
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+from datetime import datetime
+from app.models import Cuenta, Movimiento, EstadoCuenta, TipoMovimiento, ResumenPeriodo, Hold, EstadoHold
+from app.schemas import CuentaFilter, MovimientoFilter, OperacionLoteItem
+
+
+# Granularidad -> (subcolección de cuentas/{id}, formato del periodo)
+RESUMENES = {
+    "dia": ("resumenes_diarios", "%Y-%m-%d"),
+    "mes": ("resumenes_mensuales", "%Y-%m")
+}
+
+
+class TransferenciaAnulada(LookupError):
+    """La referencia de la transferencia se anuló al resolverla: ya no se aplica"""
+
+    def __init__(self, referencia: str):
+        self.referencia = referencia
+        super().__init__(f"La transferencia {referencia} fue anulada y no se puede aplicar")
+
+
+class RepositorioCuentas(Protocol):
+    """
+    Interfaz de almacenamiento que usan CuentasService y las tareas de fondo.
+
+    La implementan `AsyncCuentasRepository` (AsyncClient de Firestore) y
+    `ThreadpoolCuentasRepository`, que adapta `CuentasRepository` sobre el
+    cliente síncrono de Firestore o sobre un motor local de
+    app.almacenamiento (memoria o SQLite). Ver `CuentasRepository` para la
+    semántica de cada método.
+    """
+
+    async def create(self, cuenta: Cuenta) -> str: ...
+
+    async def get_by_id(self, cuenta_id: str, use_cache: bool = True) -> Optional[Cuenta]: ...
+
+    async def get_many(self, cuenta_ids: List[str], use_cache: bool = True) -> Dict[str, Cuenta]: ...
+
+    async def list_page(
+        self,
+        filters: Optional[CuentaFilter] = None,
+        page_size: int = 50,
+        start_after: Optional[str] = None
+    ) -> Tuple[List[Cuenta], Optional[str]]: ...
+
+    async def update(self, cuenta_id: str, update_data: dict) -> bool: ...
+
+    async def cambiar_estado(self, cuenta_id: str, nuevo_estado: EstadoCuenta) -> bool: ...
+
+    async def crear_movimiento(self, movimiento: Movimiento) -> str: ...
+
+    async def aplicar_movimiento(
+        self,
+        cuenta_id: str,
+        tipo: TipoMovimiento,
+        monto: float,
+        descripcion: str,
+        debito: bool = False,
+        validar: Optional[Callable[[Cuenta], None]] = None
+    ) -> Optional[Movimiento]: ...
+
+    async def aplicar_lote(
+        self,
+        operaciones: List[OperacionLoteItem],
+        validar: Callable[[Cuenta, OperacionLoteItem], None]
+    ) -> Tuple[list, int]: ...
+
+    async def transferir(
+        self,
+        origen_id: str,
+        destino_id: str,
+        monto: float,
+        descripciones: Tuple[str, str],
+        referencia: Optional[str] = None,
+        validar: Optional[Callable[[Cuenta, Cuenta], None]] = None
+    ) -> Optional[Tuple[Movimiento, Movimiento]]: ...
+
+    async def resolver_transferencia(self, referencia: str) -> Optional[Tuple[Movimiento, Movimiento]]: ...
+
+    async def get_movimientos_page(
+        self,
+        cuenta_id: str,
+        filters: Optional[MovimientoFilter] = None,
+        page_size: int = 50,
+        start_after: Optional[Tuple[datetime, str]] = None
+    ) -> Tuple[List[Movimiento], Optional[Movimiento]]: ...
+
+    async def get_resumenes(
+        self,
+        cuenta_id: str,
+        granularidad: str = "dia",
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        limit: int = 31
+    ) -> List[ResumenPeriodo]: ...
+
+    async def crear_hold(self, hold: Hold, validar: Callable[[Cuenta], None]) -> Optional[Hold]: ...
+
+    async def capturar_hold(
+        self,
+        cuenta_id: str,
+        hold_id: str,
+        tipo: TipoMovimiento,
+        descripcion: Optional[str],
+        monto: Optional[float],
+        validar: Callable[[Cuenta, Hold, float], None]
+    ) -> Tuple[Optional[Hold], Optional[Movimiento]]: ...
+
+    async def liberar_hold(
+        self,
+        cuenta_id: str,
+        hold_id: str,
+        estado: EstadoHold = EstadoHold.LIBERADO
+    ) -> Optional[Hold]: ...
+
+    async def cerrar_hold_huerfano(
+        self,
+        cuenta_id: str,
+        hold_id: str,
+        estado: EstadoHold = EstadoHold.EXPIRADO
+    ) -> Optional[Hold]: ...
+
+    async def get_hold(self, hold_id: str) -> Optional[Hold]: ...
+
+    async def get_holds_activos(self, cuenta_id: str) -> List[Hold]: ...
+
+    async def get_holds_vencidos(self, ahora: datetime, limit: int = 100) -> List[Hold]: ...
+
+    async def get_outbox(self, antes: datetime, limit: int = 500) -> List[Dict[str, Any]]: ...
+
+    async def borrar_outbox(self, ids: List[str]) -> None: ...
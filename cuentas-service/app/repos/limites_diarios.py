@@ -0,0 +1,81 @@
+from typing import Dict, Optional, Tuple
+from app.config import settings
+from app.models import TipoMovimiento
+import threading
+
+
+class LimiteDiarioExcedido(ValueError):
+    """La operación supera el límite diario de depósitos o retiros"""
+
+    def __init__(self, campo: str, limite: float, acumulado: float):
+        self.campo = campo
+        self.limite = limite
+        self.acumulado = acumulado
+        disponible = max(limite - acumulado, 0.0)
+        nombre = "depósitos" if campo == "depositos" else campo
+        super().__init__(
+            f"Límite diario de {nombre} excedido ({limite}). Disponible hoy: {round(disponible, 2)}"
+        )
+
+
+def limite_diario(tipo) -> Optional[Tuple[str, float]]:
+    """Retorna (campo del contador, límite) para los tipos con límite diario"""
+    tipo_value = tipo.value if hasattr(tipo, 'value') else tipo
+    if tipo_value == TipoMovimiento.DEPOSITO.value:
+        return "depositos", settings.LIMITE_DEPOSITO_DIARIO
+    if tipo_value == TipoMovimiento.RETIRO.value:
+        return "retiros", settings.LIMITE_RETIRO_DIARIO
+    return None
+
+
+class AcumuladosDiarios:
+    """
+    Último acumulado diario conocido por cuenta, en memoria del proceso.
+
+    El contador real está en Firestore (`limites_diarios/{cuenta_id}_{dia}`)
+    y solo crece durante el día, así que el valor local es una cota
+    inferior: si ya con él se supera el límite, la operación se rechaza sin
+    ir a Firestore. Solo se guardan los acumulados del día en curso.
+
+    En las cuentas fraccionadas el contador está repartido en los shards y
+    un crédito lee solo uno: ahí esta cota es además lo que valida el resto
+    del día (ver "Límites diarios" en CuentasRepository).
+    """
+
+    def __init__(self):
+        self._dia: Optional[str] = None
+        self._acumulados: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, cuenta_id: str, dia: str, campo: str) -> float:
+        with self._lock:
+            if dia != self._dia:
+                return 0.0
+            return self._acumulados.get((cuenta_id, campo), 0.0)
+
+    def registrar(self, cuenta_id: str, dia: str, campo: str, acumulado: float) -> None:
+        """Guarda un acumulado leído o escrito en Firestore"""
+        with self._lock:
+            if dia != self._dia:
+                if self._dia is not None and dia < self._dia:
+                    return
+                self._dia = dia
+                self._acumulados.clear()
+
+            clave = (cuenta_id, campo)
+            self._acumulados[clave] = max(self._acumulados.get(clave, 0.0), acumulado)
+
+    def verificar(self, cuenta_id: str, dia: str, tipo, monto: float) -> None:
+        """Lanza LimiteDiarioExcedido si el acumulado conocido ya no admite `monto`"""
+        limite = limite_diario(tipo)
+        if limite is None:
+            return
+
+        campo, maximo = limite
+        acumulado = self.get(cuenta_id, dia, campo)
+        if acumulado + monto > maximo:
+            raise LimiteDiarioExcedido(campo, maximo, acumulado)
+
+
+# Instancia global de los acumulados
+acumulados_diarios = AcumuladosDiarios()
@@ -0,0 +1,56 @@
+from collections import deque
+from typing import Optional
+import threading
+
+
+class IndiceNumerosPendiente(RuntimeError):
+    """Falta indexar los números de las cuentas anteriores al índice `numeros_cuenta`"""
+
+    def __init__(self):
+        super().__init__(
+            "El índice numeros_cuenta está incompleto: ejecutar python -m scripts.indexar_numeros_cuenta"
+        )
+
+
+class NumeroCuentaAllocator:
+    """
+    Reparte números de cuenta a partir de bloques reservados en Firestore.
+
+    Cada proceso reserva un bloque de números consecutivos con una sola
+    transacción sobre el contador `contadores/numero_cuenta` y luego los
+    entrega localmente, sin consultas por cada cuenta creada. Los números
+    de un bloque que no se usen antes de reiniciar el proceso se pierden;
+    eso solo deja huecos en la numeración.
+
+    `indice_completo` indica si, al reservar el último bloque, todas las
+    cuentas tenían su entrada en `numeros_cuenta`: solo entonces alcanza
+    con ese índice para detectar un número ya usado.
+    """
+
+    def __init__(self):
+        self._bloques = deque()
+        self._lock = threading.Lock()
+        self.indice_completo = False
+
+    def tomar(self) -> Optional[str]:
+        """Retorna el siguiente número disponible o None si no quedan bloques"""
+        with self._lock:
+            while self._bloques:
+                numero = next(self._bloques[0], None)
+                if numero is not None:
+                    return f"{numero:010d}"
+                self._bloques.popleft()
+        return None
+
+    def agregar_bloque(self, bloque: range, indice_completo: bool = True) -> None:
+        """Agrega un bloque recién reservado"""
+        if bloque.stop > 10 ** 10:
+            raise RuntimeError("Se agotó el rango de números de cuenta de 10 dígitos")
+
+        with self._lock:
+            self._bloques.append(iter(bloque))
+            self.indice_completo = indice_completo
+
+
+# Instancia global del asignador
+numeros_cuenta_allocator = NumeroCuentaAllocator()
@@ -1,52 +1,140 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Literal, Optional
+from datetime import date, datetime
+from app.config import settings
+from app.idempotencia import IdempotenciaConflicto, idempotencia_store
+from app.eventos import despachador_eventos
 from app.services.cuentas_service import CuentasService
 from app.schemas import (
     CuentaCreate, CuentaUpdate, CuentaResponse,
+    CuentaLookupRequest, CuentaLookupResponse,
     DepositoRequest, RetiroRequest, OperacionResponse,
-    MovimientoResponse, CuentaFilter, MovimientoFilter
+    TransferenciaRequest, TransferenciaResponse, TransferenciaResolucionResponse,
+    OperacionLoteRequest, OperacionLoteResponse,
+    MovimientoResponse, CuentaFilter, MovimientoFilter,
+    ResumenPeriodoResponse, ResumenResponse, EventosResponse,
+    HoldCreate, HoldCapture, HoldResponse
 )
-from app.models import EstadoCuenta, Moneda, Cuenta, Movimiento
+from app.models import EstadoCuenta, Moneda, TipoMovimiento, Cuenta, Movimiento, ResumenPeriodo, Hold
 from app.deps import get_cuentas_service
+from app.decodificacion import cuenta_a_fila, cuenta_a_respuesta, movimiento_a_fila, movimiento_a_respuesta
+from app.responses import FastJSONResponse, dumps
+import csv
+import io
 
 
 router = APIRouter(prefix="/cuentas", tags=["Cuentas"])
 
+# Los listados paginados responden la lista de siempre; el cursor de la
+# página siguiente va en cabeceras para no cambiar el cuerpo
+CABECERA_PAGINA = "X-Next-Page-Token"
+
 
 def cuenta_to_response(cuenta: Cuenta) -> CuentaResponse:
-    """Convierte un modelo Cuenta a CuentaResponse"""
-    return CuentaResponse(
-        id=cuenta.id,
-        cliente_id=cuenta.cliente_id,
-        numero_cuenta=cuenta.numero_cuenta,
-        tipo=cuenta.tipo if isinstance(cuenta.tipo, str) else cuenta.tipo.value,
-        moneda=cuenta.moneda if isinstance(cuenta.moneda, str) else cuenta.moneda.value,
-        saldo=cuenta.saldo,
-        estado=cuenta.estado if isinstance(cuenta.estado, str) else cuenta.estado.value,
-        fecha_apertura=cuenta.fecha_apertura,
-        created_at=cuenta.created_at,
-        updated_at=cuenta.updated_at
-    )
+    """Convierte un modelo Cuenta a CuentaResponse (sin revalidar, ver app.decodificacion)"""
+    return cuenta_a_respuesta(cuenta)
 
 
 def movimiento_to_response(mov: Movimiento) -> MovimientoResponse:
-    """Convierte un modelo Movimiento a MovimientoResponse"""
-    return MovimientoResponse(
-        id=mov.id,
-        cuenta_id=mov.cuenta_id,
-        tipo=mov.tipo if isinstance(mov.tipo, str) else mov.tipo.value,
-        monto=mov.monto,
-        saldo_anterior=mov.saldo_anterior,
-        saldo_nuevo=mov.saldo_nuevo,
-        descripcion=mov.descripcion,
-        referencia=mov.referencia,
-        fecha=mov.fecha
+    """Convierte un modelo Movimiento a MovimientoResponse (sin revalidar, ver app.decodificacion)"""
+    return movimiento_a_respuesta(mov)
+
+
+def resumen_to_response(resumen: ResumenPeriodo) -> ResumenPeriodoResponse:
+    """Convierte un ResumenPeriodo a ResumenPeriodoResponse"""
+    return ResumenPeriodoResponse(
+        periodo=resumen.periodo,
+        saldo_apertura=resumen.saldo_apertura,
+        saldo_cierre=resumen.saldo_cierre,
+        creditos=resumen.creditos,
+        debitos=resumen.debitos,
+        total_creditos=resumen.total_creditos,
+        total_debitos=resumen.total_debitos,
+        cantidad_movimientos=resumen.cantidad_movimientos
     )
 
 
+def hold_to_response(hold: Hold) -> HoldResponse:
+    """Convierte un Hold a HoldResponse"""
+    return HoldResponse(
+        id=hold.id,
+        cuenta_id=hold.cuenta_id,
+        monto=hold.monto,
+        descripcion=hold.descripcion,
+        referencia=hold.referencia,
+        estado=hold.estado,
+        expira_en=hold.expira_en,
+        monto_capturado=hold.monto_capturado,
+        movimiento_id=hold.movimiento_id,
+        created_at=hold.created_at,
+        updated_at=hold.updated_at
+    )
+
+
+def respuesta_paginada(request: Request, filas: list, next_page_token: Optional[str]) -> FastJSONResponse:
+    """
+    Lista JSON de una página con el cursor de la siguiente en cabeceras
+
+    `X-Next-Page-Token` lleva el token y `Link` la URL de la página
+    siguiente (rel="next"). En la última página no se envía ninguna.
+    """
+    headers = {}
+    if next_page_token:
+        siguiente = request.url.include_query_params(page_token=next_page_token)
+        headers[CABECERA_PAGINA] = next_page_token
+        headers["Link"] = f'<{siguiente}>; rel="next"'
+    return FastJSONResponse(filas, headers=headers)
+
+
+async def ejecutar_idempotente(
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str],
+    cuerpo: Optional[BaseModel],
+    operacion: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Ejecuta una operación de escritura respetando el header Idempotency-Key
+    
+    Una repetición con la misma clave recibe la respuesta guardada (con el
+    header `Idempotent-Replayed: true`); reutilizar la clave con otra ruta
+    o cuerpo responde 422.
+    """
+    huella = idempotencia_store.huella(
+        request.method,
+        request.url.path,
+        cuerpo.model_dump_json() if cuerpo is not None else ""
+    )
+    
+    try:
+        resultado, repetido = await idempotencia_store.ejecutar(idempotency_key, huella, operacion)
+    except IdempotenciaConflicto:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="La Idempotency-Key ya se usó con una petición distinta"
+        )
+    
+    if repetido:
+        response.headers["Idempotent-Replayed"] = "true"
+    return resultado
+
+
+IdempotencyKey = Header(
+    None,
+    alias="Idempotency-Key",
+    max_length=255,
+    description="Clave única del cliente para reintentar la operación sin repetirla"
+)
+
+
 @router.post("/", response_model=CuentaResponse, status_code=status.HTTP_201_CREATED)
 async def crear_cuenta(
     cuenta_data: CuentaCreate,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = IdempotencyKey,
     service: CuentasService = Depends(get_cuentas_service)
 ):
     """
@@ -57,31 +145,44 @@ async def crear_cuenta(
     - **moneda**: Moneda de la cuenta (BOB, USD)
     - **saldo_inicial**: Saldo inicial (opcional, por defecto 0)
     """
-    try:
-        cuenta = service.crear_cuenta(cuenta_data)
-        return cuenta_to_response(cuenta)
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al crear cuenta: {str(e)}"
-        )
+    async def _crear() -> CuentaResponse:
+        try:
+            cuenta = await service.crear_cuenta(cuenta_data)
+            return cuenta_to_response(cuenta)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al crear cuenta: {str(e)}"
+            )
+    
+    return await ejecutar_idempotente(request, response, idempotency_key, cuenta_data, _crear)
 
 
 @router.get("/", response_model=List[CuentaResponse])
 async def listar_cuentas(
+    request: Request,
     cliente_id: Optional[str] = Query(None, description="Filtrar por cliente"),
     numero_cuenta: Optional[str] = Query(None, description="Filtrar por número de cuenta"),
     estado: Optional[EstadoCuenta] = Query(None, description="Filtrar por estado"),
     moneda: Optional[Moneda] = Query(None, description="Filtrar por moneda"),
+    page_size: int = Query(50, ge=1, le=500, description="Cantidad de cuentas por página"),
+    page_token: Optional[str] = Query(None, description="Token de la página siguiente"),
     service: CuentasService = Depends(get_cuentas_service)
 ):
     """
-    Lista todas las cuentas con filtros opcionales
+    Lista las cuentas con filtros opcionales, paginadas por cursor
     
     - **cliente_id**: Filtrar cuentas de un cliente específico
     - **numero_cuenta**: Buscar por número de cuenta exacto
     - **estado**: Filtrar por estado (ACTIVA, BLOQUEADA, CERRADA)
     - **moneda**: Filtrar por moneda (BOB, USD)
+    - **page_size**: Tamaño de página (por defecto 50, máximo 500)
+    - **page_token**: Valor de la cabecera `X-Next-Page-Token` de la respuesta anterior
+    
+    Las cuentas se ordenan por ID. Si hay más páginas, la respuesta trae la
+    cabecera `X-Next-Page-Token` y un `Link` con `rel="next"`; en la última
+    página no vienen.
+    La página se serializa directamente con orjson (ver app.responses).
     """
     filters = CuentaFilter(
         cliente_id=cliente_id,
@@ -90,9 +191,162 @@ async def listar_cuentas(
         moneda=moneda
     )
     
-    cuentas = service.listar_cuentas(filters)
+    cuentas, next_page_token = await service.listar_cuentas(filters, page_size, page_token)
     
-    return [cuenta_to_response(cuenta) for cuenta in cuentas]
+    return respuesta_paginada(request, [cuenta_a_fila(cuenta) for cuenta in cuentas], next_page_token)
+
+
+@router.post("/lookup", response_model=CuentaLookupResponse)
+async def buscar_cuentas(
+    lookup: CuentaLookupRequest,
+    service: CuentasService = Depends(get_cuentas_service)
+):
+    """
+    Obtiene varias cuentas por ID en una sola llamada
+    
+    - **ids**: Lista de IDs de cuenta (máximo 500)
+    
+    Útil para otros microservicios que necesitan resolver muchas cuentas
+    (p. ej. transferencias). Las cuentas vuelven en el orden pedido; los IDs
+    inexistentes se listan en `no_encontradas`.
+    """
+    cuentas, no_encontradas = await service.obtener_cuentas(lookup.ids)
+    
+    return FastJSONResponse({
+        "items": [cuenta_a_fila(cuenta) for cuenta in cuentas],
+        "no_encontradas": no_encontradas
+    })
+
+
+async def _eventos_sse(request: Request, desde: int, cuenta_id: Optional[str]) -> AsyncIterator[bytes]:
+    """Transmite el feed como Server-Sent Events hasta que el cliente se desconecta"""
+    while not await request.is_disconnected():
+        eventos, desde, incompleto = await despachador_eventos.esperar(
+            desde, timeout=15.0, cuenta_id=cuenta_id
+        )
+        if incompleto:
+            yield f"event: incompleto\nid: {desde}\ndata: {{}}\n\n".encode()
+        if not eventos:
+            # Comentario para mantener viva la conexión
+            yield b": ping\n\n"
+            continue
+        yield b"".join(
+            f"id: {evento['secuencia']}\nevent: movimiento\ndata: ".encode() + dumps(evento) + b"\n\n"
+            for evento in eventos
+        )
+
+
+@router.get("/eventos", response_model=EventosResponse)
+async def obtener_eventos(
+    request: Request,
+    desde: Optional[int] = Query(None, ge=0, description="Secuencia del último evento recibido"),
+    cuenta_id: Optional[str] = Query(None, description="Solo eventos de esta cuenta"),
+    espera: float = Query(25.0, ge=0, le=60, description="Segundos a esperar si no hay eventos"),
+    limit: int = Query(500, ge=1, le=1000, description="Máximo de eventos por respuesta"),
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID", ge=0)
+):
+    """
+    Feed de cambios de las cuentas (movimientos registrados por este proceso)
+    
+    - **desde**: Secuencia del último evento recibido; sin valor arranca desde ahora
+    - **cuenta_id**: Filtrar por cuenta
+    - **espera**: Long-poll: segundos a esperar si todavía no hay eventos (máximo 60)
+    - **limit**: Eventos por respuesta (por defecto 500, máximo 1000)
+    
+    Con `Accept: text/event-stream` responde con Server-Sent Events (usa
+    `Last-Event-ID` al reconectar). Si no, responde una página y el cliente
+    vuelve a llamar con `desde=ultima_secuencia`. `incompleto` indica que se
+    perdieron eventos (buffer lleno o reinicio del servicio) y hay que
+    releer el estado de las cuentas. La entrega es al menos una vez: los
+    eventos se deduplican por `id`.
+    """
+    if desde is None:
+        desde = last_event_id if last_event_id is not None else despachador_eventos.ultima_secuencia
+    
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            _eventos_sse(request, desde, cuenta_id),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    eventos, siguiente, incompleto = await despachador_eventos.esperar(
+        desde, timeout=espera, cuenta_id=cuenta_id, limite=limit
+    )
+    return FastJSONResponse({
+        "items": eventos,
+        "ultima_secuencia": siguiente,
+        "incompleto": incompleto
+    })
+
+
+@router.post("/operaciones/batch", response_model=OperacionLoteResponse)
+async def operaciones_batch(
+    lote: OperacionLoteRequest,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = IdempotencyKey,
+    service: CuentasService = Depends(get_cuentas_service)
+):
+    """
+    Aplica un lote de depósitos y retiros (planillas, liquidaciones de comercios)
+    
+    - **operaciones**: Lista de operaciones con cuenta_id, tipo (DEPOSITO o RETIRO),
+      monto, descripcion y referencia opcional
+    
+    Las operaciones se agrupan por cuenta y se aplican en transacciones de hasta
+    500 escrituras. La respuesta trae un resultado por operación, en el mismo orden,
+    y un resumen con la duración y las operaciones por segundo.
+    """
+    return await ejecutar_idempotente(
+        request, response, idempotency_key, lote,
+        lambda: service.aplicar_lote(lote)
+    )
+
+
+@router.post("/transferir", response_model=TransferenciaResponse)
+async def transferir(
+    transferencia: TransferenciaRequest,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = IdempotencyKey,
+    service: CuentasService = Depends(get_cuentas_service)
+):
+    """
+    Transfiere fondos entre dos cuentas (uso interno de transferencias-service)
+    
+    - **cuenta_origen_id** / **cuenta_destino_id**: Cuentas a debitar y acreditar
+    - **monto**: Cantidad a transferir (debe ser mayor a 0)
+    - **descripcion**: Descripción de los dos movimientos (opcional)
+    - **referencia**: ID de la transferencia; repetirlo devuelve la ya aplicada sin volver a mover fondos
+    - **cliente_id**: Si viene, la cuenta origen debe pertenecer a este cliente (403 si no)
+    
+    El débito, el crédito y los movimientos TRANSFERENCIA_SALIDA y
+    TRANSFERENCIA_ENTRADA se escriben en una sola transacción: o se aplica
+    todo o nada. Con el header `Idempotency-Key`, un reintento con la misma
+    clave devuelve la respuesta original sin volver a transferir.
+    """
+    return await ejecutar_idempotente(
+        request, response, idempotency_key, transferencia,
+        lambda: service.transferir(transferencia)
+    )
+
+
+@router.post("/transferir/{referencia}/resolver", response_model=TransferenciaResolucionResponse)
+async def resolver_transferencia(
+    referencia: str,
+    service: CuentasService = Depends(get_cuentas_service)
+):
+    """
+    Resuelve una transferencia de resultado desconocido (uso interno de transferencias-service)
+    
+    - **referencia**: La enviada en POST /transferir
+    
+    Si la transferencia se aplicó responde APLICADA con sus movimientos; si
+    no, la anula y responde ANULADA: un POST /transferir posterior con esa
+    referencia responde 409 sin mover fondos. Repetirlo da el mismo resultado.
+    """
+    return await service.resolver_transferencia(referencia)
 
 
 @router.get("/{cuenta_id}", response_model=CuentaResponse)
@@ -105,7 +359,7 @@ async def obtener_cuenta(
     
     - **cuenta_id**: ID de la cuenta
     """
-    cuenta = service.obtener_cuenta(cuenta_id)
+    cuenta = await service.obtener_cuenta(cuenta_id)
     return cuenta_to_response(cuenta)
 
 
@@ -113,6 +367,9 @@ async def obtener_cuenta(
 async def actualizar_cuenta(
     cuenta_id: str,
     update_data: CuentaUpdate,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = IdempotencyKey,
     service: CuentasService = Depends(get_cuentas_service)
 ):
     """
@@ -121,14 +378,19 @@ async def actualizar_cuenta(
     - **tipo**: Cambiar tipo de cuenta
     - **estado**: Cambiar estado de cuenta
     """
-    cuenta = service.actualizar_cuenta(cuenta_id, update_data)
-    return cuenta_to_response(cuenta)
+    async def _actualizar() -> CuentaResponse:
+        return cuenta_to_response(await service.actualizar_cuenta(cuenta_id, update_data))
+    
+    return await ejecutar_idempotente(request, response, idempotency_key, update_data, _actualizar)
 
 
 @router.post("/{cuenta_id}/depositar", response_model=OperacionResponse)
 async def depositar(
     cuenta_id: str,
     deposito: DepositoRequest,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = IdempotencyKey,
     service: CuentasService = Depends(get_cuentas_service)
 ):
     """
@@ -136,14 +398,23 @@ async def depositar(
     
     - **monto**: Cantidad a depositar (debe ser mayor a 0)
     - **descripcion**: Descripción del depósito
+    
+    Con el header `Idempotency-Key`, un reintento con la misma clave
+    devuelve la respuesta original sin volver a depositar.
     """
-    return service.depositar(cuenta_id, deposito)
+    return await ejecutar_idempotente(
+        request, response, idempotency_key, deposito,
+        lambda: service.depositar(cuenta_id, deposito)
+    )
 
 
 @router.post("/{cuenta_id}/retirar", response_model=OperacionResponse)
 async def retirar(
     cuenta_id: str,
     retiro: RetiroRequest,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = IdempotencyKey,
     service: CuentasService = Depends(get_cuentas_service)
 ):
     """
@@ -152,48 +423,272 @@ async def retirar(
     - **monto**: Cantidad a retirar (debe ser mayor a 0)
     - **descripcion**: Descripción del retiro
     
-    Valida que haya saldo suficiente
+    Valida que haya saldo suficiente. Con el header `Idempotency-Key`, un
+    reintento con la misma clave devuelve la respuesta original sin volver
+    a retirar.
     """
-    return service.retirar(cuenta_id, retiro)
+    return await ejecutar_idempotente(
+        request, response, idempotency_key, retiro,
+        lambda: service.retirar(cuenta_id, retiro)
+    )
 
 
 @router.post("/{cuenta_id}/bloquear", response_model=CuentaResponse)
 async def bloquear_cuenta(
     cuenta_id: str,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = IdempotencyKey,
     service: CuentasService = Depends(get_cuentas_service)
 ):
     """
     Bloquea una cuenta, impidiendo operaciones
     """
-    cuenta = service.bloquear_cuenta(cuenta_id)
-    return cuenta_to_response(cuenta)
+    async def _bloquear() -> CuentaResponse:
+        return cuenta_to_response(await service.bloquear_cuenta(cuenta_id))
+    
+    return await ejecutar_idempotente(request, response, idempotency_key, None, _bloquear)
 
 
 @router.post("/{cuenta_id}/desbloquear", response_model=CuentaResponse)
 async def desbloquear_cuenta(
     cuenta_id: str,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = IdempotencyKey,
     service: CuentasService = Depends(get_cuentas_service)
 ):
     """
     Desbloquea una cuenta previamente bloqueada
     """
-    cuenta = service.desbloquear_cuenta(cuenta_id)
-    return cuenta_to_response(cuenta)
+    async def _desbloquear() -> CuentaResponse:
+        return cuenta_to_response(await service.desbloquear_cuenta(cuenta_id))
+    
+    return await ejecutar_idempotente(request, response, idempotency_key, None, _desbloquear)
+
+
+@router.post("/{cuenta_id}/holds", response_model=HoldResponse, status_code=status.HTTP_201_CREATED)
+async def crear_hold(
+    cuenta_id: str,
+    hold_data: HoldCreate,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = IdempotencyKey,
+    service: CuentasService = Depends(get_cuentas_service)
+):
+    """
+    Reserva fondos de la cuenta (hold)
+    
+    - **monto**: Cantidad a retener (debe ser mayor a 0)
+    - **descripcion**: Descripción de la reserva
+    - **referencia**: Referencia externa opcional (p. ej. el pago o la transferencia)
+    - **duracion_segundos**: Vigencia del hold; al vencer se libera solo
+    
+    El monto retenido deja de estar disponible hasta que el hold se
+    captura (`/capture`), se libera (`/release`) o expira. Con el header
+    `Idempotency-Key`, un reintento devuelve el mismo hold.
+    """
+    async def _crear() -> HoldResponse:
+        return hold_to_response(await service.crear_hold(cuenta_id, hold_data))
+    
+    return await ejecutar_idempotente(request, response, idempotency_key, hold_data, _crear)
+
+
+@router.get("/{cuenta_id}/holds", response_model=List[HoldResponse])
+async def listar_holds(
+    cuenta_id: str,
+    service: CuentasService = Depends(get_cuentas_service)
+):
+    """
+    Lista los holds activos de la cuenta
+    """
+    holds = await service.listar_holds(cuenta_id)
+    return [hold_to_response(hold) for hold in holds]
+
+
+@router.get("/{cuenta_id}/holds/{hold_id}", response_model=HoldResponse)
+async def obtener_hold(
+    cuenta_id: str,
+    hold_id: str,
+    service: CuentasService = Depends(get_cuentas_service)
+):
+    """
+    Obtiene un hold de la cuenta, en cualquier estado
+    """
+    return hold_to_response(await service.obtener_hold(cuenta_id, hold_id))
+
+
+@router.post("/{cuenta_id}/holds/{hold_id}/capture", response_model=OperacionResponse)
+async def capturar_hold(
+    cuenta_id: str,
+    hold_id: str,
+    captura: HoldCapture,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = IdempotencyKey,
+    service: CuentasService = Depends(get_cuentas_service)
+):
+    """
+    Convierte un hold activo en un débito de la cuenta
+    
+    - **monto**: Cantidad a debitar (por defecto todo lo retenido); el resto se libera
+    - **tipo**: Tipo del movimiento (RETIRO, TRANSFERENCIA_SALIDA o PAGO_SERVICIO)
+    - **descripcion**: Descripción del movimiento (por defecto la del hold)
+    
+    Responde 409 si el hold ya no está activo o expiró.
+    """
+    return await ejecutar_idempotente(
+        request, response, idempotency_key, captura,
+        lambda: service.capturar_hold(cuenta_id, hold_id, captura)
+    )
+
+
+@router.post("/{cuenta_id}/holds/{hold_id}/release", response_model=HoldResponse)
+async def liberar_hold(
+    cuenta_id: str,
+    hold_id: str,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = IdempotencyKey,
+    service: CuentasService = Depends(get_cuentas_service)
+):
+    """
+    Libera un hold activo y devuelve su monto al saldo disponible
+    
+    Responde 409 si el hold ya se capturó o expiró.
+    """
+    async def _liberar() -> HoldResponse:
+        return hold_to_response(await service.liberar_hold(cuenta_id, hold_id))
+    
+    return await ejecutar_idempotente(request, response, idempotency_key, None, _liberar)
 
 
 @router.get("/{cuenta_id}/movimientos", response_model=List[MovimientoResponse])
 async def obtener_movimientos(
     cuenta_id: str,
-    limit: int = Query(50, ge=1, le=200, description="Límite de resultados"),
+    request: Request,
+    tipo: Optional[TipoMovimiento] = Query(None, description="Filtrar por tipo de movimiento"),
+    fecha_desde: Optional[datetime] = Query(None, description="Movimientos desde esta fecha"),
+    fecha_hasta: Optional[datetime] = Query(None, description="Movimientos hasta esta fecha"),
+    limit: int = Query(50, ge=1, le=200, description="Límite de resultados por página"),
+    page_token: Optional[str] = Query(None, description="Token de la página siguiente"),
+    service: CuentasService = Depends(get_cuentas_service)
+):
+    """
+    Obtiene el historial de movimientos de una cuenta, del más reciente al más antiguo
+    
+    - **tipo**: Filtrar por tipo (DEPOSITO, RETIRO, TRANSFERENCIA_ENTRADA, ...)
+    - **fecha_desde** / **fecha_hasta**: Rango de fechas (inclusive)
+    - **limit**: Movimientos por página (por defecto 50, máximo 200)
+    - **page_token**: Valor de la cabecera `X-Next-Page-Token` de la respuesta anterior
+    
+    Igual que en el listado de cuentas, la página siguiente se anuncia con
+    las cabeceras `X-Next-Page-Token` y `Link` (rel="next").
+    """
+    filters = MovimientoFilter(
+        tipo=tipo,
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta
+    )
+    
+    movimientos, next_page_token = await service.obtener_movimientos(
+        cuenta_id, filters, limit=limit, page_token=page_token
+    )
+    
+    return respuesta_paginada(request, [movimiento_a_fila(mov) for mov in movimientos], next_page_token)
+
+
+async def _movimientos_ndjson(paginas: AsyncIterator[List[Movimiento]]) -> AsyncIterator[bytes]:
+    """Serializa cada movimiento como una línea JSON"""
+    async for movimientos in paginas:
+        yield b"".join(
+            dumps(movimiento_a_fila(mov)) + b"\n"
+            for mov in movimientos
+        )
+
+
+async def _movimientos_csv(paginas: AsyncIterator[List[Movimiento]]) -> AsyncIterator[str]:
+    """Serializa los movimientos como CSV, una página por bloque"""
+    columnas = list(MovimientoResponse.model_fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    writer.writerow(columnas)
+    yield buffer.getvalue()
+    
+    async for movimientos in paginas:
+        buffer.seek(0)
+        buffer.truncate()
+        for mov in movimientos:
+            fila = movimiento_to_response(mov).model_dump(mode="json")
+            writer.writerow([fila[columna] for columna in columnas])
+        yield buffer.getvalue()
+
+
+@router.get("/{cuenta_id}/movimientos/export")
+async def exportar_movimientos(
+    cuenta_id: str,
+    formato: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="ndjson o csv"),
+    desde: Optional[datetime] = Query(None, description="Movimientos desde esta fecha"),
+    hasta: Optional[datetime] = Query(None, description="Movimientos hasta esta fecha"),
     service: CuentasService = Depends(get_cuentas_service)
 ):
     """
-    Obtiene el historial de movimientos de una cuenta
+    Exporta todos los movimientos de una cuenta (extracto)
+    
+    - **format**: `ndjson` (una línea JSON por movimiento) o `csv`
+    - **desde** / **hasta**: Rango de fechas (inclusive)
     
-    - **limit**: Número máximo de movimientos a retornar (por defecto 50, máximo 200)
+    La respuesta se transmite a medida que se leen las páginas de Firestore,
+    del movimiento más reciente al más antiguo.
     """
-    movimientos = service.obtener_movimientos(cuenta_id, limit=limit)
-    return [movimiento_to_response(mov) for mov in movimientos]
+    filters = MovimientoFilter(fecha_desde=desde, fecha_hasta=hasta)
+    paginas = await service.exportar_movimientos(
+        cuenta_id, filters, page_size=settings.EXPORT_PAGE_SIZE
+    )
+    
+    if formato == "csv":
+        contenido, media_type = _movimientos_csv(paginas), "text/csv"
+    else:
+        contenido, media_type = _movimientos_ndjson(paginas), "application/x-ndjson"
+    
+    return StreamingResponse(
+        contenido,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="movimientos_{cuenta_id}.{formato}"'
+        }
+    )
+
+
+@router.get("/{cuenta_id}/resumen", response_model=ResumenResponse)
+async def obtener_resumen(
+    cuenta_id: str,
+    granularidad: Literal["dia", "mes"] = Query("dia", description="dia o mes"),
+    desde: Optional[date] = Query(None, description="Primer día o mes del rango"),
+    hasta: Optional[date] = Query(None, description="Último día o mes del rango"),
+    limit: int = Query(31, ge=1, le=366, description="Cantidad máxima de periodos"),
+    service: CuentasService = Depends(get_cuentas_service)
+):
+    """
+    Obtiene el resumen de la cuenta por día o por mes, del periodo más reciente al más antiguo
+    
+    - **granularidad**: `dia` o `mes`
+    - **desde** / **hasta**: Rango de fechas (con `mes` se toma el mes de cada fecha)
+    - **limit**: Periodos a devolver (por defecto 31, máximo 366)
+    
+    Cada periodo trae saldo de apertura y de cierre, y los créditos y débitos
+    por tipo de movimiento. Solo aparecen los periodos con movimientos.
+    """
+    resumenes = await service.obtener_resumen(
+        cuenta_id, granularidad, desde=desde, hasta=hasta, limit=limit
+    )
+    
+    return ResumenResponse(
+        cuenta_id=cuenta_id,
+        granularidad=granularidad,
+        items=[resumen_to_response(resumen) for resumen in resumenes]
+    )
 
 
 # Endpoints adicionales para uso interno de otros microservicios
@@ -208,7 +703,7 @@ async def validar_saldo(
     
     Endpoint útil para otros microservicios (transferencias, pagos)
     """
-    tiene_saldo = service.validar_saldo_disponible(cuenta_id, monto)
+    tiene_saldo = await service.validar_saldo_disponible(cuenta_id, monto)
     
     return {
         "cuenta_id": cuenta_id,
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional, Literal
+from typing import Dict, List, Optional, Literal
 from datetime import datetime
 from app.models import TipoCuenta, Moneda, EstadoCuenta, TipoMovimiento
 
@@ -33,6 +33,8 @@ class CuentaResponse(BaseModel):
     tipo: str
     moneda: str
     saldo: float
+    saldo_retenido: float = 0.0
+    saldo_disponible: Optional[float] = None
     estado: str
     fecha_apertura: datetime
     created_at: datetime
@@ -42,6 +44,15 @@ class CuentaResponse(BaseModel):
         from_attributes = True
 
 
+class CuentaLookupRequest(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=500)
+
+
+class CuentaLookupResponse(BaseModel):
+    items: List[CuentaResponse]
+    no_encontradas: List[str] = []
+
+
 # Schemas para Operaciones
 class DepositoRequest(BaseModel):
     monto: float = Field(gt=0)
@@ -71,20 +82,135 @@ class OperacionResponse(BaseModel):
     success: bool
     mensaje: str
     cuenta_id: str
-    saldo_anterior: float
-    saldo_nuevo: float
+    # Sin valor en los créditos a cuentas fraccionadas (ver Movimiento)
+    saldo_anterior: Optional[float] = None
+    saldo_nuevo: Optional[float] = None
+    monto: float
+    movimiento_id: Optional[str] = None
+
+
+# Schemas para transferencias entre cuentas (uso interno de transferencias-service)
+class TransferenciaRequest(BaseModel):
+    cuenta_origen_id: str = Field(min_length=1)
+    cuenta_destino_id: str = Field(min_length=1)
+    monto: float = Field(gt=0)
+    # Sin descripción se usa "Transferencia enviada" / "Transferencia recibida"
+    descripcion: Optional[str] = Field(None, min_length=1, max_length=255)
+    # Identifica la transferencia: repetirla devuelve la ya aplicada (es un ID de documento)
+    referencia: Optional[str] = Field(None, min_length=1, max_length=255, pattern=r"^[^/]+$")
+    # Si viene, la cuenta origen tiene que pertenecer a este cliente
+    cliente_id: Optional[str] = None
+
+    @validator('monto')
+    def validar_monto(cls, v):
+        if v > 1000000:
+            raise ValueError('El monto excede el límite permitido')
+        return round(v, 2)
+
+
+class TransferenciaResponse(BaseModel):
+    success: bool
+    mensaje: str
+    monto: float
+    referencia: Optional[str] = None
+    origen: OperacionResponse
+    destino: OperacionResponse
+
+
+class TransferenciaResolucionResponse(BaseModel):
+    referencia: str
+    # APLICADA: se confirmó (viene la transferencia); ANULADA: no se aplicó y ya no se aplicará
+    estado: Literal["APLICADA", "ANULADA"]
+    transferencia: Optional[TransferenciaResponse] = None
+
+
+# Schemas para holds (reservas de fondos)
+class HoldCreate(BaseModel):
+    monto: float = Field(gt=0)
+    descripcion: str = Field(min_length=1, max_length=255)
+    referencia: Optional[str] = Field(None, max_length=255)
+    duracion_segundos: Optional[int] = Field(None, gt=0)
+
+    @validator('monto')
+    def validar_monto(cls, v):
+        if v > 1000000:
+            raise ValueError('El monto excede el límite permitido')
+        return round(v, 2)
+
+
+class HoldCapture(BaseModel):
+    # Sin monto se captura todo lo retenido; el resto de un monto menor se libera
+    monto: Optional[float] = Field(None, gt=0)
+    tipo: Literal["RETIRO", "TRANSFERENCIA_SALIDA", "PAGO_SERVICIO"] = "RETIRO"
+    descripcion: Optional[str] = Field(None, min_length=1, max_length=255)
+
+    @validator('monto')
+    def validar_monto(cls, v):
+        return round(v, 2) if v is not None else v
+
+
+class HoldResponse(BaseModel):
+    id: str
+    cuenta_id: str
+    monto: float
+    descripcion: str
+    referencia: Optional[str] = None
+    estado: str
+    expira_en: datetime
+    monto_capturado: Optional[float] = None
+    movimiento_id: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+# Schemas para operaciones en lote
+class OperacionLoteItem(BaseModel):
+    cuenta_id: str
+    tipo: Literal["DEPOSITO", "RETIRO"]
+    monto: float = Field(gt=0)
+    descripcion: str = Field(min_length=1, max_length=255)
+    referencia: Optional[str] = None
+
+    @validator('monto')
+    def validar_monto(cls, v):
+        if v > 1000000:
+            raise ValueError('El monto excede el límite permitido')
+        return round(v, 2)
+
+
+class OperacionLoteRequest(BaseModel):
+    operaciones: List[OperacionLoteItem] = Field(min_length=1)
+
+
+class OperacionLoteResultado(BaseModel):
+    indice: int
+    cuenta_id: str
+    success: bool
+    mensaje: str
     monto: float
+    saldo_anterior: Optional[float] = None
+    saldo_nuevo: Optional[float] = None
     movimiento_id: Optional[str] = None
 
 
+class OperacionLoteResponse(BaseModel):
+    total: int
+    exitosas: int
+    fallidas: int
+    lotes: int
+    duracion_ms: float
+    operaciones_por_segundo: float
+    resultados: List[OperacionLoteResultado]
+
+
 # Schemas para Movimiento
 class MovimientoResponse(BaseModel):
     id: str
     cuenta_id: str
     tipo: str
     monto: float
-    saldo_anterior: float
-    saldo_nuevo: float
+    saldo_anterior: Optional[float] = None
+    saldo_nuevo: Optional[float] = None
     descripcion: str
     referencia: Optional[str] = None
     fecha: datetime
@@ -93,6 +219,45 @@ class MovimientoResponse(BaseModel):
         from_attributes = True
 
 
+class ResumenPeriodoResponse(BaseModel):
+    periodo: str
+    # None si el periodo tiene movimientos de una cuenta fraccionada
+    saldo_apertura: Optional[float] = None
+    saldo_cierre: Optional[float] = None
+    creditos: Dict[str, float]
+    debitos: Dict[str, float]
+    total_creditos: float
+    total_debitos: float
+    cantidad_movimientos: int
+
+
+class ResumenResponse(BaseModel):
+    cuenta_id: str
+    granularidad: str
+    items: List[ResumenPeriodoResponse]
+
+
+# Schemas para el feed de eventos
+class EventoCuentaResponse(BaseModel):
+    secuencia: int
+    id: str
+    evento: str
+    cuenta_id: str
+    movimiento_id: str
+    tipo: str
+    monto: float
+    saldo_anterior: Optional[float] = None
+    saldo_nuevo: Optional[float] = None
+    fecha: datetime
+    created_at: datetime
+
+
+class EventosResponse(BaseModel):
+    items: List[EventoCuentaResponse]
+    ultima_secuencia: int
+    incompleto: bool = False
+
+
 # Schemas para consultas
 class CuentaFilter(BaseModel):
     cliente_id: Optional[str] = None
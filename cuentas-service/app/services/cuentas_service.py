@@ -1,20 +1,28 @@
-from typing import List, Optional
-from datetime import datetime
-from app.models import Cuenta, Movimiento, EstadoCuenta, TipoMovimiento
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from app.config import settings
+from app.models import Cuenta, Movimiento, EstadoCuenta, TipoMovimiento, ResumenPeriodo, Hold, EstadoHold
 from app.schemas import (
     CuentaCreate, CuentaUpdate, CuentaFilter,
     DepositoRequest, RetiroRequest, OperacionResponse,
-    MovimientoFilter
+    TransferenciaRequest, TransferenciaResponse, TransferenciaResolucionResponse,
+    MovimientoFilter, OperacionLoteItem, OperacionLoteRequest,
+    OperacionLoteResultado, OperacionLoteResponse,
+    HoldCreate, HoldCapture
 )
-from app.repos.cuentas_repo import CuentasRepository
+from app.repos.interfaz import RESUMENES, RepositorioCuentas, TransferenciaAnulada
+from app.repos.limites_diarios import LimiteDiarioExcedido
+from app.repos.numeros_cuenta import IndiceNumerosPendiente
+from app.pagination import decode_page_token, encode_page_token
 from fastapi import HTTPException, status
+import time
 
 
 class CuentasService:
-    def __init__(self, repo: CuentasRepository):
+    def __init__(self, repo: RepositorioCuentas):
         self.repo = repo
 
-    def crear_cuenta(self, cuenta_data: CuentaCreate) -> Cuenta:
+    async def crear_cuenta(self, cuenta_data: CuentaCreate) -> Cuenta:
         """Crea una nueva cuenta bancaria"""
         nueva_cuenta = Cuenta(
             cliente_id=cuenta_data.cliente_id,
@@ -26,8 +34,14 @@ class CuentasService:
             fecha_apertura=datetime.now()
         )
         
-        cuenta_id = self.repo.create(nueva_cuenta)
-        cuenta_creada = self.repo.get_by_id(cuenta_id)
+        try:
+            cuenta_id = await self.repo.create(nueva_cuenta)
+        except IndiceNumerosPendiente as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e)
+            )
+        cuenta_creada = await self.repo.get_by_id(cuenta_id)
         
         # Registrar movimiento inicial si hay saldo
         if cuenta_data.saldo_inicial > 0:
@@ -39,13 +53,17 @@ class CuentasService:
                 saldo_nuevo=cuenta_data.saldo_inicial,
                 descripcion="Depósito inicial - Apertura de cuenta"
             )
-            self.repo.crear_movimiento(movimiento)
+            await self.repo.crear_movimiento(movimiento)
         
         return cuenta_creada
 
-    def obtener_cuenta(self, cuenta_id: str) -> Cuenta:
-        """Obtiene una cuenta por ID"""
-        cuenta = self.repo.get_by_id(cuenta_id)
+    async def obtener_cuenta(self, cuenta_id: str, use_cache: bool = True) -> Cuenta:
+        """
+        Obtiene una cuenta por ID
+        
+        Las validaciones de saldo usan use_cache=False para leer el saldo vigente.
+        """
+        cuenta = await self.repo.get_by_id(cuenta_id, use_cache=use_cache)
         
         if not cuenta:
             raise HTTPException(
@@ -55,109 +73,366 @@ class CuentasService:
         
         return cuenta
 
-    def listar_cuentas(self, filters: Optional[CuentaFilter] = None) -> List[Cuenta]:
-        """Lista todas las cuentas con filtros opcionales"""
-        return self.repo.list(filters)
+    async def listar_cuentas(
+        self,
+        filters: Optional[CuentaFilter] = None,
+        page_size: int = 50,
+        page_token: Optional[str] = None
+    ) -> Tuple[List[Cuenta], Optional[str]]:
+        """Lista una página de cuentas con filtros opcionales"""
+        try:
+            cursor = decode_page_token(page_token)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        
+        cuentas, ultimo_id = await self.repo.list_page(
+            filters,
+            page_size=page_size,
+            start_after=cursor.get("id") if cursor else None
+        )
+        
+        next_page_token = encode_page_token({"id": ultimo_id}) if ultimo_id else None
+        return cuentas, next_page_token
+
+    async def obtener_cuentas(self, cuenta_ids: List[str]) -> Tuple[List[Cuenta], List[str]]:
+        """
+        Obtiene varias cuentas en una sola lectura
+        
+        Retorna las cuentas encontradas en el orden pedido (sin duplicados)
+        y los IDs que no existen.
+        """
+        encontradas = await self.repo.get_many(cuenta_ids)
+        
+        cuentas = []
+        no_encontradas = []
+        for cuenta_id in dict.fromkeys(cuenta_ids):
+            cuenta = encontradas.get(cuenta_id)
+            if cuenta:
+                cuentas.append(cuenta)
+            else:
+                no_encontradas.append(cuenta_id)
+        
+        return cuentas, no_encontradas
 
-    def actualizar_cuenta(self, cuenta_id: str, update_data: CuentaUpdate) -> Cuenta:
+    async def actualizar_cuenta(self, cuenta_id: str, update_data: CuentaUpdate) -> Cuenta:
         """Actualiza los datos de una cuenta"""
-        cuenta = self.obtener_cuenta(cuenta_id)
+        cuenta = await self.obtener_cuenta(cuenta_id)
         
         update_dict = update_data.model_dump(exclude_unset=True)
         
         if update_dict:
-            self.repo.update(cuenta_id, update_dict)
+            await self.repo.update(cuenta_id, update_dict)
         
-        return self.repo.get_by_id(cuenta_id)
+        return await self.repo.get_by_id(cuenta_id)
 
-    def depositar(self, cuenta_id: str, deposito: DepositoRequest) -> OperacionResponse:
-        """Realiza un depósito en la cuenta"""
-        cuenta = self.obtener_cuenta(cuenta_id)
-        
-        # Validar estado de la cuenta
-        if cuenta.estado != EstadoCuenta.ACTIVA:
+    async def _aplicar_movimiento(
+        self,
+        cuenta_id: str,
+        tipo_movimiento: TipoMovimiento,
+        monto: float,
+        descripcion: str,
+        mensaje: str,
+        debito: bool,
+        validar: Callable[[Cuenta], None]
+    ) -> OperacionResponse:
+        """Aplica un movimiento de forma transaccional y arma la respuesta"""
+        try:
+            movimiento = await self.repo.aplicar_movimiento(
+                cuenta_id,
+                tipo_movimiento,
+                monto,
+                descripcion,
+                debito=debito,
+                validar=validar
+            )
+        except LimiteDiarioExcedido as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"La cuenta está {cuenta.estado}. No se pueden realizar depósitos."
+                detail=str(e)
             )
         
-        saldo_anterior = cuenta.saldo
-        saldo_nuevo = saldo_anterior + deposito.monto
-        
-        # Actualizar saldo
-        self.repo.update_saldo(cuenta_id, saldo_nuevo)
-        
-        # Registrar movimiento
-        movimiento = Movimiento(
-            cuenta_id=cuenta_id,
-            tipo=TipoMovimiento.DEPOSITO,
-            monto=deposito.monto,
-            saldo_anterior=saldo_anterior,
-            saldo_nuevo=saldo_nuevo,
-            descripcion=deposito.descripcion
-        )
-        
-        movimiento_id = self.repo.crear_movimiento(movimiento)
+        if not movimiento:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Cuenta con ID {cuenta_id} no encontrada"
+            )
         
         return OperacionResponse(
             success=True,
-            mensaje="Depósito realizado exitosamente",
+            mensaje=mensaje,
             cuenta_id=cuenta_id,
-            saldo_anterior=saldo_anterior,
-            saldo_nuevo=saldo_nuevo,
-            monto=deposito.monto,
-            movimiento_id=movimiento_id
+            saldo_anterior=movimiento.saldo_anterior,
+            saldo_nuevo=movimiento.saldo_nuevo,
+            monto=monto,
+            movimiento_id=movimiento.id
         )
 
-    def retirar(self, cuenta_id: str, retiro: RetiroRequest) -> OperacionResponse:
+    async def depositar(self, cuenta_id: str, deposito: DepositoRequest) -> OperacionResponse:
+        """Realiza un depósito en la cuenta"""
+        def validar(cuenta: Cuenta):
+            # Validar estado de la cuenta
+            if cuenta.estado != EstadoCuenta.ACTIVA:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"La cuenta está {cuenta.estado}. No se pueden realizar depósitos."
+                )
+        
+        return await self._aplicar_movimiento(
+            cuenta_id,
+            TipoMovimiento.DEPOSITO,
+            deposito.monto,
+            deposito.descripcion,
+            mensaje="Depósito realizado exitosamente",
+            debito=False,
+            validar=validar
+        )
+
+    async def retirar(self, cuenta_id: str, retiro: RetiroRequest) -> OperacionResponse:
         """Realiza un retiro de la cuenta"""
-        cuenta = self.obtener_cuenta(cuenta_id)
-        
-        # Validar estado de la cuenta
-        if cuenta.estado != EstadoCuenta.ACTIVA:
+        def validar(cuenta: Cuenta):
+            # Validar estado de la cuenta
+            if cuenta.estado != EstadoCuenta.ACTIVA:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"La cuenta está {cuenta.estado}. No se pueden realizar retiros."
+                )
+            
+            # Validar saldo suficiente (lo retenido por holds no se puede retirar)
+            if cuenta.saldo_disponible < retiro.monto:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Saldo insuficiente. Saldo disponible: {cuenta.saldo_disponible} {cuenta.moneda}"
+                )
+        
+        return await self._aplicar_movimiento(
+            cuenta_id,
+            TipoMovimiento.RETIRO,
+            retiro.monto,
+            retiro.descripcion,
+            mensaje="Retiro realizado exitosamente",
+            debito=True,
+            validar=validar
+        )
+
+    async def aplicar_lote(self, lote: OperacionLoteRequest) -> OperacionLoteResponse:
+        """
+        Aplica un lote de depósitos y retiros (planillas, liquidaciones)
+        
+        Cada operación se valida por separado: una cuenta inactiva o sin
+        saldo solo rechaza esa operación, no el lote.
+        """
+        operaciones = lote.operaciones
+        if len(operaciones) > settings.LOTE_MAX_OPERACIONES:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"La cuenta está {cuenta.estado}. No se pueden realizar retiros."
+                detail=f"El lote excede el máximo de {settings.LOTE_MAX_OPERACIONES} operaciones"
             )
         
-        # Validar saldo suficiente
-        if cuenta.saldo < retiro.monto:
+        def validar(cuenta: Cuenta, operacion: OperacionLoteItem):
+            if cuenta.estado != EstadoCuenta.ACTIVA:
+                raise ValueError(f"La cuenta está {cuenta.estado}")
+            if operacion.tipo == TipoMovimiento.RETIRO.value and cuenta.saldo_disponible < operacion.monto:
+                raise ValueError(f"Saldo insuficiente. Saldo disponible: {cuenta.saldo_disponible} {cuenta.moneda}")
+        
+        inicio = time.perf_counter()
+        resultados, lotes = await self.repo.aplicar_lote(operaciones, validar)
+        duracion = time.perf_counter() - inicio
+        
+        items = []
+        for indice, (operacion, (movimiento, error)) in enumerate(zip(operaciones, resultados)):
+            items.append(OperacionLoteResultado(
+                indice=indice,
+                cuenta_id=operacion.cuenta_id,
+                success=movimiento is not None,
+                mensaje=error or "Operación realizada exitosamente",
+                monto=operacion.monto,
+                saldo_anterior=movimiento.saldo_anterior if movimiento else None,
+                saldo_nuevo=movimiento.saldo_nuevo if movimiento else None,
+                movimiento_id=movimiento.id if movimiento else None
+            ))
+        
+        exitosas = sum(1 for item in items if item.success)
+        return OperacionLoteResponse(
+            total=len(items),
+            exitosas=exitosas,
+            fallidas=len(items) - exitosas,
+            lotes=lotes,
+            duracion_ms=round(duracion * 1000, 2),
+            operaciones_por_segundo=round(len(items) / duracion, 2) if duracion > 0 else 0.0,
+            resultados=items
+        )
+
+    async def crear_hold(self, cuenta_id: str, hold_data: HoldCreate) -> Hold:
+        """
+        Reserva fondos de la cuenta hasta que el hold se captura, se libera o expira
+        
+        El monto retenido deja de estar disponible para retiros y otros
+        holds, pero sigue siendo parte del saldo.
+        """
+        duracion = hold_data.duracion_segundos or settings.HOLD_DURACION_DEFECTO
+        if duracion > settings.HOLD_DURACION_MAXIMA:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Saldo insuficiente. Saldo disponible: {cuenta.saldo} {cuenta.moneda}"
+                detail=f"La duración del hold no puede superar {settings.HOLD_DURACION_MAXIMA} segundos"
             )
         
-        saldo_anterior = cuenta.saldo
-        saldo_nuevo = saldo_anterior - retiro.monto
-        
-        # Actualizar saldo
-        self.repo.update_saldo(cuenta_id, saldo_nuevo)
-        
-        # Registrar movimiento
-        movimiento = Movimiento(
+        def validar(cuenta: Cuenta):
+            if cuenta.estado != EstadoCuenta.ACTIVA:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"La cuenta está {cuenta.estado}. No se pueden retener fondos."
+                )
+            
+            if cuenta.saldo_disponible < hold_data.monto:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Saldo insuficiente. Saldo disponible: {cuenta.saldo_disponible} {cuenta.moneda}"
+                )
+        
+        ahora = datetime.now()
+        hold = Hold(
             cuenta_id=cuenta_id,
-            tipo=TipoMovimiento.RETIRO,
-            monto=retiro.monto,
-            saldo_anterior=saldo_anterior,
-            saldo_nuevo=saldo_nuevo,
-            descripcion=retiro.descripcion
+            monto=hold_data.monto,
+            descripcion=hold_data.descripcion,
+            referencia=hold_data.referencia,
+            estado=EstadoHold.ACTIVO,
+            expira_en=ahora + timedelta(seconds=duracion),
+            created_at=ahora,
+            updated_at=ahora
         )
         
-        movimiento_id = self.repo.crear_movimiento(movimiento)
+        hold_creado = await self.repo.crear_hold(hold, validar)
+        if not hold_creado:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Cuenta con ID {cuenta_id} no encontrada"
+            )
+        
+        return hold_creado
+
+    async def obtener_hold(self, cuenta_id: str, hold_id: str) -> Hold:
+        """Obtiene un hold de la cuenta"""
+        hold = await self.repo.get_hold(hold_id)
+        
+        if not hold or hold.cuenta_id != cuenta_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Hold con ID {hold_id} no encontrado"
+            )
+        
+        return hold
+
+    async def listar_holds(self, cuenta_id: str) -> List[Hold]:
+        """Holds activos de la cuenta"""
+        await self.obtener_cuenta(cuenta_id)
+        return await self.repo.get_holds_activos(cuenta_id)
+
+    async def capturar_hold(self, cuenta_id: str, hold_id: str, captura: HoldCapture) -> OperacionResponse:
+        """
+        Convierte un hold en un débito de la cuenta
+        
+        Se puede capturar todo el monto retenido o una parte; lo que no se
+        captura se libera en la misma transacción.
+        """
+        def validar(cuenta: Cuenta, hold: Hold, monto: float):
+            if hold.estado != EstadoHold.ACTIVO.value:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"El hold está {hold.estado}"
+                )
+            
+            if monto > hold.monto:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"El monto a capturar excede el monto retenido ({hold.monto})"
+                )
+            
+            if cuenta.estado != EstadoCuenta.ACTIVA:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"La cuenta está {cuenta.estado}. No se pueden realizar débitos."
+                )
+            
+            # El monto del hold ya estaba apartado: cuenta como disponible para esta captura
+            if round(cuenta.saldo_disponible + hold.monto, 2) < monto:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Saldo insuficiente"
+                )
+        
+        try:
+            hold, movimiento = await self.repo.capturar_hold(
+                cuenta_id,
+                hold_id,
+                TipoMovimiento(captura.tipo),
+                captura.descripcion,
+                captura.monto,
+                validar
+            )
+        except LimiteDiarioExcedido as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        
+        if not hold:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Hold con ID {hold_id} no encontrado"
+            )
+        
+        if not movimiento:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="El hold expiró"
+            )
         
         return OperacionResponse(
             success=True,
-            mensaje="Retiro realizado exitosamente",
+            mensaje="Hold capturado exitosamente",
             cuenta_id=cuenta_id,
-            saldo_anterior=saldo_anterior,
-            saldo_nuevo=saldo_nuevo,
-            monto=retiro.monto,
-            movimiento_id=movimiento_id
+            saldo_anterior=movimiento.saldo_anterior,
+            saldo_nuevo=movimiento.saldo_nuevo,
+            monto=movimiento.monto,
+            movimiento_id=movimiento.id
         )
 
-    def bloquear_cuenta(self, cuenta_id: str) -> Cuenta:
+    async def liberar_hold(self, cuenta_id: str, hold_id: str) -> Hold:
+        """Libera un hold activo y devuelve su monto al saldo disponible"""
+        hold = await self.repo.liberar_hold(cuenta_id, hold_id)
+        
+        if not hold:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Hold con ID {hold_id} no encontrado"
+            )
+        
+        if hold.estado != EstadoHold.LIBERADO.value:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"El hold está {hold.estado}"
+            )
+        
+        return hold
+
+    async def holds_vencidos(self, limit: int = 100) -> List[Hold]:
+        """Holds activos con el vencimiento cumplido (para el barrido)"""
+        return await self.repo.get_holds_vencidos(datetime.now(), limit)
+
+    async def expirar_hold(self, hold: Hold) -> Optional[Hold]:
+        """Marca un hold vencido como EXPIRADO y libera su monto"""
+        return await self.repo.liberar_hold(hold.cuenta_id, hold.id, estado=EstadoHold.EXPIRADO)
+
+    async def cerrar_hold_huerfano(self, hold: Hold) -> Optional[Hold]:
+        """Marca EXPIRADO un hold activo cuya cuenta ya no existe"""
+        return await self.repo.cerrar_hold_huerfano(hold.cuenta_id, hold.id, estado=EstadoHold.EXPIRADO)
+
+    async def bloquear_cuenta(self, cuenta_id: str) -> Cuenta:
         """Bloquea una cuenta"""
-        cuenta = self.obtener_cuenta(cuenta_id)
+        cuenta = await self.obtener_cuenta(cuenta_id)
         
         if cuenta.estado == EstadoCuenta.BLOQUEADA:
             raise HTTPException(
@@ -165,12 +440,12 @@ class CuentasService:
                 detail="La cuenta ya está bloqueada"
             )
         
-        self.repo.cambiar_estado(cuenta_id, EstadoCuenta.BLOQUEADA)
-        return self.repo.get_by_id(cuenta_id)
+        await self.repo.cambiar_estado(cuenta_id, EstadoCuenta.BLOQUEADA)
+        return await self.repo.get_by_id(cuenta_id)
 
-    def desbloquear_cuenta(self, cuenta_id: str) -> Cuenta:
+    async def desbloquear_cuenta(self, cuenta_id: str) -> Cuenta:
         """Desbloquea una cuenta"""
-        cuenta = self.obtener_cuenta(cuenta_id)
+        cuenta = await self.obtener_cuenta(cuenta_id)
         
         if cuenta.estado != EstadoCuenta.BLOQUEADA:
             raise HTTPException(
@@ -178,31 +453,132 @@ class CuentasService:
                 detail="La cuenta no está bloqueada"
             )
         
-        self.repo.cambiar_estado(cuenta_id, EstadoCuenta.ACTIVA)
-        return self.repo.get_by_id(cuenta_id)
+        await self.repo.cambiar_estado(cuenta_id, EstadoCuenta.ACTIVA)
+        return await self.repo.get_by_id(cuenta_id)
+
+    @staticmethod
+    def _validar_rango_fechas(filters: Optional[MovimientoFilter]) -> None:
+        """Rechaza un filtro de movimientos con fecha_desde posterior a fecha_hasta"""
+        if filters and filters.fecha_desde and filters.fecha_hasta \
+                and filters.fecha_desde > filters.fecha_hasta:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="fecha_desde no puede ser posterior a fecha_hasta"
+            )
 
-    def obtener_movimientos(
+    async def obtener_movimientos(
         self, 
         cuenta_id: str, 
         filters: Optional[MovimientoFilter] = None,
-        limit: int = 50
-    ) -> List[Movimiento]:
-        """Obtiene el historial de movimientos de una cuenta"""
+        limit: int = 50,
+        page_token: Optional[str] = None
+    ) -> Tuple[List[Movimiento], Optional[str]]:
+        """Obtiene una página del historial de movimientos de una cuenta"""
+        self._validar_rango_fechas(filters)
+        
+        try:
+            cursor = decode_page_token(page_token)
+            start_after = (datetime.fromisoformat(cursor["fecha"]), cursor["id"]) if cursor else None
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Token de página inválido"
+            )
+        
         # Validar que la cuenta existe
-        self.obtener_cuenta(cuenta_id)
+        await self.obtener_cuenta(cuenta_id)
+        
+        movimientos, ultimo = await self.repo.get_movimientos_page(
+            cuenta_id, filters, page_size=limit, start_after=start_after
+        )
         
-        return self.repo.get_movimientos(cuenta_id, filters, limit)
+        next_page_token = None
+        if ultimo:
+            next_page_token = encode_page_token({
+                "fecha": ultimo.fecha.isoformat(),
+                "id": ultimo.id
+            })
+        return movimientos, next_page_token
 
-    def validar_saldo_disponible(self, cuenta_id: str, monto: float) -> bool:
+    async def exportar_movimientos(
+        self,
+        cuenta_id: str,
+        filters: Optional[MovimientoFilter] = None,
+        page_size: int = 500
+    ) -> AsyncIterator[List[Movimiento]]:
+        """
+        Prepara la exportación de todos los movimientos de una cuenta
+        
+        Valida la cuenta de inmediato (para responder 404 antes de empezar
+        a transmitir) y retorna un generador que lee una página por vez,
+        de modo que la memoria usada no depende del total de movimientos.
+        """
+        self._validar_rango_fechas(filters)
+        await self.obtener_cuenta(cuenta_id)
+        return self._paginas_movimientos(cuenta_id, filters, page_size)
+
+    async def _paginas_movimientos(
+        self,
+        cuenta_id: str,
+        filters: Optional[MovimientoFilter],
+        page_size: int
+    ) -> AsyncIterator[List[Movimiento]]:
+        """Recorre los movimientos página por página siguiendo el cursor"""
+        start_after = None
+        
+        while True:
+            movimientos, ultimo = await self.repo.get_movimientos_page(
+                cuenta_id, filters, page_size=page_size, start_after=start_after
+            )
+            if movimientos:
+                yield movimientos
+            if not ultimo:
+                break
+            start_after = (ultimo.fecha, ultimo.id)
+
+    async def obtener_resumen(
+        self,
+        cuenta_id: str,
+        granularidad: str = "dia",
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None,
+        limit: int = 31
+    ) -> List[ResumenPeriodo]:
+        """
+        Obtiene el resumen por día o por mes de una cuenta
+        
+        Lee los documentos de resumen que se mantienen con cada movimiento
+        (uno por periodo, o uno por shard en una cuenta fraccionada), del
+        periodo más reciente al más antiguo.
+        """
+        if desde and hasta and desde > hasta:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="desde no puede ser posterior a hasta"
+            )
+        
+        # Validar que la cuenta existe
+        await self.obtener_cuenta(cuenta_id)
+        
+        _, formato = RESUMENES[granularidad]
+        return await self.repo.get_resumenes(
+            cuenta_id,
+            granularidad,
+            desde=desde.strftime(formato) if desde else None,
+            hasta=hasta.strftime(formato) if hasta else None,
+            limit=limit
+        )
+
+    async def validar_saldo_disponible(self, cuenta_id: str, monto: float) -> bool:
         """Valida si hay saldo suficiente (útil para otros servicios)"""
-        cuenta = self.obtener_cuenta(cuenta_id)
+        cuenta = await self.obtener_cuenta(cuenta_id, use_cache=False)
         
         if cuenta.estado != EstadoCuenta.ACTIVA:
             return False
         
-        return cuenta.saldo >= monto
+        return cuenta.saldo_disponible >= monto
 
-    def descontar_saldo(
+    async def descontar_saldo(
         self, 
         cuenta_id: str, 
         monto: float, 
@@ -210,47 +586,30 @@ class CuentasService:
         tipo_movimiento: TipoMovimiento = TipoMovimiento.RETIRO
     ) -> OperacionResponse:
         """Descuenta saldo (usado por otros servicios como transferencias/pagos)"""
-        cuenta = self.obtener_cuenta(cuenta_id)
-        
-        if cuenta.estado != EstadoCuenta.ACTIVA:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="La cuenta no está activa"
-            )
-        
-        if cuenta.saldo < monto:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Saldo insuficiente"
-            )
-        
-        saldo_anterior = cuenta.saldo
-        saldo_nuevo = saldo_anterior - monto
-        
-        self.repo.update_saldo(cuenta_id, saldo_nuevo)
-        
-        movimiento = Movimiento(
-            cuenta_id=cuenta_id,
-            tipo=tipo_movimiento,
-            monto=monto,
-            saldo_anterior=saldo_anterior,
-            saldo_nuevo=saldo_nuevo,
-            descripcion=descripcion
-        )
-        
-        movimiento_id = self.repo.crear_movimiento(movimiento)
-        
-        return OperacionResponse(
-            success=True,
+        def validar(cuenta: Cuenta):
+            if cuenta.estado != EstadoCuenta.ACTIVA:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="La cuenta no está activa"
+                )
+            
+            if cuenta.saldo_disponible < monto:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Saldo insuficiente"
+                )
+        
+        return await self._aplicar_movimiento(
+            cuenta_id,
+            tipo_movimiento,
+            monto,
+            descripcion,
             mensaje="Descuento realizado exitosamente",
-            cuenta_id=cuenta_id,
-            saldo_anterior=saldo_anterior,
-            saldo_nuevo=saldo_nuevo,
-            monto=monto,
-            movimiento_id=movimiento_id
+            debito=True,
+            validar=validar
         )
 
-    def acreditar_saldo(
+    async def acreditar_saldo(
         self, 
         cuenta_id: str, 
         monto: float, 
@@ -258,36 +617,134 @@ class CuentasService:
         tipo_movimiento: TipoMovimiento = TipoMovimiento.DEPOSITO
     ) -> OperacionResponse:
         """Acredita saldo (usado por otros servicios como transferencias)"""
-        cuenta = self.obtener_cuenta(cuenta_id)
-        
-        if cuenta.estado != EstadoCuenta.ACTIVA:
+        def validar(cuenta: Cuenta):
+            if cuenta.estado != EstadoCuenta.ACTIVA:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="La cuenta no está activa"
+                )
+        
+        return await self._aplicar_movimiento(
+            cuenta_id,
+            tipo_movimiento,
+            monto,
+            descripcion,
+            mensaje="Acreditación realizada exitosamente",
+            debito=False,
+            validar=validar
+        )
+
+    async def transferir(self, transferencia: TransferenciaRequest) -> TransferenciaResponse:
+        """
+        Transfiere entre dos cuentas en una sola transacción (usado por transferencias)
+        
+        Débito, crédito y los dos movimientos se confirman juntos: si algo
+        falla no queda ninguna de las dos cuentas modificada.
+        """
+        origen_id = transferencia.cuenta_origen_id
+        destino_id = transferencia.cuenta_destino_id
+        monto = transferencia.monto
+        
+        if origen_id == destino_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="La cuenta no está activa"
+                detail="La cuenta origen y la cuenta destino deben ser distintas"
             )
         
-        saldo_anterior = cuenta.saldo
-        saldo_nuevo = saldo_anterior + monto
+        def validar(origen: Cuenta, destino: Cuenta):
+            if transferencia.cliente_id is not None and origen.cliente_id != transferencia.cliente_id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="La cuenta origen no pertenece al cliente"
+                )
+            
+            for cuenta in (origen, destino):
+                if cuenta.estado != EstadoCuenta.ACTIVA:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"La cuenta {cuenta.id} está {cuenta.estado}. No se pueden realizar transferencias."
+                    )
+            
+            if origen.moneda != destino.moneda:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Las cuentas tienen monedas distintas ({origen.moneda} y {destino.moneda})"
+                )
+            
+            # Lo retenido por holds no se puede transferir
+            if origen.saldo_disponible < monto:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Saldo insuficiente. Saldo disponible: {origen.saldo_disponible} {origen.moneda}"
+                )
+        
+        try:
+            movimientos = await self.repo.transferir(
+                origen_id,
+                destino_id,
+                monto,
+                (transferencia.descripcion or "Transferencia enviada", transferencia.descripcion or "Transferencia recibida"),
+                referencia=transferencia.referencia,
+                validar=validar
+            )
+        except TransferenciaAnulada as e:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=str(e)
+            )
         
-        self.repo.update_saldo(cuenta_id, saldo_nuevo)
+        if not movimientos:
+            # Solo en el error se vuelve a leer, para informar cuál falta
+            encontradas = await self.repo.get_many([origen_id, destino_id], use_cache=False)
+            faltante = origen_id if origen_id not in encontradas else destino_id
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Cuenta con ID {faltante} no encontrada"
+            )
         
-        movimiento = Movimiento(
-            cuenta_id=cuenta_id,
-            tipo=tipo_movimiento,
-            monto=monto,
-            saldo_anterior=saldo_anterior,
-            saldo_nuevo=saldo_nuevo,
-            descripcion=descripcion
+        return self._transferencia_response(transferencia.referencia, *movimientos)
+    
+    async def resolver_transferencia(self, referencia: str) -> TransferenciaResolucionResponse:
+        """
+        Resultado definitivo de una transferencia cuyo resultado no se supo
+        
+        APLICADA con la transferencia original, o ANULADA: no se aplicó y
+        un POST /transferir con esa referencia ya no la aplica (409).
+        """
+        movimientos = await self.repo.resolver_transferencia(referencia)
+        if movimientos is None:
+            return TransferenciaResolucionResponse(referencia=referencia, estado="ANULADA")
+        return TransferenciaResolucionResponse(
+            referencia=referencia,
+            estado="APLICADA",
+            transferencia=self._transferencia_response(referencia, *movimientos)
         )
-        
-        movimiento_id = self.repo.crear_movimiento(movimiento)
-        
-        return OperacionResponse(
+    
+    def _transferencia_response(
+        self, referencia: Optional[str], salida: Movimiento, entrada: Movimiento
+    ) -> TransferenciaResponse:
+        """Respuesta de una transferencia a partir de sus dos movimientos"""
+        return TransferenciaResponse(
             success=True,
-            mensaje="Acreditación realizada exitosamente",
-            cuenta_id=cuenta_id,
-            saldo_anterior=saldo_anterior,
-            saldo_nuevo=saldo_nuevo,
-            monto=monto,
-            movimiento_id=movimiento_id
-        )
\ No newline at end of file
+            mensaje="Transferencia realizada exitosamente",
+            monto=salida.monto,
+            referencia=referencia,
+            origen=OperacionResponse(
+                success=True,
+                mensaje="Débito realizado exitosamente",
+                cuenta_id=salida.cuenta_id,
+                saldo_anterior=salida.saldo_anterior,
+                saldo_nuevo=salida.saldo_nuevo,
+                monto=salida.monto,
+                movimiento_id=salida.id
+            ),
+            destino=OperacionResponse(
+                success=True,
+                mensaje="Acreditación realizada exitosamente",
+                cuenta_id=entrada.cuenta_id,
+                saldo_anterior=entrada.saldo_anterior,
+                saldo_nuevo=entrada.saldo_nuevo,
+                monto=entrada.monto,
+                movimiento_id=entrada.id
+            )
+        )
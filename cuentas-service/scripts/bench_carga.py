@@ -0,0 +1,340 @@
+"""
+Pruebas de carga del servicio de cuentas contra un motor local.
+
+Levanta la app completa en el mismo proceso (httpx.AsyncClient sobre
+ASGI, con el lifespan: despachador de eventos y barrido de holds) sobre
+un motor de app.almacenamiento en lugar de Firestore, y corre cada
+escenario con `--concurrencia` clientes simultáneos:
+
+- creacion: alta de cuentas con saldo inicial.
+- mezcla: depósitos y retiros al azar sobre `--cuentas` cuentas.
+- contencion: depósitos y retiros sobre una sola cuenta (con `--shards`
+  se fracciona su saldo antes de empezar).
+- listado: primera página de cuentas, con y sin filtro por cliente.
+- historial: páginas del historial de una cuenta con `--movimientos`
+  movimientos, recorriendo los cursores.
+
+Por escenario informa latencia p50/p95/p99, peticiones por segundo,
+códigos de respuesta y las operaciones contra el almacenamiento contadas
+como las cobraría Firestore (lecturas, consultas, commits, transacciones
+y documentos), en total y por petición. El resultado se guarda en JSON
+con el commit actual, para comparar corridas con `--comparar`.
+
+No usa red ni credenciales. Los números son del motor local: sirven para
+comparar cambios del servicio entre commits, no como latencias de
+Firestore; las cantidades de operaciones sí son las mismas.
+
+Uso (desde cuentas-service/):
+    python -m scripts.bench_carga
+    python -m scripts.bench_carga --motor sqlite --peticiones 2000 --concurrencia 32
+    python -m scripts.bench_carga --escenarios mezcla contencion --shards 10
+    python -m scripts.bench_carga --comparar resultados/bench_carga_abc1234_memoria.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.config import settings
+
+ESCENARIOS = ("creacion", "mezcla", "contencion", "listado", "historial")
+
+# Operaciones que son una llamada a Firestore (el resto de los contadores son documentos)
+LLAMADAS = ("lecturas", "consultas", "commits", "transacciones")
+
+# (método, url, cuerpo JSON) de la i-ésima petición de un escenario
+Peticion = Tuple[str, str, Optional[dict]]
+
+
+def percentil(ordenadas: List[float], p: float) -> float:
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not ordenadas:
+        return 0.0
+    return ordenadas[max(math.ceil(p / 100 * len(ordenadas)) - 1, 0)]
+
+
+def diferencia(despues: Dict[str, int], antes: Dict[str, int]) -> Dict[str, int]:
+    return {clave: despues.get(clave, 0) - antes.get(clave, 0) for clave in sorted(despues)}
+
+
+class Banco:
+    """Cliente de la app con los pasos de preparación de los escenarios"""
+
+    def __init__(self, client: httpx.AsyncClient, motor, semilla: int):
+        self.client = client
+        self.motor = motor
+        self.azar = random.Random(semilla)
+
+    async def pedir(self, metodo: str, url: str, cuerpo: Optional[dict] = None) -> dict:
+        respuesta = await self.client.request(metodo, url, json=cuerpo)
+        respuesta.raise_for_status()
+        return respuesta.json()
+
+    async def siguiente_pagina(self, url: str) -> Optional[str]:
+        """page_token de la página siguiente de un listado (cabecera X-Next-Page-Token)"""
+        respuesta = await self.client.get(url)
+        respuesta.raise_for_status()
+        return respuesta.headers.get("X-Next-Page-Token")
+
+    async def crear_cuentas(self, cantidad: int, cliente_id: str, saldo: float) -> List[str]:
+        cuentas = []
+        for _ in range(cantidad):
+            cuenta = await self.pedir("POST", "/api/cuentas/", {"cliente_id": cliente_id, "saldo_inicial": saldo})
+            cuentas.append(cuenta["id"])
+        return cuentas
+
+    async def cargar_movimientos(self, cuenta_id: str, cantidad: int) -> None:
+        for inicio in range(0, cantidad, settings.LOTE_MAX_OPERACIONES):
+            operaciones = [
+                {"cuenta_id": cuenta_id, "tipo": "DEPOSITO", "monto": 1, "descripcion": f"carga {i}"}
+                for i in range(inicio, min(inicio + settings.LOTE_MAX_OPERACIONES, cantidad))
+            ]
+            await self.pedir("POST", "/api/cuentas/operaciones/batch", {"operaciones": operaciones})
+
+    async def cursores_historial(self, cuenta_id: str, limite: int) -> List[Optional[str]]:
+        """page_token de cada página del historial (None = primera)"""
+        cursores = [None]
+        while True:
+            sufijo = f"&page_token={cursores[-1]}" if cursores[-1] else ""
+            siguiente = await self.siguiente_pagina(f"/api/cuentas/{cuenta_id}/movimientos?limit={limite}{sufijo}")
+            if not siguiente:
+                return cursores
+            cursores.append(siguiente)
+
+
+async def preparar(banco: Banco, nombre: str, args) -> Callable[[int], Peticion]:
+    """Prepara los datos de un escenario y retorna el generador de sus peticiones"""
+    azar = banco.azar
+
+    if nombre == "creacion":
+        return lambda i: ("POST", "/api/cuentas/", {"cliente_id": f"bench-{i % 100}", "saldo_inicial": 100})
+
+    if nombre == "mezcla":
+        cuentas = await banco.crear_cuentas(args.cuentas, "bench-mezcla", 10000)
+
+        def mezcla(i: int) -> Peticion:
+            operacion = "depositar" if azar.random() < 0.5 else "retirar"
+            monto = azar.randint(1, 100)
+            return "POST", f"/api/cuentas/{azar.choice(cuentas)}/{operacion}", {"monto": monto, "descripcion": "bench"}
+        return mezcla
+
+    if nombre == "contencion":
+        (cuenta_id,) = await banco.crear_cuentas(1, "bench-contencion", 10000)
+        if args.shards:
+            from app.repos.cuentas_repo import CuentasRepository
+            CuentasRepository(banco.motor).fraccionar_saldo(cuenta_id, args.shards)
+
+        def contencion(i: int) -> Peticion:
+            operacion = "depositar" if i % 2 == 0 else "retirar"
+            return "POST", f"/api/cuentas/{cuenta_id}/{operacion}", {"monto": 1, "descripcion": "bench"}
+        return contencion
+
+    if nombre == "listado":
+        await banco.crear_cuentas(args.cuentas, "bench-listado", 0)
+
+        def listado(i: int) -> Peticion:
+            if i % 2 == 0:
+                return "GET", "/api/cuentas/?page_size=50", None
+            return "GET", "/api/cuentas/?page_size=50&cliente_id=bench-listado", None
+        return listado
+
+    if nombre == "historial":
+        (cuenta_id,) = await banco.crear_cuentas(1, "bench-historial", 0)
+        await banco.cargar_movimientos(cuenta_id, args.movimientos)
+        cursores = await banco.cursores_historial(cuenta_id, 50)
+
+        def historial(i: int) -> Peticion:
+            cursor = cursores[i % len(cursores)]
+            sufijo = f"&page_token={cursor}" if cursor else ""
+            return "GET", f"/api/cuentas/{cuenta_id}/movimientos?limit=50{sufijo}", None
+        return historial
+
+    raise ValueError(f"Escenario desconocido: {nombre}")
+
+
+async def correr(
+    client: httpx.AsyncClient,
+    generar: Callable[[int], Peticion],
+    peticiones: int,
+    concurrencia: int
+) -> Tuple[List[float], Counter, float]:
+    """Hace `peticiones` peticiones con `concurrencia` clientes; retorna latencias, códigos y duración"""
+    latencias: List[float] = []
+    estados: Counter = Counter()
+    pendientes = iter(range(peticiones))
+
+    async def cliente() -> None:
+        for i in pendientes:
+            metodo, url, cuerpo = generar(i)
+            inicio = time.perf_counter()
+            respuesta = await client.request(metodo, url, json=cuerpo)
+            latencias.append(time.perf_counter() - inicio)
+            estados[str(respuesta.status_code)] += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(concurrencia)))
+    return latencias, estados, time.perf_counter() - inicio
+
+
+async def esperar_eventos(despachador) -> None:
+    """Espera a que el despachador termine con el outbox del escenario (sus borrados cuentan)"""
+    for _ in range(200):
+        if not despachador.stats()["pendientes"]:
+            break
+        await asyncio.sleep(despachador.ventana)
+    await asyncio.sleep(despachador.ventana * 2)
+
+
+async def ejecutar(args, motor) -> Dict[str, dict]:
+    # Importar la app después de configurar el almacenamiento
+    from app.eventos import despachador_eventos
+    from app.main import app, lifespan
+
+    resultados = {}
+    async with lifespan(app):
+        async with httpx.AsyncClient(app=app, base_url="http://bench", timeout=None) as client:
+            banco = Banco(client, motor, args.semilla)
+            for nombre in args.escenarios:
+                generar = await preparar(banco, nombre, args)
+                await esperar_eventos(despachador_eventos)
+
+                # Calentamiento sin medir: imports perezosos, caché y bloques de números de cuenta
+                await correr(client, generar, min(args.calentamiento, args.peticiones), args.concurrencia)
+                await esperar_eventos(despachador_eventos)
+
+                antes = motor.llamadas()
+                latencias, estados, duracion = await correr(client, generar, args.peticiones, args.concurrencia)
+                await esperar_eventos(despachador_eventos)
+                llamadas = diferencia(motor.llamadas(), antes)
+
+                ordenadas = sorted(latencias)
+                resultados[nombre] = {
+                    "peticiones": len(latencias),
+                    "concurrencia": args.concurrencia,
+                    "duracion_s": round(duracion, 4),
+                    "peticiones_por_segundo": round(len(latencias) / duracion, 2),
+                    "latencia_ms": {
+                        "p50": round(percentil(ordenadas, 50) * 1000, 3),
+                        "p95": round(percentil(ordenadas, 95) * 1000, 3),
+                        "p99": round(percentil(ordenadas, 99) * 1000, 3),
+                        "media": round(sum(ordenadas) / len(ordenadas) * 1000, 3),
+                        "max": round(ordenadas[-1] * 1000, 3)
+                    },
+                    "estados": dict(sorted(estados.items())),
+                    "llamadas": llamadas,
+                    "llamadas_por_peticion": {
+                        clave: round(valor / len(latencias), 3) for clave, valor in llamadas.items()
+                    }
+                }
+    return resultados
+
+
+def commit_actual() -> Optional[str]:
+    try:
+        salida = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return salida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def llamadas_por_peticion(resultado: dict) -> float:
+    return sum(resultado["llamadas_por_peticion"].get(clave, 0) for clave in LLAMADAS)
+
+
+def imprimir(resultados: Dict[str, dict], previo: Optional[dict]) -> None:
+    print(
+        f"{'escenario':<12}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'lect/req':>10}{'cons/req':>10}{'commit/req':>11}{'docs esc/req':>13}  estados"
+    )
+    for nombre, r in resultados.items():
+        por_peticion = r["llamadas_por_peticion"]
+        print(
+            f"{nombre:<12}{r['peticiones_por_segundo']:>9.0f}"
+            + "".join(f"{r['latencia_ms'][p]:>9.2f}" for p in ("p50", "p95", "p99"))
+            + f"{por_peticion.get('lecturas', 0):>10.2f}{por_peticion.get('consultas', 0):>10.2f}"
+            + f"{por_peticion.get('commits', 0):>11.2f}{por_peticion.get('documentos_escritos', 0):>13.2f}"
+            + f"  {r['estados']}"
+        )
+
+    if not previo:
+        return
+    print(f"\ncomparado con {previo.get('commit')} ({previo.get('fecha')}):")
+    for nombre, r in resultados.items():
+        anterior = previo["escenarios"].get(nombre)
+        if not anterior:
+            continue
+        print(
+            f"  {nombre:<12} req/s x{r['peticiones_por_segundo'] / anterior['peticiones_por_segundo']:.2f}"
+            f"  p95 x{r['latencia_ms']['p95'] / anterior['latencia_ms']['p95']:.2f}"
+            f"  llamadas/req {llamadas_por_peticion(anterior):.2f} -> {llamadas_por_peticion(r):.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pruebas de carga del servicio de cuentas con un motor local")
+    parser.add_argument("--motor", choices=["memoria", "sqlite"], default="memoria")
+    parser.add_argument("--escenarios", nargs="+", choices=ESCENARIOS, default=list(ESCENARIOS))
+    parser.add_argument("--peticiones", type=int, default=1000, help="Peticiones medidas por escenario")
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--calentamiento", type=int, default=50)
+    parser.add_argument("--cuentas", type=int, default=50, help="Cuentas de los escenarios mezcla y listado")
+    parser.add_argument("--movimientos", type=int, default=500, help="Movimientos de la cuenta del historial")
+    parser.add_argument("--shards", type=int, default=0, help="Shards del saldo de la cuenta de contencion")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto en resultados/)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    previo = None
+    if args.comparar:
+        with open(args.comparar) as archivo:
+            previo = json.load(archivo)
+
+    with tempfile.TemporaryDirectory(prefix="bench_carga_") as directorio:
+        settings.ALMACENAMIENTO = args.motor
+        settings.SQLITE_PATH = os.path.join(directorio, "cuentas.db")
+        settings.EVENTOS_LOG_PATH = os.path.join(directorio, "eventos.jsonl")
+        from app.almacenamiento import get_motor_local
+        motor = get_motor_local()
+
+        resultados = asyncio.run(ejecutar(args, motor))
+        motor.close()
+
+    commit = commit_actual()
+    salida = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "motor": args.motor,
+        "python": platform.python_version(),
+        "parametros": {
+            clave: valor for clave, valor in vars(args).items() if clave not in ("salida", "comparar")
+        },
+        "escenarios": resultados
+    }
+
+    ruta = args.salida or os.path.join(
+        "resultados", f"bench_carga_{commit or 'sin-commit'}_{args.motor}_{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    with open(ruta, "w") as archivo:
+        json.dump(salida, archivo, indent=2, ensure_ascii=False)
+
+    imprimir(resultados, previo)
+    print(f"\nresultados en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
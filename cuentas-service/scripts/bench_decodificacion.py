@@ -0,0 +1,157 @@
+"""
+Micro-benchmark del costo por fila al listar cuentas y movimientos.
+
+Compara, sobre documentos sintéticos con los tipos que devuelve Firestore,
+la ruta anterior (Cuenta(**data) con validación completa y CuentaResponse
+validada) con la decodificación sin validación de `app.decodificacion`.
+Cada ruta incluye la serialización a JSON de la página completa, que es
+lo que termina pagando un listado. No usa Firestore ni credenciales.
+
+Uso (desde cuentas-service/):
+    python -m scripts.bench_decodificacion
+    python -m scripts.bench_decodificacion --filas 10000 --repeticiones 5
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Tuple
+
+from app.decodificacion import (
+    cuenta_a_respuesta, decodificar_cuenta, decodificar_movimiento, movimiento_a_respuesta
+)
+from app.models import Cuenta, Movimiento
+from app.schemas import CuentaResponse, MovimientoResponse
+from pydantic import TypeAdapter
+
+
+def generar_cuentas(filas: int) -> List[tuple]:
+    base = datetime(2024, 1, 1)
+    docs = []
+    for i in range(filas):
+        fecha = base + timedelta(minutes=i)
+        docs.append((f"cuenta{i:06d}", {
+            "cliente_id": f"cliente{i % 500}",
+            "numero_cuenta": f"{1000000000 + i:010d}",
+            "tipo": random.choice(["AHORRO", "CORRIENTE"]),
+            "moneda": random.choice(["BOB", "USD"]),
+            "saldo": random.choice([0, 150, 1234.5]),
+            "saldo_shards": 0,
+            "estado": "ACTIVA",
+            "fecha_apertura": fecha,
+            "created_at": fecha,
+            "updated_at": fecha
+        }))
+    return docs
+
+
+def generar_movimientos(filas: int) -> List[tuple]:
+    base = datetime(2024, 1, 1)
+    docs = []
+    for i in range(filas):
+        fecha = base + timedelta(seconds=i)
+        docs.append((f"mov{i:06d}", {
+            "cuenta_id": "cuenta000001",
+            "tipo": random.choice(["DEPOSITO", "RETIRO"]),
+            "monto": 100,
+            "saldo_anterior": 1000.0,
+            "saldo_nuevo": 1100.0,
+            "descripcion": "Movimiento de prueba",
+            "referencia": None,
+            "fecha": fecha,
+            "created_at": fecha
+        }))
+    return docs
+
+
+# Rutas anteriores: validación completa al leer y al armar la respuesta
+
+def cuenta_validada(doc_id: str, data: dict) -> Cuenta:
+    return Cuenta(**dict(data, id=doc_id))
+
+
+def cuenta_respuesta_validada(cuenta: Cuenta) -> CuentaResponse:
+    return CuentaResponse(
+        id=cuenta.id,
+        cliente_id=cuenta.cliente_id,
+        numero_cuenta=cuenta.numero_cuenta,
+        tipo=cuenta.tipo,
+        moneda=cuenta.moneda,
+        saldo=cuenta.saldo,
+        estado=cuenta.estado,
+        fecha_apertura=cuenta.fecha_apertura,
+        created_at=cuenta.created_at,
+        updated_at=cuenta.updated_at
+    )
+
+
+def movimiento_validado(doc_id: str, data: dict) -> Movimiento:
+    return Movimiento(**dict(data, id=doc_id))
+
+
+def movimiento_respuesta_validada(mov: Movimiento) -> MovimientoResponse:
+    return MovimientoResponse(
+        id=mov.id,
+        cuenta_id=mov.cuenta_id,
+        tipo=mov.tipo,
+        monto=mov.monto,
+        saldo_anterior=mov.saldo_anterior,
+        saldo_nuevo=mov.saldo_nuevo,
+        descripcion=mov.descripcion,
+        referencia=mov.referencia,
+        fecha=mov.fecha
+    )
+
+
+def medir(repeticiones: int, funcion: Callable[[], object]) -> Tuple[float, object]:
+    """Mejor tiempo de `repeticiones` ejecuciones y el último resultado"""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def comparar(titulo: str, docs: List[tuple], rutas: dict, pagina: TypeAdapter, repeticiones: int) -> None:
+    """Mide decodificar, armar la respuesta y serializar para cada ruta"""
+    filas = len(docs)
+    print(f"{titulo} ({filas} documentos, µs por fila)")
+    print(f"  {'ruta':<22}{'decodificar':>12}{'respuesta':>12}{'json':>10}{'total':>10}")
+    totales = {}
+
+    for nombre, (decodificar, responder) in rutas.items():
+        t_dec, modelos = medir(repeticiones, lambda: [decodificar(i, d) for i, d in docs])
+        t_resp, respuestas = medir(repeticiones, lambda: [responder(m) for m in modelos])
+        t_json, _ = medir(repeticiones, lambda: pagina.dump_json(respuestas))
+
+        totales[nombre] = t_dec + t_resp + t_json
+        print(
+            f"  {nombre:<22}"
+            + "".join(f"{t / filas * 1e6:>10.2f}  " for t in (t_dec, t_resp, t_json))[:-2]
+            + f"{totales[nombre] / filas * 1e6:>10.2f}"
+        )
+
+    antes, despues = totales.values()
+    print(f"  mejora total: x{antes / despues:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo por fila de decodificar y serializar listados")
+    parser.add_argument("--filas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    comparar("Cuentas", generar_cuentas(args.filas), {
+        "validando (anterior)": (cuenta_validada, cuenta_respuesta_validada),
+        "sin validar": (decodificar_cuenta, cuenta_a_respuesta)
+    }, TypeAdapter(List[CuentaResponse]), args.repeticiones)
+
+    comparar("Movimientos", generar_movimientos(args.filas), {
+        "validando (anterior)": (movimiento_validado, movimiento_respuesta_validada),
+        "sin validar": (decodificar_movimiento, movimiento_a_respuesta)
+    }, TypeAdapter(List[MovimientoResponse]), args.repeticiones)
+
+
+if __name__ == "__main__":
+    main()
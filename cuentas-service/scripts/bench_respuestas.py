@@ -0,0 +1,112 @@
+"""
+Benchmark de req/s de los listados con y sin la respuesta rápida.
+
+Levanta la app en el mismo proceso (httpx.AsyncClient sobre ASGI) con un
+servicio falso que devuelve páginas ya decodificadas, y compara:
+
+- anterior: la ruta arma la página con CuentaResponse / MovimientoResponse
+  y FastAPI la valida contra el response_model, la pasa por
+  jsonable_encoder y la serializa con json.dumps (JSONResponse).
+- rápida: las rutas reales, que devuelven FastJSONResponse con las filas
+  ya armadas (app.responses).
+
+No usa Firestore, pero importar app.main todavía inicializa firebase_admin:
+FIREBASE_CREDENTIALS_PATH debe apuntar a un archivo de credenciales con
+formato válido.
+
+Uso (desde cuentas-service/):
+    python -m scripts.bench_respuestas
+    python -m scripts.bench_respuestas --peticiones 2000 --tamanos 50 500
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+import httpx
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+
+from app.decodificacion import cuenta_a_respuesta, decodificar_cuenta, decodificar_movimiento, movimiento_a_respuesta
+from app.deps import get_cuentas_service
+from app.main import app
+from app.schemas import CuentaResponse, MovimientoResponse
+from scripts.bench_decodificacion import generar_cuentas, generar_movimientos
+
+
+class ServicioFalso:
+    """Devuelve siempre las mismas páginas, sin ir a Firestore"""
+
+    def __init__(self, filas: int):
+        self.cuentas = [decodificar_cuenta(i, d) for i, d in generar_cuentas(filas)]
+        self.movimientos = [decodificar_movimiento(i, d) for i, d in generar_movimientos(filas)]
+
+    async def listar_cuentas(self, filters, page_size, page_token=None):
+        return self.cuentas[:page_size], "siguiente"
+
+    async def obtener_movimientos(self, cuenta_id, filters, limit=50, page_token=None):
+        return self.movimientos[:limit], "siguiente"
+
+
+# Rutas como estaban antes: el response_model valida y serializa la página
+anterior = APIRouter(prefix="/anterior")
+
+
+@anterior.get("/cuentas", response_model=List[CuentaResponse], response_class=JSONResponse)
+async def listar_cuentas_anterior(page_size: int = 50, service=Depends(get_cuentas_service)):
+    cuentas, _ = await service.listar_cuentas(None, page_size)
+    return [cuenta_a_respuesta(cuenta) for cuenta in cuentas]
+
+
+@anterior.get("/movimientos", response_model=List[MovimientoResponse], response_class=JSONResponse)
+async def obtener_movimientos_anterior(limit: int = 50, service=Depends(get_cuentas_service)):
+    movimientos, _ = await service.obtener_movimientos("cuenta", None, limit=limit)
+    return [movimiento_a_respuesta(mov) for mov in movimientos]
+
+
+async def medir(client: httpx.AsyncClient, url: str, peticiones: int) -> float:
+    """req/s de `peticiones` GET secuenciales a `url`"""
+    respuesta = await client.get(url)
+    respuesta.raise_for_status()
+
+    inicio = time.perf_counter()
+    for _ in range(peticiones):
+        await client.get(url)
+    return peticiones / (time.perf_counter() - inicio)
+
+
+async def comparar(peticiones: int, tamanos: List[int]) -> None:
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        # El JSON de ambas rutas tiene que ser el mismo
+        for anterior_url, rapida_url in (
+            ("/anterior/cuentas", "/api/cuentas/"), ("/anterior/movimientos", "/api/cuentas/x/movimientos")
+        ):
+            a, b = await client.get(anterior_url), await client.get(rapida_url)
+            assert a.json() == b.json(), f"{anterior_url} y {rapida_url} difieren"
+
+        print(f"{'listado':<14}{'filas':>7}{'anterior':>12}{'rápida':>12}{'mejora':>9}  (req/s)")
+        for tamano in tamanos:
+            for nombre, anterior_url, rapida_url in (
+                ("cuentas", f"/anterior/cuentas?page_size={tamano}", f"/api/cuentas/?page_size={tamano}"),
+                ("movimientos", f"/anterior/movimientos?limit={tamano}", f"/api/cuentas/x/movimientos?limit={tamano}"),
+            ):
+                antes = await medir(client, anterior_url, peticiones)
+                despues = await medir(client, rapida_url, peticiones)
+                print(f"{nombre:<14}{tamano:>7}{antes:>12.0f}{despues:>12.0f}{despues / antes:>8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="req/s de los listados con y sin FastJSONResponse")
+    parser.add_argument("--peticiones", type=int, default=500)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10, 50, 200])
+    args = parser.parse_args()
+
+    servicio = ServicioFalso(max(args.tamanos + [500]))
+    app.include_router(anterior)
+    app.dependency_overrides[get_cuentas_service] = lambda: servicio
+
+    asyncio.run(comparar(args.peticiones, args.tamanos))
+
+
+if __name__ == "__main__":
+    main()
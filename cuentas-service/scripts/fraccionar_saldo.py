@@ -0,0 +1,48 @@
+"""
+Activa, cambia o desactiva el saldo fraccionado (shards) de una cuenta.
+
+Pensado para cuentas con muchos créditos concurrentes (recaudadoras,
+cuentas de comercio): el saldo se reparte en N documentos y cada crédito
+suma a uno al azar, en vez de competir todos por el documento de la
+cuenta. El cambio se hace en una transacción, con la cuenta en uso.
+
+Uso (desde cuentas-service/):
+    python -m scripts.fraccionar_saldo <cuenta_id> --shards 10
+    python -m scripts.fraccionar_saldo <cuenta_id> --desactivar
+"""
+import argparse
+import sys
+
+from app.firebase import get_firebase_db
+from app.repos.cuentas_repo import CuentasRepository
+
+MAX_SHARDS = 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fracciona el saldo de una cuenta en shards")
+    parser.add_argument("cuenta_id")
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--shards", type=int, help=f"Cantidad de shards (1 a {MAX_SHARDS})")
+    grupo.add_argument("--desactivar", action="store_true", help="Vuelve a guardar el saldo en la cuenta")
+    args = parser.parse_args()
+
+    shards = 0 if args.desactivar else args.shards
+    if not args.desactivar and not 1 <= shards <= MAX_SHARDS:
+        parser.error(f"--shards debe estar entre 1 y {MAX_SHARDS}")
+
+    repo = CuentasRepository(get_firebase_db())
+    cuenta = repo.fraccionar_saldo(args.cuenta_id, shards)
+
+    if cuenta is None:
+        print(f"Cuenta no encontrada: {args.cuenta_id}")
+        sys.exit(1)
+
+    if shards:
+        print(f"Cuenta {cuenta.numero_cuenta}: saldo {cuenta.saldo} repartido en {shards} shards")
+    else:
+        print(f"Cuenta {cuenta.numero_cuenta}: saldo {cuenta.saldo} consolidado en la cuenta")
+
+
+if __name__ == "__main__":
+    main()
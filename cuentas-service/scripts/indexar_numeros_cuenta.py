@@ -0,0 +1,38 @@
+"""
+Crea las entradas del índice `numeros_cuenta` para las cuentas existentes.
+
+Es una migración obligatoria en las bases con cuentas creadas antes del
+índice: el asignador de números solo detecta colisiones contra el índice,
+así que hasta que este script termine no se crean cuentas (o, con
+NUMERO_CUENTA_EXIGIR_INDICE=false, cada número se verifica con una
+consulta). Al terminar marca `indice_completo` en el contador de números.
+Las búsquedas por número de las cuentas sin indexar se resuelven igual
+(con la consulta por `numero_cuenta`).
+
+Correrlo cuando ya no queden instancias con la versión anterior al índice
+creando cuentas. Se puede repetir sin problema.
+
+Uso (desde cuentas-service/):
+    python -m scripts.indexar_numeros_cuenta
+"""
+from app.firebase import get_firebase_db
+from app.repos.cuentas_repo import CuentasRepository
+
+
+def main():
+    repo = CuentasRepository(get_firebase_db())
+    creadas = 0
+    existentes = 0
+
+    for cuenta in repo.list():
+        if repo.indexar_numero_cuenta(cuenta):
+            creadas += 1
+        else:
+            existentes += 1
+
+    repo.marcar_indice_completo()
+    print(f"Índice actualizado: {creadas} entradas creadas, {existentes} ya existían")
+
+
+if __name__ == "__main__":
+    main()
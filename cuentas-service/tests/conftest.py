@@ -0,0 +1,53 @@
+import pytest
+
+from app.almacenamiento import crear_motor
+from app.cache import CuentasCache
+from app.eventos import DespachadorEventos
+from app.repos.cuentas_repo import CuentasRepository
+from app.repos.cuentas_repo_async import ThreadpoolCuentasRepository
+from app.repos.limites_diarios import AcumuladosDiarios
+from app.repos.numeros_cuenta import NumeroCuentaAllocator
+from app.schemas import CuentaCreate
+from app.services.cuentas_service import CuentasService
+
+
+# Las pruebas corren el repositorio síncrono contra los motores locales
+# (app.almacenamiento), igual que el servicio con ALMACENAMIENTO=memoria
+# o sqlite: sin red ni credenciales de Firebase.
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(params=["memoria", "sqlite"])
+def motor(request, tmp_path):
+    motor = crear_motor(request.param, str(tmp_path / "cuentas.db"))
+    yield motor
+    motor.close()
+
+
+@pytest.fixture
+def repo(motor) -> CuentasRepository:
+    """Repositorio con caché, números, acumulados y eventos propios (no los globales del proceso)"""
+    return CuentasRepository(
+        motor,
+        cache=CuentasCache(ttl=0),
+        allocator=NumeroCuentaAllocator(),
+        acumulados=AcumuladosDiarios(),
+        eventos=DespachadorEventos()
+    )
+
+
+@pytest.fixture
+def servicio(repo) -> CuentasService:
+    return CuentasService(ThreadpoolCuentasRepository(repo))
+
+
+@pytest.fixture
+def crear_cuenta(servicio):
+    async def _crear(saldo: float = 0.0, cliente_id: str = "cliente-1") -> str:
+        cuenta = await servicio.crear_cuenta(CuentaCreate(cliente_id=cliente_id, saldo_inicial=saldo))
+        return cuenta.id
+    return _crear
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta, timezone
+import json
+import random
+import sqlite3
+import pytest
+
+from app.almacenamiento import crear_motor
+from app.almacenamiento.documentos import DESCENDING
+from app.repos.cuentas_repo import CuentasRepository
+from app.schemas import CuentaFilter, MovimientoFilter
+
+
+BASE = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def motores(tmp_path):
+    sqlite, memoria = crear_motor("sqlite", str(tmp_path / "cuentas.db")), crear_motor("memoria")
+    yield sqlite, memoria
+    sqlite.close()
+
+
+def cargar(motores, cantidad: int = 300):
+    """Los mismos documentos en los dos motores, con tipos mezclados y campos faltantes"""
+    for motor in motores:
+        azar = random.Random(7)
+        batch = motor.batch()
+        for i in range(cantidad):
+            doc = {
+                "cuenta_id": azar.choice(["a", "b", "c"]) if i % 19 else 5,
+                "tipo": azar.choice(["DEPOSITO", "RETIRO"]),
+                "monto": azar.choice([1, 2.5, True, None, "1"]),
+            }
+            if i % 17:
+                doc["fecha"] = BASE + timedelta(seconds=azar.randint(0, 60), microseconds=azar.choice([0, 5]))
+            batch.set(motor.collection("movimientos").document(f"m{i:03d}"), doc)
+        batch.commit()
+
+
+def ids(query) -> list:
+    return [doc.id for doc in query.stream()]
+
+
+def plan(motor, query) -> str:
+    """Plan de SQLite (EXPLAIN QUERY PLAN) de una consulta"""
+    sql, parametros = motor._sql_listar(
+        query._coleccion, query._filtros, query._orden_completo(), query._limite, query._cursor
+    )
+    return " ".join(fila[3] for fila in motor._conexion().execute("EXPLAIN QUERY PLAN " + sql, parametros))
+
+
+CONSULTAS = {
+    "igualdad_numerica": lambda c: c.where("monto", "==", 1).limit(40),
+    "igualdad_null": lambda c: c.where("monto", "==", None).limit(40),
+    "rango_y_orden": lambda c: c.where("monto", ">", 0).order_by("monto").limit(40),
+    "orden_sin_filtros": lambda c: c.order_by("fecha").limit(25),
+    "operador_en_python": lambda c: c.where("cuenta_id", "in", ["a", 5]).order_by("fecha").limit(25),
+    "rango_de_fechas": lambda c: (
+        c.where("cuenta_id", "==", "a").where("fecha", ">=", BASE + timedelta(seconds=20))
+        .order_by("fecha", direction=DESCENDING).limit(10)
+    ),
+}
+
+
+@pytest.mark.parametrize("nombre", CONSULTAS)
+def test_sqlite_resuelve_las_consultas_igual_que_memoria(motores, nombre):
+    cargar(motores)
+    sqlite, memoria = motores
+    consulta = CONSULTAS[nombre]
+
+    assert ids(consulta(sqlite.collection("movimientos"))) == ids(consulta(memoria.collection("movimientos")))
+
+
+def test_paginas_con_cursor_iguales_a_memoria(motores):
+    cargar(motores)
+
+    def paginar(motor) -> list:
+        query = (
+            motor.collection("movimientos").where("cuenta_id", "==", "b")
+            .order_by("fecha", direction=DESCENDING).order_by("__name__", direction=DESCENDING)
+        )
+        vistos, pagina = [], query.limit(7)
+        while True:
+            docs = list(pagina.stream())
+            vistos += [doc.id for doc in docs]
+            if len(docs) < 7:
+                return vistos
+            pagina = query.start_after({"fecha": docs[-1].get("fecha"), "__name__": docs[-1].id}).limit(7)
+
+    sqlite, memoria = motores
+    assert paginar(sqlite) == paginar(memoria)
+    assert len(paginar(sqlite)) > 7
+
+
+def test_las_consultas_del_repositorio_usan_indices(motores):
+    sqlite, _ = motores
+    repo = CuentasRepository(sqlite)
+    ahora = datetime.now()
+
+    consultas = {
+        "ix_movimientos_cuenta_id_fecha": repo._query_movimientos("c1", limit=20, start_after=(ahora, "m1")),
+        "ix_movimientos_cuenta_id_tipo_fecha": repo._query_movimientos(
+            "c1", MovimientoFilter(tipo="DEPOSITO", fecha_desde=ahora - timedelta(days=1)), limit=20
+        ),
+        "ix_holds_estado_expira_en": repo._query_holds_vencidos(ahora, 100),
+        "ix_outbox_created_at": repo._query_outbox(ahora, 100),
+    }
+
+    for indice, query in consultas.items():
+        detalle = plan(sqlite, query)
+        assert f"USING INDEX {indice}" in detalle, detalle
+        assert "TEMP B-TREE" not in detalle, detalle
+
+
+def test_con_estadisticas_la_pagina_de_cuentas_usa_el_indice(tmp_path):
+    ruta = str(tmp_path / "cuentas.db")
+    motor = crear_motor("sqlite", ruta)
+    batch = motor.batch()
+    for i in range(500):
+        batch.set(motor.collection("cuentas").document(f"c{i:03d}"), {"cliente_id": f"cliente-{i % 50}"})
+    batch.commit()
+    # Al cerrar se corre PRAGMA optimize, que deja las estadísticas para la próxima apertura
+    motor.close()
+
+    motor = crear_motor("sqlite", ruta)
+    try:
+        query = CuentasRepository(motor)._query_cuentas_pagina(CuentaFilter(cliente_id="cliente-1"), 50, "c100")
+        detalle = plan(motor, query)
+        assert "USING INDEX ix_cuentas_cliente_id" in detalle, detalle
+        assert ids(query) == [f"c{i:03d}" for i in range(101, 500, 50)]
+    finally:
+        motor.close()
+
+
+def test_fechas_con_zona_se_guardan_en_utc(motores):
+    sqlite, _ = motores
+    ref = sqlite.collection("outbox").document("e1")
+    ref.set({"created_at": datetime(2024, 1, 1, 9, 0, tzinfo=timezone(timedelta(hours=-4)))})
+
+    # Con zona no se compara con fechas sin zona (igual que en Python)
+    assert ids(sqlite.collection("outbox").where("created_at", "<", BASE + timedelta(days=1)).limit(5)) == []
+    assert ids(sqlite.collection("outbox").where(
+        "created_at", "<", datetime(2024, 1, 1, 13, 30, tzinfo=timezone.utc)
+    ).limit(5)) == ["e1"]
+    assert ref.get().get("created_at") == datetime(2024, 1, 1, 13, 0, tzinfo=timezone.utc)
+
+
+def test_un_archivo_con_el_formato_anterior_se_vuelve_a_codificar(tmp_path):
+    ruta = str(tmp_path / "viejo.db")
+    conexion = sqlite3.connect(ruta)
+    conexion.execute(
+        "CREATE TABLE documentos (coleccion TEXT NOT NULL, id TEXT NOT NULL, datos TEXT NOT NULL, "
+        "PRIMARY KEY (coleccion, id)) WITHOUT ROWID"
+    )
+    # Sin microsegundos el texto ISO ordenaba mal frente a los que sí los tienen
+    for doc_id, fecha in (("e1", "2024-01-01T10:00:00"), ("e2", "2024-01-01T10:00:00.500000")):
+        conexion.execute(
+            "INSERT INTO documentos VALUES ('outbox', ?, ?)", (doc_id, json.dumps({"created_at": {"$fecha": fecha}}))
+        )
+    conexion.commit()
+    conexion.close()
+
+    motor = crear_motor("sqlite", ruta)
+    try:
+        query = motor.collection("outbox").where("created_at", "<=", datetime(2024, 1, 1, 10, 0)).limit(5)
+        assert ids(query) == ["e1"]
+        assert motor._conexion().execute("PRAGMA user_version").fetchone()[0] == 1
+    finally:
+        motor.close()
@@ -0,0 +1,110 @@
+from pathlib import Path
+import subprocess
+import sys
+import pytest
+
+from app.arranque import DOCUMENTO_CALENTAMIENTO, ArranqueFirestore
+
+
+pytestmark = pytest.mark.anyio
+
+
+class Cliente:
+    """Cliente de Firestore: registra las lecturas de calentamiento y el cierre"""
+
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.lecturas = []
+        self.cerrado = False
+
+    def collection(self, coleccion):
+        cliente = self
+
+        class Referencia:
+            def __init__(self, doc_id):
+                self.ruta = (coleccion, doc_id)
+
+            def get(self, **kwargs):
+                if cliente.error:
+                    raise cliente.error
+                cliente.lecturas.append((self.ruta, kwargs))
+
+        return type("Coleccion", (), {"document": lambda _, doc_id: Referencia(doc_id)})()
+
+    def close(self):
+        self.cerrado = True
+
+
+class ArranquePrueba(ArranqueFirestore):
+    """Sin Firebase: la app y los clientes son los de la prueba"""
+
+    def __init__(self, clientes: int = 1, error: Exception = None):
+        super().__init__("no-existe.json", clientes=clientes)
+        self.error = error
+        self.creados = []
+
+    def _crear_app(self):
+        return object()
+
+    def _nuevo_cliente(self, app, asincrono=False):
+        cliente = Cliente(self.error)
+        self.creados.append(cliente)
+        return cliente
+
+
+def test_importar_el_modulo_no_importa_firebase():
+    codigo = (
+        "import sys, app.arranque; "
+        "print(any(m.startswith(('firebase_admin', 'google.cloud.firestore')) for m in sys.modules))"
+    )
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=Path(__file__).resolve().parents[1],
+        check=True, capture_output=True, text=True
+    )
+
+    assert salida.stdout.strip() == "False"
+
+
+async def test_iniciar_calienta_cada_cliente_del_pool_una_vez():
+    arranque = ArranquePrueba(clientes=3)
+
+    await arranque.iniciar()
+    await arranque.iniciar()
+
+    assert len(arranque.creados) == 3
+    for cliente in arranque.creados:
+        assert [ruta for ruta, _ in cliente.lecturas] == [DOCUMENTO_CALENTAMIENTO]
+    # Los accesos a `db` se reparten por turno
+    accesos = [arranque.db for _ in range(6)]
+    assert sorted(map(id, accesos[:3])) == sorted(map(id, arranque.creados))
+    assert accesos[3:] == accesos[:3]
+    assert arranque.stats()["calentado"] is True
+
+
+async def test_un_error_al_calentar_no_impide_arrancar():
+    arranque = ArranquePrueba(error=TimeoutError("sin red"))
+
+    await arranque.iniciar()
+
+    stats = arranque.stats()
+    assert (stats["cliente"], stats["calentado"]) == (True, False)
+    assert stats["error_calentamiento"] == "TimeoutError: sin red"
+
+
+async def test_cerrar_libera_los_clientes_y_el_proximo_acceso_crea_otros():
+    arranque = ArranquePrueba(clientes=2)
+    await arranque.iniciar()
+    viejos = list(arranque.creados)
+
+    await arranque.cerrar()
+
+    assert all(cliente.cerrado for cliente in viejos)
+    assert arranque.stats()["pool"] == 0
+    assert arranque.db not in viejos
+
+
+def test_sin_el_archivo_de_credenciales_obligatorio_falla_al_pedir_la_app():
+    arranque = ArranqueFirestore("no-existe.json")
+
+    with pytest.raises(FileNotFoundError):
+        arranque.app
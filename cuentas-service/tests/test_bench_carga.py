@@ -0,0 +1,46 @@
+from pathlib import Path
+import json
+import subprocess
+import sys
+
+from scripts.bench_carga import ESCENARIOS, diferencia, percentil
+
+
+SERVICIO = Path(__file__).resolve().parents[1]
+
+
+def test_percentil_por_rango_mas_cercano():
+    ordenadas = [float(i) for i in range(1, 101)]
+
+    assert [percentil(ordenadas, p) for p in (50, 95, 99, 100)] == [50, 95, 99, 100]
+    assert percentil([7.0], 99) == 7.0
+    assert percentil([], 50) == 0.0
+
+
+def test_diferencia_de_contadores_con_claves_nuevas():
+    assert diferencia({"commits": 5, "lecturas": 3}, {"commits": 2}) == {"commits": 3, "lecturas": 3}
+
+
+def test_corrida_corta_de_todos_los_escenarios(tmp_path):
+    salida = tmp_path / "bench.json"
+    argumentos = [
+        sys.executable, "-m", "scripts.bench_carga", "--motor", "sqlite", "--peticiones", "6",
+        "--concurrencia", "2", "--calentamiento", "2", "--cuentas", "3", "--movimientos", "60",
+        "--shards", "2", "--salida", str(salida)
+    ]
+
+    subprocess.run(argumentos, cwd=SERVICIO, check=True, capture_output=True, timeout=120)
+    resultado = json.loads(salida.read_text())
+    comparada = subprocess.run(
+        argumentos + ["--comparar", str(salida)], cwd=SERVICIO, check=True, capture_output=True, text=True, timeout=120
+    )
+
+    escenarios = resultado["escenarios"]
+    assert list(escenarios) == list(ESCENARIOS)
+    for nombre, escenario in escenarios.items():
+        assert escenario["peticiones"] == 6
+        assert all(codigo.startswith("2") for codigo in escenario["estados"]), (nombre, escenario["estados"])
+    # Las operaciones contra el almacenamiento se cuentan como las cobraría Firestore
+    assert escenarios["listado"]["llamadas_por_peticion"]["consultas"] == 1
+    assert escenarios["mezcla"]["llamadas"]["transacciones"] == 6
+    assert "comparado con" in comparada.stdout
@@ -0,0 +1,86 @@
+from datetime import datetime
+import pytest
+
+from app import cache as modulo_cache
+from app.cache import CuentasCache
+from app.models import Cuenta, EstadoCuenta
+from app.schemas import CuentaUpdate, DepositoRequest
+
+
+pytestmark = pytest.mark.anyio
+
+
+def cuenta(cuenta_id: str, numero_cuenta: str = "") -> Cuenta:
+    return Cuenta(
+        id=cuenta_id, cliente_id="cliente-1", saldo=0, estado=EstadoCuenta.ACTIVA,
+        numero_cuenta=numero_cuenta or f"n-{cuenta_id}", fecha_apertura=datetime.now()
+    )
+
+
+@pytest.fixture
+def con_cache(repo):
+    """El repositorio de las pruebas con la caché habilitada"""
+    repo.cache = CuentasCache(max_size=100, ttl=60)
+    return repo
+
+
+def test_lru_desaloja_la_menos_usada_y_su_numero():
+    cache = CuentasCache(max_size=2, ttl=60)
+    cache.put(cuenta("a"))
+    cache.put(cuenta("b"))
+    cache.get("a")
+    cache.put(cuenta("c"))
+
+    assert cache.get("b") is None
+    assert cache.get_by_numero("n-b") is None
+    assert cache.get_by_numero("n-a").id == "a"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entrada_vencida_no_se_devuelve(monkeypatch):
+    reloj = [100.0]
+    monkeypatch.setattr(modulo_cache.time, "monotonic", lambda: reloj[0])
+    cache = CuentasCache(ttl=5)
+    cache.put(cuenta("a"))
+
+    reloj[0] += 4
+    assert cache.get("a").id == "a"
+    reloj[0] += 2
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_actualizar_no_renueva_el_ttl(monkeypatch):
+    reloj = [100.0]
+    monkeypatch.setattr(modulo_cache.time, "monotonic", lambda: reloj[0])
+    cache = CuentasCache(ttl=5)
+    cache.put(cuenta("a"))
+
+    reloj[0] += 4
+    cache.actualizar("a", {"saldo": 10})
+    assert cache.get("a").saldo == 10
+    reloj[0] += 2
+    assert cache.get("a") is None
+
+
+async def test_lecturas_repetidas_salen_de_la_cache(con_cache, crear_cuenta):
+    cuenta_id = await crear_cuenta(10)
+    # Un cambio hecho por otro proceso no se ve hasta leer sin caché
+    con_cache.db.collection("cuentas").document(cuenta_id).update({"saldo": 99})
+
+    assert con_cache.get_by_id(cuenta_id).saldo == 10
+    assert con_cache.get_by_id(cuenta_id, use_cache=False).saldo == 99
+    assert con_cache.get_by_id(cuenta_id).saldo == 99
+
+
+async def test_las_escrituras_del_servicio_actualizan_la_cache(con_cache, servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(10)
+    numero_cuenta = con_cache.get_by_id(cuenta_id).numero_cuenta
+
+    await servicio.depositar(cuenta_id, DepositoRequest(monto=5, descripcion="Depósito"))
+    await servicio.actualizar_cuenta(cuenta_id, CuentaUpdate(estado=EstadoCuenta.BLOQUEADA))
+
+    cacheada = con_cache.cache.get(cuenta_id)
+    assert (cacheada.saldo, cacheada.estado) == (15, EstadoCuenta.BLOQUEADA.value)
+    assert con_cache.get_by_numero_cuenta(numero_cuenta) is cacheada
+    assert con_cache.get_by_id(cuenta_id, use_cache=False).saldo == 15
@@ -0,0 +1,112 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+import anyio
+import json
+import pytest
+
+from app.eventos import DespachadorEventos
+from app.schemas import DepositoRequest, RetiroRequest
+
+
+pytestmark = pytest.mark.anyio
+
+
+def outbox(repo) -> list:
+    return sorted(doc.id for doc in repo.db.collection(repo.outbox_collection).stream())
+
+
+async def outbox_vacio(repo) -> None:
+    """Espera que se borren los registros: se borran después de publicar el lote en el buffer"""
+    with anyio.fail_after(2):
+        while outbox(repo):
+            await anyio.sleep(0.01)
+
+
+@pytest.fixture
+def despachador(repo, tmp_path) -> DespachadorEventos:
+    """El despachador del repositorio, sin ventana ni gracia para el barrido"""
+    despachador = repo.eventos
+    despachador.ventana = 0
+    despachador.barrido_gracia = 0
+    despachador.log_path = str(tmp_path / "eventos.jsonl")
+    return despachador
+
+
+@asynccontextmanager
+async def corriendo(despachador: DespachadorEventos, servicio):
+    # Se detiene dentro de la prueba: la tarea es del event loop de la prueba
+    await despachador.iniciar(servicio.repo)
+    try:
+        yield despachador
+    finally:
+        await despachador.detener()
+
+
+async def test_el_registro_del_outbox_va_en_el_commit_del_movimiento(repo, servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(0)
+
+    deposito = await servicio.depositar(cuenta_id, DepositoRequest(monto=5, descripcion="Depósito"))
+    with pytest.raises(HTTPException):
+        await servicio.retirar(cuenta_id, RetiroRequest(monto=100, descripcion="Retiro"))
+
+    # Sin despachador corriendo el registro queda en el outbox; el retiro rechazado no deja nada
+    assert outbox(repo) == [deposito.movimiento_id]
+    evento = repo.get_outbox(datetime.now() + timedelta(minutes=1))[0]
+    assert (evento["cuenta_id"], evento["saldo_nuevo"]) == (cuenta_id, 5)
+
+
+async def test_los_eventos_se_numeran_se_registran_y_salen_del_outbox(
+    repo, servicio, crear_cuenta, despachador
+):
+    cuenta_id = await crear_cuenta(0)
+
+    async with corriendo(despachador, servicio):
+        ids = [
+            (await servicio.depositar(cuenta_id, DepositoRequest(monto=1, descripcion=f"Depósito {i}"))).movimiento_id
+            for i in range(3)
+        ]
+        eventos = []
+        while len(eventos) < 3:
+            nuevos, _, _ = await despachador.esperar(len(eventos), timeout=2)
+            assert nuevos
+            eventos += nuevos
+        await outbox_vacio(repo)
+
+    assert [(evento["secuencia"], evento["id"]) for evento in eventos] == list(zip((1, 2, 3), ids))
+    with open(despachador.log_path) as log:
+        assert [json.loads(linea)["id"] for linea in log] == ids
+
+
+async def test_el_barrido_recupera_los_registros_sin_despachar(repo, servicio, crear_cuenta, despachador):
+    cuenta_id = await crear_cuenta(0)
+    # Movimientos confirmados antes de arrancar: como si el proceso hubiera caído antes de despacharlos
+    huerfanos = [
+        (await servicio.depositar(cuenta_id, DepositoRequest(monto=1, descripcion="Depósito"))).movimiento_id
+        for _ in range(2)
+    ]
+
+    async with corriendo(despachador, servicio):
+        eventos, siguiente, _ = await despachador.esperar(0, timeout=2)
+        # Un registro que vuelve a aparecer (otra réplica lo recreó) no se repite en el feed
+        await despachador._despachar([dict(eventos[0])])
+        await outbox_vacio(repo)
+
+    assert sorted(evento["id"] for evento in eventos) == sorted(huerfanos)
+    assert despachador.stats()["recuperados"] == 2
+    assert despachador.leer(siguiente) == ([], 2, False)
+
+
+def test_leer_filtra_por_cuenta_e_indica_si_el_buffer_perdio_eventos():
+    despachador = DespachadorEventos(capacidad=3)
+    despachador._buffer.extend(
+        {"id": f"m{i}", "cuenta_id": "a" if i % 2 else "b", "secuencia": i} for i in range(3, 6)
+    )
+    despachador._secuencia = 5
+
+    assert despachador.leer(2, cuenta_id="a") == ([{"id": "m3", "cuenta_id": "a", "secuencia": 3},
+                                                   {"id": "m5", "cuenta_id": "a", "secuencia": 5}], 5, False)
+    # Los eventos 1 y 2 ya salieron del buffer
+    assert despachador.leer(0)[2] is True
+    # Un cursor mayor a la secuencia es de un feed anterior (el proceso se reinició)
+    assert despachador.leer(9) == ([], 5, True)
@@ -0,0 +1,61 @@
+from fastapi import HTTPException
+import csv
+import io
+import json
+import pytest
+
+from app.config import settings
+from app.routers.cuentas import exportar_movimientos
+from app.schemas import DepositoRequest, RetiroRequest
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def cuenta_con_movimientos(servicio, crear_cuenta, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_PAGE_SIZE", 2)
+
+    async def _crear() -> str:
+        cuenta_id = await crear_cuenta(0)
+        for i in range(4):
+            await servicio.depositar(cuenta_id, DepositoRequest(monto=10, descripcion=f"Depósito {i}"))
+        await servicio.retirar(cuenta_id, RetiroRequest(monto=5, descripcion="Retiro"))
+        return cuenta_id
+    return _crear
+
+
+async def bloques(respuesta) -> list:
+    return [bloque async for bloque in respuesta.body_iterator]
+
+
+async def test_ndjson_una_linea_por_movimiento_y_un_bloque_por_pagina(servicio, cuenta_con_movimientos):
+    cuenta_id = await cuenta_con_movimientos()
+
+    respuesta = await exportar_movimientos(cuenta_id, formato="ndjson", desde=None, hasta=None, service=servicio)
+    partes = await bloques(respuesta)
+
+    assert respuesta.media_type == "application/x-ndjson"
+    assert [bloque.count(b"\n") for bloque in partes] == [2, 2, 1]
+    lineas = [json.loads(linea) for linea in b"".join(partes).splitlines()]
+    assert [linea["descripcion"] for linea in lineas] == ["Retiro"] + [f"Depósito {i}" for i in (3, 2, 1, 0)]
+    assert lineas[0]["saldo_nuevo"] == 35
+
+
+async def test_csv_con_encabezado_y_las_columnas_de_la_respuesta(servicio, cuenta_con_movimientos):
+    cuenta_id = await cuenta_con_movimientos()
+
+    respuesta = await exportar_movimientos(cuenta_id, formato="csv", desde=None, hasta=None, service=servicio)
+    filas = list(csv.DictReader(io.StringIO("".join(await bloques(respuesta)))))
+
+    assert respuesta.media_type == "text/csv"
+    assert [fila["descripcion"] for fila in filas] == ["Retiro"] + [f"Depósito {i}" for i in (3, 2, 1, 0)]
+    assert {fila["cuenta_id"] for fila in filas} == {cuenta_id}
+    assert float(filas[-1]["saldo_nuevo"]) == 10
+
+
+async def test_cuenta_inexistente_responde_404_antes_de_transmitir(servicio):
+    with pytest.raises(HTTPException) as error:
+        await exportar_movimientos("no-existe", formato="csv", desde=None, hasta=None, service=servicio)
+
+    assert error.value.status_code == 404
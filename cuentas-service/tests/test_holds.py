@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import HTTPException
+import pytest
+
+from app.holds import BarredorHolds
+from app.models import EstadoHold, Hold
+from app.schemas import HoldCapture, HoldCreate
+
+
+pytestmark = pytest.mark.anyio
+
+
+def hold_vencido(cuenta_id: str, monto: float, segundos: int = 60, referencia: Optional[str] = None) -> Hold:
+    """Hold ACTIVO que venció hace `segundos`"""
+    ahora = datetime.now()
+    return Hold(
+        cuenta_id=cuenta_id,
+        monto=monto,
+        descripcion="Reserva vencida",
+        referencia=referencia,
+        estado=EstadoHold.ACTIVO,
+        expira_en=ahora - timedelta(seconds=segundos),
+        created_at=ahora - timedelta(seconds=2 * segundos),
+        updated_at=ahora - timedelta(seconds=2 * segundos)
+    )
+
+
+def barredor(servicio, lote: int = 100) -> BarredorHolds:
+    """Barrido sin la tarea periódica: las pruebas llaman a `barrer` directamente"""
+    barredor = BarredorHolds(intervalo=3600, lote=lote)
+    barredor._servicio = servicio
+    return barredor
+
+
+async def test_hold_retiene_fondos_y_la_captura_los_debita(servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(100)
+
+    hold = await servicio.crear_hold(cuenta_id, HoldCreate(monto=40, descripcion="Reserva"))
+    cuenta = await servicio.obtener_cuenta(cuenta_id, use_cache=False)
+    assert (cuenta.saldo, cuenta.saldo_retenido, cuenta.saldo_disponible) == (100, 40, 60)
+
+    with pytest.raises(HTTPException) as error:
+        await servicio.crear_hold(cuenta_id, HoldCreate(monto=70, descripcion="Sin fondos"))
+    assert error.value.status_code == 400
+
+    operacion = await servicio.capturar_hold(cuenta_id, hold.id, HoldCapture(monto=25))
+    assert (operacion.saldo_anterior, operacion.saldo_nuevo) == (100, 75)
+
+    cuenta = await servicio.obtener_cuenta(cuenta_id, use_cache=False)
+    assert (cuenta.saldo, cuenta.saldo_retenido) == (75, 0)
+    capturado = await servicio.obtener_hold(cuenta_id, hold.id)
+    assert capturado.estado == EstadoHold.CAPTURADO.value
+    assert capturado.monto_capturado == 25
+
+
+async def test_liberar_hold_devuelve_el_monto_disponible(servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(50)
+    hold = await servicio.crear_hold(cuenta_id, HoldCreate(monto=50, descripcion="Reserva"))
+
+    liberado = await servicio.liberar_hold(cuenta_id, hold.id)
+
+    assert liberado.estado == EstadoHold.LIBERADO.value
+    cuenta = await servicio.obtener_cuenta(cuenta_id, use_cache=False)
+    assert (cuenta.saldo, cuenta.saldo_retenido) == (50, 0)
+    assert await servicio.listar_holds(cuenta_id) == []
+
+
+async def test_barrido_expira_los_holds_vencidos_en_varios_lotes(servicio, repo, crear_cuenta):
+    cuenta_id = await crear_cuenta(100)
+    for _ in range(5):
+        repo.crear_hold(hold_vencido(cuenta_id, 10), lambda cuenta: None)
+    vigente = await servicio.crear_hold(cuenta_id, HoldCreate(monto=10, descripcion="Vigente"))
+
+    expirados = await barredor(servicio, lote=2).barrer()
+
+    assert expirados == 5
+    assert await servicio.holds_vencidos() == []
+    assert [hold.id for hold in await servicio.listar_holds(cuenta_id)] == [vigente.id]
+    cuenta = await servicio.obtener_cuenta(cuenta_id, use_cache=False)
+    assert (cuenta.saldo, cuenta.saldo_retenido) == (100, 10)
+
+
+async def test_barrido_cierra_los_holds_huerfanos_y_termina(servicio, repo, motor, crear_cuenta):
+    cuenta_id = await crear_cuenta(100)
+    otra_id = await crear_cuenta(100)
+    huerfanos = [repo.crear_hold(hold_vencido(cuenta_id, 10), lambda cuenta: None) for _ in range(3)]
+    repo.crear_hold(hold_vencido(otra_id, 10), lambda cuenta: None)
+    motor.collection(repo.collection).document(cuenta_id).delete()
+
+    barrido = barredor(servicio, lote=2)
+    expirados = await barrido.barrer()
+
+    assert expirados == 4
+    assert barrido.huerfanos == 3
+    assert barrido.errores == 0
+    assert await servicio.holds_vencidos() == []
+    for hold in huerfanos:
+        assert repo.get_hold(hold.id).estado == EstadoHold.EXPIRADO.value
+
+
+async def test_capturar_un_hold_vencido_lo_expira_sin_debitar(servicio, repo, crear_cuenta):
+    cuenta_id = await crear_cuenta(100)
+    hold = repo.crear_hold(hold_vencido(cuenta_id, 30), lambda cuenta: None)
+
+    with pytest.raises(HTTPException) as error:
+        await servicio.capturar_hold(cuenta_id, hold.id, HoldCapture())
+
+    assert error.value.status_code == 409
+    assert repo.get_hold(hold.id).estado == EstadoHold.EXPIRADO.value
+    cuenta = await servicio.obtener_cuenta(cuenta_id, use_cache=False)
+    assert (cuenta.saldo, cuenta.saldo_retenido) == (100, 0)
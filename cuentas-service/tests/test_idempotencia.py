@@ -0,0 +1,120 @@
+from fastapi import FastAPI
+import anyio
+import httpx
+import pytest
+
+from app.deps import get_cuentas_service
+from app.idempotencia import IdempotenciaConflicto, IdempotenciaStore
+from app.routers import cuentas as rutas
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def store(monkeypatch) -> IdempotenciaStore:
+    """Registro propio para las rutas (no el global del proceso)"""
+    store = IdempotenciaStore(max_size=100, ttl=60)
+    monkeypatch.setattr(rutas, "idempotencia_store", store)
+    return store
+
+
+@pytest.fixture
+async def cliente(servicio, store):
+    app = FastAPI()
+    app.include_router(rutas.router, prefix="/api")
+    app.dependency_overrides[get_cuentas_service] = lambda: servicio
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as cliente:
+        yield cliente
+
+
+async def test_duplicados_concurrentes_ejecutan_la_operacion_una_vez(store):
+    llamadas = []
+    liberar = anyio.Event()
+    resultados = []
+
+    async def operacion():
+        llamadas.append(1)
+        await liberar.wait()
+        return "hecho"
+
+    async def pedir():
+        resultados.append(await store.ejecutar("k", "h", operacion))
+
+    async with anyio.create_task_group() as grupo:
+        for _ in range(3):
+            grupo.start_soon(pedir)
+        await anyio.sleep(0.01)
+        liberar.set()
+
+    assert llamadas == [1]
+    assert sorted(resultados) == [("hecho", False), ("hecho", True), ("hecho", True)]
+    assert store.stats()["esperas"] == 2
+
+
+async def test_una_operacion_fallida_no_se_guarda(store):
+    intentos = []
+
+    async def operacion():
+        intentos.append(1)
+        if len(intentos) == 1:
+            raise RuntimeError("Firestore no respondió")
+        return "hecho"
+
+    with pytest.raises(RuntimeError):
+        await store.ejecutar("k", "h", operacion)
+
+    assert await store.ejecutar("k", "h", operacion) == ("hecho", False)
+    assert len(intentos) == 2
+
+
+async def test_no_se_descartan_operaciones_en_curso(store):
+    store.max_size = 1
+    liberar = anyio.Event()
+
+    async def lenta():
+        await liberar.wait()
+        return "lenta"
+
+    async def rapida():
+        return "rapida"
+
+    async with anyio.create_task_group() as grupo:
+        grupo.start_soon(store.ejecutar, "en-curso", "h", lenta)
+        await anyio.sleep(0.01)
+        await store.ejecutar("otra", "h", rapida)
+        # La que terminó es la única que se puede descartar
+        assert store.stats()["size"] == 2
+        liberar.set()
+
+    await store.ejecutar("tercera", "h", rapida)
+    assert store.stats()["size"] == 1
+    with pytest.raises(IdempotenciaConflicto):
+        await store.ejecutar("tercera", "otra-huella", rapida)
+
+
+async def test_deposito_repetido_devuelve_la_respuesta_original(cliente, servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(10)
+    url = f"/api/cuentas/{cuenta_id}/depositar"
+    cabeceras = {"Idempotency-Key": "pago-1"}
+
+    primera = await cliente.post(url, json={"monto": 5, "descripcion": "Depósito"}, headers=cabeceras)
+    repetida = await cliente.post(url, json={"monto": 5, "descripcion": "Depósito"}, headers=cabeceras)
+
+    assert primera.status_code == repetida.status_code == 200
+    assert repetida.json() == primera.json()
+    assert repetida.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in primera.headers
+    assert (await servicio.obtener_cuenta(cuenta_id, use_cache=False)).saldo == 15
+
+
+async def test_la_misma_clave_con_otro_cuerpo_responde_422(cliente, servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(10)
+    url = f"/api/cuentas/{cuenta_id}/depositar"
+    cabeceras = {"Idempotency-Key": "pago-1"}
+
+    await cliente.post(url, json={"monto": 5, "descripcion": "Depósito"}, headers=cabeceras)
+    otra = await cliente.post(url, json={"monto": 6, "descripcion": "Depósito"}, headers=cabeceras)
+
+    assert otra.status_code == 422
+    assert (await servicio.obtener_cuenta(cuenta_id, use_cache=False)).saldo == 15
@@ -0,0 +1,119 @@
+from datetime import datetime
+from fastapi import HTTPException
+import pytest
+
+from app.cache import CuentasCache
+from app.config import settings
+from app.eventos import DespachadorEventos
+from app.repos import cuentas_repo
+from app.repos.cuentas_repo import CuentasRepository
+from app.repos.cuentas_repo_async import ThreadpoolCuentasRepository
+from app.repos.limites_diarios import AcumuladosDiarios
+from app.repos.numeros_cuenta import NumeroCuentaAllocator
+from app.schemas import DepositoRequest, RetiroRequest
+from app.services.cuentas_service import CuentasService
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def limites(monkeypatch):
+    monkeypatch.setattr(settings, "LIMITE_DEPOSITO_DIARIO", 100.0)
+    monkeypatch.setattr(settings, "LIMITE_RETIRO_DIARIO", 50.0)
+
+
+@pytest.fixture
+def repo(motor) -> CuentasRepository:
+    return nuevo_repo(motor)
+
+
+def nuevo_repo(motor) -> CuentasRepository:
+    """Repositorio con caché y acumulados propios: hace de otro proceso sobre los mismos datos"""
+    return CuentasRepository(
+        motor,
+        cache=CuentasCache(ttl=60),
+        allocator=NumeroCuentaAllocator(),
+        acumulados=AcumuladosDiarios(),
+        eventos=DespachadorEventos()
+    )
+
+
+def limite_doc(motor, cuenta_id: str):
+    dia = datetime.now().strftime("%Y-%m-%d")
+    return motor.collection("limites_diarios").document(f"{cuenta_id}_{dia}").get()
+
+
+async def rechazado(operacion) -> str:
+    with pytest.raises(HTTPException) as error:
+        await operacion
+    assert error.value.status_code == 400
+    return error.value.detail
+
+
+async def test_limite_de_retiros_con_el_contador_del_dia(motor, servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(200)
+    await servicio.retirar(cuenta_id, RetiroRequest(monto=30, descripcion="Retiro"))
+    await servicio.retirar(cuenta_id, RetiroRequest(monto=20, descripcion="Retiro"))
+
+    detalle = await rechazado(servicio.retirar(cuenta_id, RetiroRequest(monto=0.01, descripcion="Retiro")))
+
+    assert "retiros" in detalle
+    assert limite_doc(motor, cuenta_id).to_dict()["retiros"] == 50
+    assert (await servicio.obtener_cuenta(cuenta_id, use_cache=False)).saldo == 150
+
+
+async def test_cuenta_fraccionada_valida_retiros_con_la_suma_de_los_shards(motor, repo, servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(200)
+    repo.fraccionar_saldo(cuenta_id, 4)
+    for _ in range(5):
+        await servicio.retirar(cuenta_id, RetiroRequest(monto=10, descripcion="Retiro"))
+
+    # Otro proceso, sin acumulados en memoria: los débitos leen todos los shards
+    otro = CuentasService(ThreadpoolCuentasRepository(nuevo_repo(motor)))
+    await rechazado(otro.retirar(cuenta_id, RetiroRequest(monto=1, descripcion="Retiro")))
+
+    # El contador vive en los shards: el documento de límites no se escribe
+    assert not limite_doc(motor, cuenta_id).exists
+    assert (await servicio.obtener_cuenta(cuenta_id, use_cache=False)).saldo == 150
+
+
+async def test_limite_de_depositos_de_cuenta_fraccionada_es_aproximado(
+    motor, repo, servicio, crear_cuenta, monkeypatch
+):
+    # Los créditos van siempre al último shard
+    monkeypatch.setattr(cuentas_repo.random, "choice", lambda opciones: opciones[-1])
+    cuenta_id = await crear_cuenta(0)
+    # Lo depositado antes de fraccionar pasa al shard 0
+    await servicio.depositar(cuenta_id, DepositoRequest(monto=40, descripcion="Depósito"))
+    repo.fraccionar_saldo(cuenta_id, 4)
+    await servicio.depositar(cuenta_id, DepositoRequest(monto=50, descripcion="Depósito"))
+
+    # El mismo proceso conoce lo acumulado: rechaza sin ir a la base
+    await rechazado(servicio.depositar(cuenta_id, DepositoRequest(monto=20, descripcion="Depósito")))
+
+    # Otro proceso que leyó la cuenta tiene la suma de los shards como cota
+    otro_repo = nuevo_repo(motor)
+    otro_repo.get_by_id(cuenta_id, use_cache=False)
+    otro = CuentasService(ThreadpoolCuentasRepository(otro_repo))
+    await rechazado(otro.depositar(cuenta_id, DepositoRequest(monto=20, descripcion="Depósito")))
+
+    # Un proceso que nunca leyó todos los shards solo ve el shard que escribe
+    # (50): el límite puede superarse, es lo que se resigna por no serializar
+    # los créditos en un documento
+    ciego = CuentasService(ThreadpoolCuentasRepository(nuevo_repo(motor)))
+    await ciego.depositar(cuenta_id, DepositoRequest(monto=20, descripcion="Depósito"))
+    assert (await servicio.obtener_cuenta(cuenta_id, use_cache=False)).saldo == 110
+
+
+async def test_consolidar_devuelve_el_acumulado_al_documento_de_limites(motor, repo, servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(100)
+    repo.fraccionar_saldo(cuenta_id, 4)
+    await servicio.retirar(cuenta_id, RetiroRequest(monto=30, descripcion="Retiro"))
+    await servicio.depositar(cuenta_id, DepositoRequest(monto=10, descripcion="Depósito"))
+
+    repo.fraccionar_saldo(cuenta_id, 0)
+
+    acumulados = limite_doc(motor, cuenta_id).to_dict()
+    assert (acumulados["retiros"], acumulados["depositos"]) == (30, 10)
+    await rechazado(servicio.retirar(cuenta_id, RetiroRequest(monto=20.01, descripcion="Retiro")))
@@ -0,0 +1,59 @@
+from pydantic import ValidationError
+import json
+import pytest
+
+from app.cache import CuentasCache
+from app.routers.cuentas import buscar_cuentas
+from app.schemas import CuentaLookupRequest
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def lecturas(repo, monkeypatch) -> list:
+    """IDs pedidos en cada get_all del repositorio (crear una cuenta también lee con get_all)"""
+    pedidas = []
+    get_all = repo.db.get_all
+
+    def _contar(refs, *args, **kwargs):
+        refs = list(refs)
+        pedidas.append([ref.id for ref in refs])
+        return get_all(refs, *args, **kwargs)
+
+    monkeypatch.setattr(repo.db, "get_all", _contar)
+    return pedidas
+
+
+async def test_lookup_respeta_el_orden_y_lista_las_inexistentes(servicio, crear_cuenta, lecturas):
+    a, b = await crear_cuenta(10), await crear_cuenta(20)
+    lecturas.clear()
+
+    respuesta = await buscar_cuentas(CuentaLookupRequest(ids=[b, "no-existe", a, b]), service=servicio)
+    cuerpo = json.loads(respuesta.body)
+
+    assert [cuenta["id"] for cuenta in cuerpo["items"]] == [b, a]
+    assert [cuenta["saldo"] for cuenta in cuerpo["items"]] == [20, 10]
+    assert cuerpo["no_encontradas"] == ["no-existe"]
+    # Una sola lectura, sin repetir el ID duplicado
+    assert lecturas == [[b, "no-existe", a]]
+
+
+async def test_las_cuentas_cacheadas_no_se_vuelven_a_leer(repo, servicio, crear_cuenta, lecturas):
+    repo.cache = CuentasCache(ttl=60)
+    a, b = await crear_cuenta(10), await crear_cuenta(20)
+    repo.cache.invalidar(b)
+    lecturas.clear()
+
+    cuentas, no_encontradas = await servicio.obtener_cuentas([a, b])
+
+    assert [cuenta.id for cuenta in cuentas] == [a, b]
+    assert no_encontradas == []
+    assert lecturas == [[b]]
+
+
+def test_lookup_acepta_entre_1_y_500_ids():
+    CuentaLookupRequest(ids=["x"] * 500)
+    for ids in ([], ["x"] * 501):
+        with pytest.raises(ValidationError):
+            CuentaLookupRequest(ids=ids)
@@ -0,0 +1,65 @@
+import pytest
+
+from app.repos.cuentas_repo import (
+    LOTE_ESCRITURAS_POR_CUENTA, LOTE_ESCRITURAS_POR_MOVIMIENTO, LOTE_MAX_ESCRITURAS
+)
+from app.schemas import OperacionLoteItem, OperacionLoteRequest
+
+
+pytestmark = pytest.mark.anyio
+
+# Movimientos de una sola cuenta que entran en una transacción
+POR_LOTE = (LOTE_MAX_ESCRITURAS - LOTE_ESCRITURAS_POR_CUENTA) // LOTE_ESCRITURAS_POR_MOVIMIENTO
+
+
+def deposito(cuenta_id: str, monto: float = 1, descripcion: str = "Depósito") -> OperacionLoteItem:
+    return OperacionLoteItem(cuenta_id=cuenta_id, tipo="DEPOSITO", monto=monto, descripcion=descripcion)
+
+
+def test_armar_lotes_respeta_el_limite_de_escrituras_y_el_orden(repo):
+    operaciones = [deposito("a") for _ in range(POR_LOTE + 10)] + [deposito("b") for _ in range(3)]
+
+    lotes = repo._armar_lotes(operaciones)
+
+    assert len(lotes) == 2
+    for lote in lotes:
+        escrituras = sum(
+            len(grupo) * LOTE_ESCRITURAS_POR_MOVIMIENTO + LOTE_ESCRITURAS_POR_CUENTA
+            for grupo in lote.values()
+        )
+        assert escrituras <= LOTE_MAX_ESCRITURAS
+    # La cuenta que no entra sigue en el lote siguiente, en el orden original
+    assert len(lotes[0]["a"]) == POR_LOTE
+    indices = [indice for lote in lotes for indice, _ in lote.get("a", [])]
+    assert indices == list(range(POR_LOTE + 10))
+    assert [indice for indice, _ in lotes[1]["b"]] == [POR_LOTE + 10, POR_LOTE + 11, POR_LOTE + 12]
+
+
+async def test_aplicar_lote_en_varias_transacciones(servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(0)
+    operaciones = [deposito(cuenta_id, descripcion=f"Depósito {i}") for i in range(POR_LOTE + 5)]
+
+    respuesta = await servicio.aplicar_lote(OperacionLoteRequest(operaciones=operaciones))
+
+    assert respuesta.lotes == 2
+    assert respuesta.exitosas == POR_LOTE + 5
+    assert [r.saldo_nuevo for r in respuesta.resultados] == [float(i + 1) for i in range(POR_LOTE + 5)]
+    assert (await servicio.obtener_cuenta(cuenta_id, use_cache=False)).saldo == POR_LOTE + 5
+
+
+async def test_aplicar_lote_rechaza_solo_las_operaciones_invalidas(servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(10)
+    operaciones = [
+        deposito(cuenta_id, 5),
+        OperacionLoteItem(cuenta_id=cuenta_id, tipo="RETIRO", monto=50, descripcion="Sin fondos"),
+        OperacionLoteItem(cuenta_id=cuenta_id, tipo="RETIRO", monto=15, descripcion="Retiro"),
+        deposito("no-existe", 5),
+    ]
+
+    respuesta = await servicio.aplicar_lote(OperacionLoteRequest(operaciones=operaciones))
+
+    assert [r.success for r in respuesta.resultados] == [True, False, True, False]
+    assert "Saldo insuficiente" in respuesta.resultados[1].mensaje
+    assert respuesta.resultados[3].mensaje == "Cuenta no encontrada"
+    assert respuesta.resultados[2].saldo_nuevo == 0
+    assert (await servicio.obtener_cuenta(cuenta_id, use_cache=False)).saldo == 0
@@ -0,0 +1,135 @@
+from types import SimpleNamespace
+from fastapi import FastAPI
+import httpx
+import pytest
+
+from app import metricas
+from app.metricas import CABECERA_PRESUPUESTO, MetricasMiddleware, RegistroMetricas, instrumentar_firestore
+
+
+pytestmark = pytest.mark.anyio
+
+
+class Respuesta:
+    """Respuesta de la API GAPIC: solo lo que lee app.metricas"""
+
+    def __init__(self, campo: str = "", done: bool = False):
+        self._pb = SimpleNamespace(HasField=lambda nombre: nombre == campo)
+        self.done = done
+
+
+class ApiSincronica:
+    def get_document(self, request=None):
+        return Respuesta()
+
+    def batch_get_documents(self, request=None):
+        return iter([Respuesta("found"), Respuesta("missing")])
+
+    def run_query(self, request=None):
+        return iter([Respuesta("document"), Respuesta("document"), Respuesta(done=True)])
+
+    def commit(self, request=None):
+        return SimpleNamespace(write_results=[1, 2, 3])
+
+    def begin_transaction(self, request=None):
+        raise RuntimeError("Firestore no respondió")
+
+
+class ApiAsincronica:
+    async def get_document(self, request=None):
+        return Respuesta()
+
+    async def run_query(self, request=None):
+        async def respuestas():
+            yield Respuesta("document")
+            yield Respuesta(done=True)
+        return respuestas()
+
+
+@pytest.fixture
+def registro(monkeypatch) -> RegistroMetricas:
+    registro = RegistroMetricas()
+    monkeypatch.setattr(metricas, "registro_metricas", registro)
+    return registro
+
+
+def series(registro: RegistroMetricas, nombre: str) -> dict:
+    """Muestras de una métrica: etiquetas -> valor"""
+    prefijo = nombre + "{"
+    return {
+        linea[len(nombre):].rsplit(" ", 1)[0]: float(linea.rsplit(" ", 1)[1])
+        for linea in registro.exponer().splitlines() if linea.startswith(prefijo)
+    }
+
+
+def test_las_llamadas_fuera_de_una_peticion_van_a_fondo(registro):
+    cliente = instrumentar_firestore(SimpleNamespace(_firestore_api=ApiSincronica()))
+    api = cliente._firestore_api
+
+    api.get_document()
+    # BatchGetDocuments: se registra con la última respuesta esperada aunque no se agote el stream
+    next(iter(api.batch_get_documents(request={"documents": ["a"]})))
+    list(api.run_query())
+    api.commit()
+    with pytest.raises(RuntimeError):
+        api.begin_transaction()
+
+    llamadas = series(registro, "firestore_llamadas_total")
+    assert llamadas == {
+        '{ruta="fondo",tipo="escritura",operacion="commit"}': 1,
+        '{ruta="fondo",tipo="lectura",operacion="batch_get_documents"}': 1,
+        '{ruta="fondo",tipo="lectura",operacion="get_document"}': 1,
+        '{ruta="fondo",tipo="consulta",operacion="run_query"}': 1,
+        '{ruta="fondo",tipo="transaccion",operacion="begin_transaction"}': 1,
+    }
+    assert series(registro, "firestore_documentos_total") == {
+        '{ruta="fondo",tipo="consulta"}': 2,
+        '{ruta="fondo",tipo="escritura"}': 3,
+        '{ruta="fondo",tipo="lectura"}': 1,
+    }
+    assert series(registro, "firestore_errores_total") == {
+        '{ruta="fondo",tipo="transaccion",operacion="begin_transaction"}': 1
+    }
+
+
+def test_instrumentar_dos_veces_no_cuenta_doble(registro):
+    cliente = SimpleNamespace(_firestore_api=ApiSincronica())
+    instrumentar_firestore(instrumentar_firestore(cliente))
+
+    cliente._firestore_api.get_document()
+
+    assert sum(series(registro, "firestore_llamadas_total").values()) == 1
+    # Sin la API GAPIC el cliente queda como está
+    assert instrumentar_firestore(SimpleNamespace()) == SimpleNamespace()
+
+
+async def test_cada_peticion_cuenta_sus_llamadas_con_la_plantilla_de_la_ruta(registro):
+    api = instrumentar_firestore(SimpleNamespace(_firestore_api=ApiAsincronica()))._firestore_api
+    app = FastAPI()
+
+    @app.get("/cuentas/{cuenta_id}")
+    async def obtener(cuenta_id: str):
+        await api.get_document()
+        documentos = [respuesta async for respuesta in await api.run_query()]
+        return {"id": cuenta_id, "respuestas": len(documentos)}
+
+    transporte = httpx.ASGITransport(app=MetricasMiddleware(app, cabecera=True))
+    async with httpx.AsyncClient(transport=transporte, base_url="http://test") as cliente:
+        respuestas = [await cliente.get(f"/cuentas/c{i}") for i in range(2)]
+        await cliente.get("/no-existe")
+
+    cabecera = respuestas[0].headers[CABECERA_PRESUPUESTO]
+    assert cabecera.startswith("lectura=1;escritura=0;consulta=1;transaccion=0;documentos=1;ms=")
+    assert series(registro, "firestore_llamadas_total") == {
+        '{ruta="/cuentas/{cuenta_id}",tipo="consulta",operacion="run_query"}': 2,
+        '{ruta="/cuentas/{cuenta_id}",tipo="lectura",operacion="get_document"}': 2,
+    }
+    peticiones = series(registro, "http_peticion_duracion_segundos_count")
+    assert peticiones == {
+        '{metodo="GET",ruta="/cuentas/{cuenta_id}",codigo="200"}': 2,
+        '{metodo="GET",ruta="sin_ruta",codigo="404"}': 1,
+    }
+    # Dos llamadas por petición: caen en el bucket le="2"
+    assert series(registro, "firestore_llamadas_por_peticion_bucket")[
+        '{metodo="GET",ruta="/cuentas/{cuenta_id}",le="2"}'
+    ] == 2
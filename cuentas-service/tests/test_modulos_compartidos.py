@@ -0,0 +1,30 @@
+from pathlib import Path
+import pytest
+
+
+# arranque, metricas y responses se copian en cada servicio (cada imagen se
+# construye solo con su directorio): las copias tienen que ser idénticas.
+# prestamos-service usa fin de línea CRLF, así que se compara sin "\r".
+
+RAIZ = Path(__file__).resolve().parents[2]
+SERVICIOS = (
+    "cuentas-service", "fastapi-oauth", "pagos-service", "prestamos-service", "transferencias-service"
+)
+MODULOS = ("arranque.py", "metricas.py", "responses.py")
+
+
+def contenido(servicio: str, modulo: str) -> str:
+    return (RAIZ / servicio / "app" / modulo).read_bytes().decode().replace("\r\n", "\n")
+
+
+@pytest.mark.parametrize("modulo", MODULOS)
+def test_las_copias_del_modulo_son_identicas(modulo):
+    presentes = [servicio for servicio in SERVICIOS if (RAIZ / servicio / "app" / modulo).exists()]
+    if presentes == ["cuentas-service"]:
+        pytest.skip("Solo está cuentas-service")
+
+    original = contenido("cuentas-service", modulo)
+    distintos = [servicio for servicio in presentes if contenido(servicio, modulo) != original]
+
+    assert presentes == list(SERVICIOS)
+    assert not distintos, f"{modulo} difiere de cuentas-service en: {', '.join(distintos)}"
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from fastapi import HTTPException
+import json
+import pytest
+
+from app.models import TipoMovimiento
+from app.schemas import DepositoRequest, MovimientoFilter, RetiroRequest
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def cuenta_con_movimientos(servicio, crear_cuenta, depositos: int, retiros: int) -> str:
+    cuenta_id = await crear_cuenta(0)
+    for i in range(depositos):
+        await servicio.depositar(cuenta_id, DepositoRequest(monto=10, descripcion=f"Depósito {i}"))
+    for i in range(retiros):
+        await servicio.retirar(cuenta_id, RetiroRequest(monto=1, descripcion=f"Retiro {i}"))
+    return cuenta_id
+
+
+async def test_get_movimientos_page_recorre_el_historial_sin_repetir(repo, servicio, crear_cuenta):
+    cuenta_id = await cuenta_con_movimientos(servicio, crear_cuenta, depositos=5, retiros=2)
+
+    vistos = []
+    start_after = None
+    while True:
+        movimientos, ultimo = repo.get_movimientos_page(cuenta_id, page_size=3, start_after=start_after)
+        assert len(movimientos) <= 3
+        vistos += movimientos
+        if not ultimo:
+            break
+        assert ultimo.id == movimientos[-1].id
+        start_after = (ultimo.fecha, ultimo.id)
+
+    assert len({mov.id for mov in vistos}) == 7
+    claves = [(mov.fecha, mov.id) for mov in vistos]
+    assert claves == sorted(claves, reverse=True)
+
+
+async def test_get_movimientos_page_filtra_por_tipo(repo, servicio, crear_cuenta):
+    cuenta_id = await cuenta_con_movimientos(servicio, crear_cuenta, depositos=3, retiros=2)
+
+    retiros, ultimo = repo.get_movimientos_page(
+        cuenta_id, MovimientoFilter(tipo=TipoMovimiento.RETIRO), page_size=10
+    )
+
+    assert ultimo is None
+    assert [mov.descripcion for mov in retiros] == ["Retiro 1", "Retiro 0"]
+
+
+async def test_obtener_movimientos_pagina_con_token(servicio, crear_cuenta):
+    cuenta_id = await cuenta_con_movimientos(servicio, crear_cuenta, depositos=4, retiros=0)
+
+    primera, token = await servicio.obtener_movimientos(cuenta_id, limit=3)
+    segunda, fin = await servicio.obtener_movimientos(cuenta_id, limit=3, page_token=token)
+
+    assert token is not None and fin is None
+    assert [mov.descripcion for mov in primera + segunda] == [f"Depósito {i}" for i in (3, 2, 1, 0)]
+
+    with pytest.raises(HTTPException) as error:
+        await servicio.obtener_movimientos(cuenta_id, page_token="no-es-un-token")
+    assert error.value.status_code == 400
+
+
+async def test_rango_de_fechas_invertido_responde_400_al_listar_y_al_exportar(servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(0)
+    ahora = datetime.now()
+    invertido = MovimientoFilter(fecha_desde=ahora, fecha_hasta=ahora - timedelta(days=1))
+
+    for consulta in (servicio.obtener_movimientos, servicio.exportar_movimientos):
+        with pytest.raises(HTTPException) as error:
+            await consulta(cuenta_id, invertido)
+        assert error.value.status_code == 400
+
+
+async def test_get_movimientos_page_filtra_por_rango_de_fechas(repo, servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(0)
+    await servicio.depositar(cuenta_id, DepositoRequest(monto=10, descripcion="Antes"))
+    desde = datetime.now()
+    for i in range(3):
+        await servicio.depositar(cuenta_id, DepositoRequest(monto=10, descripcion=f"Dentro {i}"))
+    hasta = datetime.now()
+    await servicio.depositar(cuenta_id, DepositoRequest(monto=10, descripcion="Después"))
+
+    dentro, ultimo = repo.get_movimientos_page(
+        cuenta_id, MovimientoFilter(fecha_desde=desde, fecha_hasta=hasta), page_size=2
+    )
+    resto, fin = repo.get_movimientos_page(
+        cuenta_id, MovimientoFilter(fecha_desde=desde, fecha_hasta=hasta), page_size=2,
+        start_after=(ultimo.fecha, ultimo.id)
+    )
+
+    assert fin is None
+    assert [mov.descripcion for mov in dentro + resto] == ["Dentro 2", "Dentro 1", "Dentro 0"]
+
+
+def test_el_manifiesto_tiene_los_indices_de_las_consultas_de_movimientos(repo):
+    manifiesto = json.loads((Path(__file__).parents[1] / "firestore.indexes.json").read_text())
+    indices = {
+        (indice["collectionGroup"], tuple((campo["fieldPath"], campo["order"]) for campo in indice["fields"]))
+        for indice in manifiesto["indexes"]
+    }
+    ahora = datetime.now()
+
+    for filtros in (None, MovimientoFilter(tipo=TipoMovimiento.DEPOSITO, fecha_desde=ahora)):
+        query = repo._query_movimientos("c1", filtros)
+        # Igualdades primero y después el orden; el desempate por __name__ no va en el índice
+        igualdades = [(campo, "ASCENDING") for campo, op, _ in query._filtros if op == "=="]
+        orden = [(campo, direccion) for campo, direccion in query._orden if campo != "__name__"]
+        assert ("movimientos", tuple(igualdades + orden)) in indices
@@ -0,0 +1,111 @@
+from datetime import datetime
+from fastapi import HTTPException
+import anyio
+import pytest
+
+from app.config import settings
+from app.models import Cuenta, EstadoCuenta
+from app.repos.cuentas_repo import CuentasRepository
+from app.repos.numeros_cuenta import NumeroCuentaAllocator
+
+
+pytestmark = pytest.mark.anyio
+
+
+def cuenta_legacy(repo, numero_cuenta: str) -> str:
+    """Guarda una cuenta como las creadas antes del índice: sin entrada en numeros_cuenta"""
+    cuenta = Cuenta(
+        cliente_id="legacy", saldo=0, estado=EstadoCuenta.ACTIVA,
+        numero_cuenta=numero_cuenta, fecha_apertura=datetime.now()
+    )
+    ref = repo.db.collection("cuentas").document()
+    ref.set(repo._cuenta_to_dict(cuenta))
+    return ref.id
+
+
+def otro_proceso(repo) -> CuentasRepository:
+    """Mismo almacenamiento, asignador de números propio"""
+    return CuentasRepository(
+        repo.db, cache=repo.cache, allocator=NumeroCuentaAllocator(),
+        acumulados=repo.acumulados, eventos=repo.eventos
+    )
+
+
+def numero(n: int) -> str:
+    return f"{settings.NUMERO_CUENTA_INICIAL + n:010d}"
+
+
+async def test_numeros_consecutivos_e_indexados_en_una_base_nueva(repo, servicio, crear_cuenta):
+    ids = []
+
+    async def _crear():
+        ids.append(await crear_cuenta(0))
+
+    async with anyio.create_task_group() as grupo:
+        for _ in range(10):
+            grupo.start_soon(_crear)
+
+    cuentas = repo.get_many(ids)
+    assert sorted(cuenta.numero_cuenta for cuenta in cuentas.values()) == [numero(i) for i in range(10)]
+    assert repo._contador_numero_ref().get().to_dict()["indice_completo"] is True
+    for cuenta in cuentas.values():
+        assert repo._numero_ref(cuenta.numero_cuenta).get().to_dict()["cuenta_id"] == cuenta.id
+
+
+async def test_sin_la_migracion_no_se_crean_cuentas(repo, servicio, crear_cuenta):
+    cuenta_legacy(repo, numero(0))
+
+    with pytest.raises(HTTPException) as error:
+        await crear_cuenta(0)
+
+    assert error.value.status_code == 503
+    assert "indexar_numeros_cuenta" in error.value.detail
+
+
+async def test_sin_exigir_el_indice_se_saltean_los_numeros_legacy(repo, crear_cuenta, monkeypatch):
+    monkeypatch.setattr(settings, "NUMERO_CUENTA_EXIGIR_INDICE", False)
+    legacy_id = cuenta_legacy(repo, numero(1))
+
+    nuevas = [await crear_cuenta(0) for _ in range(3)]
+
+    numeros = [repo.get_by_id(cuenta_id).numero_cuenta for cuenta_id in nuevas]
+    assert numeros == [numero(0), numero(2), numero(3)]
+    assert repo.get_by_numero_cuenta(numero(1), use_cache=False).id == legacy_id
+
+
+async def test_la_migracion_indexa_las_cuentas_y_habilita_la_creacion(repo, crear_cuenta):
+    legacy_id = cuenta_legacy(repo, numero(0))
+    with pytest.raises(HTTPException):
+        await crear_cuenta(0)
+
+    # Lo que hace scripts/indexar_numeros_cuenta.py
+    for cuenta in repo.list():
+        repo.indexar_numero_cuenta(cuenta)
+    repo.marcar_indice_completo()
+
+    # El número legacy ya está en el índice: el batch de create lo rechaza y sigue con el próximo
+    nuevo = otro_proceso(repo)
+    cuenta_id = nuevo.create(Cuenta(
+        cliente_id="cliente-1", saldo=0, estado=EstadoCuenta.ACTIVA, numero_cuenta="", fecha_apertura=datetime.now()
+    ))
+    assert nuevo.get_by_id(cuenta_id).numero_cuenta != numero(0)
+    assert nuevo.get_by_numero_cuenta(numero(0)).id == legacy_id
+    assert nuevo._contador_numero_ref().get().to_dict()["indice_completo"] is True
+
+
+async def test_cada_proceso_reparte_su_propio_bloque(repo, monkeypatch):
+    monkeypatch.setattr(settings, "NUMERO_CUENTA_BLOQUE", 3)
+    nuevo = otro_proceso(repo)
+
+    def crear(repositorio) -> str:
+        cuenta_id = repositorio.create(Cuenta(
+            cliente_id="cliente-1", saldo=0, estado=EstadoCuenta.ACTIVA, numero_cuenta="", fecha_apertura=datetime.now()
+        ))
+        return repositorio.get_by_id(cuenta_id).numero_cuenta
+
+    primeros = [crear(repo), crear(nuevo), crear(repo), crear(nuevo)]
+    siguientes = [crear(repo) for _ in range(2)]
+
+    assert primeros == [numero(0), numero(3), numero(1), numero(4)]
+    # Agotado su bloque, el primer proceso reserva el que sigue al del otro
+    assert siguientes == [numero(2), numero(6)]
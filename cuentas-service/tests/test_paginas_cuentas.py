@@ -0,0 +1,60 @@
+from fastapi import HTTPException
+import pytest
+
+from app.pagination import encode_page_token
+from app.schemas import CuentaFilter
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def recorrer(servicio, filtros: CuentaFilter, page_size: int) -> list:
+    """Páginas de IDs hasta que no venga token"""
+    paginas, token = [], None
+    while True:
+        cuentas, token = await servicio.listar_cuentas(filtros, page_size=page_size, page_token=token)
+        paginas.append([cuenta.id for cuenta in cuentas])
+        if token is None:
+            return paginas
+
+
+async def test_las_paginas_recorren_las_cuentas_del_cliente_en_orden(servicio, crear_cuenta):
+    propias = [await crear_cuenta(0, cliente_id="cliente-1") for _ in range(5)]
+    for _ in range(3):
+        await crear_cuenta(0, cliente_id="cliente-2")
+
+    paginas = await recorrer(servicio, CuentaFilter(cliente_id="cliente-1"), page_size=2)
+
+    assert [len(pagina) for pagina in paginas] == [2, 2, 1]
+    assert sum(paginas, []) == sorted(propias)
+
+
+async def test_la_ultima_pagina_completa_no_trae_token(servicio, crear_cuenta):
+    for _ in range(4):
+        await crear_cuenta(0)
+
+    paginas = await recorrer(servicio, CuentaFilter(cliente_id="cliente-1"), page_size=2)
+
+    assert [len(pagina) for pagina in paginas] == [2, 2]
+
+
+async def test_una_cuenta_nueva_no_desplaza_las_paginas(servicio, crear_cuenta):
+    ids = sorted([await crear_cuenta(0) for _ in range(4)])
+    filtros = CuentaFilter(cliente_id="cliente-1")
+
+    primera, token = await servicio.listar_cuentas(filtros, page_size=2)
+    await crear_cuenta(0)
+    segunda, _ = await servicio.listar_cuentas(filtros, page_size=2, page_token=token)
+
+    assert [cuenta.id for cuenta in primera] == ids[:2]
+    # El cursor es el último ID: la segunda página sigue desde ahí, sin repetir ni saltear
+    assert ids[2] in [cuenta.id for cuenta in segunda]
+    assert all(cuenta.id > ids[1] for cuenta in segunda)
+
+
+async def test_token_invalido_responde_400(servicio):
+    # Texto que no es JSON y una lista en lugar de un objeto
+    for token in ("no-es-un-token", encode_page_token([1])):
+        with pytest.raises(HTTPException) as error:
+            await servicio.listar_cuentas(page_token=token)
+        assert error.value.status_code == 400
@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+import pytest
+
+from app.decodificacion import cuenta_a_fila, decodificar_cuenta, movimiento_a_fila
+from app.routers.cuentas import buscar_cuentas, listar_cuentas, obtener_movimientos, router
+from app.responses import FastJSONResponse
+from app.schemas import DepositoRequest, RetiroRequest
+
+
+pytestmark = pytest.mark.anyio
+
+# Los listados arman las filas sin validar y las serializan con orjson
+# (app.responses). Estas pruebas fijan que los bytes sean los mismos que
+# FastAPI enviaría validando las filas contra el response_model de la ruta.
+
+
+def campo_respuesta(endpoint):
+    return next(ruta.response_field for ruta in router.routes if ruta.endpoint is endpoint)
+
+
+async def como_fastapi(endpoint, contenido) -> bytes:
+    """Cuerpo que FastAPI arma al validar `contenido` contra el response_model"""
+    validado = await serialize_response(field=campo_respuesta(endpoint), response_content=contenido)
+    return JSONResponse(validado).body
+
+
+async def test_listado_de_cuentas_igual_al_response_model(repo, servicio, crear_cuenta):
+    for saldo in (0, 10, 1234.56):
+        await crear_cuenta(saldo)
+    cuentas = repo.list()
+    # Como las devuelve Firestore: fechas con zona UTC y microsegundos
+    utc = datetime(2024, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    cuentas.append(decodificar_cuenta("firestore", {
+        **cuentas[0].model_dump(exclude={"id"}),
+        "saldo": 7, "fecha_apertura": utc, "created_at": utc, "updated_at": utc
+    }))
+    filas = [cuenta_a_fila(cuenta) for cuenta in cuentas]
+
+    assert FastJSONResponse(filas).body == await como_fastapi(listar_cuentas, filas)
+
+    lookup = {"items": filas, "no_encontradas": ["no-existe"]}
+    assert FastJSONResponse(lookup).body == await como_fastapi(buscar_cuentas, lookup)
+
+
+async def test_listado_de_movimientos_igual_al_response_model(servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(0)
+    await servicio.depositar(cuenta_id, DepositoRequest(monto=100, descripcion="Depósito inicial"))
+    await servicio.depositar(cuenta_id, DepositoRequest(monto=0.1, descripcion="Ajuste"))
+    await servicio.retirar(cuenta_id, RetiroRequest(monto=33.33, descripcion="Retiro en cajero"))
+
+    movimientos, _ = await servicio.obtener_movimientos(cuenta_id)
+    filas = [movimiento_a_fila(mov) for mov in movimientos]
+
+    assert len(filas) == 3
+    assert FastJSONResponse(filas).body == await como_fastapi(obtener_movimientos, filas)
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+import pytest
+
+from app.cache import CuentasCache
+from app.eventos import DespachadorEventos
+from app.models import Movimiento, TipoMovimiento
+from app.repos.cuentas_repo import CuentasRepository
+from app.repos.limites_diarios import AcumuladosDiarios
+from app.repos.numeros_cuenta import NumeroCuentaAllocator
+from app.schemas import DepositoRequest, RetiroRequest, TransferenciaRequest
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def repo(motor) -> CuentasRepository:
+    # Con caché: los créditos a cuentas fraccionadas no leen la cuenta
+    return CuentasRepository(
+        motor,
+        cache=CuentasCache(ttl=60),
+        allocator=NumeroCuentaAllocator(),
+        acumulados=AcumuladosDiarios(),
+        eventos=DespachadorEventos()
+    )
+
+
+async def test_resumen_del_dia_con_saldos_de_apertura_y_cierre(servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(0)
+    await servicio.depositar(cuenta_id, DepositoRequest(monto=100, descripcion="Depósito"))
+    await servicio.retirar(cuenta_id, RetiroRequest(monto=30, descripcion="Retiro"))
+
+    dia, = await servicio.obtener_resumen(cuenta_id, "dia")
+    mes, = await servicio.obtener_resumen(cuenta_id, "mes")
+
+    assert dia.periodo == datetime.now().strftime("%Y-%m-%d")
+    assert mes.periodo == datetime.now().strftime("%Y-%m")
+    for resumen in (dia, mes):
+        assert (resumen.saldo_apertura, resumen.saldo_cierre) == (0, 70)
+        assert (resumen.total_creditos, resumen.total_debitos, resumen.cantidad_movimientos) == (100, 30, 2)
+        assert resumen.creditos == {TipoMovimiento.DEPOSITO.value: 100}
+        assert resumen.debitos == {TipoMovimiento.RETIRO.value: 30}
+
+
+async def test_cuenta_fraccionada_reparte_los_resumenes_por_shard(motor, repo, servicio, crear_cuenta):
+    cuenta_id, origen = await crear_cuenta(0), await crear_cuenta(100)
+    await servicio.depositar(cuenta_id, DepositoRequest(monto=10, descripcion="Depósito"))
+    repo.fraccionar_saldo(cuenta_id, 4)
+    for _ in range(8):
+        await servicio.depositar(cuenta_id, DepositoRequest(monto=5, descripcion="Depósito"))
+    await servicio.transferir(TransferenciaRequest(cuenta_origen_id=origen, cuenta_destino_id=cuenta_id, monto=20))
+    await servicio.retirar(cuenta_id, RetiroRequest(monto=15, descripcion="Retiro"))
+
+    # El documento del periodo solo tiene lo anterior a fraccionar
+    dia = datetime.now().strftime("%Y-%m-%d")
+    diarios = motor.collection("cuentas").document(cuenta_id).collection("resumenes_diarios")
+    assert diarios.document(dia).get().to_dict()["cantidad_movimientos"] == 1
+    assert {doc.id for doc in diarios.stream()} - {dia} <= {f"{dia}_{i}" for i in range(4)}
+
+    resumen, = await servicio.obtener_resumen(cuenta_id, "dia")
+    assert (resumen.saldo_apertura, resumen.saldo_cierre) == (None, None)
+    assert (resumen.total_creditos, resumen.total_debitos, resumen.cantidad_movimientos) == (70, 15, 11)
+    assert resumen.creditos == {
+        TipoMovimiento.DEPOSITO.value: 50, TipoMovimiento.TRANSFERENCIA_ENTRADA.value: 20
+    }
+
+
+async def test_el_limite_cuenta_periodos_y_no_documentos(repo, crear_cuenta):
+    cuenta_id = await crear_cuenta(0)
+    hoy = datetime.now()
+    batch = repo.db.batch()
+    for dias in range(5):
+        # Tres documentos por día: el de la cuenta y dos shards
+        for shard in (None, "0", "1"):
+            movimiento = Movimiento(
+                cuenta_id=cuenta_id, tipo=TipoMovimiento.DEPOSITO, monto=1, saldo_anterior=0, saldo_nuevo=1,
+                descripcion="Depósito", fecha=hoy - timedelta(days=dias)
+            )
+            repo._escribir_resumenes(batch, cuenta_id, [movimiento], shard)
+    batch.commit()
+
+    resumenes = repo.get_resumenes(cuenta_id, "dia", limit=2)
+
+    assert [r.periodo for r in resumenes] == [
+        (hoy - timedelta(days=dias)).strftime("%Y-%m-%d") for dias in range(2)
+    ]
+    assert [r.cantidad_movimientos for r in resumenes] == [3, 3]
+    assert len(repo.get_resumenes(cuenta_id, "dia", limit=10)) == 5
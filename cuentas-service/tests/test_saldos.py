@@ -0,0 +1,57 @@
+from fastapi import HTTPException
+import anyio
+import pytest
+
+from app.models import TipoMovimiento
+from app.schemas import DepositoRequest, RetiroRequest
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_deposito_y_retiro_actualizan_saldo_y_registran_el_movimiento(servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(50)
+
+    deposito = await servicio.depositar(cuenta_id, DepositoRequest(monto=25, descripcion="Depósito"))
+    retiro = await servicio.retirar(cuenta_id, RetiroRequest(monto=60, descripcion="Retiro"))
+
+    assert (deposito.saldo_anterior, deposito.saldo_nuevo) == (50, 75)
+    assert (retiro.saldo_anterior, retiro.saldo_nuevo) == (75, 15)
+    assert (await servicio.obtener_cuenta(cuenta_id, use_cache=False)).saldo == 15
+
+    movimientos, _ = await servicio.obtener_movimientos(cuenta_id)
+    assert [(mov.tipo, mov.saldo_nuevo) for mov in movimientos[:2]] == [
+        (TipoMovimiento.RETIRO.value, 15), (TipoMovimiento.DEPOSITO.value, 75)
+    ]
+    assert movimientos[0].id == retiro.movimiento_id
+
+
+async def test_retiro_sin_saldo_no_registra_nada(servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(10)
+    antes, _ = await servicio.obtener_movimientos(cuenta_id)
+
+    with pytest.raises(HTTPException) as error:
+        await servicio.retirar(cuenta_id, RetiroRequest(monto=10.01, descripcion="Retiro"))
+
+    assert error.value.status_code == 400
+    assert (await servicio.obtener_cuenta(cuenta_id, use_cache=False)).saldo == 10
+    despues, _ = await servicio.obtener_movimientos(cuenta_id)
+    assert [mov.id for mov in despues] == [mov.id for mov in antes]
+
+
+async def test_movimiento_en_cuenta_inexistente_responde_404(servicio):
+    with pytest.raises(HTTPException) as error:
+        await servicio.depositar("no-existe", DepositoRequest(monto=5, descripcion="Depósito"))
+
+    assert error.value.status_code == 404
+
+
+async def test_depositos_concurrentes_no_pierden_actualizaciones(servicio, crear_cuenta):
+    cuenta_id = await crear_cuenta(0)
+    async with anyio.create_task_group() as grupo:
+        for i in range(20):
+            grupo.start_soon(servicio.depositar, cuenta_id, DepositoRequest(monto=1, descripcion=f"Depósito {i}"))
+
+    assert (await servicio.obtener_cuenta(cuenta_id, use_cache=False)).saldo == 20
+    movimientos, _ = await servicio.obtener_movimientos(cuenta_id, limit=50)
+    assert sorted(mov.saldo_nuevo for mov in movimientos) == [float(i) for i in range(1, 21)]
@@ -0,0 +1,140 @@
+from fastapi import HTTPException
+import anyio
+import pytest
+
+from app.cache import CuentasCache
+from app.eventos import DespachadorEventos
+from app.repos.cuentas_repo import CuentasRepository
+from app.repos.limites_diarios import AcumuladosDiarios
+from app.repos.numeros_cuenta import NumeroCuentaAllocator
+from app.schemas import DepositoRequest, RetiroRequest, TransferenciaRequest
+
+
+pytestmark = pytest.mark.anyio
+
+# Los créditos a una cuenta fraccionada solo evitan leer la cuenta cuando
+# está en caché: estas pruebas usan un repositorio con la caché habilitada.
+
+
+@pytest.fixture
+def repo(motor) -> CuentasRepository:
+    return CuentasRepository(
+        motor,
+        cache=CuentasCache(ttl=60),
+        allocator=NumeroCuentaAllocator(),
+        acumulados=AcumuladosDiarios(),
+        eventos=DespachadorEventos()
+    )
+
+
+@pytest.fixture
+def fraccionada(repo, crear_cuenta):
+    async def _crear(saldo: float, shards: int = 4) -> str:
+        cuenta_id = await crear_cuenta(saldo)
+        repo.fraccionar_saldo(cuenta_id, shards)
+        return cuenta_id
+    return _crear
+
+
+def lecturas(motor) -> list:
+    """Registra las rutas que lee cada get_all del motor"""
+    leidas = []
+    leer = motor._leer
+
+    def _leer(rutas):
+        leidas.append(list(rutas))
+        return leer(rutas)
+
+    motor._leer = _leer
+    return leidas
+
+
+def suma_shards(repo, cuenta_id: str) -> float:
+    cuenta = repo.get_by_id(cuenta_id, use_cache=False)
+    return cuenta.saldo
+
+
+async def test_credito_a_cuenta_cacheada_lee_solo_un_shard(motor, repo, servicio, fraccionada):
+    cuenta_id = await fraccionada(100)
+    # El primer crédito llena la caché con la suma de los shards
+    await servicio.depositar(cuenta_id, DepositoRequest(monto=1, descripcion="Depósito"))
+    leidas = lecturas(motor)
+
+    respuesta = await servicio.depositar(cuenta_id, DepositoRequest(monto=5, descripcion="Depósito"))
+
+    rutas = [ruta for lectura in leidas for ruta in lectura]
+    assert f"cuentas/{cuenta_id}" not in rutas
+    assert len([ruta for ruta in rutas if "/saldo_shards/" in ruta]) == 1
+    assert (respuesta.saldo_anterior, respuesta.saldo_nuevo) == (None, None)
+    assert suma_shards(repo, cuenta_id) == 106
+
+
+async def test_creditos_concurrentes_y_debito_exacto(repo, servicio, fraccionada):
+    cuenta_id = await fraccionada(0)
+    async with anyio.create_task_group() as grupo:
+        for i in range(20):
+            grupo.start_soon(servicio.depositar, cuenta_id, DepositoRequest(monto=1, descripcion=f"Depósito {i}"))
+
+    assert suma_shards(repo, cuenta_id) == 20
+    movimientos, _ = await servicio.obtener_movimientos(cuenta_id, limit=50)
+    assert {(mov.saldo_anterior, mov.saldo_nuevo) for mov in movimientos} == {(None, None)}
+
+    # Los débitos leen todos los shards: validan y registran el saldo exacto
+    retiro = await servicio.retirar(cuenta_id, RetiroRequest(monto=15, descripcion="Retiro"))
+    assert (retiro.saldo_anterior, retiro.saldo_nuevo) == (20, 5)
+    with pytest.raises(HTTPException) as error:
+        await servicio.retirar(cuenta_id, RetiroRequest(monto=5.01, descripcion="Retiro"))
+    assert error.value.status_code == 400
+    assert suma_shards(repo, cuenta_id) == 5
+
+
+async def test_transferencia_a_destino_fraccionado(repo, servicio, crear_cuenta, fraccionada):
+    origen, destino = await crear_cuenta(100), await fraccionada(10)
+
+    respuesta = await servicio.transferir(TransferenciaRequest(
+        cuenta_origen_id=origen, cuenta_destino_id=destino, monto=30, descripcion="Pago"
+    ))
+
+    assert (respuesta.origen.saldo_anterior, respuesta.origen.saldo_nuevo) == (100, 70)
+    assert (respuesta.destino.saldo_anterior, respuesta.destino.saldo_nuevo) == (None, None)
+    assert suma_shards(repo, destino) == 40
+    # Tras la primera transferencia el destino queda en caché con la suma de sus shards
+    assert repo.cache.get(destino).saldo == 40
+
+
+async def test_consolidar_los_shards_vuelve_al_saldo_de_la_cuenta(repo, servicio, fraccionada):
+    cuenta_id = await fraccionada(50)
+    await servicio.depositar(cuenta_id, DepositoRequest(monto=25, descripcion="Depósito"))
+
+    cuenta = repo.fraccionar_saldo(cuenta_id, 0)
+
+    assert (cuenta.saldo, cuenta.saldo_shards) == (75, 0)
+    deposito = await servicio.depositar(cuenta_id, DepositoRequest(monto=5, descripcion="Depósito"))
+    assert (deposito.saldo_anterior, deposito.saldo_nuevo) == (75, 80)
+
+
+async def test_credito_con_la_cache_vieja_lee_la_cuenta(motor, repo, servicio, crear_cuenta, fraccionada):
+    cuenta_id = await fraccionada(50)
+    destino_id = await fraccionada(0)
+    for id_ in (cuenta_id, destino_id):
+        await servicio.depositar(id_, DepositoRequest(monto=10, descripcion="Depósito"))
+    origen = await crear_cuenta(100)
+
+    # Otro proceso (con su propia caché) consolida las dos cuentas
+    otro = CuentasRepository(
+        motor, cache=CuentasCache(ttl=0), allocator=NumeroCuentaAllocator(),
+        acumulados=AcumuladosDiarios(), eventos=DespachadorEventos()
+    )
+    otro.fraccionar_saldo(cuenta_id, 0)
+    otro.fraccionar_saldo(destino_id, 0)
+    assert repo.cache.get(cuenta_id).saldo_shards == 4
+
+    deposito = await servicio.depositar(cuenta_id, DepositoRequest(monto=5, descripcion="Depósito"))
+    await servicio.transferir(TransferenciaRequest(
+        cuenta_origen_id=origen, cuenta_destino_id=destino_id, monto=20, descripcion="Pago"
+    ))
+
+    assert (deposito.saldo_anterior, deposito.saldo_nuevo) == (60, 65)
+    assert repo.cache.get(cuenta_id) is None
+    assert otro.get_by_id(cuenta_id).saldo == 65
+    assert otro.get_by_id(destino_id).saldo == 30
@@ -0,0 +1,116 @@
+from fastapi import HTTPException
+import pytest
+
+from app.models import TipoMovimiento
+from app.schemas import TransferenciaRequest
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_transferir_mueve_fondos_y_registra_los_dos_movimientos(servicio, crear_cuenta):
+    origen, destino = await crear_cuenta(100), await crear_cuenta(10)
+
+    respuesta = await servicio.transferir(TransferenciaRequest(
+        cuenta_origen_id=origen, cuenta_destino_id=destino, monto=30, descripcion="Alquiler"
+    ))
+
+    assert (respuesta.origen.saldo_anterior, respuesta.origen.saldo_nuevo) == (100, 70)
+    assert (respuesta.destino.saldo_anterior, respuesta.destino.saldo_nuevo) == (10, 40)
+    assert (await servicio.obtener_cuenta(origen, use_cache=False)).saldo == 70
+    assert (await servicio.obtener_cuenta(destino, use_cache=False)).saldo == 40
+
+    salida, _ = await servicio.obtener_movimientos(origen)
+    entrada, _ = await servicio.obtener_movimientos(destino)
+    assert salida[0].tipo == TipoMovimiento.TRANSFERENCIA_SALIDA.value
+    assert salida[0].id == respuesta.origen.movimiento_id
+    assert entrada[0].tipo == TipoMovimiento.TRANSFERENCIA_ENTRADA.value
+    assert entrada[0].descripcion == "Alquiler"
+
+
+async def test_transferir_con_la_misma_referencia_no_vuelve_a_mover_fondos(servicio, crear_cuenta):
+    origen, destino = await crear_cuenta(100), await crear_cuenta(0)
+    transferencia = TransferenciaRequest(
+        cuenta_origen_id=origen, cuenta_destino_id=destino, monto=25, referencia="trf-1"
+    )
+
+    primera = await servicio.transferir(transferencia)
+    repetida = await servicio.transferir(transferencia)
+
+    assert repetida.origen.movimiento_id == primera.origen.movimiento_id
+    assert repetida.destino.movimiento_id == primera.destino.movimiento_id
+    assert repetida.origen.saldo_nuevo == 75
+    assert (await servicio.obtener_cuenta(origen, use_cache=False)).saldo == 75
+    assert (await servicio.obtener_cuenta(destino, use_cache=False)).saldo == 25
+    movimientos, _ = await servicio.obtener_movimientos(origen)
+    assert len([m for m in movimientos if m.tipo == TipoMovimiento.TRANSFERENCIA_SALIDA.value]) == 1
+
+
+async def test_transferir_sin_saldo_no_modifica_ninguna_cuenta(servicio, crear_cuenta):
+    origen, destino = await crear_cuenta(10), await crear_cuenta(0)
+
+    with pytest.raises(HTTPException) as error:
+        await servicio.transferir(TransferenciaRequest(
+            cuenta_origen_id=origen, cuenta_destino_id=destino, monto=50
+        ))
+
+    assert error.value.status_code == 400
+    assert (await servicio.obtener_cuenta(origen, use_cache=False)).saldo == 10
+    assert (await servicio.obtener_cuenta(destino, use_cache=False)).saldo == 0
+
+
+async def test_transferir_desde_una_cuenta_de_otro_cliente_responde_403(servicio, crear_cuenta):
+    origen, destino = await crear_cuenta(100, cliente_id="ana"), await crear_cuenta(0, cliente_id="luis")
+
+    with pytest.raises(HTTPException) as error:
+        await servicio.transferir(TransferenciaRequest(
+            cuenta_origen_id=origen, cuenta_destino_id=destino, monto=10, cliente_id="luis"
+        ))
+
+    assert error.value.status_code == 403
+    assert (await servicio.obtener_cuenta(origen, use_cache=False)).saldo == 100
+
+
+async def test_transferir_a_una_cuenta_inexistente_responde_404(servicio, crear_cuenta):
+    origen = await crear_cuenta(100)
+
+    with pytest.raises(HTTPException) as error:
+        await servicio.transferir(TransferenciaRequest(
+            cuenta_origen_id=origen, cuenta_destino_id="no-existe", monto=10
+        ))
+
+    assert error.value.status_code == 404
+    assert "no-existe" in error.value.detail
+    assert (await servicio.obtener_cuenta(origen, use_cache=False)).saldo == 100
+
+
+async def test_resolver_una_transferencia_aplicada_la_devuelve_sin_mover_fondos(servicio, crear_cuenta):
+    origen, destino = await crear_cuenta(100), await crear_cuenta(0)
+    aplicada = await servicio.transferir(TransferenciaRequest(
+        cuenta_origen_id=origen, cuenta_destino_id=destino, monto=40, referencia="trf-2"
+    ))
+
+    resolucion = await servicio.resolver_transferencia("trf-2")
+
+    assert resolucion.estado == "APLICADA"
+    assert resolucion.transferencia.monto == 40
+    assert resolucion.transferencia.origen.movimiento_id == aplicada.origen.movimiento_id
+    assert resolucion.transferencia.destino.cuenta_id == destino
+    assert (await servicio.obtener_cuenta(origen, use_cache=False)).saldo == 60
+
+
+async def test_resolver_una_transferencia_no_aplicada_la_anula(servicio, crear_cuenta):
+    origen, destino = await crear_cuenta(100), await crear_cuenta(0)
+
+    resolucion = await servicio.resolver_transferencia("trf-3")
+
+    assert (resolucion.estado, resolucion.transferencia) == ("ANULADA", None)
+    # El pedido original que llega tarde ya no mueve fondos
+    with pytest.raises(HTTPException) as error:
+        await servicio.transferir(TransferenciaRequest(
+            cuenta_origen_id=origen, cuenta_destino_id=destino, monto=40, referencia="trf-3"
+        ))
+    assert error.value.status_code == 409
+    assert (await servicio.obtener_cuenta(origen, use_cache=False)).saldo == 100
+    assert (await servicio.obtener_cuenta(destino, use_cache=False)).saldo == 0
+    assert (await servicio.resolver_transferencia("trf-3")).estado == "ANULADA"
@@ -24,5 +24,7 @@ class Settings(BaseModel):
     jwt_expires_minutes: int = int(os.getenv("JWT_EXPIRES_MINUTES", "120"))
 
     cors_origins: list[str] = [o.strip() for o in os.getenv("CORS_ORIGINS", "").split(",") if o.strip()]
+    # Con DEBUG=true se agrega la cabecera X-Firestore-Llamadas a cada respuesta
+    debug: bool = os.getenv("DEBUG", "false").lower() == "true"
     session_secret: str = os.getenv("SESSION_SECRET", "dev-session-secret-change-me")
 settings = Settings()
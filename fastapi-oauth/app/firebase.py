@@ -1,44 +1,37 @@
 # app/firebase.py
-import os
 from pathlib import Path
-import firebase_admin
-from firebase_admin import credentials, auth as fb_auth, firestore
+from .arranque import ArranqueFirestore
 from .config import settings
 
-firebase_app = None
-firestore_client = None
+# ✅ Resolver ruta absoluta aunque en settings sea relativa
+cred_path = Path(settings.firebase_credentials_path).expanduser().resolve()
 
-def init_firebase():
-    global firebase_app, firestore_client
-
-    # ✅ Resolver ruta absoluta aunque en settings sea relativa
-    cred_path = Path(settings.firebase_credentials_path).expanduser().resolve()
+# Bootstrap perezoso (ver app.arranque): importar este módulo no inicializa
+# Firebase. El lifespan crea la app y el cliente y calienta el canal al arrancar.
+arranque_firestore = ArranqueFirestore(str(cred_path), {
+    "projectId": settings.firebase_project_id or None
+})
 
+def check_credentials():
     if not cred_path.is_file():
         raise FileNotFoundError(
             f"Firebase credentials file not found: {cred_path}\n"
             f"Tip: coloca el archivo ahí o ajusta FIREBASE_CREDENTIALS_PATH en .env"
         )
 
-    if firebase_app is None:
-        cred = credentials.Certificate(str(cred_path))
-        firebase_app = firebase_admin.initialize_app(cred, {
-            "projectId": settings.firebase_project_id or None
-        })
 
-    if settings.use_firestore and firestore_client is None:
-        firestore_client = firestore.client(app=firebase_app)
+def init_firebase():
+    check_credentials()
+    return arranque_firestore.app
 
 
 def get_auth():
-    if firebase_app is None:
-        init_firebase()
+    arranque_firestore.app
+    from firebase_admin import auth as fb_auth
     return fb_auth
 
 
 def get_firestore():
     if settings.use_firestore:
-        if firestore_client is None:
-            init_firebase()
-        return firestore_client
+        return arranque_firestore.db
     return None
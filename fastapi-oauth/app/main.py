@@ -5,15 +5,22 @@ from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.config import settings
-from app.firebase import init_firebase
+from app.firebase import arranque_firestore, check_credentials, init_firebase
 from app.routers import auth as auth_router
 from app.routers import auth_roles
 from app.routers import clientes as clientes_router 
+from app.metricas import MetricasMiddleware, metricas_response
+from app.responses import FastJSONResponse
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
-        init_firebase()
+        check_credentials()
+        # Cliente de Firestore único del proceso, con el canal gRPC ya caliente
+        if settings.use_firestore:
+            await arranque_firestore.iniciar()
+        else:
+            init_firebase()
     except Exception as e:
         print(f"[WARN] Firebase init skipped/failed: {e}")
     yield
@@ -21,6 +28,7 @@ async def lifespan(app: FastAPI):
 app = FastAPI(
     title="CHUNO Auth & Clientes Service",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 app.add_middleware(
@@ -39,6 +47,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latencia por ruta y llamadas a Firestore; en DEBUG, cabecera con el presupuesto por petición
+app.add_middleware(MetricasMiddleware, cabecera=settings.debug)
+
 app.include_router(auth_router.router)
 app.include_router(auth_roles.router)
 app.include_router(clientes_router.router)
@@ -46,3 +57,13 @@ app.include_router(clientes_router.router)
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/health/firestore")
+def firestore_stats():
+    return arranque_firestore.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metricas_response()
@@ -4,12 +4,15 @@ from typing import List
 from app.schemas_clientes import ClienteCreate, ClienteUpdate, ClienteOut
 from app.repos import clientes_repo as repo
 from app.authz import require_roles, Role
+from app.responses import FastJSONResponse
 
 router = APIRouter(prefix="/clientes", tags=["clientes"])
 
 @router.get("", response_model=List[ClienteOut])
 def list_clientes():
-    return repo.list_clientes()
+    # Cada fila se valida como ClienteOut y se serializa con orjson, sin
+    # pasar otra vez por el response_model
+    return FastJSONResponse([ClienteOut.model_validate(c) for c in repo.list_clientes()])
 
 @router.get("/{cliente_id}", response_model=ClienteOut)
 def get_cliente(cliente_id: str):
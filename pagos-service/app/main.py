@@ -1,12 +1,28 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.firebase import arranque_firestore, init_firebase, usar_firestore
+from app.metricas import MetricasMiddleware, metricas_response
+from app.responses import FastJSONResponse
 from app.routers import pagos
 
-app = FastAPI(title="pagos-service")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cliente de Firestore único del proceso, con el canal gRPC ya caliente
+    if usar_firestore():
+        init_firebase()
+        await arranque_firestore.iniciar()
+    yield
+
+
+app = FastAPI(title="pagos-service", default_response_class=FastJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,9 +32,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latencia por ruta y llamadas a Firestore; con DEBUG=true, cabecera con el presupuesto por petición
+app.add_middleware(MetricasMiddleware, cabecera=os.getenv("DEBUG", "false").lower() == "true")
+
 app.include_router(pagos.router)
 
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/health/firestore")
+def firestore_stats():
+    return arranque_firestore.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metricas_response()
@@ -0,0 +1,496 @@
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from starlette.responses import Response
+from starlette.routing import Match
+import inspect
+import threading
+import time
+
+
+# Métricas del servicio en el formato de texto de Prometheus.
+#
+# `instrumentar_firestore` envuelve los métodos RPC del cliente GAPIC que usa
+# el cliente de Firestore (síncrono o AsyncClient): cada llamada cuenta como
+# lectura, escritura, consulta o transacción, con su duración y los
+# documentos que trajo o escribió. `MetricasMiddleware` mide cada petición
+# HTTP y deja en un ContextVar el presupuesto de llamadas de la petición en
+# curso, así cada llamada a Firestore queda etiquetada con la ruta que la
+# originó (también desde el threadpool, que copia el contexto). Las llamadas
+# fuera de una petición (tareas de fondo) se etiquetan con ruta "fondo".
+#
+# Las llamadas HTTP a otros servicios se registran con
+# `registrar_saliente` / `registrar_error_saliente`; el estado de sus pools
+# de conexiones lo fijan recolectores que corren en cada exposición.
+#
+# GET /metrics expone todo con `metricas_response()`.
+#
+# Módulo compartido: cada servicio tiene una copia idéntica porque cada
+# imagen se construye solo con el directorio del servicio. Los cambios van
+# en todas las copias; cuentas-service/tests/test_modulos_compartidos.py
+# falla si alguna difiere.
+
+RUTA_METRICAS = "/metrics"
+CABECERA_PRESUPUESTO = "X-Firestore-Llamadas"
+
+# Límites (segundos) de los histogramas de duración
+LIMITES_DURACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Límites de llamadas a Firestore por petición
+LIMITES_LLAMADAS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+# Método RPC de la API de Firestore -> tipo de llamada
+OPERACIONES = {
+    "get_document": "lectura",
+    "batch_get_documents": "lectura",
+    "run_query": "consulta",
+    "run_aggregation_query": "consulta",
+    "partition_query": "consulta",
+    "list_documents": "consulta",
+    "list_collection_ids": "consulta",
+    "commit": "escritura",
+    "batch_write": "escritura",
+    "create_document": "escritura",
+    "update_document": "escritura",
+    "delete_document": "escritura",
+    "begin_transaction": "transaccion",
+    "rollback": "transaccion",
+}
+TIPOS = ("lectura", "escritura", "consulta", "transaccion")
+
+# RPCs que devuelven un stream (ver _Llamada)
+_STREAMS = {"batch_get_documents", "run_query", "run_aggregation_query"}
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear(numero: float) -> str:
+    if numero == float("inf"):
+        return "+Inf"
+    return repr(float(numero)) if isinstance(numero, float) else str(numero)
+
+
+def _etiquetas(nombres: Tuple[str, ...], valores: Tuple[str, ...], extra: str = "") -> str:
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class Contador:
+    """Contador monótono con etiquetas"""
+
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._series: Dict[Tuple[str, ...], float] = {}
+
+    def incrementar(self, valores: Tuple[str, ...], cantidad: float = 1) -> None:
+        self._series[valores] = self._series.get(valores, 0) + cantidad
+
+    def muestras(self) -> Iterable[str]:
+        for valores, total in sorted(self._series.items()):
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, valores)} {_formatear(total)}"
+
+
+class Histograma:
+    """Histograma acumulado (buckets `le`, _sum y _count) con etiquetas"""
+
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...], limites: Tuple[float, ...]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.limites = tuple(limites) + (float("inf"),)
+        # etiquetas -> [observaciones por bucket (no acumuladas)..., suma]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observar(self, valores: Tuple[str, ...], valor: float) -> None:
+        serie = self._series.get(valores)
+        if serie is None:
+            serie = self._series[valores] = [0] * len(self.limites) + [0.0]
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                serie[i] += 1
+                break
+        serie[-1] += valor
+
+    def muestras(self) -> Iterable[str]:
+        for valores, serie in sorted(self._series.items()):
+            acumulado = 0
+            for limite, cantidad in zip(self.limites, serie):
+                acumulado += cantidad
+                le = f'le="{_formatear(limite)}"'
+                yield f"{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, le)} {acumulado}"
+            yield f"{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {_formatear(serie[-1])}"
+            yield f"{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {acumulado}"
+
+
+class Medidor:
+    """Valor instantáneo con etiquetas (gauge)"""
+
+    tipo = "gauge"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._series: Dict[Tuple[str, ...], float] = {}
+
+    def fijar(self, valores: Tuple[str, ...], valor: float) -> None:
+        self._series[valores] = valor
+
+    def muestras(self) -> Iterable[str]:
+        for valores, valor in sorted(self._series.items()):
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, valores)} {_formatear(valor)}"
+
+
+class PresupuestoLlamadas:
+    """Llamadas a Firestore de una petición HTTP (ver MetricasMiddleware)"""
+
+    __slots__ = ("scope", "llamadas", "documentos", "segundos")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.llamadas = dict.fromkeys(TIPOS, 0)
+        self.documentos = 0
+        self.segundos = 0.0
+
+    @property
+    def total(self) -> int:
+        return sum(self.llamadas.values())
+
+    def cabecera(self) -> str:
+        partes = [f"{tipo}={cantidad}" for tipo, cantidad in self.llamadas.items()]
+        partes.append(f"documentos={self.documentos}")
+        partes.append(f"ms={self.segundos * 1000:.1f}")
+        return ";".join(partes)
+
+
+_presupuesto_actual: ContextVar[Optional[PresupuestoLlamadas]] = ContextVar("presupuesto_llamadas", default=None)
+
+
+class RegistroMetricas:
+    """Métricas del proceso; seguro entre hilos (las llamadas síncronas corren en el threadpool)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # endpoint -> plantilla de la ruta ("/api/cuentas/{cuenta_id}")
+        self._rutas: Dict[Any, str] = {}
+        self.peticiones = Histograma(
+            "http_peticion_duracion_segundos",
+            "Duración de las peticiones HTTP por ruta",
+            ("metodo", "ruta", "codigo"),
+            LIMITES_DURACION
+        )
+        self.llamadas_por_peticion = Histograma(
+            "firestore_llamadas_por_peticion",
+            "Llamadas a Firestore hechas por cada petición HTTP",
+            ("metodo", "ruta"),
+            LIMITES_LLAMADAS
+        )
+        self.llamadas = Contador(
+            "firestore_llamadas_total",
+            "Llamadas RPC a Firestore por ruta, tipo y método",
+            ("ruta", "tipo", "operacion")
+        )
+        self.errores = Contador(
+            "firestore_errores_total",
+            "Llamadas RPC a Firestore que terminaron en error",
+            ("ruta", "tipo", "operacion")
+        )
+        self.documentos = Contador(
+            "firestore_documentos_total",
+            "Documentos leídos (lecturas y consultas) o escritos por ruta",
+            ("ruta", "tipo")
+        )
+        self.duracion = Histograma(
+            "firestore_llamada_duracion_segundos",
+            "Duración de las llamadas a Firestore (streams incluidos) por ruta y tipo",
+            ("ruta", "tipo"),
+            LIMITES_DURACION
+        )
+        self.salientes = Histograma(
+            "http_saliente_duracion_segundos",
+            "Duración de las llamadas HTTP a otros servicios (hasta recibir las cabeceras)",
+            ("servicio", "metodo", "codigo"),
+            LIMITES_DURACION
+        )
+        self.errores_salientes = Contador(
+            "http_saliente_errores_total",
+            "Llamadas HTTP a otros servicios sin respuesta, por tipo de error (timeouts incluidos)",
+            ("servicio", "error")
+        )
+        self.conexiones_salientes = Medidor(
+            "http_saliente_conexiones",
+            "Conexiones del pool HTTP hacia otros servicios por estado (activa, inactiva)",
+            ("servicio", "estado")
+        )
+        self.salientes_en_curso = Medidor(
+            "http_saliente_en_curso",
+            "Llamadas HTTP a otros servicios en curso",
+            ("servicio",)
+        )
+        self._metricas = (
+            self.peticiones, self.llamadas_por_peticion, self.llamadas,
+            self.errores, self.documentos, self.duracion,
+            self.salientes, self.errores_salientes, self.conexiones_salientes, self.salientes_en_curso
+        )
+        # Funciones que actualizan los medidores justo antes de exponer
+        self._recolectores: List[Callable[[], None]] = []
+
+    def ruta(self, scope: dict) -> str:
+        """Plantilla de la ruta que atendió la petición; "sin_ruta" si ninguna coincidió"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "sin_ruta"
+        plantilla = self._rutas.get(endpoint)
+        if plantilla is None:
+            plantilla = "sin_ruta"
+            app = scope.get("app")
+            for route in getattr(app, "routes", ()):
+                if getattr(route, "endpoint", None) is endpoint and route.matches(scope)[0] == Match.FULL:
+                    plantilla = route.path
+                    break
+            self._rutas[endpoint] = plantilla
+        return plantilla
+
+    def registrar_llamada(self, operacion: str, tipo: str, segundos: float, documentos: int, error: bool) -> None:
+        presupuesto = _presupuesto_actual.get()
+        ruta = self.ruta(presupuesto.scope) if presupuesto is not None else "fondo"
+        with self._lock:
+            self.llamadas.incrementar((ruta, tipo, operacion))
+            if error:
+                self.errores.incrementar((ruta, tipo, operacion))
+            if documentos:
+                self.documentos.incrementar((ruta, tipo), documentos)
+            self.duracion.observar((ruta, tipo), segundos)
+            if presupuesto is not None:
+                presupuesto.llamadas[tipo] += 1
+                presupuesto.documentos += documentos
+                presupuesto.segundos += segundos
+
+    def registrar_peticion(self, presupuesto: PresupuestoLlamadas, codigo: int, segundos: float) -> None:
+        metodo = presupuesto.scope.get("method", "")
+        ruta = self.ruta(presupuesto.scope)
+        with self._lock:
+            self.peticiones.observar((metodo, ruta, str(codigo)), segundos)
+            self.llamadas_por_peticion.observar((metodo, ruta), presupuesto.total)
+
+    def registrar_saliente(self, servicio: str, metodo: str, codigo: int, segundos: float) -> None:
+        with self._lock:
+            self.salientes.observar((servicio, metodo, str(codigo)), segundos)
+
+    def registrar_error_saliente(self, servicio: str, error: str) -> None:
+        with self._lock:
+            self.errores_salientes.incrementar((servicio, error))
+
+    def agregar_recolector(self, recolector: Callable[[], None]) -> None:
+        if recolector not in self._recolectores:
+            self._recolectores.append(recolector)
+
+    def exponer(self) -> str:
+        """Texto de exposición de Prometheus (versión 0.0.4)"""
+        for recolector in self._recolectores:
+            recolector()
+        lineas = []
+        with self._lock:
+            for metrica in self._metricas:
+                lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+                lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+                lineas.extend(metrica.muestras())
+        return "\n".join(lineas) + "\n"
+
+
+registro_metricas = RegistroMetricas()
+
+
+def metricas_response() -> Response:
+    """Respuesta para GET /metrics"""
+    return Response(
+        registro_metricas.exponer(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI que mide cada petición HTTP por ruta.
+
+    Con `cabecera=True` (modo DEBUG) agrega a la respuesta la cabecera
+    X-Firestore-Llamadas con el presupuesto de la petición, p. ej.
+    "lectura=1;escritura=1;consulta=0;transaccion=1;documentos=2;ms=41.3".
+    En respuestas en streaming solo cuenta lo hecho antes del primer byte.
+    """
+
+    def __init__(self, app, cabecera: bool = False):
+        self.app = app
+        self.cabecera = cabecera
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == RUTA_METRICAS:
+            await self.app(scope, receive, send)
+            return
+
+        presupuesto = PresupuestoLlamadas(scope)
+        token = _presupuesto_actual.set(presupuesto)
+        inicio = time.perf_counter()
+        codigo = 500
+
+        async def enviar(mensaje):
+            nonlocal codigo
+            if mensaje["type"] == "http.response.start":
+                codigo = mensaje["status"]
+                if self.cabecera:
+                    headers = list(mensaje.get("headers", []))
+                    headers.append((CABECERA_PRESUPUESTO.lower().encode(), presupuesto.cabecera().encode()))
+                    mensaje = {**mensaje, "headers": headers}
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _presupuesto_actual.reset(token)
+            registro_metricas.registrar_peticion(presupuesto, codigo, time.perf_counter() - inicio)
+
+
+def _documentos(operacion: str, respuesta: Any) -> int:
+    """Documentos que aporta una respuesta de la API de Firestore"""
+    try:
+        if operacion == "run_query":
+            return int(respuesta._pb.HasField("document"))
+        if operacion == "batch_get_documents":
+            return int(respuesta._pb.HasField("found"))
+        if operacion == "commit":
+            return len(respuesta.write_results)
+    except AttributeError:
+        pass
+    return 0
+
+
+def _respuestas_esperadas(operacion: str, kwargs: dict) -> Optional[int]:
+    """Largo conocido de un stream: BatchGetDocuments responde una vez por documento pedido"""
+    if operacion != "batch_get_documents":
+        return None
+    request = kwargs.get("request")
+    documentos = request.get("documents") if isinstance(request, dict) else getattr(request, "documents", None)
+    return len(documentos) if documentos else None
+
+
+class _Llamada:
+    """
+    Una llamada RPC en curso. Los streams se registran al recibir la última
+    respuesta esperada o al agotarse: quien consume el stream suele dejar de
+    iterar apenas tiene lo que necesita (DocumentReference.get lee una sola
+    respuesta) y un generador async abandonado recién se cierra más tarde,
+    fuera del tiempo de la petición.
+    """
+
+    __slots__ = ("operacion", "tipo", "inicio", "documentos", "pendientes", "registrada")
+
+    def __init__(self, operacion: str, tipo: str, pendientes: Optional[int] = None):
+        self.operacion = operacion
+        self.tipo = tipo
+        self.inicio = time.perf_counter()
+        self.documentos = 0
+        self.pendientes = pendientes
+        self.registrada = False
+
+    def respuesta(self, respuesta: Any) -> None:
+        self.documentos += _documentos(self.operacion, respuesta)
+        if self.pendientes is not None:
+            self.pendientes -= 1
+            if self.pendientes <= 0:
+                self.terminar()
+        elif getattr(respuesta, "done", False):
+            self.terminar()
+
+    def terminar(self, error: bool = False) -> None:
+        if not self.registrada:
+            self.registrada = True
+            registro_metricas.registrar_llamada(
+                self.operacion, self.tipo, time.perf_counter() - self.inicio, self.documentos, error
+            )
+
+
+def _flujo(respuestas, llamada: _Llamada):
+    try:
+        for respuesta in respuestas:
+            llamada.respuesta(respuesta)
+            yield respuesta
+    except Exception:
+        llamada.terminar(error=True)
+        raise
+    finally:
+        llamada.terminar()
+
+
+async def _flujo_async(respuestas, llamada: _Llamada):
+    try:
+        async for respuesta in respuestas:
+            llamada.respuesta(respuesta)
+            yield respuesta
+    except Exception:
+        llamada.terminar(error=True)
+        raise
+    finally:
+        llamada.terminar()
+
+
+async def _esperar(pendiente, llamada: _Llamada, stream: bool):
+    try:
+        respuesta = await pendiente
+    except Exception:
+        llamada.terminar(error=True)
+        raise
+    if stream:
+        return _flujo_async(respuesta, llamada)
+    llamada.respuesta(respuesta)
+    llamada.terminar()
+    return respuesta
+
+
+def _envolver(original: Callable, operacion: str, tipo: str) -> Callable:
+    stream = operacion in _STREAMS
+
+    def envoltura(*args, **kwargs):
+        llamada = _Llamada(operacion, tipo, _respuestas_esperadas(operacion, kwargs))
+        try:
+            respuesta = original(*args, **kwargs)
+        except Exception:
+            llamada.terminar(error=True)
+            raise
+        # El cliente GAPIC async devuelve un awaitable (no siempre desde un `async def`)
+        if inspect.isawaitable(respuesta):
+            return _esperar(respuesta, llamada, stream)
+        if stream:
+            return _flujo(respuesta, llamada)
+        llamada.respuesta(respuesta)
+        llamada.terminar()
+        return respuesta
+    return envoltura
+
+
+def instrumentar_firestore(cliente):
+    """
+    Envuelve los métodos RPC del cliente de Firestore (síncrono o AsyncClient)
+    para contar y medir sus llamadas. Devuelve el mismo cliente; si la versión
+    de google-cloud-firestore no expone la API GAPIC esperada lo deja como está.
+    """
+    try:
+        api = cliente._firestore_api
+    except AttributeError:
+        return cliente
+    if getattr(api, "_instrumentada", False):
+        return cliente
+
+    for operacion, tipo in OPERACIONES.items():
+        original = getattr(api, operacion, None)
+        if original is not None:
+            setattr(api, operacion, _envolver(original, operacion, tipo))
+    api._instrumentada = True
+    return cliente
@@ -11,6 +11,7 @@ from fastapi import APIRouter, HTTPException, status
 
 from app.schemas import PagoIn, PagoOut
 from app.firebase import get_firestore
+from app.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -73,7 +74,9 @@ def list_pagos(cuenta_id: Optional[str] = None, tipo_servicio: Optional[str] = N
     for d in docs:
         data = d.to_dict() or {}
         out.append(PagoOut(**data))
-    return out
+    # Filas ya validadas como PagoOut: se serializan con orjson sin pasar
+    # otra vez por el response_model
+    return FastJSONResponse(out)
 
 
 @router.get("/api/pagos/{pago_id}", response_model=PagoOut)
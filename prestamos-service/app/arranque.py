@@ -0,0 +1,205 @@
+from typing import Any, Dict, List, Optional
+from starlette.concurrency import run_in_threadpool
+from app.metricas import instrumentar_firestore
+import itertools
+import logging
+import os
+import threading
+import time
+
+
+# Arranque perezoso de Firebase y Firestore, igual en todos los servicios.
+#
+# Importar este módulo es barato: firebase_admin y google-cloud-firestore
+# (varios cientos de ms de imports entre gRPC y protobuf) recién se importan
+# al pedir el primer cliente. El lifespan de cada servicio llama a
+# `await arranque.iniciar()`, que crea la app de Firebase y un único cliente
+# por proceso y hace una lectura mínima para calentar el canal gRPC
+# (handshake TLS y token OAuth): la primera petición ya no paga ese costo.
+# `stats()` informa cuánto tardó cada etapa y `cerrar()` libera los canales
+# al apagar.
+#
+# Módulo compartido: cada servicio tiene una copia idéntica porque cada
+# imagen se construye solo con el directorio del servicio. Los cambios van
+# en todas las copias; cuentas-service/tests/test_modulos_compartidos.py
+# falla si alguna difiere.
+
+logger = logging.getLogger(__name__)
+
+# Documento (inexistente) que se lee para calentar el canal
+DOCUMENTO_CALENTAMIENTO = ("_calentamiento", "canal")
+CALENTAMIENTO_TIMEOUT = 5.0
+
+
+class ArranqueFirestore:
+    """
+    Bootstrap de Firebase de un servicio: una app y un cliente por proceso.
+
+    `ruta_credenciales` es el JSON de la cuenta de servicio. Si no existe y
+    `credenciales_obligatorias` es False se inicializa con las credenciales
+    por defecto del entorno (ADC). `opciones` se pasa a initialize_app.
+
+    Los clientes se crean con la API pública de google-cloud-firestore, con
+    las opciones de canal por defecto de la librería (keepalive incluido).
+    Con `clientes` > 1 el cliente síncrono es un pool de clientes con un
+    canal cada uno, repartidos por turno en cada acceso a `db`: un
+    canal HTTP/2 multiplexa del orden de 100 llamadas concurrentes, así que
+    hace falta más de uno solo con threadpools más grandes que eso.
+    """
+
+    def __init__(
+        self,
+        ruta_credenciales: Optional[str],
+        opciones: Optional[Dict[str, Any]] = None,
+        credenciales_obligatorias: bool = True,
+        clientes: int = 1
+    ):
+        self.ruta_credenciales = ruta_credenciales
+        self.opciones = opciones
+        self.credenciales_obligatorias = credenciales_obligatorias
+        self.clientes = max(1, clientes)
+        self._lock = threading.Lock()
+        self._app = None
+        self._db = None
+        self._pool: List[Any] = []
+        self._turno = itertools.count()
+        self._async_db = None
+        self._tiempos: Dict[str, float] = {}
+        self._calentado = False
+        self._error_calentamiento: Optional[str] = None
+
+    def _medir(self, etapa: str, inicio: float) -> None:
+        self._tiempos[etapa] = round((time.perf_counter() - inicio) * 1000, 1)
+
+    @property
+    def app(self):
+        """App de Firebase (la crea en el primer uso)"""
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    self._app = self._crear_app()
+        return self._app
+
+    def _crear_app(self):
+        inicio = time.perf_counter()
+        import firebase_admin
+        from firebase_admin import credentials
+        from google.cloud import firestore  # noqa: F401
+        self._medir("importacion_ms", inicio)
+
+        inicio = time.perf_counter()
+        try:
+            # Otra parte del proceso ya la inicializó
+            app = firebase_admin.get_app()
+        except ValueError:
+            ruta = self.ruta_credenciales
+            if ruta and os.path.isfile(ruta):
+                app = firebase_admin.initialize_app(credentials.Certificate(ruta), self.opciones)
+            elif self.credenciales_obligatorias:
+                raise FileNotFoundError(f"Archivo de credenciales de Firebase no encontrado: {ruta}")
+            else:
+                # Sin archivo: credenciales por defecto del entorno (desarrollo local, Cloud Run)
+                app = firebase_admin.initialize_app(options=self.opciones)
+        self._medir("inicializacion_ms", inicio)
+        return app
+
+    def _nuevo_cliente(self, app, asincrono: bool = False):
+        """Cliente con las credenciales y el proyecto de la app (como firestore.client(app))"""
+        from google.cloud import firestore
+        clase = firestore.AsyncClient if asincrono else firestore.Client
+        cliente = clase(project=app.project_id, credentials=app.credential.get_credential())
+        return instrumentar_firestore(cliente)
+
+    @property
+    def db(self):
+        """Cliente síncrono de Firestore del proceso (el siguiente del pool si `clientes` > 1)"""
+        if self._db is None:
+            app = self.app
+            with self._lock:
+                if self._db is None:
+                    inicio = time.perf_counter()
+                    self._pool = [self._nuevo_cliente(app) for _ in range(self.clientes)]
+                    self._db = self._pool[0]
+                    self._medir("cliente_ms", inicio)
+        if len(self._pool) == 1:
+            return self._db
+        return self._pool[next(self._turno) % len(self._pool)]
+
+    @property
+    def async_db(self):
+        """
+        AsyncClient de Firestore, uno por proceso. Su canal gRPC queda atado
+        al event loop donde se usa por primera vez: créese desde el lifespan.
+        """
+        if self._async_db is None:
+            app = self.app
+            with self._lock:
+                if self._async_db is None:
+                    inicio = time.perf_counter()
+                    self._async_db = self._nuevo_cliente(app, asincrono=True)
+                    self._medir("cliente_async_ms", inicio)
+        return self._async_db
+
+    async def iniciar(self, asincrono: bool = False, calentar: bool = True) -> None:
+        """
+        Para el lifespan: crea la app y el cliente (AsyncClient si `asincrono`)
+        fuera del event loop y calienta el canal con una lectura.
+        Un error al calentar se registra en stats() y no impide arrancar.
+        """
+        inicio = time.perf_counter()
+        # Imports y credenciales bloquean: van al threadpool
+        await run_in_threadpool(lambda: self.app)
+        if asincrono:
+            clientes = [self.async_db]
+        else:
+            await run_in_threadpool(lambda: self.db)
+            clientes = self._pool
+
+        if calentar and not self._calentado:
+            inicio_calentamiento = time.perf_counter()
+            coleccion, doc_id = DOCUMENTO_CALENTAMIENTO
+            try:
+                # Cada cliente del pool tiene su propio canal
+                for db in clientes:
+                    doc_ref = db.collection(coleccion).document(doc_id)
+                    if asincrono:
+                        await doc_ref.get(retry=None, timeout=CALENTAMIENTO_TIMEOUT)
+                    else:
+                        await run_in_threadpool(doc_ref.get, retry=None, timeout=CALENTAMIENTO_TIMEOUT)
+                self._calentado = True
+            except Exception as e:
+                self._error_calentamiento = f"{type(e).__name__}: {e}"
+                logger.warning("No se pudo calentar el canal de Firestore: %s", self._error_calentamiento)
+            self._medir("calentamiento_ms", inicio_calentamiento)
+
+        self._medir("arranque_ms", inicio)
+        logger.info("Firestore listo: %s", self._tiempos)
+
+    async def cerrar(self) -> None:
+        """
+        Para el final del lifespan: cierra los clientes con su `close()`
+        público y suelta las referencias, así los canales gRPC se liberan
+        con los clientes. Un acceso posterior a `db` o `async_db` crea
+        clientes nuevos.
+        """
+        with self._lock:
+            clientes = self._pool + ([self._async_db] if self._async_db is not None else [])
+            self._db = None
+            self._pool = []
+            self._async_db = None
+            self._calentado = False
+
+        for cliente in clientes:
+            cliente.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Tiempos de cada etapa del arranque (ms) y estado del canal"""
+        return {
+            **self._tiempos,
+            "app": self._app is not None,
+            "cliente": self._db is not None,
+            "pool": len(self._pool),
+            "cliente_async": self._async_db is not None,
+            "calentado": self._calentado,
+            "error_calentamiento": self._error_calentamiento,
+        }
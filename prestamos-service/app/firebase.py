@@ -1,18 +1,14 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-import os
+from app.arranque import ArranqueFirestore
 
 # Ruta FIJA dentro del contenedor Docker
 CREDENTIALS_PATH = "/app/secrets/prestamos-service-key.json"
 
-# Validar que realmente exista
-if not os.path.exists(CREDENTIALS_PATH):
-    raise RuntimeError(f"⚠️ Archivo de credenciales NO encontrado en: {CREDENTIALS_PATH}")
+# Bootstrap perezoso (ver app.arranque): importar este módulo no inicializa
+# Firebase. El lifespan valida las credenciales, crea el cliente y calienta
+# el canal al arrancar.
+arranque_firestore = ArranqueFirestore(CREDENTIALS_PATH)
 
-# Inicializar Firebase solo una vez
-if not firebase_admin._apps:
-    cred = credentials.Certificate(CREDENTIALS_PATH)
-    firebase_admin.initialize_app(cred)
 
-# Cliente Firestore
-db = firestore.client()
+def get_db():
+    """Cliente Firestore del proceso"""
+    return arranque_firestore.db
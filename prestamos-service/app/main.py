@@ -1,14 +1,42 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app.firebase import arranque_firestore
+from app.metricas import MetricasMiddleware, metricas_response
+from app.responses import FastJSONResponse
 from app.routers import prestamos
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cliente de Firestore único del proceso, con el canal gRPC ya caliente
+    await arranque_firestore.iniciar()
+    yield
+
+
 app = FastAPI(
     title="prestamos-service",
-    version="1.0"
+    version="1.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
+# Latencia por ruta y llamadas a Firestore; con DEBUG=true, cabecera con el presupuesto por petición
+app.add_middleware(MetricasMiddleware, cabecera=os.getenv("DEBUG", "false").lower() == "true")
+
 app.include_router(prestamos.router)
 
 
+@app.get("/health/firestore")
+def firestore_stats():
+    return arranque_firestore.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metricas_response()
+
+
 @app.get("/")
 def root():
     return {"mensaje": "prestamos-service funcionando con Firestore 🚀"}
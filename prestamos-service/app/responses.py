@@ -0,0 +1,48 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+import orjson
+
+
+# Respuestas JSON serializadas con orjson (mismo JSON que pydantic: fechas
+# UTC con "Z"). Los listados validan sus filas como el modelo de respuesta
+# y devuelven FastJSONResponse con esos modelos: FastAPI no las vuelve a
+# validar contra el response_model ni pasa por jsonable_encoder.
+#
+# Módulo compartido: cada servicio tiene una copia idéntica porque cada
+# imagen se construye solo con el directorio del servicio. Los cambios van
+# en todas las copias; cuentas-service/tests/test_modulos_compartidos.py
+# falla si alguna difiere.
+
+_OPCIONES = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+def _default(valor: Any) -> Any:
+    """Tipos que orjson no serializa por sí solo"""
+    if isinstance(valor, datetime):
+        # Subclases como DatetimeWithNanoseconds de Firestore
+        return datetime(
+            valor.year, valor.month, valor.day, valor.hour, valor.minute,
+            valor.second, valor.microsecond, valor.tzinfo
+        )
+    if isinstance(valor, BaseModel):
+        # model_dump en pydantic 2, dict en pydantic 1 (pagos-service)
+        volcar = getattr(valor, "model_dump", None) or valor.dict
+        return volcar()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo no serializable a JSON: {type(valor).__name__}")
+
+
+def dumps(contenido: Any) -> bytes:
+    """Serializa `contenido` a JSON (bytes)"""
+    return orjson.dumps(contenido, default=_default, option=_OPCIONES)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que serializa con orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
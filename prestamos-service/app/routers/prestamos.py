@@ -1,17 +1,17 @@
 from fastapi import APIRouter, HTTPException
 from app.schemas import PrestamoCreate, PrestamoUpdate, PrestamoResponse
-from app.firebase import db
+from app.firebase import get_db
+from app.responses import FastJSONResponse
 from datetime import datetime
 import uuid
 
 router = APIRouter(prefix="/api/prestamos", tags=["Prestamos"])
 
-
 # GET lista de préstamos
 @router.get("/", response_model=list[PrestamoResponse])
 def listar_prestamos(cliente_id: str = None, estado: str = None):
 
-    prestamos_ref = db.collection("prestamos")
+    prestamos_ref = get_db().collection("prestamos")
     query = prestamos_ref
 
     if cliente_id:
@@ -22,19 +22,21 @@ def listar_prestamos(cliente_id: str = None, estado: str = None):
 
     docs = query.stream()
 
+    # Cada fila se valida como PrestamoResponse y se serializa con orjson,
+    # sin pasar otra vez por el response_model
     resultados = []
     for d in docs:
         data = d.to_dict()
         data["id"] = d.id
         resultados.append(PrestamoResponse(**data))
 
-    return resultados
+    return FastJSONResponse(resultados)
 
 
 # GET préstamo por ID
 @router.get("/{prestamo_id}", response_model=PrestamoResponse)
 def obtener_prestamo(prestamo_id: str):
-    doc = db.collection("prestamos").document(prestamo_id).get()
+    doc = get_db().collection("prestamos").document(prestamo_id).get()
 
     if not doc.exists:
         raise HTTPException(status_code=404, detail="Préstamo no encontrado")
@@ -62,7 +64,7 @@ def crear_prestamo(data: PrestamoCreate):
         "fecha_solicitud": datetime.utcnow()
     }
 
-    db.collection("prestamos").document(prestamo_id).set(payload)
+    get_db().collection("prestamos").document(prestamo_id).set(payload)
 
     payload["id"] = prestamo_id
     return PrestamoResponse(**payload)
@@ -72,7 +74,7 @@ def crear_prestamo(data: PrestamoCreate):
 @router.put("/{prestamo_id}", response_model=PrestamoResponse)
 def actualizar_prestamo(prestamo_id: str, data: PrestamoUpdate):
 
-    doc_ref = db.collection("prestamos").document(prestamo_id)
+    doc_ref = get_db().collection("prestamos").document(prestamo_id)
     doc = doc_ref.get()
 
     if not doc.exists:
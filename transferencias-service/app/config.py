@@ -8,6 +8,32 @@ class Config:
     FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID", "transferenciaschuno")
     USE_FIRESTORE = os.getenv("USE_FIRESTORE", "true").lower() == "true"
     FIRESTORE_TRANSFERENCIAS_COLLECTION = os.getenv("FIRESTORE_TRANSFERENCIAS_COLLECTION", "transferencias")
+    # Clientes de Firestore del proceso (un canal gRPC cada uno); 1 alcanza para el threadpool por defecto
+    FIRESTORE_POOL_SIZE = int(os.getenv("FIRESTORE_POOL_SIZE", "1"))
+    DEBUG = os.getenv("DEBUG", "false").lower() == "true"
     CUENTAS_SERVICE_URL = os.getenv("CUENTAS_SERVICE_URL", "http://cuentas-service:8003/api/cuentas")
+    # Cliente HTTP hacia cuentas-service (uno por proceso). Timeouts en segundos
+    CUENTAS_HTTP_MAX_CONEXIONES = int(os.getenv("CUENTAS_HTTP_MAX_CONEXIONES", "100"))
+    CUENTAS_HTTP_MAX_KEEPALIVE = int(os.getenv("CUENTAS_HTTP_MAX_KEEPALIVE", "20"))
+    CUENTAS_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("CUENTAS_HTTP_KEEPALIVE_EXPIRY", "30"))
+    CUENTAS_HTTP_TIMEOUT = float(os.getenv("CUENTAS_HTTP_TIMEOUT", "5"))
+    CUENTAS_HTTP_CONNECT_TIMEOUT = float(os.getenv("CUENTAS_HTTP_CONNECT_TIMEOUT", "2"))
+    CUENTAS_HTTP_POOL_TIMEOUT = float(os.getenv("CUENTAS_HTTP_POOL_TIMEOUT", "2"))
+    # Reintentos de POST /transferir ante timeout, error de conexión o 5xx (misma Idempotency-Key);
+    # espera inicial en segundos, se duplica en cada reintento
+    CUENTAS_TRANSFERIR_REINTENTOS = int(os.getenv("CUENTAS_TRANSFERIR_REINTENTOS", "2"))
+    CUENTAS_TRANSFERIR_ESPERA = float(os.getenv("CUENTAS_TRANSFERIR_ESPERA", "0.2"))
+    # Reconciliación de transferencias PENDIENTE (ver app.reconciliacion): cada cuántos segundos,
+    # antigüedad mínima en segundos y cuántas por consulta
+    RECONCILIACION_INTERVALO = float(os.getenv("RECONCILIACION_INTERVALO", "60"))
+    RECONCILIACION_ESPERA = float(os.getenv("RECONCILIACION_ESPERA", "60"))
+    RECONCILIACION_LOTE = int(os.getenv("RECONCILIACION_LOTE", "100"))
+    # Cuentas por llamada a POST /lookup de cuentas-service (su máximo es 500)
+    CUENTAS_LOOKUP_MAX = int(os.getenv("CUENTAS_LOOKUP_MAX", "500"))
+    # Caché del dueño de cada cuenta (ver app.propietarios); TTL en segundos, 0 la desactiva
+    PROPIETARIOS_CACHE_TTL = float(os.getenv("PROPIETARIOS_CACHE_TTL", "300"))
+    PROPIETARIOS_CACHE_MAX = int(os.getenv("PROPIETARIOS_CACHE_MAX", "10000"))
+    # HTTP/2 requiere el paquete h2 (pip install "httpx[http2]") y un servidor o proxy que lo hable
+    CUENTAS_HTTP2 = os.getenv("CUENTAS_HTTP2", "false").lower() == "true"
 
 config = Config()
\ No newline at end of file
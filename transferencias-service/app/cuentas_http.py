@@ -0,0 +1,111 @@
+import logging
+import time
+from typing import Dict, Optional
+import httpx
+from .config import config
+from .metricas import registro_metricas
+
+# Cliente HTTP hacia cuentas-service, uno por proceso.
+#
+# Lo crea el lifespan y se inyecta en TransferenciasService con
+# `get_cuentas_http`: las conexiones quedan abiertas (keep-alive) entre
+# llamadas, en vez de un handshake TCP por cada una. Cada llamada se mide
+# en app.metricas (duración por código, errores y timeouts por tipo) y en
+# cada exposición de /metrics se publica el uso del pool de conexiones.
+
+logger = logging.getLogger(__name__)
+
+SERVICIO = "cuentas"
+
+
+class TransporteMedido(httpx.AsyncBaseTransport):
+    """Transporte que registra en app.metricas cada llamada del transporte interno"""
+
+    def __init__(self, transporte: httpx.AsyncHTTPTransport, servicio: str):
+        self._transporte = transporte
+        self.servicio = servicio
+        self.en_curso = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        inicio = time.perf_counter()
+        self.en_curso += 1
+        try:
+            respuesta = await self._transporte.handle_async_request(request)
+        except httpx.TransportError as e:
+            # ConnectTimeout, ReadTimeout, PoolTimeout, ConnectError, ...
+            registro_metricas.registrar_error_saliente(self.servicio, type(e).__name__)
+            raise
+        finally:
+            self.en_curso -= 1
+        registro_metricas.registrar_saliente(
+            self.servicio, request.method, respuesta.status_code, time.perf_counter() - inicio
+        )
+        return respuesta
+
+    async def aclose(self) -> None:
+        await self._transporte.aclose()
+
+    def conexiones(self) -> Optional[Dict[str, int]]:
+        """Conexiones del pool en uso y ociosas (keep-alive), o None si no se pueden leer"""
+        # El pool de httpcore es privado en httpx: si una versión lo cambia
+        # no se publica el medidor, en vez de informar cero conexiones
+        pool = getattr(self._transporte, "_pool", None)
+        if pool is None or not hasattr(pool, "connections"):
+            return None
+        conexiones = list(pool.connections)
+        ociosas = sum(1 for conexion in conexiones if conexion.is_idle())
+        return {"activa": len(conexiones) - ociosas, "inactiva": ociosas}
+
+
+class ClienteCuentas:
+    """httpx.AsyncClient del proceso hacia cuentas-service"""
+
+    def __init__(self):
+        self.http: Optional[httpx.AsyncClient] = None
+        self._transporte: Optional[TransporteMedido] = None
+
+    def iniciar(self) -> None:
+        """Para el lifespan: crea el cliente con sus límites y timeouts"""
+        http2 = config.CUENTAS_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning('CUENTAS_HTTP2 requiere el paquete h2 (pip install "httpx[http2]"): se usa HTTP/1.1')
+                http2 = False
+
+        limites = httpx.Limits(
+            max_connections=config.CUENTAS_HTTP_MAX_CONEXIONES,
+            max_keepalive_connections=config.CUENTAS_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=config.CUENTAS_HTTP_KEEPALIVE_EXPIRY
+        )
+        self._transporte = TransporteMedido(httpx.AsyncHTTPTransport(limits=limites, http2=http2), SERVICIO)
+        self.http = httpx.AsyncClient(
+            transport=self._transporte,
+            timeout=httpx.Timeout(
+                config.CUENTAS_HTTP_TIMEOUT,
+                connect=config.CUENTAS_HTTP_CONNECT_TIMEOUT,
+                pool=config.CUENTAS_HTTP_POOL_TIMEOUT
+            )
+        )
+        registro_metricas.agregar_recolector(self.recolectar)
+
+    async def cerrar(self) -> None:
+        """Para el final del lifespan: cierra las conexiones abiertas"""
+        if self.http is not None:
+            await self.http.aclose()
+        self.http = None
+        self._transporte = None
+
+    def recolectar(self) -> None:
+        """Publica el uso del pool en los medidores de app.metricas"""
+        if self._transporte is None:
+            conexiones, en_curso = {"activa": 0, "inactiva": 0}, 0
+        else:
+            conexiones, en_curso = self._transporte.conexiones(), self._transporte.en_curso
+        for estado, cantidad in (conexiones or {}).items():
+            registro_metricas.conexiones_salientes.fijar((SERVICIO, estado), cantidad)
+        registro_metricas.salientes_en_curso.fijar((SERVICIO,), en_curso)
+
+
+cliente_cuentas = ClienteCuentas()
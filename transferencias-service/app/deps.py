@@ -1,11 +1,28 @@
+import httpx
+from typing import TYPE_CHECKING
 from fastapi import Depends, HTTPException, status
-from google.cloud import firestore
-from .firebase import get_firebase_app
+from .config import config
+from .cuentas_http import cliente_cuentas
+from .firebase import arranque_firestore
 from .security import get_current_user
 
-def get_db() -> firestore.Client:
-    app = get_firebase_app()
-    return firestore.Client(project=app.project_id)
+if TYPE_CHECKING:
+    from google.cloud import firestore
+
+def get_db() -> "firestore.Client":
+    # Cliente del proceso (o el siguiente del pool), creado en el lifespan (ver app.arranque)
+    return arranque_firestore.db
+
+def get_transferencias_collection(db = Depends(get_db)) -> "firestore.CollectionReference":
+    # Armar la referencia no hace llamadas; sin caché, un cliente cerrado en cerrar() no queda vivo
+    return db.collection(config.FIRESTORE_TRANSFERENCIAS_COLLECTION)
+
+def get_cuentas_http() -> httpx.AsyncClient:
+    # Cliente del proceso hacia cuentas-service, creado en el lifespan (ver app.cuentas_http);
+    # sin lifespan no se crea aquí: quedaría sin cerrar y sin recolector de métricas
+    if cliente_cuentas.http is None:
+        raise RuntimeError("El cliente de cuentas-service no está iniciado: se crea en el lifespan de la app")
+    return cliente_cuentas.http
 
 async def get_current_active_user(current_user: dict = Depends(get_current_user)):
     if not current_user.get("active", True):
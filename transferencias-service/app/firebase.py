@@ -1,12 +1,15 @@
-import firebase_admin
-from firebase_admin import credentials
+from .arranque import ArranqueFirestore
 from .config import config
 
-_firebase_app = None
+# Bootstrap perezoso (ver app.arranque): importar este módulo no inicializa
+# Firebase. El lifespan crea la app y los clientes, calienta los canales al
+# arrancar y los cierra al apagar. Los canales usan las opciones por defecto
+# de google-cloud-firestore, que ya incluyen keepalive cada 30 s.
+arranque_firestore = ArranqueFirestore(
+    config.FIREBASE_CREDENTIALS_PATH,
+    clientes=config.FIRESTORE_POOL_SIZE
+)
+
 
 def get_firebase_app():
-    global _firebase_app
-    if _firebase_app is None:
-        cred = credentials.Certificate(config.FIREBASE_CREDENTIALS_PATH)
-        _firebase_app = firebase_admin.initialize_app(cred)
-    return _firebase_app
\ No newline at end of file
+    return arranque_firestore.app
@@ -1,9 +1,58 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from .routers import transferencias
-from .firebase import get_firebase_app
+from .config import config
+from .cuentas_http import cliente_cuentas
+from .deps import get_db, get_transferencias_collection
+from .firebase import arranque_firestore
+from .metricas import MetricasMiddleware, metricas_response
+from .propietarios import propietarios_cache
+from .reconciliacion import reconciliador_pendientes
+from .responses import FastJSONResponse
+from .services.transferencias_service import TransferenciasService
 
-app = FastAPI(title="Transferencias Service")
 
-get_firebase_app()  # Initialize Firebase
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # App de Firebase y cliente de Firestore únicos del proceso, con el canal gRPC ya caliente
+    await arranque_firestore.iniciar()
+    # Conexiones keep-alive hacia cuentas-service compartidas por todas las peticiones
+    cliente_cuentas.iniciar()
+    # Resolución de las transferencias que quedaron PENDIENTE
+    await reconciliador_pendientes.iniciar(
+        lambda: TransferenciasService(get_transferencias_collection(get_db()), cliente_cuentas.http)
+    )
+    yield
+    await reconciliador_pendientes.detener()
+    await cliente_cuentas.cerrar()
+    await arranque_firestore.cerrar()
 
-app.include_router(transferencias.router, prefix="/api/transferencias")
\ No newline at end of file
+
+app = FastAPI(title="Transferencias Service", default_response_class=FastJSONResponse, lifespan=lifespan)
+
+# Latencia por ruta y llamadas a Firestore; en DEBUG, cabecera con el presupuesto por petición
+app.add_middleware(MetricasMiddleware, cabecera=config.DEBUG)
+
+app.include_router(transferencias.router, prefix="/api/transferencias")
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metricas_response()
+
+
+@app.get("/health/firestore")
+def firestore_stats():
+    return arranque_firestore.stats()
+
+
+@app.get("/health/propietarios")
+def propietarios_stats():
+    # Caché del dueño de cada cuenta que usa el listado (hits, misses, tamaño)
+    return propietarios_cache.stats()
+
+
+@app.get("/health/reconciliacion")
+def reconciliacion_stats():
+    # Barrido de transferencias PENDIENTE (resueltas por estado, errores)
+    return reconciliador_pendientes.stats()
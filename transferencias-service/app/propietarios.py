@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from .config import config
+import threading
+import time
+
+# Caché en proceso del dueño (cliente_id) de cada cuenta.
+#
+# El listado de transferencias filtra por dueño de la cuenta origen; el
+# dueño de una cuenta casi nunca cambia, así que se resuelve con
+# POST /lookup de cuentas-service y se guarda aquí por un TTL.
+
+
+class PropietariosCache:
+    """
+    Caché (TTL + LRU) cuenta_id -> cliente_id, compartida por el proceso.
+
+    Una cuenta inexistente se guarda con dueño None, para no volver a
+    preguntarla en cada listado. Usa un lock: los repositorios corren en el
+    threadpool.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entradas: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def habilitada(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get_muchos(self, cuenta_ids: Iterable[str]) -> Tuple[Dict[str, Optional[str]], List[str]]:
+        """Separa los dueños cacheados de las cuentas que hay que resolver (sin duplicados)"""
+        propietarios: Dict[str, Optional[str]] = {}
+        faltantes: List[str] = []
+        ahora = time.monotonic()
+
+        with self._lock:
+            for cuenta_id in dict.fromkeys(cuenta_ids):
+                entrada = self._entradas.get(cuenta_id) if self.habilitada else None
+                if entrada is None or entrada[1] < ahora:
+                    self._entradas.pop(cuenta_id, None)
+                    faltantes.append(cuenta_id)
+                    continue
+                self._entradas.move_to_end(cuenta_id)
+                propietarios[cuenta_id] = entrada[0]
+
+            if self.habilitada:
+                self.hits += len(propietarios)
+                self.misses += len(faltantes)
+
+        return propietarios, faltantes
+
+    def put_muchos(self, propietarios: Dict[str, Optional[str]]) -> None:
+        """Guarda (o renueva) el dueño de cada cuenta"""
+        if not self.habilitada:
+            return
+
+        expira = time.monotonic() + self.ttl
+        with self._lock:
+            for cuenta_id, cliente_id in propietarios.items():
+                self._entradas.pop(cuenta_id, None)
+                self._entradas[cuenta_id] = (cliente_id, expira)
+
+            while len(self._entradas) > self.max_size:
+                self._entradas.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._entradas),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0
+            }
+
+
+# Instancia global de la caché
+propietarios_cache = PropietariosCache(
+    max_size=config.PROPIETARIOS_CACHE_MAX,
+    ttl=config.PROPIETARIOS_CACHE_TTL
+)
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from typing import Callable, Optional
+from .config import config
+
+# Reconciliación de transferencias PENDIENTE.
+#
+# Una transferencia queda PENDIENTE cuando cuentas-service no respondió a
+# ningún intento de POST /transferir: no se sabe si movió los fondos. Este
+# barrido le pide a cuentas-service el resultado definitivo con
+# POST /transferir/{referencia}/resolver (la referencia es el ID de la
+# transferencia): si se aplicó queda EXITOSA; si no, cuentas-service la
+# anula (un pedido original que llegue tarde ya no mueve fondos) y queda
+# RECHAZADA.
+
+logger = logging.getLogger(__name__)
+
+
+class ReconciliadorPendientes:
+    """
+    Cada `intervalo` segundos resuelve las transferencias PENDIENTE con más
+    de `espera` segundos (de a `lote` por consulta). La espera deja terminar
+    los reintentos del pedido original antes de anularlo.
+
+    Con varias réplicas cada una corre su barrido: resolver es idempotente
+    en cuentas-service, así que dos réplicas llegan al mismo estado.
+    """
+
+    def __init__(self, intervalo: float = 60.0, espera: float = 60.0, lote: int = 100):
+        self.intervalo = intervalo
+        self.espera = espera
+        self.lote = lote
+
+        self._servicio_factory: Optional[Callable] = None
+        self._tarea: Optional[asyncio.Task] = None
+
+        self.barridos = 0
+        self.exitosas = 0
+        self.rechazadas = 0
+        self.errores = 0
+
+    @property
+    def activo(self) -> bool:
+        return self._tarea is not None and not self._tarea.done()
+
+    async def iniciar(self, servicio_factory: Callable) -> None:
+        """Arranca el barrido; `servicio_factory` arma un TransferenciasService en cada barrido"""
+        if self.activo:
+            return
+
+        self._servicio_factory = servicio_factory
+        self._tarea = asyncio.create_task(self._ejecutar())
+
+    async def detener(self) -> None:
+        """Detiene el barrido"""
+        if self._tarea is None:
+            return
+
+        self._tarea.cancel()
+        try:
+            await self._tarea
+        except asyncio.CancelledError:
+            pass
+        self._tarea = None
+
+    def stats(self) -> dict:
+        """Estadísticas del barrido"""
+        return {
+            "activo": self.activo,
+            "intervalo": self.intervalo,
+            "espera": self.espera,
+            "barridos": self.barridos,
+            "exitosas": self.exitosas,
+            "rechazadas": self.rechazadas,
+            "errores": self.errores
+        }
+
+    async def _ejecutar(self) -> None:
+        while True:
+            await self.barrer()
+            await asyncio.sleep(self.intervalo)
+
+    async def barrer(self) -> int:
+        """Resuelve las transferencias PENDIENTE vencidas; retorna cuántas se resolvieron"""
+        resueltas = 0
+        try:
+            servicio = self._servicio_factory()
+            for transferencia in await servicio.pendientes(self.espera, self.lote):
+                try:
+                    estado = await servicio.reconciliar(transferencia.id)
+                except Exception:
+                    self.errores += 1
+                    logger.exception("No se pudo reconciliar la transferencia %s", transferencia.id)
+                    continue
+                if estado == "EXITOSA":
+                    self.exitosas += 1
+                elif estado == "RECHAZADA":
+                    self.rechazadas += 1
+                resueltas += 1
+        except Exception:
+            self.errores += 1
+            logger.exception("No se pudo barrer las transferencias pendientes")
+
+        self.barridos += 1
+        return resueltas
+
+
+# Instancia global del barrido
+reconciliador_pendientes = ReconciliadorPendientes(
+    intervalo=config.RECONCILIACION_INTERVALO,
+    espera=config.RECONCILIACION_ESPERA,
+    lote=config.RECONCILIACION_LOTE
+)
@@ -1,11 +1,13 @@
-from google.cloud import firestore
 from ..schemas import Transferencia
-from ..config import config
-from typing import List, Optional
+from datetime import datetime
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from google.cloud import firestore
 
 class TransferenciasRepo:
-    def __init__(self, db: firestore.Client):
-        self.collection = db.collection(config.FIRESTORE_TRANSFERENCIAS_COLLECTION)
+    def __init__(self, collection: "firestore.CollectionReference"):
+        self.collection = collection
 
     def get_all(self, cuenta_id: Optional[str] = None, tipo: Optional[str] = None) -> List[Transferencia]:
         query = self.collection
@@ -30,7 +32,21 @@ class TransferenciasRepo:
             return Transferencia(**doc.to_dict(), id=doc.id)
         return None
 
-    def create(self, data: dict) -> str:
+    def get_pendientes(self, antes_de: datetime, limit: int) -> List[Transferencia]:
+        # Solo igualdad sobre estado (sin índice compuesto); las PENDIENTE son pocas,
+        # la antigüedad se filtra aquí
+        docs = self.collection.where("estado", "==", "PENDIENTE").limit(limit).stream()
+        transferencias = [Transferencia(**doc.to_dict(), id=doc.id) for doc in docs]
+        return [t for t in transferencias if t.fecha.replace(tzinfo=None) <= antes_de]
+
+    def nuevo_id(self) -> str:
+        # ID generado localmente, sin ir a Firestore
+        return self.collection.document().id
+
+    def create(self, data: dict, transferencia_id: Optional[str] = None) -> str:
+        if transferencia_id:
+            self.collection.document(transferencia_id).set(data)
+            return transferencia_id
         _, doc_ref = self.collection.add(data)
         return doc_ref.id
 
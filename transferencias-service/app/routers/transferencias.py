@@ -1,40 +1,66 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+import httpx
 from typing import List, Optional
 from ..schemas import Transferencia, TransferenciaPropiaTerceros, TransferenciaInterbancaria
 from ..services.transferencias_service import TransferenciasService
-from ..deps import get_db, get_current_active_user
+from ..deps import get_transferencias_collection, get_cuentas_http, get_current_active_user
+from ..responses import FastJSONResponse
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Transferencia])
-def list_transferencias(
+async def list_transferencias(
     cuenta_id: Optional[str] = Query(None),
     tipo: Optional[str] = Query(None),
-    db = Depends(get_db),
+    collection = Depends(get_transferencias_collection),
+    http = Depends(get_cuentas_http),
     current_user = Depends(get_current_active_user)
 ):
-    service = TransferenciasService(db)
-    return service.get_all(cuenta_id, tipo, current_user["uid"])
+    service = TransferenciasService(collection, http)
+    # El repo ya arma modelos Transferencia validados: se serializan sin revalidar
+    return FastJSONResponse(await service.get_all(cuenta_id, tipo, current_user["uid"]))
 
 @router.get("/{transferencia_id}", response_model=Transferencia)
-def get_transferencia(
+async def get_transferencia(
     transferencia_id: str,
-    db = Depends(get_db),
+    collection = Depends(get_transferencias_collection),
+    http = Depends(get_cuentas_http),
     current_user = Depends(get_current_active_user)
 ):
-    service = TransferenciasService(db)
-    transferencia = service.get_by_id(transferencia_id, current_user["uid"])
+    service = TransferenciasService(collection, http)
+    transferencia = await service.get_by_id(transferencia_id, current_user["uid"])
     if not transferencia:
         raise HTTPException(status_code=404, detail="Transferencia not found")
     return transferencia
 
+@router.post("/{transferencia_id}/reconciliar", response_model=Transferencia)
+async def reconciliar_transferencia(
+    transferencia_id: str,
+    collection = Depends(get_transferencias_collection),
+    http = Depends(get_cuentas_http),
+    current_user = Depends(get_current_active_user)
+):
+    # Resuelve ya una transferencia PENDIENTE propia, sin esperar al barrido (app.reconciliacion)
+    service = TransferenciasService(collection, http)
+    transferencia = await service.get_by_id(transferencia_id, current_user["uid"])
+    if not transferencia:
+        raise HTTPException(status_code=404, detail="Transferencia not found")
+    if transferencia.estado != "PENDIENTE":
+        return transferencia
+    try:
+        estado = await service.reconciliar(transferencia_id)
+    except httpx.HTTPError:
+        raise HTTPException(status_code=502, detail="Could not resolve the transfer with cuentas-service")
+    return transferencia.model_copy(update={"estado": estado})
+
 @router.post("/", response_model=Transferencia)
 async def create_transferencia(
     body: dict,  # Handle union manually
-    db = Depends(get_db),
+    collection = Depends(get_transferencias_collection),
+    http = Depends(get_cuentas_http),
     current_user = Depends(get_current_active_user)
 ):
-    service = TransferenciasService(db)
+    service = TransferenciasService(collection, http)
     try:
         if body["tipo"] in ["PROPIA", "TERCEROS"]:
             validated = TransferenciaPropiaTerceros(**body)
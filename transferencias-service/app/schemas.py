@@ -21,7 +21,9 @@ class Transferencia(TransferenciaBase):
     banco_destino: Optional[str] = None
     nro_cuenta_externa: Optional[str] = None
     fecha: datetime
-    estado: Literal["EXITOSA", "RECHAZADA"]
+    # PENDIENTE: cuentas-service no confirmó el resultado; app.reconciliacion
+    # la resuelve en EXITOSA o RECHAZADA por su referencia (el ID)
+    estado: Literal["EXITOSA", "RECHAZADA", "PENDIENTE"]
 
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -1,11 +1,11 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from firebase_admin import auth
 from .firebase import get_firebase_app
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")  # Placeholder, assuming auth-service handles login
 
 def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+    from firebase_admin import auth  # la app ya la inicializó el lifespan
     get_firebase_app()  # Ensure initialized
     try:
         decoded_token = auth.verify_id_token(token)
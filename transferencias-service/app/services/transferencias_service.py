@@ -1,77 +1,187 @@
+import asyncio
 import httpx
-from datetime import datetime
+import logging
+from datetime import datetime, timedelta
 from ..schemas import Transferencia
 from ..repos.transferencias_repo import TransferenciasRepo
 from ..config import config
-from typing import List, Optional
+from ..propietarios import propietarios_cache
+from typing import Dict, Iterable, List, Optional
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
 
 class TransferenciasService:
-    def __init__(self, db):
-        self.repo = TransferenciasRepo(db)
+    def __init__(self, collection, http: httpx.AsyncClient):
+        self.repo = TransferenciasRepo(collection)
+        # Cliente compartido del proceso (app.cuentas_http): reutiliza conexiones keep-alive
+        self.http = http
 
-    def get_all(self, cuenta_id: Optional[str], tipo: Optional[str], user_id: str) -> List[Transferencia]:
-        transferencias = self.repo.get_all(cuenta_id, tipo)
-        # Filter by user ownership
-        return [t for t in transferencias if self._user_owns_cuenta(user_id, t.cuenta_origen_id)]
+    async def get_all(self, cuenta_id: Optional[str], tipo: Optional[str], user_id: str) -> List[Transferencia]:
+        transferencias = await run_in_threadpool(self.repo.get_all, cuenta_id, tipo)
+        # Filter by user ownership: one lookup for all the distinct origin accounts
+        propietarios = await self._propietarios(t.cuenta_origen_id for t in transferencias)
+        return [t for t in transferencias if propietarios.get(t.cuenta_origen_id) == user_id]
 
-    def get_by_id(self, transferencia_id: str, user_id: str) -> Optional[Transferencia]:
-        transferencia = self.repo.get_by_id(transferencia_id)
-        if transferencia and self._user_owns_cuenta(user_id, transferencia.cuenta_origen_id):
+    async def get_by_id(self, transferencia_id: str, user_id: str) -> Optional[Transferencia]:
+        transferencia = await run_in_threadpool(self.repo.get_by_id, transferencia_id)
+        if transferencia is None:
+            return None
+        propietarios = await self._propietarios([transferencia.cuenta_origen_id])
+        if propietarios.get(transferencia.cuenta_origen_id) == user_id:
             return transferencia
         return None
 
+    async def _propietarios(self, cuenta_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        cliente_id de cada cuenta (None si no existe). Las que no están en la
+        caché se resuelven con POST /lookup de cuentas-service, una llamada
+        por cada CUENTAS_LOOKUP_MAX cuentas, en paralelo.
+        """
+        propietarios, faltantes = propietarios_cache.get_muchos(cuenta_ids)
+        if not faltantes:
+            return propietarios
+
+        bloques = [
+            faltantes[i:i + config.CUENTAS_LOOKUP_MAX]
+            for i in range(0, len(faltantes), config.CUENTAS_LOOKUP_MAX)
+        ]
+        try:
+            respuestas = await asyncio.gather(*(
+                self.http.post(f"{config.CUENTAS_SERVICE_URL}/lookup", json={"ids": bloque})
+                for bloque in bloques
+            ))
+        except httpx.HTTPError:
+            raise HTTPException(status_code=502, detail="Could not resolve account ownership")
+
+        resueltos: Dict[str, Optional[str]] = {}
+        for resp in respuestas:
+            if resp.status_code != 200:
+                raise HTTPException(status_code=502, detail="Could not resolve account ownership")
+            data = resp.json()
+            resueltos.update({cuenta["id"]: cuenta["cliente_id"] for cuenta in data["items"]})
+            resueltos.update(dict.fromkeys(data["no_encontradas"]))
+
+        propietarios_cache.put_muchos(resueltos)
+        return {**propietarios, **resueltos}
+
     async def create(self, data: dict, user_id: str) -> Transferencia:
-        if not await self._user_owns_cuenta(user_id, data["cuenta_origen_id"]):
-            raise HTTPException(status_code=403, detail="Not authorized for this cuenta")
+        # El ID se reserva antes para usarlo como referencia e Idempotency-Key en cuentas-service
+        transferencia_id = self.repo.nuevo_id()
 
-        # Validate saldo
-        if not await self._validar_saldo(data["cuenta_origen_id"], data["monto"]):
-            raise HTTPException(status_code=400, detail="Insufficient balance")
+        if data["tipo"] in ["PROPIA", "TERCEROS"]:
+            estado = await self._transferir(transferencia_id, data, user_id)
+        else:
+            if not await self._user_owns_cuenta(user_id, data["cuenta_origen_id"]):
+                raise HTTPException(status_code=403, detail="Not authorized for this cuenta")
 
-        estado = "RECHAZADA"
-        try:
-            if data["tipo"] in ["PROPIA", "TERCEROS"]:
-                await self._update_cuenta(data["cuenta_origen_id"], -data["monto"])
-                await self._update_cuenta(data["cuenta_destino_id"], data["monto"])
-                estado = "EXITOSA"
-            elif data["tipo"] == "INTERBANCARIA":
+            # Validate saldo
+            if not await self._validar_saldo(data["cuenta_origen_id"], data["monto"]):
+                raise HTTPException(status_code=400, detail="Insufficient balance")
+
+            estado = "RECHAZADA"
+            try:
                 await self._update_cuenta(data["cuenta_origen_id"], -data["monto"])
                 estado = "EXITOSA"  # Assume handled externally; save details
-        except Exception as e:
-            # Rollback if possible, but for simplicity, just set rejected
-            pass
+            except Exception as e:
+                # Rollback if possible, but for simplicity, just set rejected
+                pass
 
         transferencia_data = {
             **data,
             "fecha": datetime.utcnow(),
             "estado": estado
         }
-        id = self.repo.create(transferencia_data)
+        id = await run_in_threadpool(self.repo.create, transferencia_data, transferencia_id)
         return Transferencia(id=id, **transferencia_data)
 
+    async def pendientes(self, espera: float, limit: int) -> List[Transferencia]:
+        """Transferencias PENDIENTE con más de `espera` segundos"""
+        antes_de = datetime.utcnow() - timedelta(seconds=espera)
+        return await run_in_threadpool(self.repo.get_pendientes, antes_de, limit)
+
+    async def reconciliar(self, transferencia_id: str) -> str:
+        """
+        Resultado definitivo de una transferencia PENDIENTE (ver app.reconciliacion).
+
+        POST /transferir/{referencia}/resolver de cuentas-service responde
+        APLICADA (queda EXITOSA) o ANULADA (queda RECHAZADA: ya no se puede
+        aplicar). Retorna el estado guardado; sin respuesta de cuentas-service
+        lanza la excepción y la transferencia sigue PENDIENTE.
+        """
+        resp = await self.http.post(f"{config.CUENTAS_SERVICE_URL}/transferir/{transferencia_id}/resolver")
+        resp.raise_for_status()
+        estado = "EXITOSA" if resp.json()["estado"] == "APLICADA" else "RECHAZADA"
+        await run_in_threadpool(self.repo.update, transferencia_id, {"estado": estado})
+        logger.info("Transferencia %s reconciliada: %s", transferencia_id, estado)
+        return estado
+
+    async def _transferir(self, transferencia_id: str, data: dict, user_id: str) -> str:
+        """
+        Una sola llamada a cuentas-service: valida dueño, estado y saldo y
+        aplica débito, crédito y movimientos en una transacción (o nada).
+        Retorna el estado de la transferencia.
+
+        Ante un timeout, un error de conexión o un 5xx el resultado es
+        desconocido (cuentas-service pudo haber confirmado): se reintenta
+        con la misma Idempotency-Key y referencia, que no vuelven a mover
+        fondos. Si sigue sin respuesta queda PENDIENTE; solo un 4xx la
+        rechaza.
+        """
+        payload = {
+            "cuenta_origen_id": data["cuenta_origen_id"],
+            "cuenta_destino_id": data["cuenta_destino_id"],
+            "monto": data["monto"],
+            "descripcion": data.get("descripcion"),
+            "referencia": transferencia_id,
+            "cliente_id": user_id
+        }
+        for intento in range(config.CUENTAS_TRANSFERIR_REINTENTOS + 1):
+            if intento:
+                await asyncio.sleep(config.CUENTAS_TRANSFERIR_ESPERA * 2 ** (intento - 1))
+            try:
+                resp = await self.http.post(
+                    f"{config.CUENTAS_SERVICE_URL}/transferir",
+                    json=payload,
+                    headers={"Idempotency-Key": transferencia_id}
+                )
+            except httpx.TransportError as e:
+                logger.warning("Transferencia %s: intento %d sin respuesta (%s)", transferencia_id, intento + 1, type(e).__name__)
+                continue
+
+            if resp.status_code >= 500:
+                logger.warning("Transferencia %s: intento %d respondió %d", transferencia_id, intento + 1, resp.status_code)
+                continue
+            if resp.status_code == 403:
+                raise HTTPException(status_code=403, detail="Not authorized for this cuenta")
+            if 400 <= resp.status_code < 500:
+                # Saldo insuficiente, cuenta inactiva o inexistente: no se movió nada
+                raise HTTPException(status_code=resp.status_code, detail=resp.json().get("detail"))
+            return "EXITOSA"
+
+        logger.error("Transferencia %s sin confirmar por cuentas-service: queda PENDIENTE", transferencia_id)
+        return "PENDIENTE"
+
     async def _validar_saldo(self, cuenta_id: str, monto: float) -> bool:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(f"{config.CUENTAS_SERVICE_URL}/{cuenta_id}/validar-saldo?monto={monto}")
-            resp.raise_for_status()
-            return resp.json()["tiene_saldo"]
+        resp = await self.http.post(f"{config.CUENTAS_SERVICE_URL}/{cuenta_id}/validar-saldo?monto={monto}")
+        resp.raise_for_status()
+        return resp.json()["tiene_saldo"]
 
     async def _update_cuenta(self, cuenta_id: str, monto: float):
-        async with httpx.AsyncClient() as client:
-            if monto > 0:
-                payload = {"monto": monto, "descripcion": "Transferencia recibida"}
-                resp = await client.post(f"{config.CUENTAS_SERVICE_URL}/{cuenta_id}/depositar", json=payload)
-            elif monto < 0:
-                payload = {"monto": abs(monto), "descripcion": "Transferencia enviada"}
-                resp = await client.post(f"{config.CUENTAS_SERVICE_URL}/{cuenta_id}/retirar", json=payload)
-            else:
-                return
-            resp.raise_for_status()
+        if monto > 0:
+            payload = {"monto": monto, "descripcion": "Transferencia recibida"}
+            resp = await self.http.post(f"{config.CUENTAS_SERVICE_URL}/{cuenta_id}/depositar", json=payload)
+        elif monto < 0:
+            payload = {"monto": abs(monto), "descripcion": "Transferencia enviada"}
+            resp = await self.http.post(f"{config.CUENTAS_SERVICE_URL}/{cuenta_id}/retirar", json=payload)
+        else:
+            return
+        resp.raise_for_status()
 
     async def _user_owns_cuenta(self, user_id: str, cuenta_id: str) -> bool:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{config.CUENTAS_SERVICE_URL}/{cuenta_id}")
-            if resp.status_code != 200:
-                return False
-            data = resp.json()
-            return data["cliente_id"] == user_id
\ No newline at end of file
+        resp = await self.http.get(f"{config.CUENTAS_SERVICE_URL}/{cuenta_id}")
+        if resp.status_code != 200:
+            return False
+        data = resp.json()
+        return data["cliente_id"] == user_id
\ No newline at end of file
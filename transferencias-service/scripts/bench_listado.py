@@ -0,0 +1,209 @@
+"""
+Peticiones por segundo de GET /api/transferencias/ con el cliente de
+Firestore del proceso y con un cliente nuevo por petición.
+
+Levanta la app en el mismo proceso (httpx.AsyncClient sobre ASGI, con el
+lifespan) y corre el listado con `--concurrencia` clientes simultáneos en
+cada modo:
+
+- pool: el cliente (o pool de clientes, FIRESTORE_POOL_SIZE) que crea el
+  lifespan, con el canal ya caliente y la referencia a la colección armada
+  una sola vez.
+- por-peticion: un firestore.Client nuevo en cada petición, como hacía
+  get_db antes: canal gRPC, handshake TLS y token nuevos cada vez.
+
+La autenticación se reemplaza por un usuario fijo (`--uid`) y, salvo con
+`--cuentas-real`, el lookup de dueños de cuentas-service por uno local que
+asigna todas las cuentas a ese usuario. Necesita un
+Firestore alcanzable: el del proyecto de FIREBASE_CREDENTIALS_PATH o el
+emulador (FIRESTORE_EMULATOR_HOST; sigue haciendo falta un archivo de
+credenciales para inicializar Firebase). Por modo informa peticiones por
+segundo, latencia p50/p95/p99, códigos de respuesta y llamadas a Firestore
+por petición (de app.metricas), y guarda el resultado en JSON con el commit.
+
+Uso (desde transferencias-service/):
+    python -m scripts.bench_listado
+    python -m scripts.bench_listado --peticiones 2000 --concurrencia 32 --cuenta-id abc123
+    python -m scripts.bench_listado --modos pool
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+MODOS = ("pool", "por-peticion")
+
+
+def percentil(ordenadas: List[float], p: float) -> float:
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not ordenadas:
+        return 0.0
+    return ordenadas[max(math.ceil(p / 100 * len(ordenadas)) - 1, 0)]
+
+
+def llamadas_firestore() -> int:
+    from app.metricas import registro_metricas
+    return int(sum(registro_metricas.llamadas._series.values()))
+
+
+async def correr(client: httpx.AsyncClient, url: str, peticiones: int, concurrencia: int) -> Tuple[List[float], Counter, float]:
+    """Hace `peticiones` GET a `url` con `concurrencia` clientes; retorna latencias, códigos y duración"""
+    latencias: List[float] = []
+    estados: Counter = Counter()
+    pendientes = iter(range(peticiones))
+
+    async def cliente() -> None:
+        for _ in pendientes:
+            inicio = time.perf_counter()
+            respuesta = await client.get(url)
+            latencias.append(time.perf_counter() - inicio)
+            estados[str(respuesta.status_code)] += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(concurrencia)))
+    return latencias, estados, time.perf_counter() - inicio
+
+
+def coleccion_por_peticion():
+    """Dependency que reproduce el get_db anterior: un cliente nuevo en cada petición"""
+    from google.cloud import firestore
+    from app.config import config
+    from app.firebase import arranque_firestore
+    from app.metricas import instrumentar_firestore
+
+    app = arranque_firestore.app
+    db = instrumentar_firestore(firestore.Client(project=app.project_id, credentials=app.credential.get_credential()))
+    return db.collection(config.FIRESTORE_TRANSFERENCIAS_COLLECTION)
+
+
+def cuentas_local(uid: str) -> httpx.AsyncClient:
+    """Cliente hacia un POST /lookup local: todas las cuentas pertenecen a `uid`"""
+    def responder(request: httpx.Request) -> httpx.Response:
+        ids = json.loads(request.content)["ids"]
+        return httpx.Response(200, json={
+            "items": [{"id": cuenta_id, "cliente_id": uid} for cuenta_id in ids],
+            "no_encontradas": []
+        })
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(responder))
+
+
+async def ejecutar(args) -> Dict[str, dict]:
+    from app.deps import get_cuentas_http, get_current_active_user, get_transferencias_collection
+    from app.main import app, lifespan
+
+    app.dependency_overrides[get_current_active_user] = lambda: {"uid": args.uid, "active": True}
+    if not args.cuentas_real:
+        cuentas = cuentas_local(args.uid)
+        app.dependency_overrides[get_cuentas_http] = lambda: cuentas
+    parametros = {clave: valor for clave, valor in (("cuenta_id", args.cuenta_id), ("tipo", args.tipo)) if valor}
+    url = "/api/transferencias/" + (f"?{httpx.QueryParams(parametros)}" if parametros else "")
+
+    resultados = {}
+    async with lifespan(app):
+        async with httpx.AsyncClient(app=app, base_url="http://bench", timeout=None) as client:
+            for modo in args.modos:
+                if modo == "por-peticion":
+                    app.dependency_overrides[get_transferencias_collection] = coleccion_por_peticion
+                else:
+                    app.dependency_overrides.pop(get_transferencias_collection, None)
+
+                # Calentamiento sin medir
+                await correr(client, url, min(args.calentamiento, args.peticiones), args.concurrencia)
+
+                antes = llamadas_firestore()
+                latencias, estados, duracion = await correr(client, url, args.peticiones, args.concurrencia)
+                llamadas = llamadas_firestore() - antes
+
+                ordenadas = sorted(latencias)
+                resultados[modo] = {
+                    "peticiones": len(latencias),
+                    "concurrencia": args.concurrencia,
+                    "duracion_s": round(duracion, 4),
+                    "peticiones_por_segundo": round(len(latencias) / duracion, 2),
+                    "latencia_ms": {
+                        "p50": round(percentil(ordenadas, 50) * 1000, 3),
+                        "p95": round(percentil(ordenadas, 95) * 1000, 3),
+                        "p99": round(percentil(ordenadas, 99) * 1000, 3),
+                        "media": round(sum(ordenadas) / len(ordenadas) * 1000, 3),
+                        "max": round(ordenadas[-1] * 1000, 3)
+                    },
+                    "estados": dict(sorted(estados.items())),
+                    "llamadas_firestore_por_peticion": round(llamadas / len(latencias), 3)
+                }
+    return resultados
+
+
+def commit_actual() -> Optional[str]:
+    try:
+        salida = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return salida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def imprimir(resultados: Dict[str, dict]) -> None:
+    print(f"{'modo':<14}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'llamadas/req':>14}  estados")
+    for modo, r in resultados.items():
+        print(
+            f"{modo:<14}{r['peticiones_por_segundo']:>9.0f}"
+            + "".join(f"{r['latencia_ms'][p]:>9.2f}" for p in ("p50", "p95", "p99"))
+            + f"{r['llamadas_firestore_por_peticion']:>14.2f}  {r['estados']}"
+        )
+    if "pool" in resultados and "por-peticion" in resultados:
+        antes, despues = resultados["por-peticion"], resultados["pool"]
+        print(
+            f"\npool vs por-peticion: req/s x{despues['peticiones_por_segundo'] / antes['peticiones_por_segundo']:.2f}"
+            f"  p95 x{despues['latencia_ms']['p95'] / antes['latencia_ms']['p95']:.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peticiones por segundo del listado de transferencias")
+    parser.add_argument("--modos", nargs="+", choices=MODOS, default=list(MODOS))
+    parser.add_argument("--peticiones", type=int, default=500, help="Peticiones medidas por modo")
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--calentamiento", type=int, default=20)
+    parser.add_argument("--uid", default="bench", help="uid del usuario autenticado")
+    parser.add_argument("--cuenta-id", help="Filtro cuenta_id del listado")
+    parser.add_argument("--tipo", help="Filtro tipo del listado")
+    parser.add_argument("--cuentas-real", action="store_true", help="Resolver dueños con CUENTAS_SERVICE_URL")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto en resultados/)")
+    args = parser.parse_args()
+
+    resultados = asyncio.run(ejecutar(args))
+
+    commit = commit_actual()
+    salida = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "emulador": os.getenv("FIRESTORE_EMULATOR_HOST"),
+        "parametros": {clave: valor for clave, valor in vars(args).items() if clave != "salida"},
+        "modos": resultados
+    }
+
+    ruta = args.salida or os.path.join(
+        "resultados", f"bench_listado_{commit or 'sin-commit'}_{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    with open(ruta, "w") as archivo:
+        json.dump(salida, archivo, indent=2, ensure_ascii=False)
+
+    imprimir(resultados)
+    print(f"\nresultados en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
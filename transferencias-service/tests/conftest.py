@@ -0,0 +1,155 @@
+from typing import Callable, Dict, List, Optional
+import json
+import uuid
+import httpx
+import pytest
+
+from app.config import config
+from app.propietarios import propietarios_cache
+
+
+# Las pruebas corren el servicio contra una colección en memoria con la
+# parte de la API de Firestore que usa TransferenciasRepo, y contra un
+# cuentas-service falso detrás de httpx.MockTransport: sin red ni
+# credenciales de Firebase.
+
+
+class Documento:
+    def __init__(self, doc_id: str, datos: Optional[dict]):
+        self.id = doc_id
+        self.exists = datos is not None
+        self._datos = datos
+
+    def to_dict(self) -> Optional[dict]:
+        return dict(self._datos) if self._datos is not None else None
+
+
+class Referencia:
+    def __init__(self, coleccion: "Coleccion", doc_id: str):
+        self._coleccion = coleccion
+        self.id = doc_id
+
+    def get(self) -> Documento:
+        return Documento(self.id, self._coleccion.documentos.get(self.id))
+
+    def set(self, datos: dict) -> None:
+        self._coleccion.documentos[self.id] = dict(datos)
+
+    def update(self, datos: dict) -> None:
+        if self.id not in self._coleccion.documentos:
+            raise KeyError(self.id)
+        self._coleccion.documentos[self.id].update(datos)
+
+
+class Consulta:
+    def __init__(self, coleccion: "Coleccion", filtros: tuple = (), limite: Optional[int] = None):
+        self._coleccion = coleccion
+        self._filtros = filtros
+        self._limite = limite
+
+    def where(self, campo: str, op: str, valor) -> "Consulta":
+        assert op == "==", op
+        return Consulta(self._coleccion, self._filtros + ((campo, valor),), self._limite)
+
+    def limit(self, limite: int) -> "Consulta":
+        return Consulta(self._coleccion, self._filtros, limite)
+
+    def stream(self) -> List[Documento]:
+        self._coleccion.consultas += 1
+        docs = [
+            Documento(doc_id, datos) for doc_id, datos in self._coleccion.documentos.items()
+            if all(datos.get(campo) == valor for campo, valor in self._filtros)
+        ]
+        return docs[:self._limite]
+
+
+class Coleccion(Consulta):
+    """Colección de Firestore en memoria (solo lo que usa TransferenciasRepo)"""
+
+    def __init__(self):
+        self.documentos: Dict[str, dict] = {}
+        self.consultas = 0
+        super().__init__(self)
+
+    def document(self, doc_id: Optional[str] = None) -> Referencia:
+        return Referencia(self, doc_id or uuid.uuid4().hex[:20])
+
+    def add(self, datos: dict):
+        ref = self.document()
+        ref.set(datos)
+        return None, ref
+
+
+class CuentasFalso:
+    """
+    cuentas-service falso: `respuestas[ruta]` decide qué responde cada ruta
+    (un httpx.Response, una excepción o una función del request) y
+    `pedidos` guarda (ruta, cuerpo, cabeceras) de cada llamada.
+    """
+
+    def __init__(self):
+        self.propietarios: Dict[str, str] = {}
+        self.respuestas: Dict[str, object] = {}
+        self.pedidos: List[tuple] = []
+
+    def rutas(self, prefijo: str) -> List[tuple]:
+        return [pedido for pedido in self.pedidos if pedido[0].startswith(prefijo)]
+
+    def lookup(self, request: httpx.Request) -> httpx.Response:
+        ids = json.loads(request.content)["ids"]
+        return httpx.Response(200, json={
+            "items": [{"id": i, "cliente_id": self.propietarios[i]} for i in ids if i in self.propietarios],
+            "no_encontradas": [i for i in ids if i not in self.propietarios]
+        })
+
+    def manejar(self, request: httpx.Request) -> httpx.Response:
+        ruta = request.url.path.removeprefix(httpx.URL(config.CUENTAS_SERVICE_URL).path)
+        cuerpo = json.loads(request.content) if request.content else None
+        self.pedidos.append((ruta, cuerpo, dict(request.headers)))
+
+        respuesta = self.respuestas.get(ruta)
+        if respuesta is None and ruta == "/lookup":
+            respuesta = self.lookup
+        if isinstance(respuesta, list):
+            respuesta = respuesta.pop(0)
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        if callable(respuesta):
+            return respuesta(request)
+        return respuesta or httpx.Response(404, json={"detail": "Not Found"})
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def sin_estado_global(monkeypatch):
+    """Caché de dueños vacía y reintentos sin espera en cada prueba"""
+    propietarios_cache.clear()
+    monkeypatch.setattr(config, "CUENTAS_TRANSFERIR_ESPERA", 0)
+    yield
+    propietarios_cache.clear()
+
+
+@pytest.fixture
+def coleccion() -> Coleccion:
+    return Coleccion()
+
+
+@pytest.fixture
+def cuentas() -> CuentasFalso:
+    return CuentasFalso()
+
+
+@pytest.fixture
+def http(cuentas) -> httpx.AsyncClient:
+    # MockTransport no abre conexiones: no hace falta cerrarlo
+    return httpx.AsyncClient(transport=httpx.MockTransport(cuentas.manejar))
+
+
+@pytest.fixture
+def servicio_factory(coleccion, http) -> Callable:
+    from app.services.transferencias_service import TransferenciasService
+    return lambda: TransferenciasService(coleccion, http)
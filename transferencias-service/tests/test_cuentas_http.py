@@ -0,0 +1,92 @@
+import asyncio
+import httpx
+import pytest
+
+from app import cuentas_http, deps
+from app.config import config
+from app.cuentas_http import ClienteCuentas, TransporteMedido
+from app.metricas import RegistroMetricas
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def registro(monkeypatch) -> RegistroMetricas:
+    registro = RegistroMetricas()
+    monkeypatch.setattr(cuentas_http, "registro_metricas", registro)
+    return registro
+
+
+def series(registro: RegistroMetricas, nombre: str) -> dict:
+    prefijo = nombre + "{"
+    return {
+        linea[len(nombre):].rsplit(" ", 1)[0]: float(linea.rsplit(" ", 1)[1])
+        for linea in registro.exponer().splitlines() if linea.startswith(prefijo)
+    }
+
+
+async def servidor_keep_alive(conexiones: list):
+    """Servidor HTTP/1.1 mínimo que responde 200 y deja la conexión abierta"""
+
+    async def atender(lector: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        conexiones.append(escritor)
+        try:
+            while True:
+                await lector.readuntil(b"\r\n\r\n")
+                escritor.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+                await escritor.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # El cliente cerró la conexión
+            escritor.close()
+
+    return await asyncio.start_server(atender, "127.0.0.1", 0)
+
+
+async def test_las_llamadas_reutilizan_la_conexion_y_se_publica_el_pool(registro):
+    conexiones = []
+    servidor = await servidor_keep_alive(conexiones)
+    puerto = servidor.sockets[0].getsockname()[1]
+    cliente = ClienteCuentas()
+    cliente.iniciar()
+    try:
+        for _ in range(5):
+            assert (await cliente.http.get(f"http://127.0.0.1:{puerto}/api/cuentas/c1")).status_code == 200
+
+        assert len(conexiones) == 1
+        assert series(registro, "http_saliente_conexiones") == {
+            '{servicio="cuentas",estado="activa"}': 0, '{servicio="cuentas",estado="inactiva"}': 1
+        }
+        assert series(registro, "http_saliente_duracion_segundos_count") == {
+            '{servicio="cuentas",metodo="GET",codigo="200"}': 5
+        }
+        assert cliente.http.timeout.connect == config.CUENTAS_HTTP_CONNECT_TIMEOUT
+    finally:
+        await cliente.cerrar()
+        servidor.close()
+
+    # Cerrado el cliente, el pool se publica vacío
+    assert series(registro, "http_saliente_conexiones")['{servicio="cuentas",estado="inactiva"}'] == 0
+    assert series(registro, "http_saliente_en_curso") == {'{servicio="cuentas"}': 0}
+
+
+async def test_los_errores_de_transporte_se_cuentan_por_tipo(registro):
+    def sin_respuesta(request):
+        raise httpx.ReadTimeout("sin respuesta", request=request)
+
+    transporte = TransporteMedido(httpx.MockTransport(sin_respuesta), "cuentas")
+    async with httpx.AsyncClient(transport=transporte) as cliente:
+        with pytest.raises(httpx.ReadTimeout):
+            await cliente.post("http://cuentas/api/cuentas/transferir")
+
+    assert series(registro, "http_saliente_errores_total") == {'{servicio="cuentas",error="ReadTimeout"}': 1}
+    assert transporte.en_curso == 0
+    # Un transporte sin el pool de httpcore no publica conexiones en lugar de informar cero
+    assert transporte.conexiones() is None
+
+
+def test_sin_lifespan_no_hay_cliente(monkeypatch):
+    monkeypatch.setattr(deps, "cliente_cuentas", ClienteCuentas())
+
+    with pytest.raises(RuntimeError):
+        deps.get_cuentas_http()
@@ -0,0 +1,67 @@
+import pytest
+
+from app import deps
+from app.arranque import ArranqueFirestore
+from app.config import config
+
+
+pytestmark = pytest.mark.anyio
+
+
+class Cliente:
+    """Cliente de Firestore: arma referencias y registra el cierre"""
+
+    def __init__(self):
+        self.cerrado = False
+
+    def collection(self, nombre: str):
+        return (self, nombre)
+
+    def close(self):
+        self.cerrado = True
+
+
+class ArranquePrueba(ArranqueFirestore):
+    """Sin Firebase: la app y los clientes son los de la prueba"""
+
+    def __init__(self, clientes: int):
+        super().__init__("no-existe.json", clientes=clientes)
+        self.creados = []
+
+    def _crear_app(self):
+        return object()
+
+    def _nuevo_cliente(self, app, asincrono=False):
+        self.creados.append(Cliente())
+        return self.creados[-1]
+
+
+@pytest.fixture
+def arranque(monkeypatch) -> ArranquePrueba:
+    arranque = ArranquePrueba(clientes=2)
+    monkeypatch.setattr(deps, "arranque_firestore", arranque)
+    return arranque
+
+
+async def test_las_peticiones_comparten_los_clientes_del_proceso(arranque):
+    await arranque.iniciar(calentar=False)
+
+    clientes = [deps.get_db() for _ in range(4)]
+
+    assert len(arranque.creados) == 2
+    # Se reparten por turno entre los clientes del pool
+    assert clientes[2:] == clientes[:2]
+    assert {id(cliente) for cliente in clientes} == {id(cliente) for cliente in arranque.creados}
+
+
+async def test_la_coleccion_se_arma_con_el_cliente_vigente(arranque):
+    await arranque.iniciar(calentar=False)
+    db, nombre = deps.get_transferencias_collection(deps.get_db())
+
+    await arranque.cerrar()
+    nuevo, _ = deps.get_transferencias_collection(deps.get_db())
+
+    assert nombre == config.FIRESTORE_TRANSFERENCIAS_COLLECTION
+    # Una colección armada antes de cerrar no deja vivo al cliente cerrado
+    assert db.cerrado and not nuevo.cerrado
+    assert len(arranque.creados) == 4
@@ -0,0 +1,86 @@
+from datetime import datetime
+from fastapi import HTTPException
+import httpx
+import pytest
+
+from app import propietarios as modulo_propietarios
+from app.config import config
+from app.propietarios import PropietariosCache, propietarios_cache
+
+
+pytestmark = pytest.mark.anyio
+
+
+def guardar(coleccion, transferencia_id: str, origen: str) -> None:
+    coleccion.document(transferencia_id).set({
+        "tipo": "PROPIA", "cuenta_origen_id": origen, "cuenta_destino_id": "destino",
+        "monto": 1, "fecha": datetime.utcnow(), "estado": "EXITOSA"
+    })
+
+
+def lookups(cuentas) -> list:
+    return [sorted(cuerpo["ids"]) for _, cuerpo, _ in cuentas.rutas("/lookup")]
+
+
+async def test_el_listado_resuelve_los_duenos_con_un_lookup(servicio_factory, coleccion, cuentas):
+    cuentas.propietarios.update({"a": "cliente-1", "b": "cliente-2"})
+    for i, origen in enumerate(["a", "b", "a", "borrada", "a"]):
+        guardar(coleccion, f"t{i}", origen)
+
+    propias = await servicio_factory().get_all(None, None, "cliente-1")
+
+    assert sorted(t.id for t in propias) == ["t0", "t2", "t4"]
+    assert lookups(cuentas) == [["a", "b", "borrada"]]
+
+
+async def test_los_duenos_cacheados_no_se_vuelven_a_pedir(servicio_factory, coleccion, cuentas):
+    cuentas.propietarios.update({"a": "cliente-1"})
+    guardar(coleccion, "t1", "a")
+    guardar(coleccion, "t2", "borrada")
+    servicio = servicio_factory()
+
+    await servicio.get_all(None, None, "cliente-1")
+    guardar(coleccion, "t3", "c")
+    await servicio.get_all(None, None, "cliente-1")
+    assert await servicio.get_by_id("t1", "cliente-1") is not None
+
+    # La cuenta inexistente también queda cacheada (con dueño None)
+    assert lookups(cuentas) == [["a", "borrada"], ["c"]]
+
+
+async def test_muchas_cuentas_se_piden_en_bloques(servicio_factory, coleccion, cuentas, monkeypatch):
+    monkeypatch.setattr(config, "CUENTAS_LOOKUP_MAX", 2)
+    for i in range(5):
+        cuentas.propietarios[f"c{i}"] = "cliente-1"
+        guardar(coleccion, f"t{i}", f"c{i}")
+
+    propias = await servicio_factory().get_all(None, None, "cliente-1")
+
+    assert len(propias) == 5
+    assert sorted(len(ids) for ids in lookups(cuentas)) == [1, 2, 2]
+
+
+async def test_sin_respuesta_de_cuentas_responde_502_y_no_cachea(servicio_factory, coleccion, cuentas):
+    guardar(coleccion, "t1", "a")
+    cuentas.respuestas["/lookup"] = [httpx.ConnectError("sin conexión"), httpx.Response(500)]
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            await servicio_factory().get_all(None, None, "cliente-1")
+        assert error.value.status_code == 502
+
+    assert propietarios_cache.stats()["entradas"] == 0
+
+
+def test_la_cache_vence_por_ttl_y_descarta_la_menos_usada(monkeypatch):
+    reloj = [100.0]
+    monkeypatch.setattr(modulo_propietarios.time, "monotonic", lambda: reloj[0])
+    cache = PropietariosCache(max_size=2, ttl=10)
+
+    cache.put_muchos({"a": "cliente-1", "b": None})
+    cache.get_muchos(["a"])
+    cache.put_muchos({"c": "cliente-2"})
+    assert cache.get_muchos(["a", "b", "c"]) == ({"a": "cliente-1", "c": "cliente-2"}, ["b"])
+
+    reloj[0] += 11
+    assert cache.get_muchos(["a", "a"]) == ({}, ["a"])
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+import httpx
+import pytest
+
+from app.config import config
+from app.reconciliacion import ReconciliadorPendientes
+
+
+pytestmark = pytest.mark.anyio
+
+
+def transferencia(monto: float = 10) -> dict:
+    return {
+        "tipo": "PROPIA", "cuenta_origen_id": "origen", "cuenta_destino_id": "destino",
+        "monto": monto, "descripcion": "Alquiler"
+    }
+
+
+def pendiente(coleccion, transferencia_id: str, minutos: int = 5) -> None:
+    coleccion.document(transferencia_id).set({
+        **transferencia(), "fecha": datetime.utcnow() - timedelta(minutes=minutos), "estado": "PENDIENTE"
+    })
+
+
+async def test_una_sola_llamada_con_la_referencia_como_idempotency_key(servicio_factory, coleccion, cuentas):
+    cuentas.respuestas["/transferir"] = httpx.Response(200, json={})
+
+    creada = await servicio_factory().create(transferencia(), "cliente-1")
+
+    assert creada.estado == "EXITOSA"
+    assert coleccion.documentos[creada.id]["estado"] == "EXITOSA"
+    ((ruta, cuerpo, cabeceras),) = cuentas.pedidos
+    assert ruta == "/transferir"
+    assert cuerpo["referencia"] == cabeceras["idempotency-key"] == creada.id
+    assert (cuerpo["cliente_id"], cuerpo["monto"]) == ("cliente-1", 10)
+
+
+async def test_sin_respuesta_se_reintenta_con_la_misma_clave(servicio_factory, cuentas):
+    cuentas.respuestas["/transferir"] = [
+        httpx.ConnectError("sin conexión"), httpx.Response(503), httpx.Response(200, json={})
+    ]
+
+    creada = await servicio_factory().create(transferencia(), "cliente-1")
+
+    assert creada.estado == "EXITOSA"
+    assert {pedido[2]["idempotency-key"] for pedido in cuentas.pedidos} == {creada.id}
+    assert len(cuentas.pedidos) == 3
+
+
+async def test_sin_confirmacion_queda_pendiente(servicio_factory, coleccion, cuentas):
+    cuentas.respuestas["/transferir"] = lambda request: httpx.Response(504)
+
+    creada = await servicio_factory().create(transferencia(), "cliente-1")
+
+    assert creada.estado == coleccion.documentos[creada.id]["estado"] == "PENDIENTE"
+    assert len(cuentas.pedidos) == config.CUENTAS_TRANSFERIR_REINTENTOS + 1
+
+
+@pytest.mark.parametrize("codigo", [400, 403, 404])
+async def test_un_4xx_rechaza_sin_guardar_ni_reintentar(servicio_factory, coleccion, cuentas, codigo):
+    cuentas.respuestas["/transferir"] = httpx.Response(codigo, json={"detail": "Saldo insuficiente"})
+
+    with pytest.raises(HTTPException) as error:
+        await servicio_factory().create(transferencia(), "cliente-1")
+
+    assert error.value.status_code == codigo
+    assert coleccion.documentos == {}
+    assert len(cuentas.pedidos) == 1
+
+
+@pytest.mark.parametrize("resolucion, estado", [("APLICADA", "EXITOSA"), ("ANULADA", "RECHAZADA")])
+async def test_reconciliar_guarda_el_resultado_de_cuentas(servicio_factory, coleccion, cuentas, resolucion, estado):
+    pendiente(coleccion, "t1")
+    cuentas.respuestas["/transferir/t1/resolver"] = httpx.Response(200, json={"estado": resolucion})
+
+    assert await servicio_factory().reconciliar("t1") == estado
+    assert coleccion.documentos["t1"]["estado"] == estado
+
+
+async def test_el_barrido_resuelve_solo_las_pendientes_vencidas(servicio_factory, coleccion, cuentas):
+    pendiente(coleccion, "vieja")
+    pendiente(coleccion, "anulada")
+    pendiente(coleccion, "sin-respuesta")
+    # Recién creada: su pedido original todavía puede estar reintentando
+    pendiente(coleccion, "reciente", minutos=0)
+    cuentas.respuestas.update({
+        "/transferir/vieja/resolver": httpx.Response(200, json={"estado": "APLICADA"}),
+        "/transferir/anulada/resolver": httpx.Response(200, json={"estado": "ANULADA"}),
+        "/transferir/sin-respuesta/resolver": httpx.ReadTimeout("sin respuesta"),
+    })
+    reconciliador = ReconciliadorPendientes(espera=60)
+    reconciliador._servicio_factory = servicio_factory
+
+    assert await reconciliador.barrer() == 2
+
+    estados = {doc_id: datos["estado"] for doc_id, datos in coleccion.documentos.items()}
+    assert estados == {
+        "vieja": "EXITOSA", "anulada": "RECHAZADA", "sin-respuesta": "PENDIENTE", "reciente": "PENDIENTE"
+    }
+    stats = reconciliador.stats()
+    assert (stats["exitosas"], stats["rechazadas"], stats["errores"]) == (1, 1, 1)